@@ -0,0 +1,325 @@
+"""asyncio ACME v2 client API.
+
+This module provides coroutine counterparts of `.ClientV2` and
+`.ClientNetwork`, so that a single event loop can drive many orders at
+once. Messages, JWS and challenges are handled by `acme.messages`,
+`acme.jws` and `acme.challenges` exactly as in the synchronous client.
+
+HTTP requests are sent by a `.ClientNetwork` running in a pool of
+threads, so that they never block the event loop and keep reusing its
+pool of kept-alive connections.
+
+.. note:: The I/O itself is not asynchronous: each request occupies a
+   thread for its whole duration. At most ``max_workers`` requests of an
+   `AsyncClientNetwork` are in flight at the same time, and the others
+   wait for a free thread. By default, there are as many threads as the
+   ``pool_maxsize`` connections the `.ClientNetwork` keeps alive, which
+   suits tens of concurrent requests, not thousands.
+
+.. note:: This module requires Python 3.5 or later. It is not installed
+   on Python 2.
+
+"""
+import asyncio
+import concurrent.futures
+import datetime
+import functools
+
+import josepy as jose
+import OpenSSL
+
+from acme import client
+from acme import crypto_util
+from acme import errors
+from acme import messages
+
+
+class AsyncClientNetwork(object):
+    """asyncio wrapper around `.ClientNetwork`.
+
+    :ivar .ClientNetwork net: Thread-safe client network sending the
+        requests.
+    :ivar int max_workers: Maximum number of requests sent at the same
+        time.
+
+    """
+    def __init__(self, net, loop=None, max_workers=None):
+        """Initialize.
+
+        :param .ClientNetwork net: Client network sending the requests.
+        :param asyncio.AbstractEventLoop loop: Event loop to use. Defaults
+            to the current event loop.
+        :param int max_workers: Number of threads sending the requests.
+            Defaults to the ``pool_maxsize`` of ``net``, so that each
+            thread can keep its connection alive.
+
+        """
+        self.net = net
+        self.max_workers = net.pool_maxsize if max_workers is None else max_workers
+        self._loop = loop
+        self._executor = concurrent.futures.ThreadPoolExecutor(self.max_workers)
+
+    def close(self):
+        """Stop the threads sending the requests once they are sent."""
+        self._executor.shutdown(wait=False)
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking call of the synchronous client in the executor.
+
+        :param callable func: Function to call.
+
+        :returns: What ``func`` returned.
+
+        """
+        loop = self._loop if self._loop is not None else asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs))
+
+    async def head(self, *args, **kwargs):
+        """Send HEAD request. See `.ClientNetwork.head`."""
+        return await self.run(self.net.head, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        """Send GET request. See `.ClientNetwork.get`."""
+        return await self.run(self.net.get, *args, **kwargs)
+
+    async def post(self, *args, **kwargs):
+        """Send POST request. See `.ClientNetwork.post`."""
+        return await self.run(self.net.post, *args, **kwargs)
+
+
+class AsyncClientV2(object):
+    """asyncio ACME client for a v2 API.
+
+    :ivar messages.Directory directory:
+    :ivar .AsyncClientNetwork net: Client network.
+
+    """
+    def __init__(self, directory, net, polling_strategy=None):
+        """Initialize.
+
+        :param .messages.Directory directory: Directory Resource
+        :param .AsyncClientNetwork net: Client network.
+        :param .PollingStrategy polling_strategy: Strategy deciding when
+            authorizations and orders are polled again.
+
+        """
+        self.directory = directory
+        self.net = net
+        self._client = client.ClientV2(directory, net.net, polling_strategy)
+
+    @classmethod
+    async def from_url(cls, url, net, polling_strategy=None):
+        """Create a client from the URL of the ACME directory.
+
+        :param str url: URL of the ACME directory.
+        :param .AsyncClientNetwork net: Client network.
+        :param .PollingStrategy polling_strategy: Strategy deciding when
+            authorizations and orders are polled again.
+
+        :rtype: `AsyncClientV2`
+
+        """
+        response = await net.get(url)
+        return cls(messages.Directory.from_json(response.json()), net, polling_strategy)
+
+    async def new_account(self, new_account):
+        """Register. See `.ClientV2.new_account`.
+
+        :param .NewRegistration new_account:
+
+        :raises .ConflictError: in case the account already exists
+
+        :returns: Registration Resource.
+        :rtype: `.RegistrationResource`
+
+        """
+        return await self.net.run(self._client.new_account, new_account)
+
+    async def query_registration(self, regr):
+        """Query server about registration. See `.ClientV2.query_registration`.
+
+        :param messages.RegistrationResource: Existing Registration
+            Resource.
+
+        """
+        return await self.net.run(self._client.query_registration, regr)
+
+    async def update_registration(self, regr, update=None):
+        """Update registration. See `.ClientV2.update_registration`.
+
+        :param messages.RegistrationResource regr: Registration Resource.
+        :param messages.Registration update: Updated body of the
+            resource. If not provided, body will be taken from `regr`.
+
+        :returns: Updated Registration Resource.
+        :rtype: `.RegistrationResource`
+
+        """
+        return await self.net.run(self._client.update_registration, regr, update)
+
+    async def new_order(self, csr_pem):
+        """Request a new Order object from the server.
+
+        The authorizations of the order are fetched concurrently.
+
+        :param str csr_pem: A CSR in PEM format.
+
+        :returns: The newly created order.
+        :rtype: OrderResource
+
+        """
+        csr = OpenSSL.crypto.load_certificate_request(OpenSSL.crypto.FILETYPE_PEM, csr_pem)
+        # pylint: disable=protected-access
+        order = messages.NewOrder(identifiers=[
+            messages.Identifier(typ=messages.IDENTIFIER_FQDN, value=name)
+            for name in crypto_util._pyopenssl_cert_or_req_all_names(csr)])
+        response = await self.net.run(self._client._post, self.directory['newOrder'], order)
+        body = messages.Order.from_json(response.json())
+        authorizations = await asyncio.gather(*[
+            self._get_authzr(url) for url in body.authorizations])
+        return messages.OrderResource(
+            body=body,
+            uri=response.headers.get('Location'),
+            authorizations=[authzr for authzr, _ in authorizations],
+            csr_pem=csr_pem)
+
+    async def _get_authzr(self, url, identifier=None):
+        # pylint: disable=protected-access
+        response = await self.net.run(self._client._post_as_get, url)
+        return self._client._authzr_from_response(response, identifier, url), response
+
+    async def poll(self, authzr):
+        """Poll Authorization Resource for status.
+
+        :param authzr: Authorization Resource
+        :type authzr: `.AuthorizationResource`
+
+        :returns: Updated Authorization Resource and HTTP response.
+
+        :rtype: (`.AuthorizationResource`, `requests.Response`)
+
+        """
+        return await self._get_authzr(authzr.uri, authzr.body.identifier)
+
+    async def answer_challenge(self, challb, response):
+        """Answer challenge. See `.ClientBase.answer_challenge`.
+
+        :param challb: Challenge Resource body.
+        :type challb: `.ChallengeBody`
+
+        :param response: Corresponding Challenge response
+        :type response: `.challenges.ChallengeResponse`
+
+        :returns: Challenge Resource with updated body.
+        :rtype: `.ChallengeResource`
+
+        """
+        return await self.net.run(self._client.answer_challenge, challb, response)
+
+    async def poll_and_finalize(self, orderr, deadline=None):
+        """Poll authorizations and finalize the order.
+
+        If no deadline is provided, this method will timeout after 90
+        seconds.
+
+        :param messages.OrderResource orderr: order to finalize
+        :param datetime.datetime deadline: when to stop polling and timeout
+
+        :returns: finalized order
+        :rtype: messages.OrderResource
+
+        """
+        if deadline is None:
+            deadline = datetime.datetime.now() + datetime.timedelta(seconds=90)
+        orderr = await self.poll_authorizations(orderr, deadline)
+        return await self.finalize_order(orderr, deadline)
+
+    async def poll_authorizations(self, orderr, deadline):
+        """Poll the authorizations of an order until they are not pending.
+
+        All authorizations are polled concurrently, each one on the
+        schedule given by `.ClientV2.polling_strategy`.
+
+        :param messages.OrderResource orderr: order to poll
+        :param datetime.datetime deadline: when to stop polling and timeout
+
+        :returns: order with updated authorizations
+        :rtype: messages.OrderResource
+
+        :raises .TimeoutError: if an authorization is still pending at
+            the deadline
+        :raises .ValidationError: if an authorization failed
+
+        """
+        responses = await asyncio.gather(*[
+            self._poll_authorization(url, deadline)
+            for url in orderr.body.authorizations])
+        failed = [authzr for authzr in responses
+                  if authzr.body.status != messages.STATUS_VALID and
+                  any(chall.error is not None for chall in authzr.body.challenges)]
+        if failed:
+            raise errors.ValidationError(failed)
+        return orderr.update(authorizations=list(responses))
+
+    async def _poll_authorization(self, url, deadline):
+        attempt = 0
+        while datetime.datetime.now() < deadline:
+            authzr, response = await self._get_authzr(url)
+            if authzr.body.status != messages.STATUS_PENDING:
+                return authzr
+            await _sleep_until(
+                self._client.polling_strategy.next_poll(attempt, response), deadline)
+            attempt += 1
+        raise errors.TimeoutError()
+
+    async def finalize_order(self, orderr, deadline):
+        """Finalize an order and obtain a certificate.
+
+        :param messages.OrderResource orderr: order to finalize
+        :param datetime.datetime deadline: when to stop polling and timeout
+
+        :returns: finalized order
+        :rtype: messages.OrderResource
+
+        """
+        # pylint: disable=protected-access
+        csr = OpenSSL.crypto.load_certificate_request(
+            OpenSSL.crypto.FILETYPE_PEM, orderr.csr_pem)
+        wrapped_csr = messages.CertificateRequest(csr=jose.ComparableX509(csr))
+        response = await self.net.run(self._client._post, orderr.body.finalize, wrapped_csr)
+        attempt = 0
+        while datetime.datetime.now() < deadline:
+            await _sleep_until(
+                self._client.polling_strategy.next_poll(attempt, response), deadline)
+            attempt += 1
+            response = await self.net.run(self._client._post_as_get, orderr.uri)
+            body = messages.Order.from_json(response.json())
+            if body.error is not None:
+                raise errors.IssuanceError(body.error)
+            if body.certificate is not None:
+                certificate_response = await self.net.run(
+                    self._client._post_as_get, body.certificate)
+                return orderr.update(body=body, fullchain_pem=certificate_response.text)
+        raise errors.TimeoutError()
+
+    async def revoke(self, cert, rsn):
+        """Revoke certificate.
+
+        :param .ComparableX509 cert: `OpenSSL.crypto.X509` wrapped in
+            `.ComparableX509`
+
+        :param int rsn: Reason code for certificate revocation.
+
+        :raises .ClientError: If revocation is unsuccessful.
+
+        """
+        return await self.net.run(self._client.revoke, cert, rsn)
+
+
+async def _sleep_until(when, deadline):
+    """Sleep until `when`, but not past `deadline`."""
+    delay = (min(when, deadline) - datetime.datetime.now()).total_seconds()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
@@ -0,0 +1,229 @@
+"""Tests for acme.aio."""
+import datetime
+import sys
+import threading
+import time
+import unittest
+
+import mock
+
+if sys.version_info < (3, 5):  # pragma: no cover
+    raise unittest.SkipTest('acme.aio requires Python 3.5 or later')
+
+# pylint: disable=wrong-import-order,wrong-import-position
+import asyncio
+
+from acme import client_test
+from acme import errors
+from acme import messages
+from acme import messages_test
+# pylint: enable=wrong-import-order,wrong-import-position
+
+
+class AsyncClientV2Test(client_test.ClientTestBase):
+    """Tests for acme.aio.AsyncClientV2."""
+
+    def setUp(self):
+        super(AsyncClientV2Test, self).setUp()
+        from acme.aio import AsyncClientNetwork, AsyncClientV2
+        from acme.client import PollingStrategy
+        self.loop = asyncio.new_event_loop()
+        self.net.pool_maxsize = 4
+        self.async_net = AsyncClientNetwork(self.net, loop=self.loop)
+        # Do not wait between polls
+        self.client = AsyncClientV2(client_test.DIRECTORY_V2, self.async_net,
+                                    PollingStrategy(initial=0))
+        self.response.headers['Retry-After'] = '0'
+
+        self.authzr_uri2 = 'https://www.letsencrypt-demo.org/acme/authz/2'
+        self.authz2 = self.authz.update(identifier=messages.Identifier(
+            typ=messages.IDENTIFIER_FQDN, value='www.example.com'),
+            status=messages.STATUS_PENDING)
+        self.authzr2 = messages.AuthorizationResource(
+            body=self.authz2, uri=self.authzr_uri2)
+        self.order = messages.Order(
+            identifiers=(self.authz.identifier, self.authz2.identifier),
+            status=messages.STATUS_PENDING,
+            authorizations=(self.authzr.uri, self.authzr_uri2),
+            finalize='https://www.letsencrypt-demo.org/acme/acct/1/order/1/finalize')
+        self.orderr = messages.OrderResource(
+            body=self.order,
+            uri='https://www.letsencrypt-demo.org/acme/acct/1/order/1',
+            authorizations=[self.authzr, self.authzr2], csr_pem=client_test.CSR_SAN_PEM)
+
+    def tearDown(self):
+        self.async_net.close()
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_from_url(self):
+        from acme.aio import AsyncClientV2
+        self.response.json.return_value = client_test.DIRECTORY_V2.to_json()
+        client = self._run(AsyncClientV2.from_url('directory', self.async_net))
+        self.assertEqual(client.directory['newOrder'], client_test.DIRECTORY_V2['newOrder'])
+        self.net.get.assert_called_once_with('directory')
+
+        polling_strategy = mock.MagicMock()
+        client = self._run(AsyncClientV2.from_url('directory', self.async_net, polling_strategy))
+        # pylint: disable=protected-access
+        self.assertTrue(client._client.polling_strategy is polling_strategy)
+
+    def test_network_passthrough(self):
+        self.assertEqual(self._run(self.async_net.head('uri')), self.net.head.return_value)
+        self.assertEqual(self._run(self.async_net.post('uri', None)), self.response)
+
+    def test_max_workers(self):
+        from acme.aio import AsyncClientNetwork
+        self.assertEqual(self.async_net.max_workers, 4)
+        async_net = AsyncClientNetwork(self.net, loop=self.loop, max_workers=2)
+        self.addCleanup(async_net.close)
+        self.assertEqual(async_net.max_workers, 2)
+
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def _post(*unused_args, **unused_kwargs):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return self.response
+        self.net.post.side_effect = _post
+
+        self._run(asyncio.gather(*[asyncio.ensure_future(async_net.post('uri', None),
+                                                         loop=self.loop)
+                                   for _ in range(6)]))
+        self.assertEqual(peak[0], 2)
+
+    def test_new_account(self):
+        self.response.status_code = 201
+        self.response.json.return_value = self.regr.body.to_json()
+        self.response.headers['Location'] = self.regr.uri
+        self.assertEqual(self.regr, self._run(self.client.new_account(self.new_reg)))
+
+    def test_new_account_conflict(self):
+        self.response.status_code = 200
+        self.response.headers['Location'] = self.regr.uri
+        self.assertRaises(errors.ConflictError, self._run,
+                          self.client.new_account(self.new_reg))
+
+    def test_query_and_update_registration(self):
+        self.response.json.return_value = self.regr.body.to_json()
+        self.response.headers['Location'] = self.regr.uri
+        self.assertEqual(self.regr, self._run(self.client.query_registration(self.regr)))
+        self.assertEqual(self.regr, self._run(self.client.update_registration(self.regr)))
+
+    def test_new_order(self):
+        def _post(url, obj, **unused_kwargs):
+            response = mock.MagicMock(ok=True, status_code=201, headers={}, links={})
+            if url == client_test.DIRECTORY_V2['newOrder']:
+                response.json.return_value = self.order.to_json()
+                response.headers['Location'] = self.orderr.uri
+            elif url == self.authzr.uri:
+                response.json.return_value = self.authz.to_json()
+            else:
+                response.json.return_value = self.authz2.to_json()
+            self.assertTrue(obj is None or url == client_test.DIRECTORY_V2['newOrder'])
+            return response
+        self.net.post.side_effect = _post
+
+        self.assertEqual(self._run(self.client.new_order(client_test.CSR_SAN_PEM)),
+                         self.orderr)
+
+    def test_poll(self):
+        self.response.json.return_value = self.authz.to_json()
+        authzr, response = self._run(self.client.poll(self.authzr))
+        self.assertEqual(authzr, self.authzr)
+        self.assertEqual(response, self.response)
+
+    def test_answer_challenge(self):
+        self.response.links['up'] = {'url': self.challr.authzr_uri}
+        self.response.json.return_value = self.challr.body.to_json()
+        chall_response = mock.MagicMock()
+        self.assertEqual(self.challr, self._run(
+            self.client.answer_challenge(self.challr.body, chall_response)))
+
+    def test_poll_authorizations_success(self):
+        deadline = datetime.datetime(9999, 9, 9)
+        updated_authz2 = self.authz2.update(status=messages.STATUS_VALID)
+        updated_authzr2 = messages.AuthorizationResource(
+            body=updated_authz2, uri=self.authzr_uri2)
+        updated_orderr = self.orderr.update(authorizations=[self.authzr, updated_authzr2])
+        polls = {self.authzr.uri: [self.authz],
+                 self.authzr_uri2: [self.authz2, updated_authz2]}
+
+        def _post(url, unused_obj, **unused_kwargs):
+            response = mock.MagicMock(headers={'Retry-After': '0'})
+            response.json.return_value = polls[url].pop(0).to_json()
+            return response
+        self.net.post.side_effect = _post
+
+        self.assertEqual(self._run(self.client.poll_authorizations(self.orderr, deadline)),
+                         updated_orderr)
+        self.assertEqual(self.net.post.call_count, 3)
+
+    def test_poll_authorizations_failure(self):
+        deadline = datetime.datetime(9999, 9, 9)
+        challb = self.challr.body.update(status=messages.STATUS_INVALID,
+                                         error=messages.Error.with_code('unauthorized'))
+        authz = self.authz.update(status=messages.STATUS_INVALID, challenges=(challb,))
+        self.response.json.return_value = authz.to_json()
+        self.assertRaises(errors.ValidationError, self._run,
+                          self.client.poll_authorizations(self.orderr, deadline))
+
+    def test_poll_authorizations_timeout(self):
+        deadline = datetime.datetime.now() - datetime.timedelta(seconds=1)
+        self.assertRaises(errors.TimeoutError, self._run,
+                          self.client.poll_authorizations(self.orderr, deadline))
+
+    def test_poll_and_finalize(self):
+        updated_order = self.order.update(
+            certificate='https://www.letsencrypt-demo.org/acme/cert/')
+        updated_orderr = self.orderr.update(body=updated_order,
+                                            fullchain_pem=client_test.CERT_SAN_PEM)
+        self.client.poll_authorizations = mock.MagicMock()
+        self.client.poll_authorizations.return_value = asyncio.Future(loop=self.loop)
+        self.client.poll_authorizations.return_value.set_result(self.orderr)
+        self.response.json.return_value = updated_order.to_json()
+        self.response.text = client_test.CERT_SAN_PEM
+
+        self.assertEqual(self._run(self.client.poll_and_finalize(self.orderr)),
+                         updated_orderr)
+        deadline = self.client.poll_authorizations.call_args[0][1]
+        self.assertTrue(deadline > datetime.datetime.now())
+
+    def test_finalize_order_error(self):
+        updated_order = self.order.update(error=messages.Error.with_code('unauthorized'))
+        self.response.json.return_value = updated_order.to_json()
+        deadline = datetime.datetime(9999, 9, 9)
+        self.assertRaises(errors.IssuanceError, self._run,
+                          self.client.finalize_order(self.orderr, deadline))
+
+    def test_finalize_order_timeout(self):
+        deadline = datetime.datetime.now() - datetime.timedelta(seconds=60)
+        self.assertRaises(errors.TimeoutError, self._run,
+                          self.client.finalize_order(self.orderr, deadline))
+
+    def test_finalize_order_retry_after(self):
+        self.response.headers['Retry-After'] = '60'
+        deadline = datetime.datetime.now() + datetime.timedelta(seconds=0.01)
+        self.assertRaises(errors.TimeoutError, self._run,
+                          self.client.finalize_order(self.orderr, deadline))
+        # The order is polled a last time at the deadline, before the Retry-After delay
+        self.assertEqual(self.net.post.call_count, 2)
+        self.assertTrue(datetime.datetime.now() < deadline + datetime.timedelta(seconds=30))
+
+    def test_revoke(self):
+        self._run(self.client.revoke(messages_test.CERT, self.rsn))
+        self.net.post.assert_called_once_with(
+            client_test.DIRECTORY_V2["revokeCert"], mock.ANY, acme_version=2,
+            new_nonce_url=client_test.DIRECTORY_V2['newNonce'])
+
+
+if __name__ == '__main__':
+    unittest.main()  # pragma: no cover
@@ -5,16 +5,18 @@ import datetime
 from email.utils import parsedate_tz
 import heapq
 import logging
+import random
 import time
 import re
 import sys
+import threading
 
 import six
 from six.moves import http_client  # pylint: disable=import-error
 import josepy as jose
 import OpenSSL
 import requests
-from requests.adapters import HTTPAdapter
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 from requests_toolbelt.adapters.source import SourceAddressAdapter
 
 from acme import crypto_util
@@ -22,7 +24,7 @@ from acme import errors
 from acme import jws
 from acme import messages
 # pylint: disable=unused-import, no-name-in-module
-from acme.magic_typing import Dict, List, Set, Text
+from acme.magic_typing import Dict, List, Optional
 
 
 logger = logging.getLogger(__name__)
@@ -41,6 +43,8 @@ if sys.version_info < (2, 7, 9):  # pragma: no cover
 
 DEFAULT_NETWORK_TIMEOUT = 45
 
+DEFAULT_NONCE_MAX_AGE = 120
+
 DER_CONTENT_TYPE = 'application/pkix-cert'
 
 
@@ -575,21 +579,75 @@ class Client(ClientBase):
         return self._revoke(cert, rsn, self.directory[messages.Revocation])
 
 
+class PollingStrategy(object):
+    """Strategy deciding when an ACME resource should be polled again.
+
+    The delay between polls grows exponentially from `initial` to
+    `maximum` seconds, and is increased by a random fraction of up to
+    `jitter` of itself so that many clients do not poll in lockstep. A
+    poll never happens before the time given by the ``Retry-After``
+    header of the previous response.
+
+    Subclass it and override `next_poll` to implement another strategy.
+
+    :ivar float initial: Delay in seconds before the second poll.
+    :ivar float maximum: Maximum delay in seconds between polls.
+    :ivar float factor: Growth factor of the delay between polls.
+    :ivar float jitter: Maximum random fraction added to each delay.
+
+    """
+    def __init__(self, initial=1, maximum=10, factor=1.5, jitter=0.1):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+
+    def next_poll(self, attempt, response):
+        """Compute the time of the next poll.
+
+        :param int attempt: Number of polls already made, not counting
+            the request that created the resource or triggered its
+            processing.
+        :param requests.Response response: Last response received for
+            this resource.
+
+        :returns: Time point when the next poll should be performed.
+        :rtype: `datetime.datetime`
+
+        """
+        delay = min(self.initial * self.factor ** attempt, self.maximum)
+        delay += random.uniform(0, self.jitter * delay)
+        backoff = datetime.datetime.now() + datetime.timedelta(seconds=delay)
+        return max(backoff, ClientBase.retry_after(response, 0))
+
+
 class ClientV2(ClientBase):
     """ACME client for a v2 API.
 
+    A single instance may be shared between threads, for instance to run
+    several `new_order` and `poll_and_finalize` flows for the same
+    account in parallel. The ``pool_maxsize`` of its `.ClientNetwork`
+    should then be at least the number of threads.
+
     :ivar messages.Directory directory:
     :ivar .ClientNetwork net: Client network.
+    :ivar .PollingStrategy polling_strategy: Strategy deciding when
+        authorizations and orders are polled again.
     """
 
-    def __init__(self, directory, net):
+    def __init__(self, directory, net, polling_strategy=None):
         """Initialize.
 
         :param .messages.Directory directory: Directory Resource
         :param .ClientNetwork net: Client network.
+        :param .PollingStrategy polling_strategy: Strategy deciding when
+            authorizations and orders are polled again. Defaults to a
+            `.PollingStrategy` with default settings.
         """
         super(ClientV2, self).__init__(directory=directory,
             net=net, acme_version=2)
+        self.polling_strategy = (PollingStrategy() if polling_strategy is None
+                                 else polling_strategy)
 
     def new_account(self, new_account):
         """Register.
@@ -621,10 +679,11 @@ class ClientV2(ClientBase):
         self.net.account = regr  # See certbot/certbot#6258
         # ACME v2 requires to use a POST-as-GET request (POST an empty JWS) here.
         # This is done by passing None instead of an empty UpdateRegistration to _post().
-        response = self._post(regr.uri, None)
-        self.net.account = self._regr_from_response(response, uri=regr.uri,
-                                                    terms_of_service=regr.terms_of_service)
-        return self.net.account
+        response = self._post(regr.uri, None, account=regr)
+        new_regr = self._regr_from_response(response, uri=regr.uri,
+                                            terms_of_service=regr.terms_of_service)
+        self.net.account = new_regr
+        return new_regr
 
     def update_registration(self, regr, update=None):
         """Update registration.
@@ -642,9 +701,11 @@ class ClientV2(ClientBase):
         return super(ClientV2, self).update_registration(new_regr, update)
 
     def _get_v2_account(self, regr):
-        self.net.account = None
         only_existing_reg = regr.body.update(only_return_existing=True)
-        response = self._post(self.directory['newAccount'], only_existing_reg)
+        # newAccount must be signed without kid. The account is passed to
+        # this request only, so that requests made concurrently from other
+        # threads keep being signed with the current account.
+        response = self._post(self.directory['newAccount'], only_existing_reg, account=None)
         updated_uri = response.headers['Location']
         new_regr = regr.update(uri=updated_uri)
         self.net.account = new_regr
@@ -713,28 +774,49 @@ class ClientV2(ClientBase):
         return self.finalize_order(orderr, deadline)
 
     def poll_authorizations(self, orderr, deadline):
-        """Poll Order Resource for status."""
-        responses = []
-        for url in orderr.body.authorizations:
-            while datetime.datetime.now() < deadline:
-                authzr = self._authzr_from_response(self._post_as_get(url), uri=url)
-                if authzr.body.status != messages.STATUS_PENDING:
-                    responses.append(authzr)
-                    break
-                time.sleep(1)
-        # If we didn't get a response for every authorization, we fell through
-        # the bottom of the loop due to hitting the deadline.
-        if len(responses) < len(orderr.body.authorizations):
+        """Poll Order Resource for status.
+
+        Authorizations are polled in an interleaved way: each pending
+        authorization is polled again when `polling_strategy` says so,
+        independently of the others.
+
+        :param messages.OrderResource orderr: order to poll
+        :param datetime.datetime deadline: when to stop polling and timeout
+
+        :returns: order with updated authorizations
+        :rtype: messages.OrderResource
+
+        """
+        urls = orderr.body.authorizations
+        responses = {}  # type: Dict[int, messages.AuthorizationResource]
+        # Heap of (time of the next poll, index of the authorization, polls made)
+        now = datetime.datetime.now()
+        schedule = [(now, index, 0) for index in range(len(urls))]
+        while schedule:
+            when, index, attempt = heapq.heappop(schedule)
+            if when >= deadline or datetime.datetime.now() >= deadline:
+                break
+            _sleep_until(when)
+            response = self._post_as_get(urls[index])
+            authzr = self._authzr_from_response(response, uri=urls[index])
+            if authzr.body.status != messages.STATUS_PENDING:
+                responses[index] = authzr
+            else:
+                heapq.heappush(schedule, (
+                    self.polling_strategy.next_poll(attempt, response), index, attempt + 1))
+        # If we didn't get a response for every authorization, we left
+        # the loop due to hitting the deadline.
+        if len(responses) < len(urls):
             raise errors.TimeoutError()
         failed = []
-        for authzr in responses:
+        for authzr in responses.values():
             if authzr.body.status != messages.STATUS_VALID:
                 for chall in authzr.body.challenges:
                     if chall.error != None:
                         failed.append(authzr)
         if failed:
             raise errors.ValidationError(failed)
-        return orderr.update(authorizations=responses)
+        return orderr.update(authorizations=[responses[index] for index in range(len(urls))])
 
     def finalize_order(self, orderr, deadline):
         """Finalize an order and obtain a certificate.
@@ -749,9 +831,10 @@ class ClientV2(ClientBase):
         csr = OpenSSL.crypto.load_certificate_request(
             OpenSSL.crypto.FILETYPE_PEM, orderr.csr_pem)
         wrapped_csr = messages.CertificateRequest(csr=jose.ComparableX509(csr))
-        self._post(orderr.body.finalize, wrapped_csr)
+        response = self._post(orderr.body.finalize, wrapped_csr)
+        attempt = 0
         while datetime.datetime.now() < deadline:
-            time.sleep(1)
+            _sleep_until(min(self.polling_strategy.next_poll(attempt, response), deadline))
             response = self._post_as_get(orderr.uri)
             body = messages.Order.from_json(response.json())
             if body.error is not None:
@@ -759,6 +842,7 @@ class ClientV2(ClientBase):
             if body.certificate is not None:
                 certificate_response = self._post_as_get(body.certificate).text
                 return orderr.update(body=body, fullchain_pem=certificate_response)
+            attempt += 1
         raise errors.TimeoutError()
 
     def revoke(self, cert, rsn):
@@ -946,10 +1030,81 @@ class BackwardsCompatibleClientV2(object):
         return self.client.external_account_required()
 
 
+class NoncePool(object):
+    """Thread-safe pool of replay nonces received from an ACME server.
+
+    Nonces are handed out oldest first, so that they are used before
+    they expire. Nonces older than `max_age` are dropped instead.
+
+    :ivar float max_age: Age in seconds after which a nonce is dropped.
+        If ``None``, nonces never expire.
+    :ivar int hits: Number of nonces taken from the pool.
+    :ivar int misses: Number of times the pool had no fresh nonce.
+    :ivar int expired: Number of nonces dropped because of their age.
+    :ivar int bad_nonce_retries: Number of requests retried after a
+        ``badNonce`` error.
+
+    """
+    def __init__(self, max_age=DEFAULT_NONCE_MAX_AGE):
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.bad_nonce_retries = 0
+        self._nonces = collections.deque()  # type: collections.deque
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            self._drop_expired()
+            return len(self._nonces)
+
+    def _drop_expired(self):
+        if self.max_age is None:
+            return
+        oldest_allowed = time.time() - self.max_age
+        while self._nonces and self._nonces[0][1] < oldest_allowed:
+            self._nonces.popleft()
+            self.expired += 1
+
+    def add(self, nonce):
+        """Add a nonce to the pool.
+
+        :param bytes nonce: Decoded nonce.
+
+        """
+        with self._lock:
+            self._nonces.append((nonce, time.time()))
+
+    def pop(self):
+        """Take the oldest fresh nonce from the pool.
+
+        :returns: Decoded nonce, or ``None`` if the pool is empty.
+        :rtype: bytes
+
+        """
+        with self._lock:
+            self._drop_expired()
+            if not self._nonces:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._nonces.popleft()[0]
+
+    def record_bad_nonce(self):
+        """Count a request retried after a ``badNonce`` error."""
+        with self._lock:
+            self.bad_nonce_retries += 1
+
+
 class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
     """Wrapper around requests that signs POSTs for authentication.
 
     Also adds user agent, and handles Content-Type.
+
+    Instances are safe to use from several threads. Connections to the
+    ACME server are kept alive and reused from a pool, which should be
+    sized with ``pool_maxsize`` to the number of concurrent requests.
     """
     JSON_CONTENT_TYPE = 'application/json'
     JOSE_CONTENT_TYPE = 'application/jose+json'
@@ -968,23 +1123,43 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
     :param float timeout: Timeout for requests.
     :param source_address: Optional source address to bind to when making requests.
     :type source_address: str or tuple(str, int)
+    :param float nonce_max_age: Age in seconds after which a stored nonce
+            is not used anymore.
+    :param int nonce_low_water_mark: When using ACME v2, the nonce pool is
+            refilled in the background with requests to the newNonce
+            endpoint whenever it holds fewer nonces than this number. The
+            default of 0 disables prefetching.
+    :param int pool_connections: Number of connection pools to cache, one
+            per host.
+    :param int pool_maxsize: Maximum number of connections to keep alive
+            in each pool. Also available as the ``pool_maxsize`` attribute.
     """
     def __init__(self, key, account=None, alg=jose.RS256, verify_ssl=True,
                  user_agent='acme-python', timeout=DEFAULT_NETWORK_TIMEOUT,
-                 source_address=None):
+                 source_address=None, nonce_max_age=DEFAULT_NONCE_MAX_AGE,
+                 nonce_low_water_mark=0, pool_connections=DEFAULT_POOLSIZE,
+                 pool_maxsize=DEFAULT_POOLSIZE):
         # pylint: disable=too-many-arguments
         self.key = key
         self.account = account
         self.alg = alg
         self.verify_ssl = verify_ssl
-        self._nonces = set() # type: Set[Text]
+        self.nonce_pool = NoncePool(nonce_max_age)
+        self.pool_maxsize = pool_maxsize
+        self.nonce_low_water_mark = nonce_low_water_mark
+        self._refill_lock = threading.Lock()
+        self._refill_thread = None  # type: Optional[threading.Thread]
         self.user_agent = user_agent
         self.session = requests.Session()
         self._default_timeout = timeout
-        adapter = HTTPAdapter()
-
+        adapter_kwargs = {
+            'pool_connections': pool_connections,
+            'pool_maxsize': pool_maxsize,
+        }
         if source_address is not None:
-            adapter = SourceAddressAdapter(source_address)
+            adapter = SourceAddressAdapter(source_address, **adapter_kwargs)
+        else:
+            adapter = HTTPAdapter(**adapter_kwargs)
 
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
@@ -997,7 +1172,7 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
         except Exception:  # pylint: disable=broad-except
             pass
 
-    def _wrap_in_jws(self, obj, nonce, url, acme_version):
+    def _wrap_in_jws(self, obj, nonce, url, acme_version, account):
         """Wrap `JSONDeSerializable` object in JWS.
 
         .. todo:: Implement ``acmePath``.
@@ -1005,6 +1180,8 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
         :param josepy.JSONDeSerializable obj:
         :param str url: The URL to which this object will be POSTed
         :param bytes nonce:
+        :param messages.RegistrationResource account: Account whose URI is
+            used as ``kid`` with ACME v2, or ``None`` to embed the key.
         :rtype: `josepy.JWS`
 
         """
@@ -1018,8 +1195,8 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
             kwargs["url"] = url
             # newAccount and revokeCert work without the kid
             # newAccount must not have kid
-            if self.account is not None:
-                kwargs["kid"] = self.account["uri"]
+            if account is not None:
+                kwargs["kid"] = account["uri"]
         kwargs["key"] = self.key
         return jws.JWS.sign(jobj, **kwargs).json_dumps(indent=2)
 
@@ -1160,7 +1337,7 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
         return self._check_response(
             self._send_request('GET', url, **kwargs), content_type=content_type)
 
-    def _add_nonce(self, response):
+    def _nonce_from_response(self, response):
         if self.REPLAY_NONCE_HEADER in response.headers:
             nonce = response.headers[self.REPLAY_NONCE_HEADER]
             try:
@@ -1168,20 +1345,45 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
             except jose.DeserializationError as error:
                 raise errors.BadNonce(nonce, error)
             logger.debug('Storing nonce: %s', nonce)
-            self._nonces.add(decoded_nonce)
-        else:
-            raise errors.MissingNonce(response)
+            return decoded_nonce
+        raise errors.MissingNonce(response)
+
+    def _add_nonce(self, response):
+        self.nonce_pool.add(self._nonce_from_response(response))
 
     def _get_nonce(self, url, new_nonce_url):
-        if not self._nonces:
+        nonce = self.nonce_pool.pop()
+        if nonce is None:
             logger.debug('Requesting fresh nonce')
             if new_nonce_url is None:
                 response = self.head(url)
             else:
                 # request a new nonce from the acme newNonce endpoint
                 response = self._check_response(self.head(new_nonce_url), content_type=None)
-            self._add_nonce(response)
-        return self._nonces.pop()
+            nonce = self._nonce_from_response(response)
+        return nonce
+
+    def _maybe_refill_nonces(self, new_nonce_url):
+        """Start refilling the nonce pool in the background if it runs low."""
+        if new_nonce_url is None or len(self.nonce_pool) >= self.nonce_low_water_mark:
+            return
+        with self._refill_lock:
+            if self._refill_thread is not None and self._refill_thread.is_alive():
+                return
+            self._refill_thread = threading.Thread(
+                target=self._refill_nonces, args=(new_nonce_url,))
+            self._refill_thread.daemon = True
+            self._refill_thread.start()
+
+    def _refill_nonces(self, new_nonce_url):
+        try:
+            while len(self.nonce_pool) < self.nonce_low_water_mark:
+                logger.debug('Prefetching nonce')
+                self._add_nonce(self._check_response(
+                    self.head(new_nonce_url), content_type=None))
+        except Exception:  # pylint: disable=broad-except
+            # Requests that need a nonce will fetch one themselves.
+            logger.debug('Failed to prefetch nonce', exc_info=True)
 
     def post(self, *args, **kwargs):
         """POST object wrapped in `.JWS` and check response.
@@ -1189,12 +1391,16 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
         If the server responded with a badNonce error, the request will
         be retried once.
 
+        The JWS is signed for `account`, unless another account (or
+        ``None``) is given with the ``account`` keyword argument.
+
         """
         try:
             return self._post_once(*args, **kwargs)
         except messages.Error as error:
             if error.code == 'badNonce':
                 logger.debug('Retrying request after error:\n%s', error)
+                self.nonce_pool.record_bad_nonce()
                 return self._post_once(*args, **kwargs)
             else:
                 raise
@@ -1202,9 +1408,23 @@ class ClientNetwork(object):  # pylint: disable=too-many-instance-attributes
     def _post_once(self, url, obj, content_type=JOSE_CONTENT_TYPE,
             acme_version=1, **kwargs):
         new_nonce_url = kwargs.pop('new_nonce_url', None)
-        data = self._wrap_in_jws(obj, self._get_nonce(url, new_nonce_url), url, acme_version)
+        account = kwargs.pop('account', self.account)
+        data = self._wrap_in_jws(obj, self._get_nonce(url, new_nonce_url), url,
+                                 acme_version, account)
         kwargs.setdefault('headers', {'Content-Type': content_type})
         response = self._send_request('POST', url, data=data, **kwargs)
         response = self._check_response(response, content_type=content_type)
         self._add_nonce(response)
+        self._maybe_refill_nonces(new_nonce_url)
         return response
+
+
+def _sleep_until(when):
+    """Sleep until the given time point, if it is in the future.
+
+    :param datetime.datetime when: time point to wait for
+
+    """
+    seconds = (when - datetime.datetime.now()).total_seconds()
+    if seconds > 0:
+        time.sleep(seconds)
@@ -820,6 +820,35 @@ class ClientV2Test(ClientTestBase):
             self.authz.to_json(), self.authz2.to_json(), updated_authz2.to_json())
         self.assertEqual(self.client.poll_authorizations(self.orderr, deadline), updated_orderr)
 
+    def test_poll_authorizations_interleaved(self):
+        deadline = datetime.datetime(9999, 9, 9)
+        self.client.polling_strategy = mock.MagicMock()
+        self.client.polling_strategy.next_poll.side_effect = (
+            lambda attempt, response: datetime.datetime.now())
+        statuses = {
+            self.authzr.uri: [messages.STATUS_PENDING, messages.STATUS_VALID],
+            self.authzr_uri2: [messages.STATUS_PENDING, messages.STATUS_PENDING,
+                               messages.STATUS_VALID],
+        }
+        polled = []
+
+        def _post_as_get(url):
+            polled.append(url)
+            response = mock.MagicMock()
+            response.json.return_value = self.authz.update(
+                status=statuses[url].pop(0)).to_json()
+            return response
+
+        with mock.patch('acme.client.ClientV2._post_as_get') as mock_post_as_get:
+            mock_post_as_get.side_effect = _post_as_get
+            self.client.poll_authorizations(self.orderr, deadline)
+
+        self.assertEqual(polled, [self.authzr.uri, self.authzr_uri2, self.authzr.uri,
+                                  self.authzr_uri2, self.authzr_uri2])
+        self.assertEqual(
+            [call[0][0] for call in self.client.polling_strategy.next_poll.call_args_list],
+            [0, 0, 1])
+
     def test_finalize_order_success(self):
         updated_order = self.order.update(
             certificate='https://www.letsencrypt-demo.org/acme/cert/')
@@ -856,6 +885,8 @@ class ClientV2Test(ClientTestBase):
         self.assertNotEqual(self.client.net.account, None)
         self.assertEqual(self.client.net.post.call_count, 2)
         self.assertTrue(DIRECTORY_V2.newAccount in self.net.post.call_args_list[0][0])
+        # The account lookup is signed without kid, without resetting net.account
+        self.assertTrue(self.net.post.call_args_list[0][1]['account'] is None)
 
         self.response.json.return_value = self.regr.body.update(
             contact=()).to_json()
@@ -915,6 +946,39 @@ class MockJSONDeSerializable(jose.JSONDeSerializable):
         pass  # pragma: no cover
 
 
+class PollingStrategyTest(unittest.TestCase):
+    """Tests for acme.client.PollingStrategy."""
+
+    def setUp(self):
+        from acme.client import PollingStrategy
+        self.strategy = PollingStrategy(initial=1, maximum=10, factor=2, jitter=0.5)
+        self.response = mock.MagicMock(headers={})
+
+    def _delay(self, attempt):
+        start = datetime.datetime.now()
+        return (self.strategy.next_poll(attempt, self.response) - start).total_seconds()
+
+    @mock.patch('acme.client.random.uniform')
+    def test_exponential_backoff(self, mock_uniform):
+        mock_uniform.return_value = 0
+        self.assertAlmostEqual(self._delay(0), 1, places=1)
+        self.assertAlmostEqual(self._delay(2), 4, places=1)
+        self.assertAlmostEqual(self._delay(10), 10, places=1)
+
+    def test_jitter(self):
+        for _ in range(10):
+            delay = self._delay(3)
+            self.assertTrue(8 <= delay <= 12.1)
+
+    @mock.patch('acme.client.random.uniform')
+    def test_retry_after(self, mock_uniform):
+        mock_uniform.return_value = 0
+        self.response.headers['Retry-After'] = '30'
+        self.assertAlmostEqual(self._delay(0), 30, places=1)
+        self.response.headers['Retry-After'] = '0'
+        self.assertAlmostEqual(self._delay(0), 1, places=1)
+
+
 class ClientNetworkTest(unittest.TestCase):
     """Tests for acme.client.ClientNetwork."""
     # pylint: disable=too-many-public-methods
@@ -939,17 +1003,16 @@ class ClientNetworkTest(unittest.TestCase):
         # pylint: disable=protected-access
         jws_dump = self.net._wrap_in_jws(
             MockJSONDeSerializable('foo'), nonce=b'Tg', url="url",
-            acme_version=1)
+            acme_version=1, account=None)
         jws = acme_jws.JWS.json_loads(jws_dump)
         self.assertEqual(json.loads(jws.payload.decode()), {'foo': 'foo'})
         self.assertEqual(jws.signature.combined.nonce, b'Tg')
 
     def test_wrap_in_jws_v2(self):
-        self.net.account = {'uri': 'acct-uri'}
         # pylint: disable=protected-access
         jws_dump = self.net._wrap_in_jws(
             MockJSONDeSerializable('foo'), nonce=b'Tg', url="url",
-            acme_version=2)
+            acme_version=2, account={'uri': 'acct-uri'})
         jws = acme_jws.JWS.json_loads(jws_dump)
         self.assertEqual(json.loads(jws.payload.decode()), {'foo': 'foo'})
         self.assertEqual(jws.signature.combined.nonce, b'Tg')
@@ -1207,13 +1270,24 @@ class ClientNetworkWithMockedResponseTest(unittest.TestCase):
             'uri', self.obj, content_type=self.content_type))
         self.assertTrue(self.response.checked)
         self.net._wrap_in_jws.assert_called_once_with(
-            self.obj, jose.b64decode(self.all_nonces.pop()), "uri", 1)
+            self.obj, jose.b64decode(self.all_nonces.pop()), "uri", 1, None)
 
         self.available_nonces = []
         self.assertRaises(errors.MissingNonce, self.net.post,
                           'uri', self.obj, content_type=self.content_type)
         self.net._wrap_in_jws.assert_called_with(
-            self.obj, jose.b64decode(self.all_nonces.pop()), "uri", 1)
+            self.obj, jose.b64decode(self.all_nonces.pop()), "uri", 1, None)
+
+    def test_post_account(self):
+        # pylint: disable=protected-access
+        self.net.account = mock.sentinel.account
+        self.net.post('uri', self.obj, content_type=self.content_type)
+        self.net._wrap_in_jws.assert_called_with(
+            self.obj, mock.ANY, "uri", 1, mock.sentinel.account)
+
+        self.net.post('uri', self.obj, content_type=self.content_type, account=None)
+        self.net._wrap_in_jws.assert_called_with(self.obj, mock.ANY, "uri", 1, None)
+        self.assertEqual(self.net.account, mock.sentinel.account)
 
     def test_post_wrong_initial_nonce(self):  # HEAD
         self.available_nonces = [b'f', jose.b64encode(b'good')]
@@ -1280,6 +1354,101 @@ class ClientNetworkWithMockedResponseTest(unittest.TestCase):
         self.net.post('uri', self.obj, content_type=None,
             acme_version=2, new_nonce_url='new_nonce_uri')
 
+    def test_post_reuses_nonce(self):
+        self.content_type = None
+        self.net.post('uri', self.obj, content_type=None)
+        self.net.post('uri', self.obj, content_type=None)
+        # One HEAD for the first nonce, then each POST response provides the next one
+        self.assertEqual(self.send_request.call_count, 3)
+        self.assertEqual(self.net.nonce_pool.hits, 1)
+        self.assertEqual(self.net.nonce_pool.misses, 1)
+
+    def test_post_bad_nonce_counted(self):
+        # pylint: disable=protected-access
+        self.net._post_once = mock.MagicMock(
+            side_effect=[messages.Error.with_code('badNonce'), self.response])
+        self.assertEqual(self.response, self.net.post(
+            'uri', self.obj, content_type=self.content_type))
+        self.assertEqual(self.net.nonce_pool.bad_nonce_retries, 1)
+
+    def _prefetch_responses(self, count):
+        """Mock out responses which each carry a distinct nonce"""
+        nonces = [jose.b64encode(('Nonce%d' % i).encode()) for i in range(count)]
+
+        def send_request(*unused_args, **unused_kwargs):
+            # pylint: disable=missing-docstring
+            response = mock.MagicMock(ok=True, status_code=http_client.OK)
+            response.headers = {}
+            if nonces:
+                response.headers[self.net.REPLAY_NONCE_HEADER] = nonces.pop().decode()
+            return response
+
+        # pylint: disable=protected-access
+        self.net._send_request = self.send_request = mock.MagicMock(
+            side_effect=send_request)
+        self.net._check_response = lambda response, content_type: response
+
+    def test_nonce_prefetch(self):
+        self._prefetch_responses(5)
+        self.net.nonce_low_water_mark = 3
+        self.net.post('uri', self.obj, content_type=None,
+                      acme_version=2, new_nonce_url='new_nonce_uri')
+        self.net._refill_thread.join()  # pylint: disable=protected-access
+        # The POST response nonce and prefetched ones reach the low-water mark
+        self.assertEqual(len(self.net.nonce_pool), 3)
+        self.send_request.assert_any_call('HEAD', 'new_nonce_uri')
+        self.assertEqual(self.send_request.call_count, 4)
+
+    def test_nonce_prefetch_error(self):
+        self._prefetch_responses(3)
+        self.net.nonce_low_water_mark = 5
+        self.net.post('uri', self.obj, content_type=None,
+                      acme_version=2, new_nonce_url='new_nonce_uri')
+        self.net._refill_thread.join()  # pylint: disable=protected-access
+        # Prefetching stopped when the server did not return a nonce anymore
+        self.assertEqual(len(self.net.nonce_pool), 2)
+
+
+class NoncePoolTest(unittest.TestCase):
+    """Tests for acme.client.NoncePool."""
+
+    def setUp(self):
+        from acme.client import NoncePool
+        self.pool = NoncePool(max_age=10)
+
+    def test_empty(self):
+        self.assertTrue(self.pool.pop() is None)
+        self.assertEqual(self.pool.misses, 1)
+        self.assertEqual(self.pool.hits, 0)
+
+    def test_oldest_first(self):
+        self.pool.add(b'first')
+        self.pool.add(b'second')
+        self.assertEqual(len(self.pool), 2)
+        self.assertEqual(self.pool.pop(), b'first')
+        self.assertEqual(self.pool.pop(), b'second')
+        self.assertEqual(self.pool.hits, 2)
+
+    @mock.patch('acme.client.time.time')
+    def test_expired(self, mock_time):
+        mock_time.return_value = 100
+        self.pool.add(b'old')
+        mock_time.return_value = 105
+        self.pool.add(b'fresh')
+        mock_time.return_value = 112
+        self.assertEqual(self.pool.pop(), b'fresh')
+        self.assertEqual(self.pool.expired, 1)
+        self.assertEqual(self.pool.misses, 0)
+
+    @mock.patch('acme.client.time.time')
+    def test_no_max_age(self, mock_time):
+        from acme.client import NoncePool
+        pool = NoncePool(max_age=None)
+        mock_time.return_value = 0
+        pool.add(b'nonce')
+        mock_time.return_value = 10 ** 6
+        self.assertEqual(pool.pop(), b'nonce')
+
 
 class ClientNetworkSourceAddressBindingTest(unittest.TestCase):
     """Tests that if ClientNetwork has a source IP set manually, the underlying library has
@@ -1307,5 +1476,16 @@ class ClientNetworkSourceAddressBindingTest(unittest.TestCase):
             default_adapter = session.adapters.get(scheme)
             self.assertEqual(client_network_adapter.__class__, default_adapter.__class__)
 
+    def test_pool_size(self):
+        from acme.client import ClientNetwork
+        for source_address in (None, self.source_address):
+            net = ClientNetwork(key=None, alg=None, source_address=source_address,
+                                pool_connections=2, pool_maxsize=20)
+            for adapter in net.session.adapters.values():
+                self.assertEqual(adapter._pool_connections, 2)  # pylint: disable=protected-access
+                self.assertEqual(adapter._pool_maxsize, 20)  # pylint: disable=protected-access
+                self.assertEqual(adapter.poolmanager.connection_pool_kw['maxsize'], 20)
+
+
 if __name__ == '__main__':
     unittest.main()  # pragma: no cover
@@ -3,8 +3,26 @@
 The JWS implementation in josepy only implements the base JOSE standard. In
 order to support the new header fields defined in ACME, this module defines some
 ACME-specific classes that layer on top of josepy.
+
+josepy does not implement elliptic curve keys, so this module also defines
+`JWKEC` and the ES256 and ES384 signature algorithms, for keys on the P-256
+and P-384 curves.
 """
+import binascii
+
 import josepy as jose
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes  # type: ignore
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+
+_CURVES = {
+    'P-256': (ec.SECP256R1, 32),
+    'P-384': (ec.SECP384R1, 48),
+}
+"""Supported curves: JWK name, curve and size of the coordinates in bytes."""
 
 
 class Header(jose.Header):
@@ -52,3 +70,173 @@ class JWS(jose.JWS):
                                     protect=frozenset(['nonce', 'url', 'kid', 'jwk', 'alg']),
                                     nonce=nonce, url=url, kid=kid,
                                     include_jwk=include_jwk)
+
+
+def _encode_int(value, size):
+    """Encode an integer as big-endian bytes of a fixed size."""
+    return binascii.unhexlify('{0:0{1}x}'.format(value, size * 2))
+
+
+def _decode_int(data):
+    """Decode big-endian bytes as an integer."""
+    return int(binascii.hexlify(data), 16)
+
+
+class ComparableECKey(jose.ComparableKey):  # pylint: disable=too-few-public-methods
+    """Wrapper for ``cryptography`` elliptic curve keys.
+
+    Wraps around:
+
+    - :class:`~cryptography.hazmat.primitives.asymmetric.ec.EllipticCurvePrivateKey`
+    - :class:`~cryptography.hazmat.primitives.asymmetric.ec.EllipticCurvePublicKey`
+
+    """
+
+    def __hash__(self):
+        if isinstance(self._wrapped, ec.EllipticCurvePrivateKeyWithSerialization):
+            priv = self.private_numbers()
+            pub = priv.public_numbers
+            return hash((self.__class__, pub.curve.name, pub.x, pub.y, priv.private_value))
+        pub = self.public_numbers()
+        return hash((self.__class__, pub.curve.name, pub.x, pub.y))
+
+
+@jose.JWK.register
+class JWKEC(jose.JWK):
+    """Elliptic curve JWK, on the P-256 or P-384 curve.
+
+    :ivar key: :class:`~cryptography.hazmat.primitives.asymmetric.ec.EllipticCurvePrivateKey`
+        or :class:`~cryptography.hazmat.primitives.asymmetric.ec.EllipticCurvePublicKey`
+        wrapped in :class:`ComparableECKey`
+
+    """
+    typ = 'EC'
+    cryptography_key_types = (ec.EllipticCurvePublicKey, ec.EllipticCurvePrivateKey)
+    __slots__ = ('key',)
+    required = ('crv', jose.JWK.type_field_name, 'x', 'y')
+
+    def __init__(self, *args, **kwargs):
+        if 'key' in kwargs and not isinstance(kwargs['key'], ComparableECKey):
+            kwargs['key'] = ComparableECKey(kwargs['key'])
+        super(JWKEC, self).__init__(*args, **kwargs)
+
+    @classmethod
+    def load(cls, data, password=None, backend=None):
+        """Load serialized elliptic curve key as JWK.
+
+        :param str data: Public or private key serialized as PEM or DER.
+        :param str password: Optional password.
+        :param backend: A `.PEMSerializationBackend` and
+            `.DERSerializationBackend` provider.
+
+        :raises josepy.errors.Error: if unable to deserialize, or if
+            the key is not an elliptic curve key
+
+        :rtype: `JWKEC`
+
+        """
+        key = cls._load_cryptography_key(data, password, backend)
+        if not isinstance(key, cls.cryptography_key_types):
+            raise jose.Error('Unable to deserialize {0} into {1}'.format(
+                key.__class__, cls.__name__))
+        return cls(key=key)
+
+    @property
+    def crv(self):
+        """JWK name of the curve of the key."""
+        for crv, (curve, _) in _CURVES.items():
+            if self.key.curve.name == curve.name:
+                return crv
+        raise jose.Error('Unsupported curve: {0}'.format(self.key.curve.name))
+
+    def public_key(self):
+        return type(self)(key=self.key.public_key())
+
+    @classmethod
+    def fields_from_json(cls, jobj):
+        try:
+            curve, size = _CURVES[jobj['crv']]
+        except KeyError:
+            raise jose.DeserializationError('Unsupported curve: {0}'.format(jobj.get('crv')))
+        x, y = (_decode_int(jose.decode_b64jose(jobj[param], size))  # pylint: disable=invalid-name
+                for param in ('x', 'y'))
+        public_numbers = ec.EllipticCurvePublicNumbers(x, y, curve())
+        if 'd' not in jobj:  # public key
+            key = public_numbers.public_key(default_backend())
+        else:  # private key
+            d = _decode_int(jose.decode_b64jose(jobj['d'], size))  # pylint: disable=invalid-name
+            key = ec.EllipticCurvePrivateNumbers(d, public_numbers).private_key(
+                default_backend())
+        return cls(key=key)
+
+    def fields_to_partial_json(self):
+        crv = self.crv
+        size = _CURVES[crv][1]
+        # pylint: disable=protected-access
+        if isinstance(self.key._wrapped, ec.EllipticCurvePublicKey):
+            public = self.key.public_numbers()
+            private = None
+        else:
+            private = self.key.private_numbers()
+            public = private.public_numbers
+        params = {
+            'crv': crv,
+            'x': jose.encode_b64jose(_encode_int(public.x, size)),
+            'y': jose.encode_b64jose(_encode_int(public.y, size)),
+        }
+        if private is not None:
+            params['d'] = jose.encode_b64jose(_encode_int(private.private_value, size))
+        return params
+
+
+class _JWAEC(jose.JWASignature):
+    """ECDSA signature algorithm, with signatures encoded as in RFC 7518."""
+    kty = JWKEC
+
+    def __init__(self, name, hash_, size):
+        super(_JWAEC, self).__init__(name)
+        self.hash = hash_()
+        self.size = size
+
+    def sign(self, key, msg):
+        """Sign the ``msg`` using ``key``."""
+        try:
+            signature = key.sign(msg, ec.ECDSA(self.hash))
+        except AttributeError:
+            raise jose.Error('Public key cannot be used for signing')
+        r, s = decode_dss_signature(signature)  # pylint: disable=invalid-name
+        return _encode_int(r, self.size) + _encode_int(s, self.size)
+
+    def verify(self, key, msg, sig):
+        """Verify the ``msg`` and ``sig`` using ``key``."""
+        if len(sig) != 2 * self.size:
+            return False
+        signature = encode_dss_signature(
+            _decode_int(sig[:self.size]), _decode_int(sig[self.size:]))
+        try:
+            key.verify(signature, msg, ec.ECDSA(self.hash))
+        except InvalidSignature:
+            return False
+        return True
+
+
+# These replace the placeholders of josepy, which are not implemented.
+ES256 = jose.JWASignature.register(_JWAEC('ES256', hashes.SHA256, 32))
+"""ECDSA using P-256 and SHA-256."""
+ES384 = jose.JWASignature.register(_JWAEC('ES384', hashes.SHA384, 48))
+"""ECDSA using P-384 and SHA-384."""
+
+
+def signature_algorithm(key):
+    """Signature algorithm to use with an account key.
+
+    :param josepy.JWK key: Account key.
+
+    :returns: ES256 or ES384 for keys on the P-256 or P-384 curves,
+        RS256 otherwise.
+    :rtype: `josepy.JWASignature`
+
+    """
+    if isinstance(key, JWKEC):
+        return ES384 if key.crv == 'P-384' else ES256
+    return jose.RS256
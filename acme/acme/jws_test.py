@@ -1,7 +1,10 @@
 """Tests for acme.jws."""
+import binascii
 import unittest
 
 import josepy as jose
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec
 
 from acme import test_util
 
@@ -63,5 +66,111 @@ class JWSTest(unittest.TestCase):
         self.assertEqual(jws.signature.combined.jwk, self.pubkey)
 
 
+EC_KEY = ec.derive_private_key(
+    0x8e9b109e719098bf980487df1f5d77e9cb4d1b666eb65cc392f62672d5dcfc5a, ec.SECP256R1(),
+    default_backend())
+
+
+class JWKECTest(unittest.TestCase):
+    """Tests for acme.jws.JWKEC."""
+
+    def setUp(self):
+        from acme.jws import JWKEC
+        self.jwk = JWKEC(key=EC_KEY)
+        self.json = self.jwk.to_json()
+
+    def test_to_json(self):
+        self.assertEqual(sorted(self.json), ['crv', 'd', 'kty', 'x', 'y'])
+        self.assertEqual(self.json['kty'], 'EC')
+        self.assertEqual(self.json['crv'], 'P-256')
+        numbers = EC_KEY.private_numbers()
+        self.assertEqual(jose.decode_b64jose(self.json['d'], 32),
+                         binascii.unhexlify('{0:064x}'.format(numbers.private_value)))
+        self.assertEqual(jose.decode_b64jose(self.json['x'], 32),
+                         binascii.unhexlify('{0:064x}'.format(numbers.public_numbers.x)))
+
+    def test_json_round_trip(self):
+        from acme.jws import JWKEC
+        loaded = jose.JWK.from_json(self.json)
+        self.assertTrue(isinstance(loaded, JWKEC))
+        self.assertEqual(loaded, self.jwk)
+        self.assertEqual(hash(loaded), hash(self.jwk))
+        public = self.jwk.public_key()
+        self.assertEqual(sorted(public.to_json()), ['crv', 'kty', 'x', 'y'])
+        self.assertEqual(jose.JWK.from_json(public.to_json()), public)
+        self.assertEqual(hash(jose.JWK.from_json(public.to_json())), hash(public))
+
+    def test_unsupported_curve(self):
+        from acme.jws import JWKEC
+        self.assertRaises(jose.DeserializationError, jose.JWK.from_json,
+                          dict(self.json, crv='P-521'))
+        p521 = JWKEC(key=ec.generate_private_key(ec.SECP521R1(), default_backend()))
+        self.assertRaises(jose.Error, p521.to_json)
+
+    def test_load(self):
+        from cryptography.hazmat.primitives import serialization
+        from acme.jws import JWKEC
+        pem = self.jwk.key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption())
+        self.assertEqual(JWKEC.load(pem), self.jwk)
+        self.assertRaises(jose.Error, JWKEC.load, test_util.load_vector('rsa512_key.pem'))
+
+    def test_thumbprint(self):
+        # Only the required members are used, in lexicographic order
+        from cryptography.hazmat.primitives import hashes  # type: ignore
+        digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
+        digest.update(
+            '{{"crv":"P-256","kty":"EC","x":"{x}","y":"{y}"}}'.format(**self.json).encode())
+        self.assertEqual(self.jwk.thumbprint(), digest.finalize())
+
+
+class JWAECTest(unittest.TestCase):
+    """Tests for acme.jws.ES256 and acme.jws.ES384."""
+
+    def setUp(self):
+        from acme.jws import JWKEC
+        self.jwk = JWKEC(key=EC_KEY)
+
+    def test_signature_encoding(self):
+        # Signatures are the concatenation of r and s, not DER
+        from cryptography.hazmat.primitives import hashes  # type: ignore
+        from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+        from acme.jws import ES256
+        r, s = decode_dss_signature(EC_KEY.sign(b'foo', ec.ECDSA(hashes.SHA256())))
+        signature = binascii.unhexlify('{0:064x}{1:064x}'.format(r, s))
+        public_key = self.jwk.public_key().key
+        self.assertTrue(ES256.verify(public_key, b'foo', signature))
+        self.assertFalse(ES256.verify(public_key, b'bar', signature))
+        self.assertFalse(ES256.verify(public_key, b'foo', signature[1:]))
+
+    def test_sign_and_verify(self):
+        from acme.jws import ES384, JWKEC
+        jwk = JWKEC(key=ec.generate_private_key(ec.SECP384R1(), default_backend()))
+        signature = ES384.sign(jwk.key, b'foo')
+        self.assertEqual(len(signature), 96)
+        self.assertTrue(ES384.verify(jwk.public_key().key, b'foo', signature))
+
+    def test_sign_with_public_key(self):
+        from acme.jws import ES256
+        self.assertRaises(jose.Error, ES256.sign, self.jwk.public_key().key, b'foo')
+
+    def test_jws_round_trip(self):
+        from acme.jws import ES256, JWS
+        jws = JWS.sign(payload=b'foo', key=self.jwk, alg=ES256,
+                       nonce=jose.b64encode(b'Nonce'), url='hi')
+        parsed = JWS.json_loads(jws.json_dumps())
+        self.assertTrue(parsed.signature.combined.alg is ES256)
+        self.assertEqual(parsed.signature.combined.jwk, self.jwk.public_key())
+        self.assertTrue(parsed.verify())
+
+    def test_signature_algorithm(self):
+        from acme.jws import ES256, ES384, JWKEC, signature_algorithm
+        self.assertEqual(signature_algorithm(KEY), jose.RS256)
+        self.assertEqual(signature_algorithm(self.jwk), ES256)
+        p384 = JWKEC(key=ec.generate_private_key(ec.SECP384R1(), default_backend()))
+        self.assertEqual(signature_algorithm(p384), ES384)
+
+
 if __name__ == '__main__':
     unittest.main()  # pragma: no cover
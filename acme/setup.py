@@ -1,5 +1,6 @@
 from setuptools import setup
 from setuptools import find_packages
+from setuptools.command.build_py import build_py
 from setuptools.command.test import test as TestCommand
 import sys
 
@@ -52,6 +53,18 @@ class PyTest(TestCommand):
         sys.exit(errno)
 
 
+class BuildPy(build_py):
+    """Leaves out the modules using Python 3.5+ syntax on older versions."""
+    PY35_MODULES = ('aio', 'aio_test')
+
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            modules = [(pkg, module, path) for pkg, module, path in modules
+                       if not (pkg == 'acme' and module in self.PY35_MODULES)]
+        return modules
+
+
 setup(
     name='acme',
     version=version,
@@ -86,5 +99,5 @@ setup(
     },
     test_suite='acme',
     tests_require=["pytest"],
-    cmdclass={"test": PyTest},
+    cmdclass={"test": PyTest, "build_py": BuildPy},
 )
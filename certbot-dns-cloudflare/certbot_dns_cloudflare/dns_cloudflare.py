@@ -4,6 +4,8 @@ import logging
 import CloudFlare
 import zope.interface
 
+from acme.magic_typing import List, Tuple  # pylint: disable=unused-import, no-name-in-module
+
 from certbot import errors
 from certbot import interfaces
 from certbot.plugins import dns_common
@@ -12,6 +14,9 @@ logger = logging.getLogger(__name__)
 
 ACCOUNT_URL = 'https://dash.cloudflare.com/profile/api-tokens'
 
+# Cloudflare does not return more than 50 zones per page
+_ZONES_PER_PAGE = 50
+
 
 @zope.interface.implementer(interfaces.IAuthenticator)
 @zope.interface.provider(interfaces.IPluginFactory)
@@ -24,6 +29,8 @@ class Authenticator(dns_common.DNSAuthenticator):
     description = ('Obtain certificates using a DNS TXT record (if you are using Cloudflare for '
                    'DNS).')
     ttl = 120
+    # Each record is created with its own client.
+    thread_safe = True
 
     def __init__(self, *args, **kwargs):
         super(Authenticator, self).__init__(*args, **kwargs)
@@ -65,6 +72,7 @@ class _CloudflareClient(object):
 
     def __init__(self, email, api_key):
         self.cf = CloudFlare.CloudFlare(email, api_key)
+        self._account = [email, api_key]
 
     def add_txt_record(self, domain, record_name, record_content, record_ttl):
         """
@@ -138,14 +146,34 @@ class _CloudflareClient(object):
         :raises certbot.errors.PluginError: if no zone_id is found.
         """
 
-        zone_name_guesses = dns_common.base_domain_name_guesses(domain)
+        zone_id = dns_common.zone_cache.find_zone_id_in_listing('cloudflare', self._account,
+                                                                domain, self._list_zones)
+        if zone_id is None:
+            raise errors.PluginError('Unable to determine zone_id for {0} using zone names: {1}. '
+                                     'Please confirm that the domain name has been entered '
+                                     'correctly and is already associated with the supplied '
+                                     'Cloudflare account.'
+                                     .format(domain, dns_common.base_domain_name_guesses(domain)))
+        logger.debug('Found zone_id of %s for %s', zone_id, domain)
+        return zone_id
+
+    def _list_zones(self):
+        """
+        List the zones of the account with the Cloudflare API.
+
+        :returns: The name and zone_id of each zone.
+        :rtype: list
+        :raises certbot.errors.PluginError: if the zones cannot be listed.
+        """
 
-        for zone_name in zone_name_guesses:
-            params = {'name': zone_name,
-                      'per_page': 1}
+        zones = []  # type: List[Tuple[str, str]]
+        page = 1
+        while True:
+            params = {'page': page,
+                      'per_page': _ZONES_PER_PAGE}
 
             try:
-                zones = self.cf.zones.get(params=params)  # zones | pylint: disable=no-member
+                result = self.cf.zones.get(params=params)  # zones | pylint: disable=no-member
             except CloudFlare.exceptions.CloudFlareAPIError as e:
                 code = int(e)
                 hint = None
@@ -159,15 +187,10 @@ class _CloudflareClient(object):
                                          'you have supplied valid Cloudflare API credentials.{2}'
                                          .format(code, e, ' ({0})'.format(hint) if hint else ''))
 
-            if zones:
-                zone_id = zones[0]['id']
-                logger.debug('Found zone_id of %s for %s using name %s', zone_id, domain, zone_name)
-                return zone_id
-
-        raise errors.PluginError('Unable to determine zone_id for {0} using zone names: {1}. '
-                                 'Please confirm that the domain name has been entered correctly '
-                                 'and is already associated with the supplied Cloudflare account.'
-                                 .format(domain, zone_name_guesses))
+            zones.extend((zone['name'], zone['id']) for zone in result)
+            if len(result) < _ZONES_PER_PAGE:
+                return zones
+            page += 1
 
     def _find_txt_record_id(self, zone_id, record_name, record_content):
         """
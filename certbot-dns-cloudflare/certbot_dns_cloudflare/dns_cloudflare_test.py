@@ -27,7 +27,8 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
         dns_test_common.write({"cloudflare_email": EMAIL, "cloudflare_api_key": API_KEY}, path)
 
         self.config = mock.MagicMock(cloudflare_credentials=path,
-                                     cloudflare_propagation_seconds=0)  # don't wait during tests
+                                     cloudflare_propagation_seconds=0,  # don't wait during tests
+                                     **dns_test_common.default_options('cloudflare'))
 
         self.auth = Authenticator(self.config, "cloudflare")
 
@@ -61,12 +62,13 @@ class CloudflareClientTest(unittest.TestCase):
         from certbot_dns_cloudflare.dns_cloudflare import _CloudflareClient
 
         self.cloudflare_client = _CloudflareClient(EMAIL, API_KEY)
+        dns_test_common.patch_zone_cache(self)
 
         self.cf = mock.MagicMock()
         self.cloudflare_client.cf = self.cf
 
     def test_add_txt_record(self):
-        self.cf.zones.get.return_value = [{'id': self.zone_id}]
+        self.cf.zones.get.return_value = [{'name': DOMAIN, 'id': self.zone_id}]
 
         self.cloudflare_client.add_txt_record(DOMAIN, self.record_name, self.record_content,
                                               self.record_ttl)
@@ -81,7 +83,7 @@ class CloudflareClientTest(unittest.TestCase):
         self.assertEqual(self.record_ttl, post_data['ttl'])
 
     def test_add_txt_record_error(self):
-        self.cf.zones.get.return_value = [{'id': self.zone_id}]
+        self.cf.zones.get.return_value = [{'name': DOMAIN, 'id': self.zone_id}]
 
         self.cf.zones.dns_records.post.side_effect = API_ERROR
 
@@ -90,6 +92,20 @@ class CloudflareClientTest(unittest.TestCase):
             self.cloudflare_client.add_txt_record,
             DOMAIN, self.record_name, self.record_content, self.record_ttl)
 
+    def test_add_txt_record_zones_listed_once(self):
+        other_zones = [{'name': 'zone{0}.org'.format(i), 'id': i} for i in range(50)]
+        self.cf.zones.get.side_effect = [other_zones, [{'name': DOMAIN, 'id': self.zone_id}]]
+
+        for name in (DOMAIN, 'www.' + DOMAIN):
+            self.cloudflare_client.add_txt_record(name, self.record_name, self.record_content,
+                                                  self.record_ttl)
+
+        self.assertEqual([mock.call(params={'page': 1, 'per_page': 50}),
+                          mock.call(params={'page': 2, 'per_page': 50})],
+                         self.cf.zones.get.call_args_list)
+        self.assertEqual([mock.call(self.zone_id, data=mock.ANY)] * 2,
+                         self.cf.zones.dns_records.post.call_args_list)
+
     def test_add_txt_record_error_during_zone_lookup(self):
         self.cf.zones.get.side_effect = API_ERROR
 
@@ -107,7 +123,7 @@ class CloudflareClientTest(unittest.TestCase):
             DOMAIN, self.record_name, self.record_content, self.record_ttl)
 
     def test_del_txt_record(self):
-        self.cf.zones.get.return_value = [{'id': self.zone_id}]
+        self.cf.zones.get.return_value = [{'name': DOMAIN, 'id': self.zone_id}]
         self.cf.zones.dns_records.get.return_value = [{'id': self.record_id}]
 
         self.cloudflare_client.del_txt_record(DOMAIN, self.record_name, self.record_content)
@@ -130,7 +146,7 @@ class CloudflareClientTest(unittest.TestCase):
         self.cloudflare_client.del_txt_record(DOMAIN, self.record_name, self.record_content)
 
     def test_del_txt_record_error_during_delete(self):
-        self.cf.zones.get.return_value = [{'id': self.zone_id}]
+        self.cf.zones.get.return_value = [{'name': DOMAIN, 'id': self.zone_id}]
         self.cf.zones.dns_records.get.return_value = [{'id': self.record_id}]
         self.cf.zones.dns_records.delete.side_effect = API_ERROR
 
@@ -142,7 +158,7 @@ class CloudflareClientTest(unittest.TestCase):
         self.assertEqual(expected, self.cf.mock_calls)
 
     def test_del_txt_record_error_during_get(self):
-        self.cf.zones.get.return_value = [{'id': self.zone_id}]
+        self.cf.zones.get.return_value = [{'name': DOMAIN, 'id': self.zone_id}]
         self.cf.zones.dns_records.get.side_effect = API_ERROR
 
         self.cloudflare_client.del_txt_record(DOMAIN, self.record_name, self.record_content)
@@ -152,7 +168,7 @@ class CloudflareClientTest(unittest.TestCase):
         self.assertEqual(expected, self.cf.mock_calls)
 
     def test_del_txt_record_no_record(self):
-        self.cf.zones.get.return_value = [{'id': self.zone_id}]
+        self.cf.zones.get.return_value = [{'name': DOMAIN, 'id': self.zone_id}]
         self.cf.zones.dns_records.get.return_value = []
 
         self.cloudflare_client.del_txt_record(DOMAIN, self.record_name, self.record_content)
@@ -162,7 +178,7 @@ class CloudflareClientTest(unittest.TestCase):
         self.assertEqual(expected, self.cf.mock_calls)
 
     def test_del_txt_record_no_zone(self):
-        self.cf.zones.get.return_value = [{'id': None}]
+        self.cf.zones.get.return_value = [{'name': 'other-' + DOMAIN, 'id': self.zone_id}]
 
         self.cloudflare_client.del_txt_record(DOMAIN, self.record_name, self.record_content)
         expected = [mock.call.zones.get(params=mock.ANY)]
@@ -20,6 +20,8 @@ class Authenticator(dns_common.DNSAuthenticator):
     """
 
     description = 'Obtain certs using a DNS TXT record (if you are using DigitalOcean for DNS).'
+    # Each record is created with its own client.
+    thread_safe = True
 
     def __init__(self, *args, **kwargs):
         super(Authenticator, self).__init__(*args, **kwargs)
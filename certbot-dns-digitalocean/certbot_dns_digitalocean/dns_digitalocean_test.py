@@ -26,7 +26,8 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
         dns_test_common.write({"digitalocean_token": TOKEN}, path)
 
         self.config = mock.MagicMock(digitalocean_credentials=path,
-                                     digitalocean_propagation_seconds=0)  # don't wait during tests
+                                     digitalocean_propagation_seconds=0,  # don't wait during tests
+                                     **dns_test_common.default_options('digitalocean'))
 
         self.auth = Authenticator(self.config, "digitalocean")
 
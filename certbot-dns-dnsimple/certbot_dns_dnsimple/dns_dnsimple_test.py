@@ -25,7 +25,8 @@ class AuthenticatorTest(test_util.TempDirTestCase,
         dns_test_common.write({"dnsimple_token": TOKEN}, path)
 
         self.config = mock.MagicMock(dnsimple_credentials=path,
-                                     dnsimple_propagation_seconds=0)  # don't wait during tests
+                                     dnsimple_propagation_seconds=0,  # don't wait during tests
+                                     **dns_test_common.default_options('dnsimple'))
 
         self.auth = Authenticator(self.config, "dnsimple")
 
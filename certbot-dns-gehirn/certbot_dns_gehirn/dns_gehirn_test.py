@@ -29,7 +29,8 @@ class AuthenticatorTest(test_util.TempDirTestCase,
         )
 
         self.config = mock.MagicMock(gehirn_credentials=path,
-                                     gehirn_propagation_seconds=0)  # don't wait during tests
+                                     gehirn_propagation_seconds=0,  # don't wait during tests
+                                     **dns_test_common.default_options('gehirn'))
 
         self.auth = Authenticator(self.config, "gehirn")
 
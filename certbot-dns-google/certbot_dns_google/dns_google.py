@@ -31,6 +31,9 @@ class Authenticator(dns_common.DNSAuthenticator):
     description = ('Obtain certificates using a DNS TXT record (if you are using Google Cloud DNS '
                    'for DNS).')
     ttl = 60
+    # Records are added by replacing the whole record set of their name, so concurrent changes
+    # to the records of a domain and its wildcard would conflict.
+    thread_safe = False
 
     def __init__(self, *args, **kwargs):
         super(Authenticator, self).__init__(*args, **kwargs)
@@ -262,26 +265,37 @@ class _GoogleClient(object):
         :raises certbot.errors.PluginError: if the managed zone cannot be found.
         """
 
-        zone_dns_name_guesses = dns_common.base_domain_name_guesses(domain)
+        zone_id = dns_common.zone_cache.find_zone_id_in_listing('google', self.project_id,
+                                                                domain, self._list_managed_zones)
+        if zone_id is None:
+            raise errors.PluginError('Unable to determine managed zone for {0} using zone names: '
+                                     '{1}.'.format(domain,
+                                                   dns_common.base_domain_name_guesses(domain)))
+        return zone_id
+
+    def _list_managed_zones(self):
+        """
+        List the public managed zones of the project with the Google Cloud DNS API.
+
+        :returns: The DNS name and ID of each managed zone.
+        :rtype: list
+        :raises certbot.errors.PluginError: if the managed zones cannot be listed.
+        """
 
         mz = self.dns.managedZones()  # managedZones | pylint: disable=no-member
-        for zone_name in zone_dns_name_guesses:
+        zones = []
+        request = mz.list(project=self.project_id)
+        while request is not None:
             try:
-                request = mz.list(project=self.project_id, dnsName=zone_name + '.')
                 response = request.execute()
-                zones = response['managedZones']
             except googleapiclient_errors.Error as e:
                 raise errors.PluginError('Encountered error finding managed zone: {0}'
                                          .format(e))
-
-            for zone in zones:
-                zone_id = zone['id']
+            for zone in response['managedZones']:
                 if 'privateVisibilityConfig' not in zone:
-                    logger.debug('Found id of %s for %s using name %s', zone_id, domain, zone_name)
-                    return zone_id
-
-        raise errors.PluginError('Unable to determine managed zone for {0} using zone names: {1}.'
-                                 .format(domain, zone_dns_name_guesses))
+                    zones.append((zone['dnsName'], zone['id']))
+            request = mz.list_next(previous_request=request, previous_response=response)
+        return zones
 
     @staticmethod
     def get_project_id():
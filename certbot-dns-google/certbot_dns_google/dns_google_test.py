@@ -32,7 +32,8 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
 
         super(AuthenticatorTest, self).setUp()
         self.config = mock.MagicMock(google_credentials=path,
-                                     google_propagation_seconds=0)  # don't wait during tests
+                                     google_propagation_seconds=0,  # don't wait during tests
+                                     **dns_test_common.default_options('google'))
 
         self.auth = Authenticator(self.config, "google")
 
@@ -66,6 +67,10 @@ class GoogleClientTest(unittest.TestCase):
     record_ttl = 42
     zone = "ZONE_ID"
     change = "an-id"
+    managed_zone = {'id': zone, 'dnsName': DOMAIN + '.'}
+
+    def setUp(self):
+        dns_test_common.patch_zone_cache(self)
 
     def _setUp_client_with_mock(self, zone_request_side_effect):
         from certbot_dns_google.dns_google import _GoogleClient
@@ -81,6 +86,7 @@ class GoogleClientTest(unittest.TestCase):
         # Setup
         mock_mz = mock.MagicMock()
         mock_mz.list.return_value.execute.side_effect = zone_request_side_effect
+        mock_mz.list_next.return_value = None
 
         mock_rrs = mock.MagicMock()
         rrsets = {"rrsets": [{"name": "_acme-challenge.example.org.", "type": "TXT",
@@ -109,7 +115,7 @@ class GoogleClientTest(unittest.TestCase):
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
     @mock.patch('certbot_dns_google.dns_google._GoogleClient.get_project_id')
     def test_add_txt_record(self, get_project_id_mock, credential_mock):
-        client, changes = self._setUp_client_with_mock([{'managedZones': [{'id': self.zone}]}])
+        client, changes = self._setUp_client_with_mock([{'managedZones': [self.managed_zone]}])
         credential_mock.assert_called_once_with('/not/a/real/path.json', mock.ANY)
         self.assertFalse(get_project_id_mock.called)
 
@@ -136,7 +142,7 @@ class GoogleClientTest(unittest.TestCase):
     @mock.patch('certbot_dns_google.dns_google.open',
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
     def test_add_txt_record_and_poll(self, unused_credential_mock):
-        client, changes = self._setUp_client_with_mock([{'managedZones': [{'id': self.zone}]}])
+        client, changes = self._setUp_client_with_mock([{'managedZones': [self.managed_zone]}])
         changes.create.return_value.execute.return_value = {'status': 'pending', 'id': self.change}
         changes.get.return_value.execute.return_value = {'status': 'done'}
 
@@ -155,7 +161,7 @@ class GoogleClientTest(unittest.TestCase):
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
     def test_add_txt_record_delete_old(self, unused_credential_mock):
         client, changes = self._setUp_client_with_mock(
-            [{'managedZones': [{'id': self.zone}]}])
+            [{'managedZones': [self.managed_zone]}])
         mock_get_rrs = "certbot_dns_google.dns_google._GoogleClient.get_existing_txt_rrset"
         with mock.patch(mock_get_rrs) as mock_rrs:
             mock_rrs.return_value = ["sample-txt-contents"]
@@ -169,7 +175,7 @@ class GoogleClientTest(unittest.TestCase):
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
     def test_add_txt_record_noop(self, unused_credential_mock):
         client, changes = self._setUp_client_with_mock(
-            [{'managedZones': [{'id': self.zone}]}])
+            [{'managedZones': [self.managed_zone]}])
         client.add_txt_record(DOMAIN, "_acme-challenge.example.org",
                               "example-txt-contents", self.record_ttl)
         self.assertFalse(changes.create.called)
@@ -193,11 +199,37 @@ class GoogleClientTest(unittest.TestCase):
         self.assertRaises(errors.PluginError, client.add_txt_record,
                           DOMAIN, self.record_name, self.record_content, self.record_ttl)
 
+    @mock.patch('oauth2client.service_account.ServiceAccountCredentials.from_json_keyfile_name')
+    @mock.patch('certbot_dns_google.dns_google.open',
+                mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
+    def test_add_txt_record_delegated_subzone(self, unused_credential_mock):
+        client, changes = self._setUp_client_with_mock([
+            {'managedZones': [self.managed_zone,
+                              {'id': 'PRIVATE_ID', 'dnsName': 'sub.' + DOMAIN + '.',
+                               'privateVisibilityConfig': {}}]},
+            {'managedZones': [{'id': 'SUB_ID', 'dnsName': 'sub.' + DOMAIN + '.'}]},
+        ])
+        # pylint: disable=no-member
+        mock_mz = client.dns.managedZones.return_value
+        # The second page is requested with the same mock request
+        mock_mz.list_next.side_effect = [mock_mz.list.return_value, None]
+
+        client.add_txt_record(DOMAIN, self.record_name, self.record_content, self.record_ttl)
+        changes.create.assert_called_with(body=mock.ANY, managedZone=self.zone,
+                                          project=PROJECT_ID)
+
+        client.add_txt_record('sub.' + DOMAIN, self.record_name, self.record_content,
+                              self.record_ttl)
+        changes.create.assert_called_with(body=mock.ANY, managedZone='SUB_ID',
+                                          project=PROJECT_ID)
+        # Both pages of zones are listed once
+        self.assertEqual(mock_mz.list.return_value.execute.call_count, 2)
+
     @mock.patch('oauth2client.service_account.ServiceAccountCredentials.from_json_keyfile_name')
     @mock.patch('certbot_dns_google.dns_google.open',
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
     def test_add_txt_record_error_during_add(self, unused_credential_mock):
-        client, changes = self._setUp_client_with_mock([{'managedZones': [{'id': self.zone}]}])
+        client, changes = self._setUp_client_with_mock([{'managedZones': [self.managed_zone]}])
         changes.create.side_effect = API_ERROR
 
         self.assertRaises(errors.PluginError, client.add_txt_record,
@@ -207,7 +239,7 @@ class GoogleClientTest(unittest.TestCase):
     @mock.patch('certbot_dns_google.dns_google.open',
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
     def test_del_txt_record(self, unused_credential_mock):
-        client, changes = self._setUp_client_with_mock([{'managedZones': [{'id': self.zone}]}])
+        client, changes = self._setUp_client_with_mock([{'managedZones': [self.managed_zone]}])
 
         mock_get_rrs = "certbot_dns_google.dns_google._GoogleClient.get_existing_txt_rrset"
         with mock.patch(mock_get_rrs) as mock_rrs:
@@ -263,7 +295,7 @@ class GoogleClientTest(unittest.TestCase):
     @mock.patch('certbot_dns_google.dns_google.open',
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
     def test_del_txt_record_error_during_delete(self, unused_credential_mock):
-        client, changes = self._setUp_client_with_mock([{'managedZones': [{'id': self.zone}]}])
+        client, changes = self._setUp_client_with_mock([{'managedZones': [self.managed_zone]}])
         changes.create.side_effect = API_ERROR
 
         client.del_txt_record(DOMAIN, self.record_name, self.record_content, self.record_ttl)
@@ -273,7 +305,7 @@ class GoogleClientTest(unittest.TestCase):
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
     def test_get_existing(self, unused_credential_mock):
         client, unused_changes = self._setUp_client_with_mock(
-            [{'managedZones': [{'id': self.zone}]}])
+            [{'managedZones': [self.managed_zone]}])
         # Record name mocked in setUp
         found = client.get_existing_txt_rrset(self.zone, "_acme-challenge.example.org")
         self.assertEqual(found, ["\"example-txt-contents\""])
@@ -285,7 +317,7 @@ class GoogleClientTest(unittest.TestCase):
                 mock.mock_open(read_data='{"project_id": "' + PROJECT_ID + '"}'), create=True)
     def test_get_existing_fallback(self, unused_credential_mock):
         client, unused_changes = self._setUp_client_with_mock(
-            [{'managedZones': [{'id': self.zone}]}])
+            [{'managedZones': [self.managed_zone]}])
         # pylint: disable=no-member
         mock_execute = client.dns.resourceRecordSets.return_value.list.return_value.execute
         mock_execute.side_effect = API_ERROR
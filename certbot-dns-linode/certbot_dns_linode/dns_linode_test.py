@@ -25,7 +25,8 @@ class AuthenticatorTest(test_util.TempDirTestCase,
         dns_test_common.write({"linode_key": TOKEN}, path)
 
         self.config = mock.MagicMock(linode_credentials=path,
-                                     linode_propagation_seconds=0)  # don't wait during tests
+                                     linode_propagation_seconds=0,  # don't wait during tests
+                                     **dns_test_common.default_options('linode'))
 
         self.auth = Authenticator(self.config, "linode")
 
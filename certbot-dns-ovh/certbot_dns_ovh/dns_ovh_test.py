@@ -34,7 +34,8 @@ class AuthenticatorTest(test_util.TempDirTestCase,
         dns_test_common.write(credentials, path)
 
         self.config = mock.MagicMock(ovh_credentials=path,
-                                     ovh_propagation_seconds=0)  # don't wait during tests
+                                     ovh_propagation_seconds=0,  # don't wait during tests
+                                     **dns_test_common.default_options('ovh'))
 
         self.auth = Authenticator(self.config, "ovh")
 
@@ -40,6 +40,8 @@ class Authenticator(dns_common.DNSAuthenticator):
 
     description = 'Obtain certificates using a DNS TXT record (if you are using BIND for DNS).'
     ttl = 120
+    # Each record is created with its own dynamic update.
+    thread_safe = True
 
     def __init__(self, *args, **kwargs):
         super(Authenticator, self).__init__(*args, **kwargs)
@@ -94,6 +96,7 @@ class _RFC2136Client(object):
     def __init__(self, server, port, key_name, key_secret, key_algorithm):
         self.server = server
         self.port = port
+        self._account = [server, port, key_name, key_secret]
         self.keyring = dns.tsigkeyring.from_text({
             key_name: key_secret
         })
@@ -179,16 +182,62 @@ class _RFC2136Client(object):
         :raises certbot.errors.PluginError: if no SOA record can be found.
         """
 
+        return dns_common.zone_cache.find_zone_id('rfc2136', self._account, record_name,
+                                                  self._lookup_domain, self._in_domain)
+
+    def _lookup_domain(self, record_name):
+        """
+        Probe the server for the closest domain with an SOA record for a given domain name.
+
+        :param str record_name: The record name for which to find the closest SOA record.
+        :returns: The domain, twice: it is both the name and the ID of the zone.
+        :rtype: tuple
+        :raises certbot.errors.PluginError: if no SOA record can be found.
+        """
+
         domain_name_guesses = dns_common.base_domain_name_guesses(record_name)
 
         # Loop through until we find an authoritative SOA record
         for guess in domain_name_guesses:
             if self._query_soa(guess):
-                return guess
+                return guess, guess
 
         raise errors.PluginError('Unable to determine base domain for {0} using names: {1}.'
                                  .format(record_name, domain_name_guesses))
 
+    def _in_domain(self, record_name, domain_name):
+        """
+        Check with a single query that a domain is the closest one with an SOA record for a name.
+
+        The authoritative response to an SOA query holds the SOA record of the zone of the name,
+        in the authority section if the name is not the apex of the zone.
+
+        :param str record_name: The record name.
+        :param str domain_name: The domain found for another record name.
+        :returns: True if the domain is the closest one with an SOA record, False otherwise.
+        :rtype: bool
+        :raises certbot.errors.PluginError: if no response is received.
+        """
+
+        name = dns.name.from_text(record_name)
+        domain = dns.name.from_text(domain_name)
+
+        request = dns.message.make_query(name, dns.rdatatype.SOA, dns.rdataclass.IN)
+        # Turn off Recursion Desired bit in query
+        request.flags ^= dns.flags.RD
+
+        try:
+            response = dns.query.udp(request, self.server, port=self.port)
+        except Exception as e:
+            raise errors.PluginError('Encountered error when making query: {0}'
+                                     .format(e))
+
+        if response.rcode() not in (dns.rcode.NOERROR, dns.rcode.NXDOMAIN) or \
+                not response.flags & dns.flags.AA:
+            return False
+        return any(response.get_rrset(section, domain, dns.rdataclass.IN, dns.rdatatype.SOA)
+                   for section in (response.answer, response.authority))
+
     def _query_soa(self, domain_name):
         """
         Query a domain name for an authoritative SOA record.
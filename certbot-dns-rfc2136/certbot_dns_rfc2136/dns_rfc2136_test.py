@@ -3,7 +3,10 @@
 import unittest
 
 import dns.flags
+import dns.message
 import dns.rcode
+import dns.rdatatype
+import dns.rrset
 import dns.tsig
 import mock
 
@@ -31,7 +34,8 @@ class AuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthentic
         dns_test_common.write(VALID_CONFIG, path)
 
         self.config = mock.MagicMock(rfc2136_credentials=path,
-                                     rfc2136_propagation_seconds=0)  # don't wait during tests
+                                     rfc2136_propagation_seconds=0,  # don't wait during tests
+                                     **dns_test_common.default_options('rfc2136'))
 
         self.auth = Authenticator(self.config, "rfc2136")
 
@@ -76,6 +80,7 @@ class RFC2136ClientTest(unittest.TestCase):
         from certbot_dns_rfc2136.dns_rfc2136 import _RFC2136Client
 
         self.rfc2136_client = _RFC2136Client(SERVER, PORT, NAME, SECRET, dns.tsig.HMAC_MD5)
+        dns_test_common.patch_zone_cache(self)
 
     @mock.patch("dns.query.tcp")
     def test_add_txt_record(self, query_mock):
@@ -152,6 +157,39 @@ class RFC2136ClientTest(unittest.TestCase):
 
         self.assertTrue(domain == DOMAIN)
 
+    def test_find_domain_delegated_subzone(self):
+        zones = [DOMAIN, 'sub.' + DOMAIN]
+        # _query_soa | pylint: disable=protected-access
+        self.rfc2136_client._query_soa = mock.MagicMock(side_effect=lambda name: name in zones)
+        # _in_domain | pylint: disable=protected-access
+        self.rfc2136_client._in_domain = mock.MagicMock(return_value=False)
+
+        # _find_domain | pylint: disable=protected-access
+        self.assertEqual(self.rfc2136_client._find_domain('_acme-challenge.' + DOMAIN), DOMAIN)
+        self.assertEqual(self.rfc2136_client._find_domain('_acme-challenge.sub.' + DOMAIN),
+                         'sub.' + DOMAIN)
+        self.rfc2136_client._in_domain.assert_called_once_with(
+            '_acme-challenge.sub.' + DOMAIN, DOMAIN)
+        # The zone found for a name is reused
+        self.assertEqual(self.rfc2136_client._find_domain('_acme-challenge.' + DOMAIN), DOMAIN)
+        self.assertEqual(self.rfc2136_client._query_soa.call_count, 4)
+
+    def test_find_domain_cached_zone(self):
+        # _query_soa | pylint: disable=protected-access
+        self.rfc2136_client._query_soa = mock.MagicMock(side_effect=lambda name: name == DOMAIN)
+        # _in_domain | pylint: disable=protected-access
+        self.rfc2136_client._in_domain = mock.MagicMock(return_value=True)
+
+        # _find_domain | pylint: disable=protected-access
+        self.assertEqual(self.rfc2136_client._find_domain('_acme-challenge.' + DOMAIN), DOMAIN)
+        self.assertEqual(self.rfc2136_client._query_soa.call_count, 2)
+        # The zone of another name is confirmed with a single query
+        self.assertEqual(self.rfc2136_client._find_domain('_acme-challenge.a.b.' + DOMAIN),
+                         DOMAIN)
+        self.assertEqual(self.rfc2136_client._query_soa.call_count, 2)
+        self.rfc2136_client._in_domain.assert_called_once_with(
+            '_acme-challenge.a.b.' + DOMAIN, DOMAIN)
+
     def test_find_domain_wraps_errors(self):
         # _query_soa | pylint: disable=protected-access
         self.rfc2136_client._query_soa = mock.MagicMock(return_value=False)
@@ -183,6 +221,39 @@ class RFC2136ClientTest(unittest.TestCase):
         query_mock.assert_called_with(mock.ANY, SERVER, port=PORT)
         self.assertFalse(result)
 
+    @mock.patch("dns.query.udp")
+    def test_in_domain(self, query_mock):
+        name = '_acme-challenge.www.' + DOMAIN
+        request = dns.message.make_query(name, dns.rdatatype.SOA)
+        response = dns.message.make_response(request)
+        response.flags |= dns.flags.AA
+        response.set_rcode(dns.rcode.NXDOMAIN)
+        soa = dns.rrset.from_text(
+            DOMAIN + '.', 300, 'IN', 'SOA', 'ns. hostmaster. 1 7200 900 1209600 86400')
+        response.find_rrset(response.authority, soa.name, soa.rdclass, soa.rdtype,
+                            create=True).update(soa)
+        query_mock.return_value = response
+
+        # _in_domain | pylint: disable=protected-access
+        self.assertTrue(self.rfc2136_client._in_domain(name, DOMAIN))
+        self.assertFalse(self.rfc2136_client._in_domain(name, 'www.' + DOMAIN))
+        query_mock.assert_called_with(mock.ANY, SERVER, port=PORT)
+        self.assertFalse(query_mock.call_args[0][0].flags & dns.flags.RD)
+
+        # Referrals to a delegated zone are not authoritative
+        response.flags &= ~dns.flags.AA
+        self.assertFalse(self.rfc2136_client._in_domain(name, DOMAIN))
+
+    @mock.patch("dns.query.udp")
+    def test_in_domain_wraps_errors(self, query_mock):
+        query_mock.side_effect = Exception
+
+        self.assertRaises(
+            errors.PluginError,
+            # _in_domain | pylint: disable=protected-access
+            self.rfc2136_client._in_domain,
+            DOMAIN, DOMAIN)
+
     @mock.patch("dns.query.udp")
     def test_query_soa_wraps_errors(self, query_mock):
         query_mock.side_effect = Exception
@@ -77,29 +77,24 @@ class Authenticator(dns_common.DNSAuthenticator):
            That is, the id for the zone whose name is the longest parent of the
            domain.
         """
+        # The AWS account is not known, so zones are only cached for the run.
+        zone_id = dns_common.zone_cache.find_zone_id_in_listing("route53", None, domain,
+                                                               self._list_zones)
+        if zone_id is None:
+            raise errors.PluginError(
+                "Unable to find a Route53 hosted zone for {0}".format(domain)
+            )
+        return zone_id
+
+    def _list_zones(self):
+        """List the names and ids of the public hosted zones."""
         paginator = self.r53.get_paginator("list_hosted_zones")
         zones = []
-        target_labels = domain.rstrip(".").split(".")
         for page in paginator.paginate():
             for zone in page["HostedZones"]:
-                if zone["Config"]["PrivateZone"]:
-                    continue
-
-                candidate_labels = zone["Name"].rstrip(".").split(".")
-                if candidate_labels == target_labels[-len(candidate_labels):]:
+                if not zone["Config"]["PrivateZone"]:
                     zones.append((zone["Name"], zone["Id"]))
-
-        if not zones:
-            raise errors.PluginError(
-                "Unable to find a Route53 hosted zone for {0}".format(domain)
-            )
-
-        # Order the zones that are suffixes for our desired to domain by
-        # length, this puts them in an order like:
-        # ["foo.bar.baz.com", "bar.baz.com", "baz.com", "com"]
-        # And then we choose the first one, which will be the most specific.
-        zones.sort(key=lambda z: len(z[0]), reverse=True)
-        return zones[0][1]
+        return zones
 
     def _change_txt_record(self, action, validation_domain_name, validation):
         zone_id = self._find_zone_id_for_domain(validation_domain_name)
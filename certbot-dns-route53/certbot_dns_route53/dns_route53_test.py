@@ -125,6 +125,7 @@ class ClientTest(unittest.TestCase):
         from certbot_dns_route53.dns_route53 import Authenticator
 
         super(ClientTest, self).setUp()
+        dns_test_common.patch_zone_cache(self)
 
         self.config = mock.MagicMock()
 
@@ -174,6 +175,24 @@ class ClientTest(unittest.TestCase):
         result = self.client._find_zone_id_for_domain("foo.example.com")
         self.assertEqual(result, "FOO")
 
+    def test_find_zone_id_for_domain_delegated_subzone(self):
+        self.client.r53.get_paginator = mock.MagicMock()
+        self.client.r53.get_paginator().paginate.return_value = [
+            {
+                "HostedZones": [
+                    self.EXAMPLE_COM_ZONE,
+                    self.FOO_EXAMPLE_COM_ZONE,
+                ]
+            }
+        ]
+
+        self.assertEqual(self.client._find_zone_id_for_domain("_acme-challenge.example.com"),
+                         "EXAMPLE")
+        self.assertEqual(self.client._find_zone_id_for_domain("_acme-challenge.foo.example.com"),
+                         "FOO")
+        # The zones are only listed once
+        self.assertEqual(self.client.r53.get_paginator().paginate.call_count, 1)
+
     def test_find_zone_id_for_domain_no_results(self):
         self.client.r53.get_paginator = mock.MagicMock()
         self.client.r53.get_paginator().paginate.return_value = []
@@ -29,7 +29,8 @@ class AuthenticatorTest(test_util.TempDirTestCase,
         )
 
         self.config = mock.MagicMock(sakuracloud_credentials=path,
-                                     sakuracloud_propagation_seconds=0)  # don't wait during tests
+                                     sakuracloud_propagation_seconds=0,  # don't wait during tests
+                                     **dns_test_common.default_options('sakuracloud'))
 
         self.auth = Authenticator(self.config, "sakuracloud")
 
@@ -81,6 +81,9 @@ class NginxConfigurator(common.Installer):
         add("ctl", default=constants.CLI_DEFAULTS["ctl"], help="Path to the "
             "'nginx' binary, used for 'configtest' and retrieving nginx "
             "version number.")
+        add("parse-workers", default=1, type=int, help="Number of processes "
+            "parsing the Nginx configuration files. Configurations made of "
+            "many included files load faster with one process per CPU.")
 
     @property
     def nginx_conf(self):
@@ -192,7 +195,10 @@ class NginxConfigurator(common.Installer):
         # Make sure configuration is valid
         self.config_test()
 
-        self.parser = parser.NginxParser(self.conf('server-root'))
+        self.parser = parser.NginxParser(
+            self.conf('server-root'),
+            cache_dir=os.path.join(self.config.work_dir, constants.PARSE_CACHE_DIR),
+            workers=self.conf('parse-workers'))
 
         # Set Version
         if self.version is None:
@@ -477,9 +483,15 @@ class NginxConfigurator(common.Installer):
         # 2. longest wildcard name starting with *
         # 3. longest wildcard name ending with *
         # 4. first matching regex in order of appearance in the file
+        index = self.parser.get_name_index()
+        best_matches = dict((id(vhost), (name_type, name))
+                            for vhost, name_type, name in index.best_matches(target_name))
         matches = []
         for vhost in vhost_list:
-            name_type, name = parser.get_best_match(target_name, vhost.names)
+            if index.indexes(vhost):
+                name_type, name = best_matches.get(id(vhost), (None, None))
+            else:
+                name_type, name = parser.get_best_match(target_name, vhost.names)
             if name_type == 'exact':
                 matches.append({'vhost': vhost,
                                 'name': name,
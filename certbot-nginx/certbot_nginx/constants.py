@@ -19,6 +19,9 @@ CLI_DEFAULTS = dict(
 MOD_SSL_CONF_DEST = "options-ssl-nginx.conf"
 """Name of the mod_ssl config file as saved in `IConfig.config_dir`."""
 
+PARSE_CACHE_DIR = "nginx-parse-cache"
+"""Name of the directory where parsed configuration files are cached, in `IConfig.work_dir`."""
+
 UPDATED_MOD_SSL_CONF_DIGEST = ".updated-options-ssl-nginx-conf-digest.txt"
 """Name of the hash of the updated or informed mod_ssl_conf as saved in `IConfig.config_dir`."""
 
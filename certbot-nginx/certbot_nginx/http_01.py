@@ -91,6 +91,7 @@ class NginxHttp01(common.ChallengePerformer):
                     body.insert(0, bucket_directive)
                 if include_directive not in body:
                     body.insert(0, include_directive)
+                self.configurator.parser.mark_dirty(root)
                 included = True
                 break
         if not included:
@@ -1,14 +1,18 @@
-"""Very low-level nginx config parser based on pyparsing."""
+"""Very low-level nginx config parser."""
 # Forked from https://github.com/fatiherikli/nginxparser (MIT Licensed)
 import copy
 import logging
+import re
 
 from pyparsing import (
     Literal, White, Forward, Group, Optional, OneOrMore, QuotedString, Regex, ZeroOrMore, Combine)
+from pyparsing import ParseException
 from pyparsing import stringEnd
 from pyparsing import restOfLine
 import six
 
+from acme.magic_typing import List, Tuple  # pylint: disable=unused-import, no-name-in-module
+
 logger = logging.getLogger(__name__)
 
 class RawNginxParser(object):
@@ -62,6 +66,117 @@ class RawNginxParser(object):
         """Returns the parsed tree as a list."""
         return self.parse().asList()
 
+
+# Building blocks of the grammar of RawNginxParser, as regular expressions
+_SPACE = re.compile(r"[ \t\r\n]+")
+_QUOTED = r"""(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')"""
+_TAIL_TOKENCHARS = r"(?:\$\{|[^{;\s])*"
+_TOKEN = re.compile(
+    r"{quoted}\){tail}|(?:\$\{{|[^{{}};\s'\"]){tail}|{quoted}".format(
+        quoted=_QUOTED, tail=_TAIL_TOKENCHARS),
+    re.DOTALL)
+
+
+class StreamingNginxParser(object):
+    """A class that parses nginx configuration in a single pass.
+
+    It accepts the same configurations as `RawNginxParser` and returns the
+    same trees, but scans the source with a few regular expressions and an
+    explicit stack of the blocks being parsed instead of a pyparsing
+    grammar, so that its cost is linear in the size of the source.
+
+    """
+
+    def __init__(self, source):
+        self.source = source
+
+    def _error(self, loc, msg):
+        return ParseException(self.source, loc, msg)
+
+    def _words(self, loc):
+        """Scans the tokens of a directive or block header.
+
+        :returns: The tokens and the whitespace around them, and the
+            position following them.
+        :rtype: tuple
+
+        """
+        source = self.source
+        words = []
+        space = _SPACE.match(source, loc)
+        if space:
+            words.append(space.group())
+            loc = space.end()
+        token = _TOKEN.match(source, loc)
+        if token is None:
+            return None, loc
+        words.append(token.group())
+        loc = token.end()
+        while True:
+            space = _SPACE.match(source, loc)
+            if space is None:
+                break
+            loc = space.end()
+            token = _TOKEN.match(source, loc)
+            if token is None:
+                words.append(space.group())
+                break
+            words.extend((space.group(), token.group()))
+            loc = token.end()
+        return words, loc
+
+    def as_list(self):
+        """Returns the parsed tree as a list.
+
+        :raises pyparsing.ParseException: If the source is not valid.
+
+        """
+        source = self.source
+        end = len(source)
+        # Contents of the enclosing blocks, and headers of the open blocks
+        stack = []  # type: List[Tuple[List, List]]
+        contents = []  # type: List
+        loc = 0
+        while True:
+            space = _SPACE.match(source, loc)
+            after_space = space.end() if space else loc
+            if source.startswith("#", after_space):
+                end_of_line = source.find("\n", after_space)
+                if end_of_line == -1:
+                    end_of_line = len(source)
+                comment = [space.group()] if space else []
+                comment.extend(("#", source[after_space + 1:end_of_line]))
+                contents.append(comment)
+                loc = end_of_line
+                continue
+
+            words, loc = self._words(loc)
+            if words is not None:
+                if source.startswith(";", loc):
+                    contents.append(words)
+                elif source.startswith("{", loc):
+                    stack.append((contents, words))
+                    contents = []
+                else:
+                    raise self._error(loc, 'Expected ";" or "{"')
+                loc += 1
+                continue
+
+            if stack and source.startswith("}", loc):
+                if space:
+                    contents.append(space.group())
+                parent, header = stack.pop()
+                parent.append([header, contents])
+                contents = parent
+                loc += 1
+            elif not stack and loc == end and contents:
+                if space:
+                    contents.append(space.group())
+                return contents
+            else:
+                raise self._error(loc, 'Expected "}"' if stack else "Expected a directive")
+
+
 class RawNginxDumper(object):
     # pylint: disable=too-few-public-methods
     """A class that dumps nginx configuration from the provided tree."""
@@ -109,7 +224,7 @@ def loads(source):
     :rtype: list
 
     """
-    return UnspacedList(RawNginxParser(source).as_list())
+    return UnspacedList(StreamingNginxParser(source).as_list())
 
 
 def load(_file):
@@ -152,13 +267,13 @@ class UnspacedList(list):
     """Wrap a list [of lists], making any whitespace entries magically invisible"""
 
     def __init__(self, list_source):
-        # ensure our argument is not a generator, and duplicate any sublists
-        self.spaced = copy.deepcopy(list(list_source))
-        self.dirty = False
+        # ensure our argument is not a generator; sublists are duplicated below
+        self.spaced = list(list_source)
 
         # Turn self into a version of the source list that has spaces removed
         # and all sub-lists also UnspacedList()ed
         list.__init__(self, list_source)
+        comment_start = self.index("#") if "#" in self else len(self)
         for i, entry in reversed(list(enumerate(self))):
             if isinstance(entry, list):
                 sublist = UnspacedList(entry)
@@ -166,7 +281,7 @@ class UnspacedList(list):
                 self.spaced[i] = sublist.spaced
             elif spacey(entry):
                 # don't delete comments
-                if "#" not in self[:i]:
+                if i <= comment_start:
                     list.__delitem__(self, i)
 
     def _coerce(self, inbound):
@@ -192,25 +307,21 @@ class UnspacedList(list):
         self.spaced.insert(slicepos, spaced_item)
         if not spacey(item):
             list.insert(self, i, item)
-        self.dirty = True
 
     def append(self, x):
         item, spaced_item = self._coerce(x)
         self.spaced.append(spaced_item)
         if not spacey(item):
             list.append(self, item)
-        self.dirty = True
 
     def extend(self, x):
         item, spaced_item = self._coerce(x)
         self.spaced.extend(spaced_item)
         list.extend(self, item)
-        self.dirty = True
 
     def __add__(self, other):
         l = copy.deepcopy(self)
         l.extend(other)
-        l.dirty = True
         return l
 
     def pop(self, _i=None):
@@ -231,24 +342,14 @@ class UnspacedList(list):
         self.spaced.__setitem__(self._spaced_position(i), spaced_item)
         if not spacey(item):
             list.__setitem__(self, i, item)
-        self.dirty = True
 
     def __delitem__(self, i):
         self.spaced.__delitem__(self._spaced_position(i))
         list.__delitem__(self, i)
-        self.dirty = True
 
     def __deepcopy__(self, memo):
         new_spaced = copy.deepcopy(self.spaced, memo=memo)
-        l = UnspacedList(new_spaced)
-        l.dirty = self.dirty
-        return l
-
-    def is_dirty(self):
-        """Recurse through the parse tree to figure out if any sublists are dirty"""
-        if self.dirty:
-            return True
-        return any((isinstance(x, UnspacedList) and x.is_dirty() for x in self))
+        return UnspacedList(new_spaced)
 
     def _spaced_position(self, idx):
         "Convert from indexes in the unspaced list to positions in the spaced one"
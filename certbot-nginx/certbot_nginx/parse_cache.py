@@ -0,0 +1,168 @@
+"""On-disk cache of parsed nginx configuration files."""
+import hashlib
+import json
+import logging
+import tempfile
+
+import six
+
+from certbot import errors
+from certbot import util
+from certbot.compat import filesystem
+from certbot.compat import os
+
+from certbot_nginx import nginxparser
+
+logger = logging.getLogger(__name__)
+
+# Changed whenever the parser may return different trees for a file
+_FORMAT_VERSION = 1
+
+
+class ParseCache(object):
+    """On-disk cache of parsed nginx configuration files.
+
+    The tree of each file is stored as JSON, which loads much faster than
+    the file is parsed, in a file named after the hash of its path. The
+    entry records the size, modification time and SHA-256 digest of the
+    file when it was parsed. A cached tree is only used if all of them
+    still match the file, so the file is read, but only parsed again if it
+    changed. Entries which cannot be read or don't match are ignored and
+    replaced, and those of files no longer loaded are removed by `prune`.
+
+    :ivar str directory: Directory where parsed trees are stored.
+
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, filename):
+        digest = hashlib.sha256(_encode(filename)).hexdigest()
+        return os.path.join(self.directory, digest + ".json")
+
+    def load(self, filename):
+        """Parse an nginx configuration file, using its cached tree if possible.
+
+        :param str filename: Path to the file
+
+        :returns: The parsed tree
+        :rtype: nginxparser.UnspacedList
+
+        :raises IOError: If the file cannot be read.
+        :raises pyparsing.ParseException: If the file cannot be parsed.
+
+        """
+        return nginxparser.UnspacedList(self.load_tree(filename))
+
+    def load_tree(self, filename):
+        """Parse an nginx configuration file, using its cached tree if possible.
+
+        :param str filename: Path to the file
+
+        :returns: The parsed tree, whitespace included, as returned by
+            `.nginxparser.StreamingNginxParser.as_list`
+        :rtype: list
+
+        :raises IOError: If the file cannot be read.
+        :raises pyparsing.ParseException: If the file cannot be parsed.
+
+        """
+        size = os.path.getsize(filename)
+        mtime = os.path.getmtime(filename)
+        with open(filename) as _file:
+            source = _file.read()
+        key = {
+            "version": _FORMAT_VERSION,
+            "path": filename,
+            "size": size,
+            "mtime": mtime,
+            "sha256": hashlib.sha256(_encode(source)).hexdigest(),
+        }
+
+        tree = self._get(key)
+        if tree is not None:
+            logger.debug("Using cached parse tree of %s", filename)
+            return tree
+
+        tree = nginxparser.StreamingNginxParser(source).as_list()
+        self._store(key, tree)
+        return tree
+
+    def _get(self, key):
+        """Find the tree cached for a file.
+
+        :param dict key: The path, size, modification time and digest of
+            the file, and the version of the cache format
+
+        :returns: The tree, or None if none is cached or it's stale or
+            invalid.
+        :rtype: list or None
+
+        """
+        path = self._path(key["path"])
+        try:
+            with open(path) as entry_file:
+                entry = json.load(entry_file)
+        except (IOError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            return None
+        tree = entry.get("tree")
+        if not isinstance(tree, list) or not _is_tree(tree):
+            logger.debug("Ignoring invalid cached parse tree %s", path)
+            return None
+        return tree
+
+    def _store(self, key, tree):
+        """Cache the tree of a file. Failing to cache it is not an error.
+
+        :param dict key: The key of the file, see `_get`
+        :param list tree: The parsed tree, whitespace included
+
+        """
+        temp_path = None
+        try:
+            util.make_or_verify_dir(self.directory, 0o700)
+            handle, temp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(handle, "w") as entry_file:
+                json.dump({"key": key, "tree": tree}, entry_file, separators=(",", ":"))
+            filesystem.replace(temp_path, self._path(key["path"]))
+        except (IOError, OSError, errors.Error) as error:
+            logger.debug("Could not cache the parse tree of %s in %s: %s",
+                         key["path"], self.directory, error)
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def prune(self, filenames):
+        """Remove the cached trees of files other than the given ones.
+
+        Failing to remove them is not an error.
+
+        :param filenames: Paths of the files whose trees are kept, such as
+            the files loaded by `.NginxParser.load`
+        :type filenames: `collections.Iterable` of `str`
+
+        """
+        keep = set(os.path.basename(self._path(filename)) for filename in filenames)
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(".json") and name not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError as error:
+                    logger.debug("Could not remove cached parse tree %s: %s", name, error)
+
+
+def _encode(source):
+    if isinstance(source, six.text_type):
+        return source.encode("utf-8")
+    return source
+
+
+def _is_tree(tree):
+    """Whether a list only contains strings and lists of the same kind."""
+    return all(isinstance(item, six.string_types) or
+               (isinstance(item, list) and _is_tree(item)) for item in tree)
@@ -1,19 +1,28 @@
 """NginxParser is a member object of the NginxConfigurator class."""
 import copy
+import errno
 import functools
 import glob
 import logging
+import multiprocessing
 import re
+import signal
+import stat
+import sys
+import tempfile
+import threading
 import pyparsing
 
 import six
 
 from certbot import errors
+from certbot.compat import filesystem
 from certbot.compat import os
 
 from certbot_nginx import obj
 from certbot_nginx import nginxparser
-from acme.magic_typing import Union, Dict, Set, Any, List, Tuple # pylint: disable=unused-import, no-name-in-module
+from certbot_nginx import parse_cache
+from acme.magic_typing import Union, Dict, Set, Any, List, Optional, Tuple # pylint: disable=unused-import, no-name-in-module
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +36,28 @@ class NginxParser(object):
 
     """
 
-    def __init__(self, root):
+    def __init__(self, root, cache_dir=None, workers=1):
+        """Initialize.
+
+        :param str root: Path to the server root directory.
+        :param str cache_dir: Directory where parsed trees are cached, see
+            `.parse_cache.ParseCache`. Files are always parsed if None.
+        :param int workers: Number of processes parsing files. If more than
+            1, the included files are found and parsed in a pool of
+            processes before being loaded, see `_parse_in_parallel`.
+
+        """
         self.parsed = {} # type: Dict[str, Union[List, nginxparser.UnspacedList]]
         self.root = os.path.abspath(root)
+        self._cache_dir = cache_dir
+        self._cache = parse_cache.ParseCache(cache_dir) if cache_dir else None
+        self._workers = workers
+        # Trees parsed by _parse_in_parallel, waiting to be loaded
+        self._prefetched = {} # type: Dict[str, List]
+        # Virtual hosts and their name index, built again once the trees change
+        self._vhosts = None # type: Optional[Tuple[List, ServerNameIndex]]
+        # Files whose trees were modified since they were loaded or written
+        self._dirty = set() # type: Set[str]
         self.config_root = self._find_config_root()
 
         # Parse nginx.conf and included files.
@@ -42,7 +70,75 @@ class NginxParser(object):
 
         """
         self.parsed = {}
-        self._parse_recursively(self.config_root)
+        self._dirty = set()
+        self._vhosts = None
+        included = []  # type: List[str]
+        if self._workers > 1:
+            # Forking from a thread other than the main one may deadlock the workers
+            if _in_main_thread():
+                included = self._find_included_files()
+                self._prefetched = self._parse_in_parallel(included)
+            else:
+                logger.debug("Parsing nginx configuration files sequentially outside of "
+                             "the main thread")
+        try:
+            self._parse_recursively(self.config_root)
+        finally:
+            self._prefetched = {}
+        if self._cache is not None:
+            # The trees of the files found by _find_included_files are cached too
+            self._cache.prune(set(self.parsed).union(included))
+
+    def _find_included_files(self):
+        """Finds the files that may be included in the configuration.
+
+        This is a quick scan for 'include' directives, without parsing
+        the files. It may find files that `_parse_recursively` doesn't
+        load, such as files included in 'location' blocks or in comments.
+
+        :returns: paths of nginx.conf and of the files it may include,
+            recursively, in the order they were found
+        :rtype: list
+
+        """
+        files = []  # type: List[str]
+        found = set()  # type: Set[str]
+        pending = [self.config_root]
+        while pending:
+            for item in glob.glob(self.abs_path(pending.pop(0))):
+                if item in found:
+                    continue
+                found.add(item)
+                files.append(item)
+                try:
+                    with open(item) as _file:
+                        # Only one of the quoted or unquoted groups matches
+                        pending.extend("".join(groups)
+                                       for groups in INCLUDE_REGEX.findall(_file.read()))
+                except (IOError, OSError, ValueError):
+                    # The error is reported when the file is loaded
+                    pass
+        return files
+
+    def _parse_in_parallel(self, files):
+        """Parses files in a pool of processes.
+
+        :param list files: paths of the files to parse
+        :returns: mapping of the paths of the files that could be parsed to
+            their trees, as returned by `_parse_tree`
+        :rtype: dict
+
+        """
+        logger.debug("Parsing %d nginx configuration files in %d processes",
+                     len(files), self._workers)
+        pool = multiprocessing.Pool(min(self._workers, len(files)) or 1,
+                                    initializer=_init_parse_worker)
+        try:
+            trees = pool.map(functools.partial(_parse_tree, self._cache_dir), files)
+        finally:
+            pool.terminate()
+            pool.join()
+        return dict((item, tree) for item, tree in zip(files, trees) if tree is not None)
 
     def _parse_recursively(self, filepath):
         """Parses nginx config files recursively by looking at 'include'
@@ -124,15 +220,41 @@ class NginxParser(object):
         return servers
 
     def get_vhosts(self):
-        # pylint: disable=cell-var-from-loop
         """Gets list of all 'virtual hosts' found in Nginx configuration.
         Technically this is a misnomer because Nginx does not have virtual
         hosts, it has 'server blocks'.
 
+        The virtual hosts are only built again after the parsed trees
+        were modified, see `mark_dirty`, or loaded again.
+
         :returns: List of :class:`~certbot_nginx.obj.VirtualHost`
             objects found in configuration
         :rtype: list
 
+        """
+        return list(self._get_vhosts_and_index()[0])
+
+    def get_name_index(self):
+        """Gets the index of the server names of the virtual hosts.
+
+        :returns: Index of the virtual hosts returned by `get_vhosts`
+        :rtype: ServerNameIndex
+
+        """
+        return self._get_vhosts_and_index()[1]
+
+    def _get_vhosts_and_index(self):
+        # Reset by load and mark_dirty
+        if self._vhosts is None:
+            vhosts = self._build_vhosts()
+            self._vhosts = (vhosts, ServerNameIndex(vhosts))
+        return self._vhosts
+
+    def _build_vhosts(self):
+        """Builds the virtual hosts from the parsed trees.
+
+        :rtype: list
+
         """
         enabled = True  # We only look at enabled vhosts for now
         servers = self._get_raw_servers()
@@ -203,11 +325,16 @@ class NginxParser(object):
             if item in self.parsed and not override:
                 continue
             try:
-                with open(item) as _file:
-                    parsed = nginxparser.load(_file)
-                    self.parsed[item] = parsed
-                    trees.append(parsed)
-            except IOError:
+                if item in self._prefetched:
+                    parsed = nginxparser.UnspacedList(self._prefetched.pop(item))
+                elif self._cache is not None:
+                    parsed = self._cache.load(item)
+                else:
+                    with open(item) as _file:
+                        parsed = nginxparser.load(_file)
+                self.parsed[item] = parsed
+                trees.append(parsed)
+            except (IOError, OSError):
                 logger.warning("Could not open file: %s", item)
             except pyparsing.ParseException as err:
                 logger.debug("Could not parse file: %s due to %s", item, err)
@@ -224,29 +351,49 @@ class NginxParser(object):
         raise errors.NoInstallationError(
             "Could not find Nginx root configuration file (nginx.conf)")
 
+    def mark_dirty(self, filename):
+        """Records that the tree of a parsed file was modified.
+
+        The methods of this class modifying trees call it. Code modifying
+        `parsed` directly must call it too, or `filedump` won't write the
+        file and `get_vhosts` will keep returning the virtual hosts built
+        before the change.
+
+        :param str filename: Path of the modified file, a key of `parsed`
+
+        """
+        self._dirty.add(filename)
+        self._vhosts = None
+
     def filedump(self, ext='tmp', lazy=True):
         """Dumps parsed configurations into files.
 
+        Each file is written to a temporary file in the same directory,
+        which then replaces it, so that it is never left half-written.
+
         :param str ext: The file extension to use for the dumped files. If
             empty, this overrides the existing conf files.
-        :param bool lazy: Only write files that have been modified
+        :param bool lazy: Only write files that have been modified, see
+            `mark_dirty`
 
         """
-        # Best-effort atomicity is enforced above us by reverter.py
-        for filename in self.parsed:
-            tree = self.parsed[filename]
-            if ext:
-                filename = filename + os.path.extsep + ext
+        # Best-effort atomicity across files is enforced above us by reverter.py
+        filenames = sorted(self._dirty) if lazy else list(self.parsed)
+        for filename in filenames:
+            tree = self.parsed.get(filename)
+            if tree is None:
+                self._dirty.discard(filename)
+                continue
+            dump_filename = filename + os.path.extsep + ext if ext else filename
             try:
-                if lazy and not tree.is_dirty():
-                    continue
                 out = nginxparser.dumps(tree)
-                logger.debug('Writing nginx conf tree to %s:\n%s', filename, out)
-                with open(filename, 'w') as _file:
-                    _file.write(out)
-
-            except IOError:
-                logger.error("Could not open file for writing: %s", filename)
+                logger.debug('Writing nginx conf tree to %s:\n%s', dump_filename, out)
+                _write_atomically(dump_filename, out)
+            except (IOError, OSError):
+                logger.error("Could not open file for writing: %s", dump_filename)
+            else:
+                if not ext:
+                    self._dirty.discard(filename)
 
     def parse_server(self, server):
         """Parses a list of server directives, accounting for global address sslishness.
@@ -349,6 +496,7 @@ class NginxParser(object):
             if not isinstance(result, list) or len(result) != 2:
                 raise errors.MisconfigurationError("Not a server block.")
             result = result[1]
+            self.mark_dirty(filename)
             block_func(result)
 
             self._update_vhost_based_on_new_directives(vhost, result)
@@ -388,6 +536,7 @@ class NginxParser(object):
             self._update_vhost_based_on_new_directives(new_vhost, new_directives)
 
         enclosing_block.append(raw_in_parsed)
+        self.mark_dirty(vhost_template.filep)
         new_vhost.path[-1] = len(enclosing_block) - 1
         if remove_singleton_listen_params:
             for addr in new_vhost.addrs:
@@ -485,6 +634,135 @@ def get_best_match(target_name, names):
     return (None, None)
 
 
+class ServerNameIndex(object):
+    """Finds the best matching server name of each virtual host for a domain.
+
+    Results are identical to calling `get_best_match` with the names of
+    each virtual host, but the cost of a lookup depends on the number of
+    matching names and of regular expressions rather than on the total
+    number of names: exact names are kept in a dict, wildcard names in
+    tries of their labels, and regular expressions are compiled once.
+
+    The names of the virtual hosts must not change while they are indexed.
+
+    """
+    def __init__(self, vhosts):
+        """Initialize.
+
+        :param list vhosts: :class:`~certbot_nginx.obj.VirtualHost` objects
+            to index
+
+        """
+        self._vhosts = list(vhosts)
+        self._indexed = set(id(vhost) for vhost in self._vhosts)
+        # Names are stored as (vhost position, position in vhost.names, name)
+        self._exact = {} # type: Dict[str, List[Tuple[int, int, str]]]
+        self._match_all = [] # type: List[Tuple[int, int, str]]
+        self._wildcard_start = _LabelTrie()
+        self._wildcard_end = _LabelTrie()
+        self._regexes = [] # type: List[Tuple[int, int, str, Any]]
+        for vhost_pos, vhost in enumerate(self._vhosts):
+            for name_pos, name in enumerate(vhost.names):
+                entry = (vhost_pos, name_pos, name)
+                self._exact.setdefault(name, []).append(entry)
+                if name == '*':
+                    self._match_all.append(entry)
+                    continue
+                labels = name.split('.')
+                # *.eff.org matches names ending with the labels eff, org
+                if labels[0] in ('*', ''):
+                    self._wildcard_start.add(reversed(labels[1:] or ['']), entry)
+                # www.eff.* matches names starting with the labels www, eff
+                if labels[-1] in ('*', ''):
+                    self._wildcard_end.add(labels[:-1] or [''], entry)
+                if len(name) >= 2 and name[0] == '~':
+                    try:
+                        self._regexes.append(entry + (re.compile(name[1:]),))
+                    except re.error:  # pragma: no cover
+                        # perl-compatible regexes are sometimes not recognized by python
+                        pass
+
+    def indexes(self, vhost):
+        """Is this virtual host indexed?
+
+        :param vhost: The virtual host
+        :type vhost: :class:`~certbot_nginx.obj.VirtualHost`
+        :rtype: bool
+
+        """
+        return id(vhost) in self._indexed
+
+    def best_matches(self, target_name):
+        """Finds the best match for target_name of each indexed virtual host.
+
+        :param str target_name: The name to match
+        :returns: Tuples of a virtual host, the type of match and the name
+            that matched, see `get_best_match`, for the virtual hosts with a
+            matching name, in the order they were indexed
+        :rtype: list
+
+        """
+        # Maps vhost positions to (match type, key, name), lower is better
+        best = {} # type: Dict[int, Tuple[int, Tuple[int, int], str]]
+
+        def _offer(entries, match_type, longest):
+            for vhost_pos, name_pos, name in entries:
+                candidate = (match_type,
+                             (-len(name) if longest else len(name), name_pos), name)
+                if vhost_pos not in best or candidate < best[vhost_pos]:
+                    best[vhost_pos] = candidate
+
+        # There can be more than one exact match; e.g. eff.org, .eff.org
+        _offer(self._exact.get(target_name, []), 0, False)
+        _offer(self._exact.get('.' + target_name, []), 0, False)
+        labels = target_name.split('.')
+        _offer(self._match_all, 1, True)
+        _offer(self._wildcard_start.find(list(reversed(labels))), 1, True)
+        _offer(self._wildcard_end.find(labels), 2, True)
+        for vhost_pos, name_pos, name, regex in self._regexes:
+            # The first matching regex of each vhost
+            if vhost_pos not in best and regex.match(target_name):
+                best[vhost_pos] = (3, (name_pos, 0), name)
+
+        return [(self._vhosts[vhost_pos], _MATCH_TYPES[best[vhost_pos][0]], best[vhost_pos][2])
+                for vhost_pos in sorted(best)]
+
+
+_MATCH_TYPES = ['exact', 'wildcard_start', 'wildcard_end', 'regex']
+
+
+class _LabelTrie(object):
+    """Trie of domain name labels."""
+
+    def __init__(self):
+        self._root = ({}, []) # type: Tuple[Dict[str, Any], List[Any]]
+
+    def add(self, labels, value):
+        """Adds a value for a sequence of labels."""
+        node = self._root
+        for label in labels:
+            node = node[0].setdefault(label, ({}, []))
+        node[1].append(value)
+
+    def find(self, labels):
+        """Finds the values of the proper prefixes of a sequence of labels.
+
+        :param list labels: The labels
+        :returns: The values added for the sequences of labels starting
+            ``labels`` and shorter than it
+        :rtype: list
+
+        """
+        values = [] # type: List[Any]
+        node = self._root
+        for label in labels[:-1]:
+            node = node[0].get(label)
+            if node is None:
+                break
+            values.extend(node[1])
+        return values
+
+
 def _exact_match(target_name, name):
     return target_name == name or '.' + target_name == name
 
@@ -528,6 +806,107 @@ def _regex_match(target_name, name):
         return False
 
 
+def _parse_tree(cache_dir, filename):
+    """Parses a file in a worker process of `NginxParser._parse_in_parallel`.
+
+    :param str cache_dir: Directory where parsed trees are cached, or None
+    :param str filename: path of the file to parse
+
+    :returns: the parsed tree, whitespace included, or None if the file
+        cannot be read or parsed. `NginxParser` then reports the error
+        when it loads the file again.
+    :rtype: list or None
+
+    """
+    try:
+        if cache_dir:
+            return parse_cache.ParseCache(cache_dir).load_tree(filename)
+        with open(filename) as _file:
+            return nginxparser.StreamingNginxParser(_file.read()).as_list()
+    except (IOError, OSError, ValueError, pyparsing.ParseException):
+        return None
+
+
+def _write_atomically(filename, content):
+    """Writes a file through a temporary file replacing it once synced.
+
+    Symbolic links are followed, so that the file they point to is
+    written, as in sites-enabled directories linking to sites-available.
+    The temporary file is hidden, so that nginx includes matching the
+    directory don't pick it up. An existing file keeps its mode, and its
+    owner and group where permitted, see `_copy_ownership_and_mode`.
+
+    :param str filename: Path of the file
+    :param str content: New content of the file
+
+    :raises IOError: If the file cannot be written.
+    :raises OSError: If the file cannot be written.
+
+    """
+    try:
+        filename = filesystem.realpath(filename)
+    except RuntimeError as error:
+        raise OSError(str(error))
+    directory, basename = os.path.split(filename)
+    handle, temp_path = tempfile.mkstemp(prefix='.' + basename + '.', dir=directory)
+    try:
+        with os.fdopen(handle, 'w') as temp_file:
+            temp_file.write(content)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        if os.path.exists(filename):
+            _copy_ownership_and_mode(filename, temp_path)
+        else:
+            filesystem.chmod(temp_path, 0o644)
+        filesystem.replace(temp_path, filename)
+    finally:
+        # Only left if the file could not be replaced
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _copy_ownership_and_mode(src, dst):
+    """Gives a file the owner, group and mode of another one, where permitted.
+
+    Only root may give a file to another user, so the owner is only
+    copied if it is not the user running Certbot. Failing to copy the
+    owner or group is logged: the mode is still applied.
+
+    :param str src: Path of the file whose owner, group and mode are copied
+    :param str dst: Path of the file to change
+
+    :raises OSError: If the file cannot be changed.
+
+    """
+    mode = stat.S_IMODE(os.lstat(src).st_mode)
+    try:
+        filesystem.copy_ownership_and_apply_mode(
+            src, dst, mode, copy_user=not filesystem.check_owner(src), copy_group=True)
+    except OSError as error:
+        if error.errno != errno.EPERM:
+            raise
+        logger.warning("Could not keep the owner and group of %s: %s", src, error)
+        filesystem.chmod(dst, mode)
+
+
+def _in_main_thread():
+    if sys.version_info[0] < 3:
+        # threading.main_thread only exists on Python 3
+        # pylint: disable=protected-access,no-member
+        return isinstance(threading.current_thread(), threading._MainThread)  # type: ignore
+    return threading.current_thread() is threading.main_thread()
+
+
+def _init_parse_worker():
+    """Let `NginxParser._parse_in_parallel` stop the worker processes.
+
+    Workers inherit the signal handlers of the main process, which must
+    not run in them.
+
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
 def _is_include_directive(entry):
     """Checks if an nginx parsed entry is an 'include' directive.
 
@@ -571,6 +950,8 @@ INCLUDE = 'include'
 REPEATABLE_DIRECTIVES = set(['server_name', 'listen', INCLUDE, 'rewrite', 'add_header'])
 COMMENT = ' managed by Certbot'
 COMMENT_BLOCK = [' ', '#', COMMENT]
+INCLUDE_REGEX = re.compile(r"""(?:^|[;{}])\s*include\s+"""
+                           r"""(?:"([^"]*)"|'([^']*)'|([^\s;{}"']+))\s*;""", re.MULTILINE)
 
 def comment_directive(block, location):
     """Add a ``#managed by Certbot`` comment to the end of the line at location.
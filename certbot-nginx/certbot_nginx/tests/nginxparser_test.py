@@ -1,18 +1,25 @@
 """Test for certbot_nginx.nginxparser."""
 import copy
 import operator
+import random
 import tempfile
 import unittest
 
 from pyparsing import ParseException
 
+from certbot.compat import os
+
 from certbot_nginx.nginxparser import (
-    RawNginxParser, loads, load, dumps, dump, UnspacedList)
+    RawNginxParser, StreamingNginxParser, loads, load, dumps, dump, UnspacedList)
 from certbot_nginx.tests import util
 
 
 FIRST = operator.itemgetter(0)
 
+ROUNDTRIP_TESTDATA = os.path.join(
+    os.path.dirname(__file__), os.pardir, os.pardir, os.pardir,
+    "certbot-compatibility-test", "nginx", "nginx-roundtrip-testdata")
+
 
 class TestRawNginxParser(unittest.TestCase):
     """Test the raw low-level Nginx config parser."""
@@ -348,6 +355,48 @@ class TestRawNginxParser(unittest.TestCase):
         self.assertRaises(ParseException, loads, "blag${dfgdf{g};")
 
 
+class TestStreamingNginxParser(unittest.TestCase):
+    """Compare the streaming parser with the pyparsing grammar."""
+
+    def _assert_same(self, source):
+        try:
+            expected = RawNginxParser(source).as_list()
+        except ParseException:
+            self.assertRaises(ParseException, StreamingNginxParser(source).as_list)
+        else:
+            self.assertEqual(StreamingNginxParser(source).as_list(), expected, source)
+
+    def _assert_same_files(self, directory):
+        count = 0
+        for where, _, files in os.walk(directory):
+            for name in files:
+                with open(os.path.join(where, name)) as handle:
+                    self._assert_same(handle.read())
+                count += 1
+        self.assertTrue(count > 0)
+
+    def test_testdata(self):
+        self._assert_same_files(os.path.dirname(util.get_data_filename("nginx.conf")))
+
+    @unittest.skipUnless(os.path.isdir(ROUNDTRIP_TESTDATA), "roundtrip testdata not available")
+    def test_roundtrip_testdata(self):
+        self._assert_same_files(ROUNDTRIP_TESTDATA)
+
+    def test_edge_cases(self):
+        for source in ["", " \n", "a;", " a b ;\n", "a {}", "a{b;}\n", "a { b { c; } }",
+                       "}", "a {", "a { b; } }", "#", "a; # b\r\n", "a #b;", "a\fb;",
+                       "'a')b c;", "\"a\\\"\n\";", "${a}{b;", "a {\n  # b }\n}\n",
+                       "a ;\n\n", "a b\n {\n\tc 'd;' \"e{\";\n}"]:
+            self._assert_same(source)
+
+    def test_random(self):
+        rnd = random.Random(0)
+        alphabet = " \t\n\r\f{};#\"'\\$()ab"
+        for _ in range(2000):
+            self._assert_same("".join(
+                rnd.choice(alphabet) for _ in range(rnd.randint(0, 20))))
+
+
 class TestUnspacedList(unittest.TestCase):
     """Test the UnspacedList data structure"""
     def setUp(self):
@@ -424,17 +473,6 @@ class TestUnspacedList(unittest.TestCase):
         del ul3[2]
         self.assertEqual(ul3, ["some", "things", "why", "did", "whether"])
 
-    def test_is_dirty(self):
-        self.assertEqual(False, self.ul2.is_dirty())
-        ul3 = UnspacedList([])
-        ul3.append(self.ul)
-        self.assertEqual(False, self.ul.is_dirty())
-        self.assertEqual(True, ul3.is_dirty())
-        ul4 = UnspacedList([[1], [2, 3, 4]])
-        self.assertEqual(False, ul4.is_dirty())
-        ul4[1][2] = 5
-        self.assertEqual(True, ul4.is_dirty())
-
 
 if __name__ == '__main__':
     unittest.main()  # pragma: no cover
@@ -0,0 +1,142 @@
+"""Tests for certbot_nginx.parse_cache."""
+import json
+import shutil
+import tempfile
+import unittest
+
+import mock
+from pyparsing import ParseException
+
+from certbot.compat import filesystem
+from certbot.compat import os
+
+from certbot_nginx import nginxparser
+from certbot_nginx.parse_cache import ParseCache
+
+SOURCE = "server {\n    listen 80;\n    server_name example.com;\n}\n"
+
+
+class ParseCacheTest(unittest.TestCase):
+    """Tests for certbot_nginx.parse_cache.ParseCache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp_dir, "cache")
+        self.cache = ParseCache(self.directory)
+        self.filename = os.path.join(self.temp_dir, "nginx.conf")
+        self._write(SOURCE)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, source, mtime=1000):
+        with open(self.filename, "w") as conf_file:
+            conf_file.write(source)
+        os.utime(self.filename, (mtime, mtime))
+
+    def _entry_path(self):
+        return self.cache._path(self.filename)  # pylint: disable=protected-access
+
+    def _load(self):
+        with mock.patch("certbot_nginx.parse_cache.nginxparser.StreamingNginxParser",
+                        side_effect=nginxparser.StreamingNginxParser) as mock_parser:
+            parsed = self.cache.load(self.filename)
+        return parsed, mock_parser.called
+
+    def test_cached(self):
+        parsed, parsed_again = self._load()
+        self.assertTrue(parsed_again)
+        self.assertTrue(filesystem.check_mode(self.directory, 0o700))
+
+        cached, parsed_again = self._load()
+        self.assertFalse(parsed_again)
+        self.assertTrue(isinstance(cached, nginxparser.UnspacedList))
+        self.assertEqual(cached, parsed)
+        self.assertEqual(cached.spaced, parsed.spaced)
+        self.assertEqual(nginxparser.dumps(cached), SOURCE)
+
+    def test_changed_content(self):
+        self._load()
+        # Same size and modification time
+        self._write(SOURCE.replace("80", "81"))
+
+        parsed, parsed_again = self._load()
+        self.assertTrue(parsed_again)
+        self.assertEqual(parsed[0][1][0], ["listen", "81"])
+        self.assertFalse(self._load()[1])
+
+    def test_changed_mtime(self):
+        self._load()
+        self._write(SOURCE, mtime=2000)
+
+        self.assertTrue(self._load()[1])
+
+    def test_other_version(self):
+        self._load()
+        with mock.patch("certbot_nginx.parse_cache._FORMAT_VERSION", 2):
+            self.assertTrue(self._load()[1])
+
+    def test_corrupt_entry(self):
+        self._load()
+        with open(self._entry_path(), "w") as entry_file:
+            entry_file.write('{"key": ')
+
+        parsed, parsed_again = self._load()
+        self.assertTrue(parsed_again)
+        self.assertEqual(nginxparser.dumps(parsed), SOURCE)
+        self.assertFalse(self._load()[1])
+
+    def test_invalid_tree(self):
+        self._load()
+        with open(self._entry_path()) as entry_file:
+            entry = json.load(entry_file)
+        for tree in ({"server": 80}, [["listen", 80]]):
+            entry["tree"] = tree
+            with open(self._entry_path(), "w") as entry_file:
+                json.dump(entry, entry_file)
+
+            self.assertTrue(self._load()[1])
+
+    def test_parse_error(self):
+        self._write("server {")
+
+        self.assertRaises(ParseException, self.cache.load, self.filename)
+        self.assertFalse(os.path.exists(self._entry_path()))
+
+    def test_missing_file(self):
+        os.remove(self.filename)
+
+        self.assertRaises((IOError, OSError), self.cache.load, self.filename)
+
+    @mock.patch("certbot_nginx.parse_cache.filesystem.replace")
+    def test_store_failure(self, mock_replace):
+        mock_replace.side_effect = OSError
+
+        self.assertEqual(nginxparser.dumps(self.cache.load(self.filename)), SOURCE)
+        self.assertFalse(os.path.exists(self._entry_path()))
+        # The temporary file is removed
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_prune(self):
+        self._load()
+        other = os.path.join(self.temp_dir, "other.conf")
+        with open(other, "w") as conf_file:
+            conf_file.write(SOURCE)
+        self.cache.load(other)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+        self.cache.prune([self.filename])
+        self.assertEqual(os.listdir(self.directory),
+                         [os.path.basename(self._entry_path())])
+        self.assertFalse(self._load()[1])
+
+    def test_prune_failure(self):
+        ParseCache(os.path.join(self.temp_dir, "missing")).prune([])
+        self._load()
+        with mock.patch("certbot_nginx.parse_cache.os.remove", side_effect=OSError):
+            self.cache.prune([])
+        self.assertTrue(os.path.exists(self._entry_path()))
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
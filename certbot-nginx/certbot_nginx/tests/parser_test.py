@@ -1,13 +1,19 @@
 """Tests for certbot_nginx.parser."""
+import errno
 import glob
 import re
 import shutil
+import threading
 import unittest
 
+import mock
+
 from acme.magic_typing import List  # pylint: disable=unused-import, no-name-in-module
 
 from certbot import errors
+from certbot.compat import filesystem
 from certbot.compat import os
+from certbot.tests import util as test_util
 
 from certbot_nginx import nginxparser
 from certbot_nginx import obj
@@ -71,6 +77,99 @@ class NginxParserTest(util.NginxTest): #pylint: disable=too-many-public-methods
                          nparser.parsed[nparser.abs_path(
                              'sites-enabled/example.com')])
 
+    def test_load_cached(self):
+        cache_dir = os.path.join(self.work_dir, 'nginx-parse-cache')
+        expected = parser.NginxParser(self.config_path).parsed
+
+        calls = []
+        for _ in range(2):
+            with mock.patch('certbot_nginx.parse_cache.nginxparser.StreamingNginxParser',
+                            side_effect=nginxparser.StreamingNginxParser) as mock_parser:
+                nparser = parser.NginxParser(self.config_path, cache_dir)
+            calls.append(mock_parser.call_count)
+            self.assertEqual(nparser.parsed, expected)
+        # Only the files which cannot be parsed are parsed again
+        self.assertEqual(calls[1], calls[0] - len(expected))
+        self.assertEqual([nginxparser.dumps(tree) for tree in nparser.parsed.values()],
+                         [nginxparser.dumps(tree) for tree in expected.values()])
+
+    def test_load_prunes_cache(self):
+        cache_dir = os.path.join(self.work_dir, 'nginx-parse-cache')
+        nparser = parser.NginxParser(self.config_path, cache_dir)
+        entries = len(os.listdir(cache_dir))
+        os.remove(nparser.abs_path('sites-enabled/example.com'))
+
+        nparser.load()
+        self.assertEqual(len(os.listdir(cache_dir)), entries - 1)
+
+    def test_load_parallel(self):
+        # pylint: disable=protected-access
+        expected = parser.NginxParser(self.config_path).parsed
+
+        for cache_dir in (None, os.path.join(self.work_dir, 'nginx-parse-cache')):
+            nparser = parser.NginxParser(self.config_path, cache_dir, workers=2)
+            self.assertEqual(list(nparser.parsed), list(expected))
+            self.assertEqual(nparser.parsed, expected)
+            self.assertEqual(nparser._prefetched, {})
+
+    @mock.patch('certbot_nginx.parser.multiprocessing.Pool')
+    def test_load_parallel_failures(self, mock_pool):
+        mock_pool().map.side_effect = lambda func, files: [
+            None if item.endswith('server.conf') else func(item) for item in files]
+        expected = parser.NginxParser(self.config_path).parsed
+
+        nparser = parser.NginxParser(self.config_path, workers=4)
+
+        # Files which could not be parsed in a worker are parsed again
+        self.assertEqual(nparser.parsed, expected)
+        self.assertTrue(mock_pool().terminate.called)
+
+    @mock.patch('certbot_nginx.parser.multiprocessing.Pool')
+    def test_load_parallel_outside_main_thread(self, mock_pool):
+        expected = parser.NginxParser(self.config_path).parsed
+        results = []  # type: List[parser.NginxParser]
+        thread = threading.Thread(target=lambda: results.append(
+            parser.NginxParser(self.config_path, workers=4)))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(results[0].parsed, expected)
+        self.assertFalse(mock_pool.called)
+
+    def test_find_included_files(self):
+        # pylint: disable=protected-access
+        nparser = parser.NginxParser(self.config_path)
+        files = nparser._find_included_files()
+        self.assertEqual(files[0], nparser.config_root)
+        self.assertTrue(set(nparser.parsed).issubset(files))
+        self.assertEqual(len(files), len(set(files)))
+
+    def test_find_included_files_quoted(self):
+        # pylint: disable=protected-access
+        with open(os.path.join(self.config_path, 'nginx.conf'), 'a') as _file:
+            _file.write('include "quoted.conf";\ninclude \'single quoted.conf\';\n')
+        for name in ('quoted.conf', 'single quoted.conf'):
+            with open(os.path.join(self.config_path, name), 'w') as _file:
+                _file.write('\n')
+        files = parser.NginxParser(self.config_path)._find_included_files()
+        self.assertTrue(os.path.join(self.config_path, 'quoted.conf') in files)
+        self.assertTrue(os.path.join(self.config_path, 'single quoted.conf') in files)
+
+    def test_parse_tree(self):
+        # pylint: disable=protected-access
+        path = os.path.join(self.config_path, 'server.conf')
+        with open(path) as _file:
+            expected = nginxparser.load(_file).spaced
+        self.assertEqual(parser._parse_tree(None, path), expected)
+        cache_dir = os.path.join(self.work_dir, 'nginx-parse-cache')
+        self.assertEqual(parser._parse_tree(cache_dir, path), expected)
+        self.assertTrue(os.listdir(cache_dir))
+
+        self.assertEqual(parser._parse_tree(None, os.path.join(self.config_path, 'missing')),
+                         None)
+        self.assertEqual(parser._parse_tree(None, os.path.join(self.config_path, 'broken.conf')),
+                         None)
+
     def test_abs_path(self):
         nparser = parser.NginxParser(self.config_path)
         if os.name != 'nt':
@@ -98,6 +197,95 @@ class NginxParserTest(util.NginxTest): #pylint: disable=too-many-public-methods
                                         ['server_name', 'example.*']]]],
                          parsed[0])
 
+    def test_filedump_dirty_files(self):
+        nparser = parser.NginxParser(self.config_path)
+        nparser.filedump('test')
+        self.assertEqual([], glob.glob(nparser.abs_path('*.test')))
+
+        example_com = nparser.abs_path('sites-enabled/example.com')
+        vhost = [x for x in nparser.get_vhosts() if x.filep == example_com][0]
+        nparser.add_server_directives(vhost, [['listen', '8080']])
+        nparser.filedump('test')
+        self.assertEqual([example_com + '.test'],
+                         glob.glob(nparser.abs_path('sites-enabled/*.test')))
+        self.assertEqual([], glob.glob(nparser.abs_path('*.test')))
+
+        with mock.patch('certbot_nginx.parser._write_atomically') as mock_write:
+            # Files are dirty until they are written in place
+            nparser.filedump('test')
+            self.assertEqual([example_com + '.test'],
+                             [args[0] for args, _ in mock_write.call_args_list])
+            nparser.filedump(ext='')
+            nparser.filedump(ext='')
+            self.assertEqual(2, mock_write.call_count)
+
+    def test_filedump_write_failure(self):
+        nparser = parser.NginxParser(self.config_path)
+        example_com = nparser.abs_path('sites-enabled/example.com')
+        vhost = [x for x in nparser.get_vhosts() if x.filep == example_com][0]
+        nparser.add_server_directives(vhost, [['listen', '8080']])
+        with open(example_com) as original_file:
+            original = original_file.read()
+
+        with mock.patch('certbot_nginx.parser.filesystem.replace') as mock_replace:
+            mock_replace.side_effect = OSError
+            nparser.filedump(ext='')
+        with open(example_com) as dumped_file:
+            self.assertEqual(original, dumped_file.read())
+        # The temporary file is removed
+        self.assertEqual([], [name for name in os.listdir(os.path.dirname(example_com))
+                              if name.startswith('.')])
+
+        # The file is still dirty
+        nparser.filedump(ext='')
+        with open(example_com) as dumped_file:
+            self.assertTrue('8080' in dumped_file.read())
+
+    def test_filedump_keeps_mode(self):
+        nparser = parser.NginxParser(self.config_path)
+        filesystem.chmod(nparser.config_root, 0o640)
+        with mock.patch('certbot_nginx.parser.filesystem.copy_ownership_and_apply_mode',
+                        side_effect=filesystem.copy_ownership_and_apply_mode) as mock_copy:
+            nparser.filedump(ext='', lazy=False)
+        self.assertTrue(filesystem.check_mode(nparser.config_root, 0o640))
+        # The files belong to the user running the tests, who can't chown them
+        self.assertTrue(mock.call(nparser.config_root, mock.ANY, 0o640, copy_user=False,
+                                  copy_group=True) in mock_copy.call_args_list)
+
+    def test_filedump_ownership_not_permitted(self):
+        nparser = parser.NginxParser(self.config_path)
+        filesystem.chmod(nparser.config_root, 0o640)
+        with mock.patch('certbot_nginx.parser.filesystem.copy_ownership_and_apply_mode',
+                        side_effect=OSError(errno.EPERM, 'Operation not permitted')):
+            with mock.patch('certbot_nginx.parser.logger') as mock_logger:
+                nparser.filedump(ext='', lazy=False)
+        self.assertTrue(mock_logger.warning.called)
+        self.assertTrue(filesystem.check_mode(nparser.config_root, 0o640))
+
+        with mock.patch('certbot_nginx.parser.filesystem.copy_ownership_and_apply_mode',
+                        side_effect=OSError(errno.EIO, 'Input/output error')):
+            with mock.patch('certbot_nginx.parser.logger') as mock_logger:
+                nparser.filedump(ext='', lazy=False)
+        mock_logger.error.assert_called_with('Could not open file for writing: %s', mock.ANY)
+
+    @test_util.skip_on_windows('Symbolic links need privileges on Windows')
+    def test_filedump_symlink(self):
+        available = os.path.join(self.config_path, 'sites-available', 'example.com')
+        enabled = os.path.join(self.config_path, 'sites-enabled', 'example.com')
+        filesystem.mkdir(os.path.dirname(available))
+        shutil.move(enabled, available)
+        os.symlink(os.path.join(os.pardir, 'sites-available', 'example.com'), enabled)
+
+        nparser = parser.NginxParser(self.config_path)
+        vhost = [x for x in nparser.get_vhosts() if x.filep == enabled][0]
+        nparser.add_server_directives(vhost, [['listen', '8080']])
+        nparser.filedump(ext='')
+
+        self.assertTrue(os.path.islink(enabled))
+        with open(available) as dumped_file:
+            self.assertTrue('8080' in dumped_file.read())
+        self.assertEqual(['example.com'], os.listdir(os.path.dirname(available)))
+
     def test__do_for_subarray(self):
         # pylint: disable=protected-access
         mylists = [([[2], [3], [2]], [[0], [2]]),
@@ -361,6 +549,64 @@ class NginxParserTest(util.NginxTest): #pylint: disable=too-many-public-methods
             self.assertEqual(winner,
                              parser.get_best_match(target_name, names[i]))
 
+    def test_server_name_index(self):
+        names = [set(['www.eff.org', 'irrelevant.long.name.eff.org', '*.org']),
+                 set(['eff.org', 'ww2.eff.org', 'test.www.eff.org']),
+                 set(['*.eff.org', '.www.eff.org']),
+                 set(['.eff.org', '*.org']),
+                 set(['www.eff.', 'www.eff.*', '*.www.eff.org']),
+                 set(['example.com', r'~^(www\.)?(eff.+)', '*.eff.*']),
+                 set(['*', r'~^(www\.)?(eff.+)']),
+                 set(['www.*', r'~^(www\.)?(eff.+)', '.test.eff.org']),
+                 set(['*.org', r'*.eff.org', 'www.eff.*']),
+                 set(['*.www.eff.org', 'www.*']),
+                 set(['*.org']),
+                 set([]),
+                 set(['example.com']),
+                 set(['', '.', '*.', '.*', '*.*', r'~^eff\.*', 'eff.org.']),
+                 set(['*.eff.org', '..eff.org', '~.*', '~['])]
+        vhosts = [obj.VirtualHost('file', [], False, True, vhost_names, [], [])
+                  for vhost_names in names]
+        index = parser.ServerNameIndex(vhosts)
+
+        for target_name in ['www.eff.org', 'eff.org', 'test.www.eff.org', 'www.eff.org.uk',
+                            'example.com', 'org', '', '.', '.eff.org', 'eff.org.', '*',
+                            'www.example.com', 'a.b.c.www.eff.org', 'www.eff']:
+            expected = []
+            for vhost in vhosts:
+                name_type, name = parser.get_best_match(target_name, vhost.names)
+                if name_type is not None:
+                    expected.append((vhost, name_type, name))
+            self.assertEqual(index.best_matches(target_name), expected)
+
+        self.assertTrue(index.indexes(vhosts[0]))
+        self.assertFalse(index.indexes(obj.VirtualHost('file', [], False, True, set(), [], [])))
+
+    def test_get_vhosts_cached(self):
+        nparser = parser.NginxParser(self.config_path)
+        vhosts = nparser.get_vhosts()
+        index = nparser.get_name_index()
+
+        self.assertEqual(nparser.get_vhosts(), vhosts)
+        self.assertTrue(all(a is b for a, b in zip(nparser.get_vhosts(), vhosts)))
+        self.assertTrue(nparser.get_name_index() is index)
+        self.assertTrue(all(index.indexes(vhost) for vhost in vhosts))
+        # Reading the trees through modified copies keeps the virtual hosts
+        nparser.parse_server(vhosts[0].raw)
+        self.assertTrue(nparser.get_name_index() is index)
+
+        example = [x for x in vhosts if 'example.com' in x.filep][0]
+        nparser.add_server_directives(example, [['server_name', 'added.example.com']])
+        self.assertFalse(nparser.get_name_index() is index)
+        self.assertEqual(nparser.get_name_index().best_matches('added.example.com'),
+                         [(vhost, 'exact', 'added.example.com')
+                          for vhost in nparser.get_vhosts() if vhost.filep == example.filep])
+
+        index = nparser.get_name_index()
+        nparser.load()
+        self.assertFalse(nparser.get_name_index() is index)
+        self.assertEqual(nparser.get_vhosts(), parser.NginxParser(self.config_path).get_vhosts())
+
     def test_comment_directive(self):
         # pylint: disable=protected-access
         block = nginxparser.UnspacedList([
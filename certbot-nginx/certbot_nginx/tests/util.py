@@ -67,6 +67,7 @@ def get_nginx_configurator(
             config = configurator.NginxConfigurator(
                 config=mock.MagicMock(
                     nginx_server_root=config_path,
+                    nginx_parse_workers=1,
                     le_vhost_ext="-le-ssl.conf",
                     config_dir=config_dir,
                     work_dir=work_dir,
@@ -1,7 +1,8 @@
 """ACME AuthHandler."""
+import datetime
 import logging
 import time
-import datetime
+from multiprocessing.pool import ThreadPool
 
 import zope.component
 
@@ -17,6 +18,9 @@ from certbot import interfaces
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of authorizations polled at the same time
+_MAX_CONCURRENT_POLLS = 10
+
 
 class AuthHandler(object):
     """ACME Authorization Handler for a client.
@@ -100,51 +104,59 @@ class AuthHandler(object):
     def _poll_authorizations(self, authzrs, max_retries, best_effort):
         """
         Poll the ACME CA server, to wait for confirmation that authorizations have their challenges
-        all verified. The poll may occur several times, until all authorizations are checked
-        (valid or invalid), or after a maximum of retries.
+        all verified. Each authorization is polled on its own schedule, as given by the Retry-After
+        header of its last poll, until it is checked (valid or invalid), or after a maximum of
+        retries. Authorizations that are due at the same time are polled concurrently.
         """
-        authzrs_to_check = {index: (authzr, None)
-                            for index, authzr in enumerate(authzrs)}
-        authzrs_failed_to_report = []
         # Give an initial second to the ACME CA server to check the authorizations
-        sleep_seconds = 1
-        for _ in range(max_retries):
-            # Wait for appropriate time (from Retry-After, initial wait, or no wait)
-            if sleep_seconds > 0:
-                time.sleep(sleep_seconds)
-            # Poll all updated authorizations.
-            authzrs_to_check = {index: self.acme.poll(authzr) for index, (authzr, _)
-                                in authzrs_to_check.items()}
-            # Update the original list of authzr with the updated authzrs from server.
-            for index, (authzr, _) in authzrs_to_check.items():
-                authzrs[index] = authzr
-
-            # Gather failed authorizations
-            authzrs_failed = [authzr for authzr, _ in authzrs_to_check.values()
-                              if authzr.body.status == messages.STATUS_INVALID]
-            for authzr_failed in authzrs_failed:
-                logger.warning('Challenge failed for domain %s',
-                               authzr_failed.body.identifier.value)
-            # Accumulating all failed authzrs to build a consolidated report
-            # on them at the end of the polling.
-            authzrs_failed_to_report.extend(authzrs_failed)
-
-            # Extract out the authorization already checked for next poll iteration.
-            # Poll may stop here because there is no pending authorizations anymore.
-            authzrs_to_check = {index: (authzr, resp) for index, (authzr, resp)
-                                in authzrs_to_check.items()
-                                if authzr.body.status == messages.STATUS_PENDING}
-            if not authzrs_to_check:
-                # Polling process is finished, we can leave the loop
-                break
-
-            # Be merciful with the ACME server CA, check the Retry-After header returned,
-            # and wait this time before polling again in next loop iteration.
-            # From all the pending authorizations, we take the greatest Retry-After value
-            # to avoid polling an authorization before its relevant Retry-After value.
-            retry_after = max(self.acme.retry_after(resp, 3)
-                              for _, resp in authzrs_to_check.values())
-            sleep_seconds = (retry_after - datetime.datetime.now()).total_seconds()
+        first_poll = datetime.datetime.now() + datetime.timedelta(seconds=1)
+        next_polls = {index: first_poll for index in range(len(authzrs))
+                      if max_retries > 0}  # type: Dict[int, datetime.datetime]
+        retries_left = {index: max_retries for index in next_polls}
+        authzrs_failed_to_report = []
+        authzrs_not_finalized = [] if max_retries > 0 else authzrs[:]
+        pool = None
+        try:
+            while next_polls:
+                # Wait until the next authorization is due for polling.
+                next_poll = min(next_polls.values())
+                sleep_seconds = (next_poll - datetime.datetime.now()).total_seconds()
+                if sleep_seconds > 0:
+                    time.sleep(sleep_seconds)
+                now = max(datetime.datetime.now(), next_poll)
+                due = sorted(index for index, when in next_polls.items() if when <= now)
+
+                # Poll all due authorizations, in parallel if there are several of them.
+                if len(due) > 1:
+                    if pool is None:
+                        pool = ThreadPool(min(len(next_polls), _MAX_CONCURRENT_POLLS))
+                    results = pool.map(lambda index: self.acme.poll(authzrs[index]), due)
+                else:
+                    results = [self.acme.poll(authzrs[due[0]])]
+
+                for index, (authzr, resp) in zip(due, results):
+                    # Update the original list of authzr with the updated authzr from server.
+                    authzrs[index] = authzr
+                    retries_left[index] -= 1
+                    if authzr.body.status == messages.STATUS_PENDING:
+                        if retries_left[index] > 0:
+                            # Be merciful with the ACME server CA, and do not poll this
+                            # authorization again before its Retry-After value.
+                            next_polls[index] = self.acme.retry_after(resp, 3)
+                            continue
+                        authzrs_not_finalized.append(authzr)
+                    elif authzr.body.status == messages.STATUS_INVALID:
+                        logger.warning('Challenge failed for domain %s',
+                                       authzr.body.identifier.value)
+                        # Accumulating all failed authzrs to build a consolidated report
+                        # on them at the end of the polling.
+                        authzrs_failed_to_report.append(authzr)
+                    # This authorization is checked, or will not be polled anymore.
+                    del next_polls[index]
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         # In case of failed authzrs, create a report to the user.
         if authzrs_failed_to_report:
@@ -153,8 +165,8 @@ class AuthHandler(object):
                 # Without best effort, having failed authzrs is critical and fail the process.
                 raise errors.AuthorizationError('Some challenges have failed.')
 
-        if authzrs_to_check:
-            # Here authzrs_to_check is still not empty, meaning we exceeded the max polling attempt.
+        if authzrs_not_finalized:
+            # Some authorizations are still pending, we exceeded the max polling attempts.
             raise errors.AuthorizationError('All authorizations were not finalized by the CA.')
 
     def _choose_challenges(self, authzrs):
@@ -2,6 +2,7 @@
 import datetime
 import logging
 import re
+import time
 import traceback
 
 import pytz
@@ -9,9 +10,9 @@ import zope.component
 
 from acme.magic_typing import List  # pylint: disable=unused-import, no-name-in-module
 
-from certbot import crypto_util
 from certbot import errors
 from certbot import interfaces
+from certbot import lineage_index
 from certbot import ocsp
 from certbot import storage
 from certbot import util
@@ -20,6 +21,9 @@ from certbot.display import util as display_util
 
 logger = logging.getLogger(__name__)
 
+_OCSP_DEADLINE = 60
+"""Seconds after which `certificates` stops waiting for OCSP responses."""
+
 ###################
 # Commands
 ###################
@@ -74,16 +78,18 @@ def certificates(config):
     """
     parsed_certs = []
     parse_failures = []
+    index = lineage_index.LineageIndex(config)
     for renewal_file in storage.renewal_conf_files(config):
         try:
-            renewal_candidate = storage.RenewableCert(renewal_file, config)
-            crypto_util.verify_renewable_cert(renewal_candidate)
+            renewal_candidate = index.metadata(renewal_file, verify=True)
+            renewal_candidate.verify()
             parsed_certs.append(renewal_candidate)
         except Exception as e:  # pylint: disable=broad-except
             logger.warning("Renewal configuration file %s produced an "
                            "unexpected error: %s. Skipping.", renewal_file, e)
             logger.debug("Traceback was:\n%s", traceback.format_exc())
             parse_failures.append(renewal_file)
+    index.save()
 
     # Describe all the certs
     _describe_certs(config, parsed_certs, parse_failures)
@@ -146,7 +152,7 @@ def find_duplicative_certs(config, domains):
 
     """
     def update_certs_for_domain_matches(candidate_lineage, rv):
-        """Return cert as identical_names_cert if it matches,
+        """Return cert metadata as identical_names_cert if it matches,
            or subset_names_cert if it matches as subset
         """
         # TODO: Handle these differently depending on whether they are
@@ -164,7 +170,11 @@ def find_duplicative_certs(config, domains):
                 subset_names_cert = candidate_lineage
         return (identical_names_cert, subset_names_cert)
 
-    return _search_lineages(config, update_certs_for_domain_matches, (None, None))
+    # Names are matched using the lineage index, and only the matching
+    # lineages are loaded.
+    matches = _search_lineage_index(config, update_certs_for_domain_matches, (None, None))
+    return tuple(None if metadata is None else lineage_for_certname(config, metadata.lineagename)
+                 for metadata in matches)
 
 def _archive_files(candidate_lineage, filetype):
     """ In order to match things like:
@@ -246,10 +256,14 @@ def match_and_check_overlaps(cli_config, acceptable_matches, match_func, rv_func
     else:
         return matched
 
-def human_readable_cert_info(config, cert, skip_filter_checks=False):
-    """ Returns a human readable description of info about a RenewableCert object"""
+def human_readable_cert_info(config, cert, skip_filter_checks=False, revoked=None):
+    """ Returns a human readable description of info about a RenewableCert object
+
+    :param bool revoked: Whether the certificate was revoked, checked
+        with OCSP if None
+
+    """
     certinfo = []
-    checker = ocsp.RevocationChecker()
 
     if config.certname and cert.lineagename != config.certname and not skip_filter_checks:
         return ""
@@ -262,7 +276,10 @@ def human_readable_cert_info(config, cert, skip_filter_checks=False):
         reasons.append('TEST_CERT')
     if cert.target_expiry <= now:
         reasons.append('EXPIRED')
-    if checker.ocsp_revoked(cert.cert, cert.chain):
+    if revoked is None:
+        checker = ocsp.RevocationChecker(cache_dir=config.ocsp_cache_dir)
+        revoked = checker.ocsp_revoked(cert.cert, cert.chain)
+    if revoked:
         reasons.append('REVOKED')
 
     if reasons:
@@ -334,10 +351,15 @@ def _report_lines(msgs):
 
 def _report_human_readable(config, parsed_certs):
     """Format a results report for a parsed cert"""
-    certinfo = []
-    for cert in parsed_certs:
-        certinfo.append(human_readable_cert_info(config, cert))
-    return "\n".join(certinfo)
+    listed = [cert for cert in parsed_certs
+              if (not config.certname or cert.lineagename == config.certname) and
+              (not config.domains or set(config.domains).issubset(cert.names()))]
+    # OCSP responders are queried concurrently, with a single checker
+    checker = ocsp.RevocationChecker(cache_dir=config.ocsp_cache_dir)
+    revoked = checker.ocsp_revoked_bulk([(cert.cert, cert.chain) for cert in listed],
+                                        deadline=time.time() + _OCSP_DEADLINE)
+    return "\n".join(human_readable_cert_info(config, cert, revoked=revoked[cert.cert])
+                     for cert in listed)
 
 def _describe_certs(config, parsed_certs, parse_failures):
     """Print information about the certs we know about"""
@@ -370,6 +392,39 @@ def _search_lineages(cli_config, func, initial_rv, *args):
     :param function func: function used while searching over lineages
     :param initial_rv: initial return value of the function (any type)
 
+    :returns: Whatever was specified by `func` if a match is found.
+    """
+    return _search_renewal_files(
+        cli_config, lambda renewal_file: storage.RenewableCert(renewal_file, cli_config),
+        func, initial_rv, *args)
+
+def _search_lineage_index(cli_config, func, initial_rv, *args):
+    """Iterate func over the metadata of unbroken lineages.
+
+    Like `_search_lineages`, but `func` is called with the
+    `.lineage_index.LineageMetadata` of each lineage, which is read from
+    the lineage index when the lineage did not change.
+
+    :param `configuration.NamespaceConfig` cli_config: parsed command line arguments
+    :param function func: function used while searching over lineages
+    :param initial_rv: initial return value of the function (any type)
+
+    :returns: Whatever was specified by `func` if a match is found.
+    """
+    index = lineage_index.LineageIndex(cli_config)
+    rv = _search_renewal_files(cli_config, index.metadata, func, initial_rv, *args)
+    index.save()
+    return rv
+
+def _search_renewal_files(cli_config, load, func, initial_rv, *args):
+    """Iterate func over what load returns for each unbroken renewal conf file.
+
+    :param `configuration.NamespaceConfig` cli_config: parsed command line arguments
+    :param function load: called with the path of a renewal conf file,
+        returns what `func` is called with for its lineage
+    :param function func: function used while searching over lineages
+    :param initial_rv: initial return value of the function (any type)
+
     :returns: Whatever was specified by `func` if a match is found.
     """
     configs_dir = cli_config.renewal_configs_dir
@@ -379,7 +434,7 @@ def _search_lineages(cli_config, func, initial_rv, *args):
     rv = initial_rv
     for renewal_file in storage.renewal_conf_files(cli_config):
         try:
-            candidate_lineage = storage.RenewableCert(renewal_file, cli_config)
+            candidate_lineage = load(renewal_file)
         except (errors.CertStorageError, IOError):
             logger.debug("Renewal conf file %s is broken. Skipping.", renewal_file)
             logger.debug("Traceback was:\n%s", traceback.format_exc())
@@ -848,7 +848,7 @@ class HelpfulArgumentParser(object):
         for name, plugin_ep in six.iteritems(plugins):
             parser_or_group = self.add_group(name,
                                              description=plugin_ep.long_description)
-            plugin_ep.plugin_cls.inject_parser_options(parser_or_group, name)
+            plugin_ep.inject_parser_options(parser_or_group, name)
 
     def determine_help_topics(self, chosen_topic):
         """
@@ -1139,6 +1139,15 @@ def prepare_and_parse_args(plugins, args, detect_defaults=False):  # pylint: dis
     helpful.add(
         "security", "--rsa-key-size", type=int, metavar="N",
         default=flag_default("rsa_key_size"), help=config_help("rsa_key_size"))
+    helpful.add(
+        "security", "--key-type", choices=["rsa", "ecdsa"],
+        default=flag_default("key_type"), help=config_help("key_type"))
+    helpful.add(
+        "security", "--elliptic-curve", choices=list(constants.ELLIPTIC_CURVES),
+        default=flag_default("elliptic_curve"), help=config_help("elliptic_curve"))
+    helpful.add(
+        "security", "--key-pool-size", type=nonnegative_int, metavar="N",
+        default=flag_default("key_pool_size"), help=config_help("key_pool_size"))
     helpful.add(
         "security", "--must-staple", action="store_true",
         dest="must_staple", default=flag_default("must_staple"),
@@ -1254,6 +1263,21 @@ def prepare_and_parse_args(plugins, args, detect_defaults=False):  # pylint: dis
         " when the user executes \"certbot renew\", regardless of if the certificate"
         " is renewed. This setting does not apply to important TLS configuration"
         " updates.")
+    helpful.add(
+        "renew", "--renew-concurrency", type=positive_int, metavar="N",
+        default=flag_default("renew_concurrency"),
+        help="Number of certificate lineages to process at the same time"
+        " when running \"certbot renew\". Lineages sharing an installer, or"
+        " an authenticator which doesn't declare itself thread safe (such as"
+        " the DNS plugins supporting it), are still renewed one at a time,"
+        " and hooks are never run concurrently. (default: 1)")
+    helpful.add(
+        "renew", "--max-renewals-per-run", type=nonnegative_int, metavar="N",
+        default=flag_default("max_renewals_per_run"),
+        help="Maximum number of certificates to renew in a single run of"
+        " \"certbot renew\". The certificates closest to their expiry are"
+        " renewed first, and the others are left for the next runs."
+        " (default: no limit)")
     helpful.add(
         "renew", "--no-autorenew", action="store_false",
         default=flag_default("autorenew"), dest="autorenew",
@@ -1629,3 +1653,23 @@ def nonnegative_int(value):
     if int_value < 0:
         raise argparse.ArgumentTypeError("value must be non-negative")
     return int_value
+
+
+def positive_int(value):
+    """Converts value to an int and checks that it is at least 1.
+
+    This function should used as the type parameter for argparse
+    arguments.
+
+    :param str value: value provided on the command line
+
+    :returns: integer representation of value
+    :rtype: int
+
+    :raises argparse.ArgumentTypeError: if value isn't a positive integer
+
+    """
+    int_value = nonnegative_int(value)
+    if int_value < 1:
+        raise argparse.ArgumentTypeError("value must be at least 1")
+    return int_value
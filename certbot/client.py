@@ -7,6 +7,7 @@ import OpenSSL
 import josepy as jose
 import zope.component
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec
 # https://github.com/python/typeshed/blob/master/third_party/
 # 2/cryptography/hazmat/primitives/asymmetric/rsa.pyi
 from cryptography.hazmat.primitives.asymmetric.rsa import generate_private_key  # type: ignore
@@ -14,6 +15,7 @@ from cryptography.hazmat.primitives.asymmetric.rsa import generate_private_key
 from acme import client as acme_client
 from acme import crypto_util as acme_crypto_util
 from acme import errors as acme_errors
+from acme import jws
 from acme import messages
 from acme.magic_typing import Optional  # pylint: disable=unused-import,no-name-in-module
 
@@ -27,6 +29,7 @@ from certbot import eff
 from certbot import error_handler
 from certbot import errors
 from certbot import interfaces
+from certbot import key_pool
 from certbot import reverter
 from certbot import storage
 from certbot import util
@@ -40,8 +43,8 @@ logger = logging.getLogger(__name__)
 
 def acme_from_config_key(config, key, regr=None):
     "Wrangle ACME client construction"
-    # TODO: Allow for other alg types besides RS256
-    net = acme_client.ClientNetwork(key, account=regr, verify_ssl=(not config.no_verify_ssl),
+    net = acme_client.ClientNetwork(key, alg=jws.signature_algorithm(key), account=regr,
+                                    verify_ssl=(not config.no_verify_ssl),
                                     user_agent=determine_user_agent(config))
     return acme_client.BackwardsCompatibleClientV2(net, key, config.server)
 
@@ -168,11 +171,16 @@ def register(config, account_storage, tos_cb=None):
         config.email = None
 
     # Each new registration shall use a fresh new key
-    rsa_key = generate_private_key(
-            public_exponent=65537,
-            key_size=config.rsa_key_size,
-            backend=default_backend())
-    key = jose.JWKRSA(key=jose.ComparableRSAKey(rsa_key))
+    if config.key_type == "ecdsa":
+        ec_key = ec.generate_private_key(
+            getattr(ec, config.elliptic_curve.upper())(), default_backend())
+        key = jws.JWKEC(key=ec_key)  # type: jose.JWK
+    else:
+        rsa_key = generate_private_key(
+                public_exponent=65537,
+                key_size=config.rsa_key_size,
+                backend=default_backend())
+        key = jose.JWKRSA(key=jose.ComparableRSAKey(rsa_key))
     acme = acme_from_config_key(config, key)
     # TODO: add phone?
     regr = perform_registration(acme, config, tos_cb)
@@ -297,12 +305,17 @@ class Client(object):
         cert, chain = crypto_util.cert_and_chain_from_fullchain(orderr.fullchain_pem)
         return cert.encode(), chain.encode()
 
-    def obtain_certificate(self, domains, old_keypath=None):
+    def obtain_certificate(self, domains, old_keypath=None, prepared_key=None):
         """Obtains a certificate from the ACME server.
 
         `.register` must be called before `.obtain_certificate`
 
         :param list domains: domains to get a certificate
+        :param str old_keypath: path to an existing private key to reuse
+        :param tuple prepared_key: key and CSR for ``domains`` in PEM
+            format, generated in advance with
+            `.crypto_util.make_key_and_csr`, used instead of generating
+            them if no key is reused
 
         :returns: certificate as PEM string, chain as PEM string,
             newly generated private key (`.util.Key`), and DER-encoded
@@ -334,15 +347,29 @@ class Client(object):
             key = None
 
         # Create CSR from names
-        if self.config.dry_run:
+        if key is None and prepared_key is not None:
+            key_pem, csr_pem = prepared_key
+            if self.config.dry_run:
+                key = util.Key(file=None, pem=key_pem)
+                csr = util.CSR(file=None, form="pem", data=csr_pem)
+            else:
+                key = crypto_util.save_key(key_pem, self.config.key_dir)
+                csr = crypto_util.save_csr(csr_pem, self.config.csr_dir)
+            logger.debug("Using the key and CSR prepared for %s.", ", ".join(domains))
+        elif self.config.dry_run:
             key = key or util.Key(file=None,
-                                  pem=crypto_util.make_key(self.config.rsa_key_size))
+                                  pem=crypto_util.make_key(self.config.rsa_key_size,
+                                                           self.config.key_type,
+                                                           self.config.elliptic_curve))
             csr = util.CSR(file=None, form="pem",
                            data=acme_crypto_util.make_csr(
                                key.pem, domains, self.config.must_staple))
         else:
             key = key or crypto_util.init_save_key(self.config.rsa_key_size,
-                                                   self.config.key_dir)
+                                                   self.config.key_dir,
+                                                   key_pool=key_pool.get_pool(self.config),
+                                                   key_type=self.config.key_type,
+                                                   elliptic_curve=self.config.elliptic_curve)
             csr = crypto_util.init_save_csr(key, domains, self.config.csr_dir)
 
         orderr = self._get_order_and_authorizations(csr.data, self.config.allow_subset_of_names)
@@ -26,6 +26,8 @@ class NamespaceConfig(object):
       - `csr_dir`
       - `in_progress_dir`
       - `key_dir`
+      - `key_pool_dir`
+      - `ocsp_cache_dir`
       - `temp_checkpoint_dir`
 
     And the following paths are dynamically resolved using
@@ -90,6 +92,14 @@ class NamespaceConfig(object):
     def key_dir(self):  # pylint: disable=missing-docstring
         return os.path.join(self.namespace.config_dir, constants.KEY_DIR)
 
+    @property
+    def key_pool_dir(self):  # pylint: disable=missing-docstring
+        return os.path.join(self.namespace.config_dir, constants.KEY_POOL_DIR)
+
+    @property
+    def ocsp_cache_dir(self):  # pylint: disable=missing-docstring
+        return os.path.join(self.namespace.work_dir, constants.OCSP_CACHE_DIR)
+
     @property
     def temp_checkpoint_dir(self):  # pylint: disable=missing-docstring
         return os.path.join(
@@ -58,6 +58,9 @@ CLI_DEFAULTS = dict(
     https_port=443,
     break_my_certs=False,
     rsa_key_size=2048,
+    key_type="rsa",
+    elliptic_curve="secp256r1",
+    key_pool_size=0,
     must_staple=False,
     redirect=None,
     auto_hsts=False,
@@ -71,6 +74,8 @@ CLI_DEFAULTS = dict(
     reuse_key=False,
     disable_renew_updates=False,
     random_sleep_on_renew=True,
+    renew_concurrency=1,
+    max_renewals_per_run=None,
     eab_hmac_key=None,
     eab_kid=None,
 
@@ -189,9 +194,19 @@ IN_PROGRESS_DIR = "IN_PROGRESS"
 KEY_DIR = "keys"
 """Directory (relative to `IConfig.config_dir`) where keys are saved."""
 
+ELLIPTIC_CURVES = ("secp256r1", "secp384r1")
+"""Elliptic curves of ECDSA keys, named as in `cryptography`."""
+
+KEY_POOL_DIR = "key-pool"
+"""Directory (relative to `IConfig.config_dir`) where pre-generated keys
+are kept."""
+
 LIVE_DIR = "live"
 """Live directory, relative to `IConfig.config_dir`."""
 
+OCSP_CACHE_DIR = "ocsp"
+"""Directory (relative to `IConfig.work_dir`) where OCSP responses are cached."""
+
 TEMP_CHECKPOINT_DIR = "temp_checkpoint"
 """Temporary checkpoint directory (relative to `IConfig.work_dir`)."""
 
@@ -210,6 +225,22 @@ RENEWAL_DEPLOY_HOOKS_DIR = "deploy"
 RENEWAL_POST_HOOKS_DIR = "post"
 """Basename of directory containing post-hooks to run with the renew command."""
 
+LINEAGE_INDEX_FILENAME = "lineage-index.json"
+"""Lineage metadata index file, relative to `IConfig.config_dir`."""
+
+PLUGIN_MANIFEST_FILENAME = "plugin-manifest.json"
+"""Plugin manifest file, relative to `IConfig.work_dir`."""
+
+DNS_ZONE_CACHE_FILENAME = "dns-zone-cache.json"
+"""Zones found by DNS plugins, relative to `IConfig.work_dir`."""
+
+OCSP_STATUS_DIR = "status"
+"""Saved OCSP status of certificates, relative to `IConfig.ocsp_cache_dir`."""
+
+OCSP_STATUS_RETRY_DELAY = 86400
+"""Seconds during which a revoked OCSP status is saved when the OCSP
+response has no nextUpdate."""
+
 FORCE_INTERACTIVE_FLAG = "--force-interactive"
 """Flag to disable TTY checking in IDisplay."""
 
@@ -4,12 +4,14 @@
     is capable of handling the signatures.
 
 """
+import binascii
+from collections import OrderedDict
 import hashlib
 import logging
+import threading
 import warnings
 
-import pyrfc3339
-import six
+import pytz
 import zope.component
 from OpenSSL import SSL  # type: ignore
 from OpenSSL import crypto
@@ -17,27 +19,36 @@ from OpenSSL import crypto
 from cryptography import x509  # type: ignore
 from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes  # type: ignore
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives.asymmetric.ec import ECDSA
 from cryptography.hazmat.primitives.asymmetric.ec import EllipticCurvePublicKey
 from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
 
 from acme import crypto_util as acme_crypto_util
-from acme.magic_typing import IO  # pylint: disable=unused-import, no-name-in-module
+# pylint: disable=unused-import, no-name-in-module
+from acme.magic_typing import Dict, IO, Tuple
+# pylint: enable=unused-import, no-name-in-module
 
+from certbot import constants
 from certbot import errors
 from certbot import interfaces
 from certbot import util
+from certbot.compat import filesystem
 from certbot.compat import os
 
 logger = logging.getLogger(__name__)
 
 
 # High level functions
-def init_save_key(key_size, key_dir, keyname="key-certbot.pem"):
+def init_save_key(key_size, key_dir, keyname="key-certbot.pem", key_pool=None,
+                  key_type="rsa", elliptic_curve=None):
     """Initializes and saves a privkey.
 
-    Inits key and saves it in PEM format on the filesystem.
+    Inits key and saves it in PEM format on the filesystem. The key is
+    taken from ``key_pool`` if it is not empty.
 
     .. note:: keyname is the attempted filename, it may be different if a file
         already exists at the path.
@@ -45,28 +56,56 @@ def init_save_key(key_size, key_dir, keyname="key-certbot.pem"):
     :param int key_size: RSA key size in bits
     :param str key_dir: Key save directory.
     :param str keyname: Filename of key
+    :param .KeyPool key_pool: Pool of pre-generated keys to use, if any.
+    :param str key_type: "rsa" or "ecdsa"
+    :param str elliptic_curve: Curve of ECDSA keys, see `make_key`.
 
     :returns: Key
     :rtype: :class:`certbot.util.Key`
 
-    :raises ValueError: If unable to generate the key given key_size.
+    :raises ValueError: If unable to generate the key given key_size,
+        key_type and elliptic_curve.
 
     """
-    try:
-        key_pem = make_key(key_size)
-    except ValueError as err:
-        logger.error("", exc_info=True)
-        raise err
+    key_pem = None
+    if key_pool is not None:
+        key_pem = key_pool.take(key_size, key_type, elliptic_curve)
+    if key_pem is None:
+        try:
+            key_pem = make_key(key_size, key_type, elliptic_curve)
+        except ValueError as err:
+            logger.error("", exc_info=True)
+            raise err
+
+    key = save_key(key_pem, key_dir, keyname)
+    if key_type == "ecdsa":
+        logger.debug("Generating key (%s): %s", elliptic_curve, key.file)
+    else:
+        logger.debug("Generating key (%d bits): %s", key_size, key.file)
+    return key
+
+
+def save_key(key_pem, key_dir, keyname="key-certbot.pem"):
+    # type: (bytes, str, str) -> util.Key
+    """Saves a privkey in PEM format on the filesystem.
 
+    .. note:: keyname is the attempted filename, it may be different if a file
+        already exists at the path.
+
+    :param bytes key_pem: Key in PEM format.
+    :param str key_dir: Key save directory.
+    :param str keyname: Filename of key
+
+    :returns: Key
+    :rtype: :class:`certbot.util.Key`
+
+    """
     config = zope.component.getUtility(interfaces.IConfig)
-    # Save file
     util.make_or_verify_dir(key_dir, 0o700, config.strict_permissions)
     key_f, key_path = util.unique_file(
         os.path.join(key_dir, keyname), 0o600, "wb")
     with key_f:
         key_f.write(key_pem)
-    logger.debug("Generating key (%d bits): %s", key_size, key_path)
-
     return util.Key(key_path, key_pem)
 
 
@@ -89,17 +128,53 @@ def init_save_csr(privkey, names, path):
     csr_pem = acme_crypto_util.make_csr(
         privkey.pem, names, must_staple=config.must_staple)
 
-    # Save CSR
+    csr = save_csr(csr_pem, path)
+    logger.debug("Creating CSR: %s", csr.file)
+    return csr
+
+
+def save_csr(csr_pem, path):
+    """Saves a CSR in PEM format on the filesystem.
+
+    :param bytes csr_pem: CSR in PEM format.
+    :param str path: Certificate save directory.
+
+    :returns: CSR
+    :rtype: :class:`certbot.util.CSR`
+
+    """
+    config = zope.component.getUtility(interfaces.IConfig)
     util.make_or_verify_dir(path, 0o755, config.strict_permissions)
     csr_f, csr_filename = util.unique_file(
         os.path.join(path, "csr-certbot.pem"), 0o644, "wb")
     with csr_f:
         csr_f.write(csr_pem)
-    logger.debug("Creating CSR: %s", csr_filename)
-
     return util.CSR(csr_filename, csr_pem, "pem")
 
 
+def make_key_and_csr(key_size, key_type, elliptic_curve, names, must_staple, key_pem=None):
+    """Generate a key and a CSR for it, without saving them.
+
+    This is used to prepare the keys of lineages in worker processes
+    before they are renewed.
+
+    :param int key_size: RSA key size in bits
+    :param str key_type: "rsa" or "ecdsa"
+    :param str elliptic_curve: Curve of ECDSA keys, see `make_key`.
+    :param list names: `str` names to include in the CSR
+    :param bool must_staple: Whether the CSR requests OCSP Must Staple.
+    :param bytes key_pem: Key in PEM format to use instead of
+        generating one, such as a key from a `.KeyPool`.
+
+    :returns: Key and CSR in PEM format.
+    :rtype: `tuple` of `bytes`
+
+    """
+    if key_pem is None:
+        key_pem = make_key(key_size, key_type, elliptic_curve)
+    return key_pem, acme_crypto_util.make_csr(key_pem, names, must_staple=must_staple)
+
+
 # WARNING: the csr and private key file are possible attack vectors for TOCTOU
 # We should either...
 # A. Do more checks to verify that the CSR is trusted/valid
@@ -174,15 +249,32 @@ def import_csr_file(csrfile, data):
     return PEM, util.CSR(file=csrfile, data=data_pem, form="pem"), domains
 
 
-def make_key(bits):
-    """Generate PEM encoded RSA key.
+def make_key(bits, key_type="rsa", elliptic_curve=None):
+    """Generate PEM encoded RSA or ECDSA key.
 
-    :param int bits: Number of bits, at least 1024.
+    :param int bits: Number of bits of RSA keys, at least 1024.
+    :param str key_type: "rsa" or "ecdsa"
+    :param str elliptic_curve: Curve of ECDSA keys, one of
+        `.constants.ELLIPTIC_CURVES`. Defaults to the first one.
 
-    :returns: new RSA key in PEM form with specified number of bits
+    :returns: new key in PEM form
     :rtype: str
 
+    :raises ValueError: If the key type or curve is not supported.
+
     """
+    if key_type == "ecdsa":
+        elliptic_curve = elliptic_curve or constants.ELLIPTIC_CURVES[0]
+        if elliptic_curve not in constants.ELLIPTIC_CURVES:
+            raise ValueError("Unsupported elliptic curve: {0}".format(elliptic_curve))
+        ec_key = ec.generate_private_key(
+            getattr(ec, elliptic_curve.upper())(), default_backend())
+        return ec_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption())
+    if key_type != "rsa":
+        raise ValueError("Unsupported key type: {0}".format(key_type))
     assert bits >= 1024  # XXX
     key = crypto.PKey()
     key.generate_key(crypto.TYPE_RSA, bits)
@@ -190,7 +282,7 @@ def make_key(bits):
 
 
 def valid_privkey(privkey):
-    """Is valid RSA private key?
+    """Is valid RSA or ECDSA private key?
 
     :param str privkey: Private key file contents in PEM
 
@@ -199,10 +291,18 @@ def valid_privkey(privkey):
 
     """
     try:
-        return crypto.load_privatekey(
-            crypto.FILETYPE_PEM, privkey).check()
+        key = crypto.load_privatekey(crypto.FILETYPE_PEM, privkey)
+        if key.type() == crypto.TYPE_RSA:
+            return key.check()
     except (TypeError, crypto.Error):
         return False
+    # PKey.check only supports RSA keys, loading other keys with
+    # cryptography checks that they are consistent
+    try:
+        return isinstance(serialization.load_pem_private_key(
+            privkey, password=None, backend=default_backend()), ec.EllipticCurvePrivateKey)
+    except (TypeError, ValueError):
+        return False
 
 
 def verify_renewable_cert(renewable_cert):
@@ -230,10 +330,8 @@ def verify_renewable_cert_sig(renewable_cert):
     :raises errors.Error: If signature verification fails.
     """
     try:
-        with open(renewable_cert.chain, 'rb') as chain_file:  # type: IO[bytes]
-            chain = x509.load_pem_x509_certificate(chain_file.read(), default_backend())
-        with open(renewable_cert.cert, 'rb') as cert_file:  # type: IO[bytes]
-            cert = x509.load_pem_x509_certificate(cert_file.read(), default_backend())
+        chain = load_parsed_cert(renewable_cert.chain).cert
+        cert = load_parsed_cert(renewable_cert.cert).cert
         pk = chain.public_key()
         with warnings.catch_warnings():
             verify_signed_payload(pk, cert.signature, cert.tbs_certificate_bytes,
@@ -306,11 +404,9 @@ def verify_fullchain(renewable_cert):
     :raises errors.Error: If cert and chain do not combine to fullchain.
     """
     try:
-        with open(renewable_cert.chain) as chain_file:  # type: IO[str]
-            chain = chain_file.read()
-        with open(renewable_cert.cert) as cert_file:  # type: IO[str]
-            cert = cert_file.read()
-        with open(renewable_cert.fullchain) as fullchain_file:  # type: IO[str]
+        chain = load_parsed_cert(renewable_cert.chain).pem
+        cert = load_parsed_cert(renewable_cert.cert).pem
+        with open(renewable_cert.fullchain, 'rb') as fullchain_file:  # type: IO[bytes]
             fullchain = fullchain_file.read()
         if (cert + chain) != fullchain:
             error_str = "fullchain does not match cert + chain for {0}!"
@@ -417,7 +513,7 @@ def notBefore(cert_path):
     :rtype: :class:`datetime.datetime`
 
     """
-    return _notAfterBefore(cert_path, crypto.X509.get_notBefore)
+    return load_parsed_cert(cert_path).not_before
 
 
 def notAfter(cert_path):
@@ -429,35 +525,177 @@ def notAfter(cert_path):
     :rtype: :class:`datetime.datetime`
 
     """
-    return _notAfterBefore(cert_path, crypto.X509.get_notAfter)
+    return load_parsed_cert(cert_path).not_after
+
+
+def _memoized_property(func):
+    """Property computed on first access, then stored in the instance."""
+    attribute = "_memoized_" + func.__name__
+
+    def _get(self):
+        if not hasattr(self, attribute):
+            setattr(self, attribute, func(self))
+        return getattr(self, attribute)
+    return property(_get, doc=func.__doc__)
+
+
+class ParsedCertificate(object):
+    """Certificate parsed once, with lazily computed properties.
+
+    Use `load_parsed_cert` to get the certificate stored in a file.
+
+    :ivar bytes pem: Content of the file the certificate was read from.
+        Certificates after the first one, such as those of a chain,
+        are ignored by the other attributes.
+
+    """
+    def __init__(self, pem):
+        self.pem = pem
+
+    @_memoized_property
+    def cert(self):
+        """The certificate.
+
+        :rtype: `cryptography.x509.Certificate`
+        :raises ValueError: if the certificate can't be parsed
+
+        """
+        return x509.load_pem_x509_certificate(self.pem, default_backend())
+
+    @_memoized_property
+    def _pyopenssl_cert(self):
+        # Names are read with pyOpenSSL, like get_names_from_cert does
+        return crypto.load_certificate(crypto.FILETYPE_PEM, self.pem)
+
+    @_memoized_property
+    def names(self):
+        """Domain names of the certificate, see `get_names_from_cert`.
+
+        :rtype: `list` of `str`
+
+        """
+        return _get_names_from_loaded_cert_or_req(self._pyopenssl_cert)
+
+    @_memoized_property
+    def sans(self):
+        """Subject Alternative Names, see `get_sans_from_cert`.
+
+        :rtype: `list` of `str`
+
+        """
+        # pylint: disable=protected-access
+        return acme_crypto_util._pyopenssl_cert_or_req_san(self._pyopenssl_cert)
+
+    @_memoized_property
+    def not_before(self):
+        """notBefore of the certificate, in UTC.
+
+        :rtype: `datetime.datetime`
+
+        """
+        return pytz.UTC.localize(self.cert.not_valid_before)
+
+    @_memoized_property
+    def not_after(self):
+        """notAfter of the certificate, in UTC.
 
+        :rtype: `datetime.datetime`
 
-def _notAfterBefore(cert_path, method):
-    """Internal helper function for finding notbefore/notafter.
+        """
+        return pytz.UTC.localize(self.cert.not_valid_after)
+
+    @_memoized_property
+    def issuer(self):
+        """Issuer of the certificate.
+
+        :rtype: `cryptography.x509.Name`
+
+        """
+        return self.cert.issuer
+
+    @_memoized_property
+    def ocsp_url(self):
+        """First OCSP responder URL of the Authority Information Access.
+
+        :returns: the URL, or None if the certificate has none
+        :rtype: str or None
+
+        """
+        try:
+            extension = self.cert.extensions.get_extension_for_class(
+                x509.AuthorityInformationAccess)
+        except x509.ExtensionNotFound:
+            return None
+        for description in extension.value:
+            if description.access_method == x509.AuthorityInformationAccessOID.OCSP:
+                return description.access_location.value
+        return None
+
+    @_memoized_property
+    def key_type(self):
+        """Type of the public key of the certificate.
+
+        :returns: "RSA", "ECDSA" or None for other key types
+        :rtype: str or None
+
+        """
+        public_key = self.cert.public_key()
+        if isinstance(public_key, RSAPublicKey):
+            return "RSA"
+        if isinstance(public_key, EllipticCurvePublicKey):
+            return "ECDSA"
+        return None
+
+    @_memoized_property
+    def fingerprint(self):
+        """SHA-256 fingerprint of the certificate, in hexadecimal.
+
+        :rtype: str
+
+        """
+        return binascii.hexlify(self.cert.fingerprint(hashes.SHA256())).decode("ascii")
+
+
+_PARSED_CERTS_CACHE_SIZE = 256
+"""Number of certificates kept by `load_parsed_cert`."""
+
+_parsed_certs = OrderedDict()  # type: OrderedDict[Tuple[str, float, int], ParsedCertificate]
+_parsed_certs_lock = threading.Lock()
+
+
+def load_parsed_cert(cert_path):
+    """Load the certificate stored in a file.
+
+    The most recently used certificates are cached, with the path,
+    modification time and size of their file, so that a certificate
+    is only parsed once as long as its file doesn't change. Symlinks
+    are resolved first: a live symlink pointing to a new version is
+    loaded again.
 
     :param str cert_path: path to a cert in PEM format
-    :param function method: one of ``crypto.X509.get_notBefore``
-        or ``crypto.X509.get_notAfter``
 
-    :returns: the notBefore or notAfter value from the cert at cert_path
-    :rtype: :class:`datetime.datetime`
+    :rtype: `ParsedCertificate`
+
+    :raises IOError: if the file can't be read
 
     """
-    # pylint: disable=redefined-outer-name
-    with open(cert_path) as f:
-        x509 = crypto.load_certificate(crypto.FILETYPE_PEM,
-                                               f.read())
-    # pyopenssl always returns bytes
-    timestamp = method(x509)
-    reformatted_timestamp = [timestamp[0:4], b"-", timestamp[4:6], b"-",
-                             timestamp[6:8], b"T", timestamp[8:10], b":",
-                             timestamp[10:12], b":", timestamp[12:]]
-    timestamp_str = b"".join(reformatted_timestamp)
-    # pyrfc3339 uses "native" strings. That is, bytes on Python 2 and unicode
-    # on Python 3
-    if six.PY3:
-        timestamp_str = timestamp_str.decode('ascii')
-    return pyrfc3339.parse(timestamp_str)
+    path = filesystem.realpath(cert_path)
+    try:
+        key = (path, os.path.getmtime(path), os.path.getsize(path))
+    except OSError as error:
+        raise IOError(error.errno, error.strerror, cert_path)
+    with _parsed_certs_lock:
+        parsed = _parsed_certs.pop(key, None)
+        if parsed is not None:
+            _parsed_certs[key] = parsed
+            return parsed
+    with open(path, 'rb') as cert_file:
+        parsed = ParsedCertificate(cert_file.read())
+    with _parsed_certs_lock:
+        _parsed_certs[key] = parsed
+        while len(_parsed_certs) > _PARSED_CERTS_CACHE_SIZE:
+            _parsed_certs.popitem(last=False)
+    return parsed
 
 
 def sha256sum(filename):
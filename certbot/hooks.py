@@ -2,6 +2,7 @@
 from __future__ import print_function
 
 import logging
+import threading
 from subprocess import Popen, PIPE
 
 from acme.magic_typing import Set, List  # pylint: disable=unused-import, no-name-in-module
@@ -14,6 +15,12 @@ from certbot.plugins import util as plug_util
 
 logger = logging.getLogger(__name__)
 
+# Hooks may be triggered from several threads when lineages are renewed
+# concurrently. They are always run one at a time, and the bookkeeping of
+# pre and post hooks that were already run or registered is protected by
+# this lock.
+_hook_lock = threading.RLock()
+
 
 def validate_hooks(config):
     """Check hook commands are executable."""
@@ -69,13 +76,14 @@ def pre_hook(config):
     :param configuration.NamespaceConfig config: Certbot settings
 
     """
-    if config.verb == "renew" and config.directory_hooks:
-        for hook in list_hooks(config.renewal_pre_hooks_dir):
-            _run_pre_hook_if_necessary(hook)
+    with _hook_lock:
+        if config.verb == "renew" and config.directory_hooks:
+            for hook in list_hooks(config.renewal_pre_hooks_dir):
+                _run_pre_hook_if_necessary(hook)
 
-    cmd = config.pre_hook
-    if cmd:
-        _run_pre_hook_if_necessary(cmd)
+        cmd = config.pre_hook
+        if cmd:
+            _run_pre_hook_if_necessary(cmd)
 
 
 executed_pre_hooks = set()  # type: Set[str]
@@ -116,16 +124,17 @@ def post_hook(config):
     """
 
     cmd = config.post_hook
-    # In the "renew" case, we save these up to run at the end
-    if config.verb == "renew":
-        if config.directory_hooks:
-            for hook in list_hooks(config.renewal_post_hooks_dir):
-                _run_eventually(hook)
-        if cmd:
-            _run_eventually(cmd)
-    # certonly / run
-    elif cmd:
-        _run_hook("post-hook", cmd)
+    with _hook_lock:
+        # In the "renew" case, we save these up to run at the end
+        if config.verb == "renew":
+            if config.directory_hooks:
+                for hook in list_hooks(config.renewal_post_hooks_dir):
+                    _run_eventually(hook)
+            if cmd:
+                _run_eventually(cmd)
+        # certonly / run
+        elif cmd:
+            _run_hook("post-hook", cmd)
 
 
 post_hooks = []  # type: List[str]
@@ -160,8 +169,9 @@ def deploy_hook(config, domains, lineage_path):
 
     """
     if config.deploy_hook:
-        _run_deploy_hook(config.deploy_hook, domains,
-                         lineage_path, config.dry_run)
+        with _hook_lock:
+            _run_deploy_hook(config.deploy_hook, domains,
+                             lineage_path, config.dry_run)
 
 
 def renew_hook(config, domains, lineage_path):
@@ -182,18 +192,19 @@ def renew_hook(config, domains, lineage_path):
 
     """
     executed_dir_hooks = set()
-    if config.directory_hooks:
-        for hook in list_hooks(config.renewal_deploy_hooks_dir):
-            _run_deploy_hook(hook, domains, lineage_path, config.dry_run)
-            executed_dir_hooks.add(hook)
-
-    if config.renew_hook:
-        if config.renew_hook in executed_dir_hooks:
-            logger.info("Skipping deploy-hook '%s' as it was already run.",
-                        config.renew_hook)
-        else:
-            _run_deploy_hook(config.renew_hook, domains,
-                             lineage_path, config.dry_run)
+    with _hook_lock:
+        if config.directory_hooks:
+            for hook in list_hooks(config.renewal_deploy_hooks_dir):
+                _run_deploy_hook(hook, domains, lineage_path, config.dry_run)
+                executed_dir_hooks.add(hook)
+
+        if config.renew_hook:
+            if config.renew_hook in executed_dir_hooks:
+                logger.info("Skipping deploy-hook '%s' as it was already run.",
+                            config.renew_hook)
+            else:
+                _run_deploy_hook(config.renew_hook, domains,
+                                 lineage_path, config.dry_run)
 
 
 def _run_deploy_hook(command, domains, lineage_path, dry_run):
@@ -198,6 +198,19 @@ class IConfig(zope.interface.Interface):
         "register multiple emails, ex: u1@example.com,u2@example.com. "
         "(default: Ask).")
     rsa_key_size = zope.interface.Attribute("Size of the RSA key.")
+    key_type = zope.interface.Attribute(
+        "Type of the private keys of new certificates and accounts: \"rsa\" "
+        "or \"ecdsa\". Accounts with an ECDSA key sign their requests with "
+        "ES256 or ES384. (default: rsa)")
+    elliptic_curve = zope.interface.Attribute(
+        "Elliptic curve of ECDSA keys: \"secp256r1\" (P-256) or "
+        "\"secp384r1\" (P-384). (default: secp256r1)")
+    key_pool_size = zope.interface.Attribute(
+        "Number of spare private keys of each type and size to keep "
+        "pre-generated in the key-pool subdirectory of the configuration "
+        "directory, so that new certificates don't wait for key generation. "
+        "Keys taken from the pool are replaced in the background. "
+        "(default: 0, no pool)")
     must_staple = zope.interface.Attribute(
         "Adds the OCSP Must Staple extension to the certificate. "
         "Autoconfigures OCSP Stapling for supported setups "
@@ -215,6 +228,8 @@ class IConfig(zope.interface.Interface):
     in_progress_dir = zope.interface.Attribute(
         "Directory used before a permanent checkpoint is finalized.")
     key_dir = zope.interface.Attribute("Keys storage.")
+    key_pool_dir = zope.interface.Attribute("Pre-generated keys storage.")
+    ocsp_cache_dir = zope.interface.Attribute("Cached OCSP responses.")
     temp_checkpoint_dir = zope.interface.Attribute(
         "Temporary checkpoint directory.")
 
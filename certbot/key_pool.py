@@ -0,0 +1,324 @@
+"""Pool of pre-generated private keys.
+
+Generating an RSA key is the most CPU intensive part of obtaining a
+certificate. With ``--key-pool-size N``, Certbot keeps up to N spare
+keys of each type and size it uses in ``<config_dir>/key-pool``, a
+directory only accessible by its owner, and new certificates use one of
+these keys instead of generating it on the spot. Keys taken from the
+pool are replaced in the background by a pool of processes while
+Certbot runs. When Certbot exits, it waits a few seconds for the keys
+still being generated; the others are abandoned, and generated by the
+next run.
+
+Each key is stored in its own file, written atomically. A key is taken
+from the pool by renaming its file before reading it, so that a key is
+never used twice even when several instances of Certbot share the pool.
+Claimed keys left behind by an instance that crashed before removing
+them are swept after a while.
+
+"""
+import logging
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+
+from acme.magic_typing import Dict  # pylint: disable=unused-import, no-name-in-module
+
+from certbot import constants
+from certbot import crypto_util
+from certbot import util
+from certbot.compat import filesystem
+from certbot.compat import os
+
+logger = logging.getLogger(__name__)
+
+_KEY_SUFFIX = ".pem"
+_CLAIMED_SUFFIX = ".claimed"
+_NEW_PREFIX = "new-"
+# Seconds waited at exit for the keys being generated
+_CLOSE_TIMEOUT = 10
+# Seconds after which a claimed key is considered left behind by a crash
+_CLAIMED_TTL = 600
+
+_pools = {}  # type: Dict[str, KeyPool]
+_pools_lock = threading.Lock()
+
+
+class KeyPool(object):
+    """Pool of pre-generated private keys, stored in a directory.
+
+    This class is thread-safe.
+
+    :ivar str directory: Directory containing the pool.
+    :ivar int size: Number of keys kept for each type and size.
+
+    """
+    def __init__(self, directory, size, strict_permissions=False, workers=None):
+        """Initialize.
+
+        :param str directory: Directory containing the pool.
+        :param int size: Number of keys kept for each type and size.
+        :param bool strict_permissions: Whether to check the owner and
+            permissions of the directories of the pool.
+        :param int workers: Maximum number of processes generating keys,
+            defaults to the number of CPUs.
+
+        """
+        self.directory = directory
+        self.size = size
+        self._strict_permissions = strict_permissions
+        self._workers = workers or multiprocessing.cpu_count()
+        self._lock = threading.Lock()
+        # Notified when a pending key is stored or given up
+        self._stored = threading.Condition(self._lock)
+        self._pending = {}  # type: Dict[str, int]
+        self._process_pool = None
+
+    def start(self):
+        """Start the processes generating keys.
+
+        This must be called from the main thread before other threads
+        are started: the processes are forked, and would inherit the
+        locks held by other threads at that time. Until the pool is
+        started, taken keys are not replaced.
+
+        """
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = multiprocessing.Pool(
+                    min(self._workers, self.size), initializer=_lower_priority)
+
+    def _key_dir(self, key_size, key_type, elliptic_curve):
+        if key_type == "ecdsa":
+            name = "ecdsa-{0}".format(elliptic_curve or constants.ELLIPTIC_CURVES[0])
+        else:
+            name = "{0}-{1}".format(key_type, key_size)
+        key_dir = os.path.join(self.directory, name)
+        util.make_or_verify_dir(self.directory, 0o700, self._strict_permissions)
+        util.make_or_verify_dir(key_dir, 0o700, self._strict_permissions)
+        return key_dir
+
+    def _available(self, key_dir):
+        return sorted(name for name in os.listdir(key_dir) if name.endswith(_KEY_SUFFIX))
+
+    def _sweep_claimed(self, key_dir):
+        """Remove the claimed keys left behind by a crash, see `take`."""
+        expiry = time.time() - _CLAIMED_TTL
+        for name in os.listdir(key_dir):
+            if not name.endswith(_CLAIMED_SUFFIX):
+                continue
+            path = os.path.join(key_dir, name)
+            try:
+                if os.path.getmtime(path) < expiry:
+                    os.remove(path)
+                    logger.debug("Removed stale claimed key %s.", path)
+            except OSError:
+                # Removed by another process in the meantime
+                pass
+
+    def take(self, key_size, key_type="rsa", elliptic_curve=None):
+        """Take a key out of the pool.
+
+        A replacement for the key is generated in the background.
+
+        :param int key_size: Size of RSA keys in bits.
+        :param str key_type: Type of the key, see `.crypto_util.make_key`.
+        :param str elliptic_curve: Curve of ECDSA keys.
+
+        :returns: Private key in PEM format, or None if the pool is
+            empty.
+        :rtype: bytes or None
+
+        """
+        key_dir = self._key_dir(key_size, key_type, elliptic_curve)
+        self._sweep_claimed(key_dir)
+        key_pem = None
+        for name in self._available(key_dir):
+            path = os.path.join(key_dir, name)
+            claimed = path + _CLAIMED_SUFFIX
+            try:
+                # Only one process can rename a given file
+                filesystem.replace(path, claimed)
+            except OSError:
+                continue
+            try:
+                # The key keeps the modification time of its generation,
+                # _sweep_claimed must know when it was claimed
+                os.utime(claimed, None)
+                with open(claimed, "rb") as key_file:
+                    key_pem = key_file.read()
+            except (IOError, OSError):
+                # Swept by another process
+                continue
+            finally:
+                _remove(claimed)
+            if crypto_util.valid_privkey(key_pem):
+                break
+            logger.debug("Discarding invalid key %s from the key pool.", path)
+            key_pem = None
+        if key_pem is None:
+            logger.debug("Key pool %s is empty.", key_dir)
+        else:
+            logger.debug("Took a key from key pool %s.", key_dir)
+        self.refill(key_size, key_type, elliptic_curve)
+        return key_pem
+
+    def refill(self, key_size, key_type="rsa", elliptic_curve=None):
+        """Generate the missing keys of a type and size in the background.
+
+        :param int key_size: Size of RSA keys in bits.
+        :param str key_type: Type of the key, see `.crypto_util.make_key`.
+        :param str elliptic_curve: Curve of ECDSA keys.
+
+        """
+        key_dir = self._key_dir(key_size, key_type, elliptic_curve)
+        self._sweep_claimed(key_dir)
+        with self._lock:
+            pending = self._pending.get(key_dir, 0)
+            missing = self.size - len(self._available(key_dir)) - pending
+            if missing <= 0:
+                return
+            if self._process_pool is None:
+                logger.debug("Key pool %s is not started, not generating keys.", key_dir)
+                return
+            self._pending[key_dir] = pending + missing
+            for _ in range(missing):
+                # Failures in the worker processes must also release the
+                # pending key, error_callback only exists on Python 3
+                kwargs = ({"error_callback": lambda error, key_dir=key_dir: self._fail(
+                    key_dir, error)} if sys.version_info[0] > 2 else {})
+                self._process_pool.apply_async(
+                    _generate_key, (key_size, key_type, elliptic_curve),
+                    callback=lambda key_pem, key_dir=key_dir: self._store(key_dir, key_pem),
+                    **kwargs)
+        logger.debug("Generating %d keys for key pool %s.", missing, key_dir)
+
+    def _fail(self, key_dir, error):
+        """Forget a key that could not be generated."""
+        logger.debug("Could not generate a key for key pool %s: %s", key_dir, error)
+        self._store(key_dir, None)
+
+    def _store(self, key_dir, key_pem):
+        """Write a newly generated key to the pool."""
+        try:
+            if key_pem is not None:
+                _write_key(key_dir, key_pem)
+        finally:
+            with self._lock:
+                self._pending[key_dir] -= 1
+                self._stored.notify_all()
+
+    def wait(self):
+        """Wait for the keys being generated to be added to the pool."""
+        with self._lock:
+            process_pool, self._process_pool = self._process_pool, None
+        if process_pool is not None:
+            process_pool.close()
+            process_pool.join()
+
+    def close(self, timeout=_CLOSE_TIMEOUT):
+        """Stop the processes generating keys.
+
+        :param float timeout: Seconds to wait for the keys being
+            generated before abandoning them.
+
+        """
+        deadline = time.time() + timeout
+        with self._lock:
+            process_pool, self._process_pool = self._process_pool, None
+            if process_pool is None:
+                return
+            pending = sum(self._pending.values())
+            if pending:
+                logger.debug("Waiting for %d keys to be added to the key pool.", pending)
+            while any(self._pending.values()) and time.time() < deadline:
+                self._stored.wait(deadline - time.time())
+        process_pool.terminate()
+        process_pool.join()
+
+
+def get_pool(config):
+    """Key pool of a configuration.
+
+    The pool is shared by the whole process and closed when the process
+    exits. It is started when it is first requested from the main
+    thread, see `KeyPool.start`: callers must request it there before
+    starting other threads if keys may be taken. Taken from other
+    threads before, its keys are not replaced.
+
+    :param .NamespaceConfig config: Configuration.
+
+    :returns: Key pool, or None if ``--key-pool-size`` is 0.
+    :rtype: `KeyPool` or None
+
+    """
+    if not config.key_pool_size:
+        return None
+    with _pools_lock:
+        pool = _pools.get(config.key_pool_dir)
+        if pool is None:
+            pool = KeyPool(config.key_pool_dir, config.key_pool_size,
+                           config.strict_permissions)
+            _pools[config.key_pool_dir] = pool
+            util.atexit_register(pool.close)
+    if _in_main_thread():
+        pool.start()
+    return pool
+
+
+def _in_main_thread():
+    if sys.version_info[0] < 3:
+        # threading.main_thread only exists on Python 3
+        # pylint: disable=protected-access,no-member
+        return isinstance(threading.current_thread(), threading._MainThread)  # type: ignore
+    return threading.current_thread() is threading.main_thread()
+
+
+def _write_key(key_dir, key_pem):
+    """Atomically write a key to a directory of the pool."""
+    try:
+        handle, temp_path = tempfile.mkstemp(dir=key_dir, prefix=_NEW_PREFIX)
+    except (IOError, OSError) as error:
+        logger.debug("Could not add a key to key pool %s: %s", key_dir, error)
+        return
+    try:
+        with os.fdopen(handle, "wb") as key_file:
+            key_file.write(key_pem)
+        filesystem.replace(temp_path, os.path.join(
+            key_dir, os.path.basename(temp_path)[len(_NEW_PREFIX):] + _KEY_SUFFIX))
+    except (IOError, OSError) as error:
+        logger.debug("Could not add a key to key pool %s: %s", key_dir, error)
+        os.remove(temp_path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _lower_priority():
+    """Run key generation after the rest of the work of Certbot."""
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+
+def _generate_key(key_size, key_type, elliptic_curve):
+    """Generate a key in a worker process.
+
+    :param int key_size: Size of RSA keys in bits.
+    :param str key_type: Type of the key.
+    :param str elliptic_curve: Curve of ECDSA keys.
+
+    :returns: Private key in PEM format, or None if it could not be
+        generated.
+    :rtype: bytes or None
+
+    """
+    try:
+        return crypto_util.make_key(key_size, key_type, elliptic_curve)
+    except ValueError:
+        return None
@@ -0,0 +1,418 @@
+"""Persistent index of lineage metadata.
+
+Building a `.storage.RenewableCert` parses its renewal configuration
+file, checks its symlinks and each inspection of the certificate parses
+the PEM file again. The `LineageIndex` keeps the metadata of every
+lineage in a JSON file in the configuration directory, so that commands
+only inspecting lineages do this work for the lineages that changed
+since the last run.
+
+An entry is reused as long as the renewal configuration file and the
+archive files the live symlinks point to have the same path,
+modification time and size as when the entry was created. Archive files
+are never modified in place: a new version of the certificate is
+written to new files.
+
+"""
+import datetime
+import json
+import logging
+import threading
+
+import pyrfc3339
+import six
+
+from acme.magic_typing import Any, List  # pylint: disable=unused-import, no-name-in-module
+
+from certbot import constants
+from certbot import crypto_util
+from certbot import errors
+from certbot import storage
+from certbot import util
+from certbot.compat import filesystem
+from certbot.compat import os
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+"""Version of the format of the index file."""
+
+KEY_PARAMS = ("rsa_key_size", "key_type", "elliptic_curve", "must_staple", "reuse_key")
+"""Renewal parameters saved in the index to prepare the key of a lineage."""
+
+
+class LineageMetadata(object):
+    """Metadata of a lineage, as stored in the `LineageIndex`.
+
+    It provides the part of the `.storage.RenewableCert` interface used
+    to describe a certificate, and can be used in its place where the
+    lineage is only inspected.
+
+    :ivar str lineagename: Name of the lineage.
+    :ivar str cert: Path to the live symlink of the certificate.
+    :ivar str privkey: Path to the live symlink of the private key.
+    :ivar str chain: Path to the live symlink of the chain.
+    :ivar str fullchain: Path to the live symlink of the fullchain.
+
+    """
+    def __init__(self, data):
+        """Initialize.
+
+        :param dict data: Entry of the lineage in the index.
+
+        """
+        self._data = data
+        self.lineagename = data["lineagename"]
+        self.cert = data["live"]["cert"]
+        self.privkey = data["live"]["privkey"]
+        self.chain = data["live"]["chain"]
+        self.fullchain = data["live"]["fullchain"]
+
+    def names(self):
+        """Subject names of the current certificate.
+
+        :rtype: `list` of `str`
+
+        """
+        return list(self._data["names"])
+
+    @property
+    def not_before(self):
+        """notBefore of the current certificate.
+
+        :rtype: `datetime.datetime`
+
+        """
+        return pyrfc3339.parse(self._data["not_before"])
+
+    @property
+    def target_expiry(self):
+        """notAfter of the current certificate.
+
+        :rtype: `datetime.datetime`
+
+        """
+        return pyrfc3339.parse(self._data["not_after"])
+
+    @property
+    def key_type(self):
+        """Type of the key of the current certificate, "RSA" or "ECDSA".
+
+        :rtype: str or None
+
+        """
+        return self._data["key_type"]
+
+    @property
+    def version(self):
+        """Current version of the certificate.
+
+        :rtype: int
+
+        """
+        return self._data["version"]
+
+    @property
+    def latest_version(self):
+        """Newest version for which all the lineage items are available.
+
+        :rtype: int
+
+        """
+        return self._data["latest_version"]
+
+    @property
+    def is_test_cert(self):
+        """Returns true if this is a test cert from a staging server."""
+        server = self._data["server"]
+        if server:
+            return util.is_staging(server)
+        return False
+
+    @property
+    def autorenew(self):
+        """Is automatic renewal enabled for this lineage?
+
+        :rtype: bool
+
+        """
+        return self._data["autorenew"]
+
+    @property
+    def key_params(self):
+        """Renewal parameters of the key of the lineage, see `KEY_PARAMS`.
+
+        Only the parameters set in the renewal configuration file are
+        included, with their value as written in it.
+
+        :rtype: dict
+
+        """
+        return dict(self._data["key_params"])
+
+    @property
+    def renew_before_expiry(self):
+        """Interval before expiry when the lineage should be renewed.
+
+        :rtype: str
+
+        """
+        return self._data["renew_before_expiry"]
+
+    @property
+    def renewal_due(self):
+        """When the current certificate is due for renewal.
+
+        This is the time from which
+        `.storage.RenewableCert.should_autorenew` considers the
+        certificate is close enough to its expiry to be renewed.
+
+        :returns: time point, or None if autorenewal is disabled
+        :rtype: `datetime.datetime` or None
+
+        """
+        if self._data["renewal_due"] is None:
+            return None
+        return pyrfc3339.parse(self._data["renewal_due"])
+
+    @property
+    def installer(self):
+        """Name of the installer used to renew the lineage, if any.
+
+        :rtype: str or None
+
+        """
+        return self._data["installer"]
+
+    def verify(self):
+        """Checks that the lineage was not corrupted on disk.
+
+        The result of `.crypto_util.verify_renewable_cert` is only known
+        if the metadata was obtained with ``verify=True``.
+
+        :raises errors.Error: If verification failed.
+
+        """
+        if self._data.get("verify_error") is not None:
+            raise errors.Error(self._data["verify_error"])
+
+
+class LineageIndex(object):
+    """Persistent index of the metadata of all lineages.
+
+    Entries are created or refreshed on demand by `metadata`. `save`
+    writes the index back to disk. This class is thread-safe.
+
+    """
+    def __init__(self, config):
+        """Initialize and load the index from disk.
+
+        :param .NamespaceConfig config: Configuration.
+
+        """
+        self.config = config
+        self.path = os.path.join(config.config_dir, constants.LINEAGE_INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as index_file:
+                data = json.load(index_file)
+        except (IOError, ValueError) as error:
+            if os.path.exists(self.path):
+                logger.debug("Ignoring unreadable lineage index %s: %s", self.path, error)
+            return {}
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            logger.debug("Ignoring lineage index %s with an unknown format.", self.path)
+            return {}
+        return data.get("lineages", {})
+
+    def metadata(self, renewal_file, verify=False):
+        """Metadata of the lineage defined by a renewal configuration file.
+
+        The metadata is taken from the index if it is up to date,
+        otherwise the lineage is parsed and the index updated.
+
+        :param str renewal_file: Path to the renewal configuration file.
+        :param bool verify: Whether the result of
+            `.crypto_util.verify_renewable_cert` is needed, see
+            `LineageMetadata.verify`.
+
+        :returns: Metadata of the lineage.
+        :rtype: `LineageMetadata`
+
+        :raises .CertStorageError: if the lineage is broken.
+        :raises IOError: if a file of the lineage can't be read.
+
+        """
+        lineagename = storage.lineagename_for_filename(renewal_file)
+        with self._lock:
+            entry = self._entries.get(lineagename)
+        if entry is not None and entry["renewal_file"] != renewal_file:
+            entry = None
+        if entry is not None:
+            signature = _signature(renewal_file, entry["live"])
+            if signature is None or signature != entry["signature"]:
+                entry = None
+        if entry is not None and (not verify or "verify_error" in entry):
+            return LineageMetadata(entry)
+        lineage = storage.RenewableCert(renewal_file, self.config)
+        if entry is None:
+            entry = _entry_for_lineage(lineage)
+        if verify:
+            entry = dict(entry, verify_error=_verify(lineage))
+        with self._lock:
+            self._entries[lineagename] = entry
+            self._dirty = True
+        return LineageMetadata(entry)
+
+    def save(self):
+        """Write the index to disk if it changed.
+
+        Entries of lineages whose renewal configuration file was removed
+        are dropped. Failing to write the index is not an error: it will
+        be rebuilt on the next run.
+
+        """
+        with self._lock:
+            stale = [name for name, entry in six.iteritems(self._entries)
+                     if not os.path.exists(entry["renewal_file"])]
+            for name in stale:
+                del self._entries[name]
+            if not self._dirty and not stale:
+                return
+            serialized = json.dumps(
+                {"version": INDEX_VERSION, "lineages": self._entries},
+                indent=1, sort_keys=True)
+            self._dirty = False
+        temp_path = self.path + ".new"
+        try:
+            with os.fdopen(filesystem.open(
+                    temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644), 'w') as fh:
+                fh.write(serialized)
+            filesystem.replace(temp_path, self.path)
+        except (IOError, OSError) as error:
+            logger.debug("Could not write lineage index %s: %s", self.path, error)
+
+
+def _entry_for_lineage(lineage):
+    """Compute the index entry of a lineage.
+
+    :param .storage.RenewableCert lineage: Lineage to describe.
+
+    :rtype: dict
+
+    """
+    live = dict((kind, getattr(lineage, kind)) for kind in storage.ALL_FOUR)
+    # The signature is computed before reading files, so that changes
+    # made while the entry is computed invalidate it.
+    signature = _signature(lineage.configfile.filename, live)
+    cert_path = lineage.current_target("cert")
+    if cert_path is None:
+        raise errors.CertStorageError("could not find cert file")
+    cert = crypto_util.load_parsed_cert(cert_path)
+    try:
+        latest_version = lineage.latest_common_version()
+    except ValueError:
+        raise errors.CertStorageError(
+            "no complete version of {0} found".format(lineage.lineagename))
+    renewal_params = lineage.configuration.get("renewalparams", {})
+    autorenew = not renewal_params or lineage.autorenewal_is_enabled()
+    renew_before_expiry = lineage.configuration.get(
+        "renew_before_expiry", constants.RENEWER_DEFAULTS["renew_before_expiry"])
+    not_after = cert.not_after
+    return {
+        "lineagename": lineage.lineagename,
+        "renewal_file": lineage.configfile.filename,
+        "live": live,
+        "signature": signature,
+        "names": cert.names,
+        "not_before": pyrfc3339.generate(cert.not_before),
+        "not_after": pyrfc3339.generate(not_after),
+        "key_type": cert.key_type,
+        "version": lineage.current_version("cert"),
+        "latest_version": latest_version,
+        "server": renewal_params.get("server", None),
+        "installer": renewal_params.get("installer", None),
+        "autorenew": autorenew,
+        "key_params": dict((name, renewal_params[name]) for name in KEY_PARAMS
+                           if name in renewal_params),
+        "renew_before_expiry": renew_before_expiry,
+        "renewal_due": (pyrfc3339.generate(_renewal_due(not_after, renew_before_expiry))
+                        if autorenew else None),
+    }
+
+
+def _renewal_due(expiry, interval):
+    """When should a certificate be renewed?
+
+    :param datetime.datetime expiry: notAfter of the certificate
+    :param str interval: time before expiry when it should be renewed,
+        see `.storage.add_time_interval`
+
+    :returns: a time point before which
+        ``add_time_interval(now, interval)`` is never after ``expiry``,
+        at most one day before the first one where it is
+    :rtype: `datetime.datetime`
+
+    """
+    due = expiry - (storage.add_time_interval(expiry, interval) - expiry)
+    # Intervals in months or years don't have a fixed length, so the
+    # estimate may be late and renewal would be attempted too late.
+    while storage.add_time_interval(due, interval) > expiry:
+        due -= datetime.timedelta(days=1)
+    return due
+
+
+def _verify(lineage):
+    """Check that a lineage was not corrupted on disk.
+
+    :param .storage.RenewableCert lineage: Lineage to verify.
+
+    :returns: Description of the verification error, or None.
+    :rtype: str or None
+
+    """
+    try:
+        crypto_util.verify_renewable_cert(lineage)
+    except errors.Error as error:
+        return str(error)
+    return None
+
+
+def _signature(renewal_file, live):
+    """Compute what identifies the current state of a lineage on disk.
+
+    :param str renewal_file: Path to the renewal configuration file.
+    :param dict live: Maps ALL_FOUR to their live symlink paths.
+
+    :returns: Path, inode, modification time and size of the renewal
+        configuration file and of the archive files targeted by the live
+        symlinks, and modification time of the archive directory of the
+        certificate, or None if one of them could not be read.
+    :rtype: `list` or None
+
+    """
+    try:
+        signature = [_file_signature(renewal_file)]  # type: List[List[Any]]
+        for kind in storage.ALL_FOUR:
+            signature.append(_file_signature(storage.get_link_target(live[kind])))
+        # New versions added to the archive change latest_version
+        archive_dir = os.path.dirname(signature[1][0])
+        signature.append([archive_dir, os.path.getmtime(archive_dir)])
+    except (errors.CertStorageError, OSError, RuntimeError):
+        return None
+    return signature
+
+
+def _file_signature(path):
+    """Path, inode, modification time and size of a file.
+
+    The inode catches a file replaced by another one of the same size
+    within the resolution of the modification time.
+
+    """
+    stat = os.lstat(filesystem.realpath(path))
+    return [path, stat.st_ino, stat.st_mtime, stat.st_size]
@@ -82,7 +82,8 @@ def _report_successful_dry_run(config):
                               reporter_util.HIGH_PRIORITY, on_crash=False)
 
 
-def _get_and_save_cert(le_client, config, domains=None, certname=None, lineage=None):
+def _get_and_save_cert(le_client, config, domains=None, certname=None, lineage=None,
+                       prepared_key=None):
     """Authenticate and enroll certificate.
 
     This method finds the relevant lineage, figures out what to do with it,
@@ -101,6 +102,10 @@ def _get_and_save_cert(le_client, config, domains=None, certname=None, lineage=N
     :param lineage: Certificate lineage object. Defaults to `None`
     :type lineage: storage.RenewableCert
 
+    :param prepared_key: Key and CSR generated in advance for the
+        renewal of ``lineage``, see `.Client.obtain_certificate`
+    :type prepared_key: `tuple` or None
+
     :returns: the issued certificate or `None` if doing a dry run
     :rtype: storage.RenewableCert or None
 
@@ -113,7 +118,7 @@ def _get_and_save_cert(le_client, config, domains=None, certname=None, lineage=N
             # Renewal, where we already know the specific lineage we're
             # interested in
             logger.info("Renewing an existing certificate")
-            renewal.renew_cert(config, domains, le_client, lineage)
+            renewal.renew_cert(config, domains, le_client, lineage, prepared_key)
         else:
             # TREAT AS NEW REQUEST
             assert domains is not None
@@ -1179,7 +1184,7 @@ def _csr_get_and_save_cert(config, le_client):
         os.path.normpath(config.chain_path), os.path.normpath(config.fullchain_path))
     return cert_path, fullchain_path
 
-def renew_cert(config, plugins, lineage):
+def renew_cert(config, plugins, lineage, prepared_key=None):
     """Renew & save an existing cert. Do not install it.
 
     :param config: Configuration object
@@ -1191,6 +1196,10 @@ def renew_cert(config, plugins, lineage):
     :param lineage: Certificate lineage object
     :type lineage: storage.RenewableCert
 
+    :param prepared_key: Key and CSR generated in advance, see
+        `.Client.obtain_certificate`
+    :type prepared_key: `tuple` or None
+
     :returns: `None`
     :rtype: None
 
@@ -1205,7 +1214,8 @@ def renew_cert(config, plugins, lineage):
         raise
     le_client = _init_le_client(config, auth, installer)
 
-    renewed_lineage = _get_and_save_cert(le_client, config, lineage=lineage)
+    renewed_lineage = _get_and_save_cert(le_client, config, lineage=lineage,
+                                         prepared_key=prepared_key)
 
     notify = zope.component.getUtility(interfaces.IDisplay).notification
     if installer is None:
@@ -1331,6 +1341,30 @@ def set_displayer(config):
     zope.component.provideUtility(displayer)
 
 
+def _plugin_manifest(cli_args):
+    """Find the plugin manifest of the working directory.
+
+    The manifest is needed before the command line is parsed, so the
+    working directory is only looked up in ``cli_args``. `main` doesn't
+    update the manifest if the working directory turns out to be
+    another one.
+
+    :param list cli_args: command line to Certbot, sans the executable
+
+    :returns: the manifest
+    :rtype: `.plugins.disco.PluginManifest`
+
+    """
+    work_dir = cli.flag_default("work_dir")
+    for i, arg in enumerate(cli_args):
+        if arg == "--work-dir" and i + 1 < len(cli_args):
+            work_dir = cli_args[i + 1]
+        elif arg.startswith("--work-dir="):
+            work_dir = arg[len("--work-dir="):]
+    return plugins_disco.PluginManifest(os.path.join(
+        os.path.abspath(work_dir), constants.PLUGIN_MANIFEST_FILENAME))
+
+
 def main(cli_args=None):
     """Command line argument parsing and main script execution.
 
@@ -1345,7 +1379,8 @@ def main(cli_args=None):
 
     log.pre_arg_parse_setup()
 
-    plugins = plugins_disco.PluginsRegistry.find_all()
+    manifest = _plugin_manifest(cli_args)
+    plugins = plugins_disco.PluginsRegistry.find_all(manifest)
     logger.debug("certbot version: %s", certbot.__version__)
     # do not log `config`, as it contains sensitive data (e.g. revoke --key)!
     logger.debug("Arguments: %r", cli_args)
@@ -1368,6 +1403,9 @@ def main(cli_args=None):
         if config.func != plugins_cmd:
             raise
 
+    if config.work_dir == os.path.dirname(manifest.path):
+        manifest.save(plugins)
+
     set_displayer(config)
 
     # Reporter
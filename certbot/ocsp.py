@@ -1,7 +1,14 @@
 """Tools for checking certificate revocation."""
+import binascii
+import collections
+import functools
 import logging
+import multiprocessing
 import re
+import tempfile
+import time
 from datetime import datetime, timedelta
+from multiprocessing.pool import ThreadPool
 from subprocess import Popen, PIPE
 
 try:
@@ -18,20 +25,45 @@ from cryptography.hazmat.primitives import hashes  # type: ignore
 from cryptography.exceptions import UnsupportedAlgorithm, InvalidSignature
 import requests
 
-from acme.magic_typing import Optional, Tuple  # pylint: disable=unused-import, no-name-in-module
+# pylint: disable=unused-import, no-name-in-module
+from acme.magic_typing import Any, Callable, Dict, List, Optional, Set, Tuple
+# pylint: enable=unused-import, no-name-in-module
 from certbot import crypto_util
 from certbot import errors
 from certbot import util
+from certbot.compat import filesystem
+from certbot.compat import os
 
 logger = logging.getLogger(__name__)
 
 
 class RevocationChecker(object):
-    """This class figures out OCSP checking on this system, and performs it."""
+    """This class figures out OCSP checking on this system, and performs it.
 
-    def __init__(self, enforce_openssl_binary_usage=False):
+    A checker can be shared between threads. OCSP requests sent with
+    cryptography reuse the kept-alive connections of a single HTTP
+    session.
+
+    """
+
+    def __init__(self, enforce_openssl_binary_usage=False, cache_dir=None, timeout=10):
+        """Initialize.
+
+        :param bool enforce_openssl_binary_usage: Query OCSP responders
+            with the openssl binary even if cryptography can do it.
+        :param str cache_dir: Directory where OCSP responses are cached,
+            see `OCSPResponseCache`. Responses are not cached if None,
+            or if cryptography is too old to check cached responses.
+        :param int timeout: Timeout of each OCSP request, in seconds.
+
+        """
         self.broken = False
         self.use_openssl_binary = enforce_openssl_binary_usage or not ocsp
+        self.cache = OCSPResponseCache(cache_dir) if cache_dir and ocsp else None
+        self.timeout = timeout
+        self._session = requests.Session()
+        # OCSP responders not answering about several certificates at once
+        self._single_request_urls = set()  # type: Set[str]
 
         if self.use_openssl_binary:
             if not util.exe_exists("openssl"):
@@ -69,10 +101,225 @@ class RevocationChecker(object):
 
         if self.use_openssl_binary:
             return self._check_ocsp_openssl_bin(cert_path, chain_path, host, url)
-        return _check_ocsp_cryptography(cert_path, chain_path, url)
+        return _check_ocsp_cryptography(cert_path, chain_path, url, self.cache,
+                                        functools.partial(self._session.post,
+                                                          timeout=self.timeout))
+
+    def next_update(self, cert_path, chain_path):
+        # type: (str, str) -> Optional[datetime]
+        """When the OCSP status of a certificate should be checked again.
+
+        :param str cert_path: Path to certificate
+        :param str chain_path: Path to intermediate cert
+
+        :returns: nextUpdate, in UTC, of the response about the
+            certificate in the cache of this checker, or None if there
+            is no valid cached response
+        :rtype: `datetime.datetime` or None
+
+        """
+        if self.cache is None:
+            return None
+        try:
+            issuer, request = _ocsp_request(cert_path, chain_path)
+        except (IOError, ValueError):
+            return None
+        cached = self.cache.get(request, issuer, cert_path)
+        return cached.next_update if cached is not None else None
+
+    def ocsp_revoked_many(self, certs, workers=10, deadline=None):
+        # type: (List[Tuple[str, str]], int, Optional[float]) -> List[bool]
+        """Get revoked status of several certificates concurrently.
+
+        Each distinct certificate is checked once with `ocsp_revoked`,
+        in a pool of ``workers`` threads.
+
+        :param list certs: ``(cert_path, chain_path)`` tuples
+        :param int workers: Maximum number of concurrent checks
+        :param float deadline: Time, as returned by `time.time`, after
+            which checks that are not done are considered failed. No
+            deadline if None.
+
+        :returns: Revoked status of each certificate, in the order of
+            ``certs``, see `ocsp_revoked`
+        :rtype: `list` of `bool`
+
+        """
+        unique = list(collections.OrderedDict.fromkeys(certs))
+        if not unique:
+            return []
+        pool = ThreadPool(min(workers, len(unique)))
+        statuses = {}  # type: Dict[Tuple[str, str], bool]
+        try:
+            pending = [(cert, pool.apply_async(self.ocsp_revoked, cert)) for cert in unique]
+            for cert, result in pending:
+                timeout = None if deadline is None else max(deadline - time.time(), 0)
+                try:
+                    statuses[cert] = result.get(timeout)
+                except multiprocessing.TimeoutError:
+                    logger.info("OCSP check for %s did not finish in time", cert[0])
+                    statuses[cert] = False
+        finally:
+            # Checks still running end after at most one request timeout
+            pool.close()
+        return [statuses[cert] for cert in certs]
+
+    def ocsp_revoked_bulk(self, certs, workers=10, deadline=None):
+        # type: (List[Tuple[str, str]], int, Optional[float]) -> Dict[str, bool]
+        """Get revoked status of many certificates, grouped by responder.
+
+        Certificates with the same OCSP responder and issuer are checked
+        with a single OCSP request about all of them. The certificates a
+        responder doesn't answer about, and all the certificates of
+        responders that didn't answer about every certificate before,
+        are checked with single requests sent concurrently by
+        `ocsp_revoked_many`. Only single requests are sent when the
+        openssl binary is used.
+
+        :param list certs: ``(cert_path, chain_path)`` tuples
+        :param int workers: Maximum number of concurrent single requests
+        :param float deadline: Time, as returned by `time.time`, after
+            which no more requests are sent and the ones that are not
+            done are considered failed. No deadline if None.
+
+        :returns: Revoked status of each certificate path, see
+            `ocsp_revoked`. Certificates that can't be read are not
+            revoked.
+        :rtype: `dict`
+
+        """
+        if self.broken or self.use_openssl_binary:
+            return dict(zip([cert_path for cert_path, _ in certs],
+                            self.ocsp_revoked_many(certs, workers, deadline)))
+
+        statuses = {}  # type: Dict[str, bool]
+        groups = collections.OrderedDict()  # type: Dict[Tuple[str, bytes], List[Tuple[Any, ...]]]
+        for cert_path, chain_path in collections.OrderedDict.fromkeys(certs):
+            try:
+                url, host = _determine_ocsp_server(cert_path)
+                if not host or not url:
+                    statuses[cert_path] = False
+                    continue
+                issuer, request = _ocsp_request(cert_path, chain_path)
+            except (IOError, ValueError) as error:
+                logger.info("Cannot build the OCSP request for %s: %s", cert_path, error)
+                statuses[cert_path] = False
+                continue
+            cached = self.cache.get(request, issuer, cert_path) if self.cache else None
+            if cached is not None:
+                statuses[cert_path] = cached.certificate_status == ocsp.OCSPCertStatus.REVOKED
+            else:
+                groups.setdefault((url, request.issuer_key_hash), []).append(
+                    (cert_path, chain_path, issuer, request))
+
+        single = []  # type: List[Tuple[str, str]]
+        for (url, _), group in groups.items():
+            if len(group) > 1 and url not in self._single_request_urls:
+                found = self._check_ocsp_batch(url, group, deadline)
+                statuses.update(found)
+                group = [entry for entry in group if entry[0] not in found]
+            single.extend((cert_path, chain_path) for cert_path, chain_path, _, _ in group)
+        if single and deadline is not None and time.time() >= deadline:
+            logger.info("No time left for the OCSP checks of %d certificates", len(single))
+            statuses.update((cert_path, False) for cert_path, _ in single)
+            return statuses
+        statuses.update(zip([cert_path for cert_path, _ in single],
+                            self.ocsp_revoked_many(single, workers, deadline)))
+        return statuses
+
+    def _check_ocsp_batch(self, url, group, deadline=None):
+        # type: (str, List[Tuple[Any, ...]], Optional[float]) -> Dict[str, bool]
+        """Check certificates of the same issuer with one OCSP request.
+
+        :param str url: URL of the OCSP responder
+        :param list group: ``(cert_path, chain_path, issuer, request)``
+            tuples, see `_ocsp_request`
+        :param float deadline: Time, as returned by `time.time`, after
+            which the request is not sent or is abandoned. No deadline
+            if None.
+
+        :returns: Revoked status of the certificates the responder
+            answered about
+        :rtype: `dict`
+
+        """
+        timeout = self.timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.time())
+            if timeout <= 0:
+                logger.info("No time left for the OCSP request about %d certificates to %s",
+                            len(group), url)
+                return {}
+        request_binary = _multi_ocsp_request([request for _, _, _, request in group])
+        try:
+            response = self._session.post(url, data=request_binary, timeout=timeout,
+                                          headers={'Content-Type': 'application/ocsp-request'})
+        except requests.exceptions.RequestException:
+            logger.info("OCSP check failed for %d certificates (are we offline?)",
+                        len(group), exc_info=True)
+            return {}
+
+        cert_path, _, issuer, _ = group[0]
+        try:
+            if response.status_code != 200:
+                raise errors.Error("HTTP status: {0}".format(response.status_code))
+            response_ocsp = _load_ocsp_response(response.content, issuer)
+            _check_ocsp_response_signature(response_ocsp, issuer, cert_path)
+        except (UnsupportedAlgorithm, InvalidSignature, AssertionError, ValueError,
+                errors.Error) as error:
+            logger.debug("OCSP request about %d certificates to %s failed: %s",
+                         len(group), url, error)
+            self._single_request_urls.add(url)
+            return {}
+
+        statuses = {}
+        cacheable = []
+        for cert_path, _, _, request in group:
+            single_response = response_ocsp.single_responses.get(
+                (request.issuer_name_hash, request.issuer_key_hash, request.serial_number))
+            if single_response is None:
+                continue
+            certificate_status, this_update, next_update = single_response
+            try:
+                _check_validity_period(this_update, next_update)
+            except AssertionError as error:
+                logger.error('Invalid OCSP response for %s: %s.', cert_path, str(error))
+                continue
+            logger.debug("OCSP certificate status for %s is: %s", cert_path, certificate_status)
+            statuses[cert_path] = certificate_status == ocsp.OCSPCertStatus.REVOKED
+            if next_update is not None:
+                cacheable.append(request)
+        if self.cache is not None:
+            self.cache.store_batch(cacheable, response.content)
+        if len(statuses) < len(group):
+            logger.debug("%s answered about %d of %d certificates, "
+                         "sending it single requests", url, len(statuses), len(group))
+            self._single_request_urls.add(url)
+        return statuses
 
     def _check_ocsp_openssl_bin(self, cert_path, chain_path, host, url):
         # type: (str, str, str, str) -> bool
+        if self.cache is None:
+            return self._run_openssl_bin(cert_path, chain_path, host, url)
+        issuer, request = _ocsp_request(cert_path, chain_path)
+        cached = self.cache.get(request, issuer, cert_path)
+        if cached is not None:
+            return cached.certificate_status == ocsp.OCSPCertStatus.REVOKED
+        self.cache.prepare()
+        handle, response_path = tempfile.mkstemp(suffix=".der", dir=self.cache.directory)
+        os.close(handle)
+        try:
+            revoked = self._run_openssl_bin(cert_path, chain_path, host, url,
+                                            ["-respout", response_path])
+            with open(response_path, 'rb') as file_handler:
+                response_der = file_handler.read()
+            if response_der:
+                self.cache.store(request, response_der)
+        finally:
+            os.remove(response_path)
+        return revoked
+
+    def _run_openssl_bin(self, cert_path, chain_path, host, url, extra_args=()):
         # jdkasten thanks "Bulletproof SSL and TLS - Ivan Ristic" for documenting this!
         cmd = ["openssl", "ocsp",
                "-no_nonce",
@@ -82,7 +329,8 @@ class RevocationChecker(object):
                "-CAfile", chain_path,
                "-verify_other", chain_path,
                "-trust_other",
-               "-header"] + self.host_args(host)
+               "-timeout", str(self.timeout),
+               "-header"] + self.host_args(host) + list(extra_args)
         logger.debug("Querying OCSP for %s", cert_path)
         logger.debug(" ".join(cmd))
         try:
@@ -102,16 +350,8 @@ def _determine_ocsp_server(cert_path):
     :returns: (OCSP server URL or None, OCSP server host or None)
 
     """
-    with open(cert_path, 'rb') as file_handler:
-        cert = x509.load_pem_x509_certificate(file_handler.read(), default_backend())
-    try:
-        extension = cert.extensions.get_extension_for_class(x509.AuthorityInformationAccess)
-        ocsp_oid = x509.AuthorityInformationAccessOID.OCSP
-        descriptions = [description for description in extension.value
-                        if description.access_method == ocsp_oid]
-
-        url = descriptions[0].access_location.value
-    except (x509.ExtensionNotFound, IndexError):
+    url = crypto_util.load_parsed_cert(cert_path).ocsp_url
+    if url is None:
         logger.info("Cannot extract OCSP URI from %s", cert_path)
         return None, None
 
@@ -124,20 +364,391 @@ def _determine_ocsp_server(cert_path):
     return None, None
 
 
-def _check_ocsp_cryptography(cert_path, chain_path, url):
-    # type: (str, str, str) -> bool
-    # Retrieve OCSP response
-    with open(chain_path, 'rb') as file_handler:
-        issuer = x509.load_pem_x509_certificate(file_handler.read(), default_backend())
-    with open(cert_path, 'rb') as file_handler:
-        cert = x509.load_pem_x509_certificate(file_handler.read(), default_backend())
+class OCSPResponseCache(object):
+    """On-disk cache of OCSP responses.
+
+    Responses are stored in DER form, in a file named after the issuer
+    key hash and the serial number of the certificate they are about. A
+    response about several certificates is stored for each of them. A
+    cached response is used until its nextUpdate, and only as long as it
+    is still valid for the certificate: its signature and validity period
+    are checked again each time it is read. Responses without nextUpdate
+    are not cached.
+
+    This class requires cryptography>=2.5.
+
+    :ivar str directory: Directory where responses are stored.
+
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, request):
+        return os.path.join(self.directory, "{0}-{1:x}.der".format(
+            binascii.hexlify(request.issuer_key_hash).decode("ascii"),
+            request.serial_number))
+
+    def get(self, request, issuer, cert_path):
+        """Find the cached response to an OCSP request.
+
+        :param request: OCSP request for a single certificate
+        :type request: `cryptography.x509.ocsp.OCSPRequest`
+        :param issuer: Issuer of the certificate
+        :type issuer: `cryptography.x509.Certificate`
+        :param str cert_path: Path to the certificate, for logging
+
+        :returns: The status of the certificate in the response, or None
+            if no response is cached, or if it's stale or invalid.
+        :rtype: `CachedOCSPStatus` or None
+
+        """
+        path = self._path(request)
+        try:
+            with open(path, 'rb') as file_handler:
+                response_ocsp = _load_ocsp_response(file_handler.read(), issuer)
+        except (IOError, ValueError, UnsupportedAlgorithm, errors.Error):
+            return None
+        single_response = response_ocsp.single_responses.get(
+            (request.issuer_name_hash, request.issuer_key_hash, request.serial_number))
+        if single_response is None:
+            return None
+        certificate_status, this_update, next_update = single_response
+        if next_update is None or datetime.utcnow() >= next_update:
+            return None
+        try:
+            _check_ocsp_response_signature(response_ocsp, issuer, cert_path)
+            _check_validity_period(this_update, next_update)
+        except (UnsupportedAlgorithm, InvalidSignature, AssertionError, errors.Error) as error:
+            logger.debug("Ignoring invalid cached OCSP response %s: %s", path, error)
+            return None
+        logger.debug("Using cached OCSP response for %s", cert_path)
+        return CachedOCSPStatus(certificate_status, next_update)
+
+    def prepare(self):
+        """Create the cache directory if needed."""
+        util.make_or_verify_dir(self.directory, 0o755)
+
+    def store(self, request, response_der):
+        """Cache the response to an OCSP request.
+
+        The response is checked again each time it is read from the
+        cache. Failing to cache it is not an error.
+
+        :param request: OCSP request for a single certificate
+        :type request: `cryptography.x509.ocsp.OCSPRequest`
+        :param bytes response_der: Response in DER form
+
+        """
+        try:
+            if not _is_cacheable(ocsp.load_der_ocsp_response(response_der)):
+                return
+        except ValueError:
+            return
+        self._write([request], response_der)
+
+    def store_batch(self, requests_ocsp, response_der):
+        """Cache the response to an OCSP request about several certificates.
+
+        :param list requests_ocsp: OCSP requests for the single
+            certificates answered about with a nextUpdate in the response
+        :param bytes response_der: Response in DER form
+
+        """
+        if requests_ocsp:
+            self._write(requests_ocsp, response_der)
+
+    def _write(self, requests_ocsp, response_der):
+        temp_path = None
+        try:
+            self.prepare()
+            for request in requests_ocsp:
+                handle, temp_path = tempfile.mkstemp(dir=self.directory)
+                with os.fdopen(handle, 'wb') as file_handler:
+                    file_handler.write(response_der)
+                filesystem.replace(temp_path, self._path(request))
+                temp_path = None
+        except (IOError, OSError, errors.Error) as error:
+            logger.debug("Could not cache OCSP response in %s: %s", self.directory, error)
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+CachedOCSPStatus = collections.namedtuple("CachedOCSPStatus", [
+    "certificate_status", "next_update"])
+"""Status of a certificate in a cached OCSP response, and its nextUpdate in UTC."""
+
+
+def _is_cacheable(response_ocsp):
+    """Can this OCSP response be cached until its nextUpdate?"""
+    return (response_ocsp.response_status == ocsp.OCSPResponseStatus.SUCCESSFUL
+            and response_ocsp.next_update is not None)
+
+
+def _ocsp_request(cert_path, chain_path):
+    """Build the OCSP request for a certificate.
+
+    :param str cert_path: Path to the certificate
+    :param str chain_path: Path to its issuer
+
+    :returns: The issuer certificate and the request
+    :rtype: `tuple` of `cryptography.x509.Certificate` and
+        `cryptography.x509.ocsp.OCSPRequest`
+
+    """
+    issuer = crypto_util.load_parsed_cert(chain_path).cert
+    cert = crypto_util.load_parsed_cert(cert_path).cert
     builder = ocsp.OCSPRequestBuilder()
     builder = builder.add_certificate(cert, issuer, hashes.SHA1())
-    request = builder.build()
+    return issuer, builder.build()
+
+
+_DER_SEQUENCE = 0x30
+
+_SHA1_OID = x509.ObjectIdentifier("1.3.14.3.2.26")
+"""Hash algorithm of the CertIDs of the requests built by `_ocsp_request`."""
+
+
+def _der_items(data):
+    """Split DER encoded data into its top-level items.
+
+    Only single byte tags and definite lengths are supported, which is
+    enough for OCSP requests and responses.
+
+    :param bytes data: DER encoded data
+
+    :returns: ``(tag, content, encoding)`` of each item
+    :rtype: `list` of `tuple`
+
+    :raises ValueError: if the data is truncated or its lengths are
+        malformed
+
+    """
+    octets = bytearray(data)
+    items = []
+    offset = 0
+    while offset < len(octets):
+        if offset + 2 > len(octets):
+            raise ValueError("truncated DER item")
+        tag, length = octets[offset], octets[offset + 1]
+        start = offset + 2
+        if length & 0x80:
+            length_size = length & 0x7f
+            if not length_size or start + length_size > len(octets):
+                raise ValueError("truncated DER item")
+            length = 0
+            for octet in octets[start:start + length_size]:
+                length = (length << 8) | octet
+            start += length_size
+        end = start + length
+        if end > len(octets):
+            raise ValueError("truncated DER item")
+        items.append((tag, data[start:end], data[offset:end]))
+        offset = end
+    return items
+
+
+def _der_encode(tag, content):
+    """Encode a DER item.
+
+    :param int tag: Tag of the item
+    :param bytes content: Encoded content of the item
+
+    :rtype: bytes
+
+    """
+    length = len(content)
+    if length < 0x80:
+        header = [tag, length]
+    else:
+        length_octets = []  # type: List[int]
+        while length:
+            length_octets.insert(0, length & 0xff)
+            length >>= 8
+        header = [tag, 0x80 | len(length_octets)] + length_octets
+    return bytes(bytearray(header)) + content
+
+
+def _multi_ocsp_request(requests_ocsp):
+    """Combine OCSP requests into one request about all their certificates.
+
+    cryptography only builds requests about a single certificate.
+
+    :param list requests_ocsp: `cryptography.x509.ocsp.OCSPRequest`
+        about a single certificate each, without extensions
+
+    :returns: OCSP request in DER form
+    :rtype: bytes
+
+    """
+    request_list = []  # type: List[bytes]
+    for request in requests_ocsp:
+        ocsp_request = _der_items(request.public_bytes(serialization.Encoding.DER))[0][1]
+        tbs_request = _der_items(ocsp_request)[0][1]
+        request_list.extend(content for tag, content, _ in _der_items(tbs_request)
+                            if tag == _DER_SEQUENCE)
+    return _der_encode(_DER_SEQUENCE, _der_encode(_DER_SEQUENCE, _der_encode(
+        _DER_SEQUENCE, b"".join(request_list))))
+
+
+_SIGNATURE_HASHES = {
+    x509.oid.SignatureAlgorithmOID.RSA_WITH_SHA1: hashes.SHA1,
+    x509.oid.SignatureAlgorithmOID.RSA_WITH_SHA256: hashes.SHA256,
+    x509.oid.SignatureAlgorithmOID.RSA_WITH_SHA384: hashes.SHA384,
+    x509.oid.SignatureAlgorithmOID.RSA_WITH_SHA512: hashes.SHA512,
+    x509.oid.SignatureAlgorithmOID.ECDSA_WITH_SHA1: hashes.SHA1,
+    x509.oid.SignatureAlgorithmOID.ECDSA_WITH_SHA256: hashes.SHA256,
+    x509.oid.SignatureAlgorithmOID.ECDSA_WITH_SHA384: hashes.SHA384,
+    x509.oid.SignatureAlgorithmOID.ECDSA_WITH_SHA512: hashes.SHA512,
+}
+"""Hash algorithms of the signature algorithms of OCSP responses."""
+
+_MultiOCSPResponse = collections.namedtuple("_MultiOCSPResponse", [
+    "responder_name", "certificates", "signature_hash_algorithm", "signature",
+    "tbs_response_bytes", "single_responses"])
+
+
+def _load_ocsp_response(response_der, issuer):
+    """Load a successful OCSP response about any number of certificates.
+
+    cryptography only loads responses about a single certificate. The
+    result has the attributes of `cryptography.x509.ocsp.OCSPResponse`
+    needed by `_check_ocsp_response_signature`, which must be called to
+    check it, and ``single_responses``, see `_single_responses`.
+
+    :param bytes response_der: OCSP response in DER form
+    :param issuer: Issuer of the certificates
+    :type issuer: `cryptography.x509.Certificate`
+
+    :rtype: `_MultiOCSPResponse`
+
+    :raises errors.Error: if the response is not successful
+    :raises UnsupportedAlgorithm: if its signature algorithm is unknown
+    :raises ValueError: if it can't be parsed
+
+    """
+    try:
+        response_items = _der_items(_der_items(response_der)[0][1])
+        if response_items[0][1] != b"\x00":
+            raise errors.Error("OCSP response status: {0}".format(
+                bytearray(response_items[0][1])[0]))
+        # responseBytes contains the OID of the response type and the
+        # encoded BasicOCSPResponse
+        basic_response = _der_items(_der_items(response_items[1][1])[0][1])[1][1]
+        basic_items = _der_items(_der_items(basic_response)[0][1])
+        algorithm = _der_oid(_der_items(basic_items[1][1])[0][1])
+        if algorithm not in _SIGNATURE_HASHES:
+            raise UnsupportedAlgorithm("Signature algorithm {0} of OCSP response is not "
+                                       "supported".format(algorithm.dotted_string))
+        certificates = []  # type: List[x509.Certificate]
+        if len(basic_items) > 3:
+            certificates = [x509.load_der_x509_certificate(encoding, default_backend())
+                            for _, _, encoding in _der_items(_der_items(basic_items[3][1])[0][1])]
+        response_data = _der_items(basic_items[0][1])
+        # The optional version is tagged [0], responderID [1] (byName) or
+        # [2] (byKey), and the extensions, after it, [1]
+        responder_tag, responder_id, _ = [item for item in response_data
+                                          if item[0] in (0xa1, 0xa2)][0]
+        responses = [content for tag, content, _ in response_data if tag == _DER_SEQUENCE][0]
+    except IndexError:
+        raise ValueError("malformed OCSP response")
+
+    responder_name = None
+    for cert in [issuer] + certificates:
+        if responder_tag == 0xa1:
+            found = cert.subject.public_bytes(default_backend()) == responder_id
+        else:
+            found = (x509.SubjectKeyIdentifier.from_public_key(cert.public_key()).digest ==
+                     _der_items(responder_id)[0][1])
+        if found:
+            responder_name = cert.subject
+            break
+    return _MultiOCSPResponse(
+        responder_name=responder_name,
+        certificates=certificates,
+        signature_hash_algorithm=_SIGNATURE_HASHES[algorithm](),
+        # The first octet of a BIT STRING is the number of unused bits
+        signature=basic_items[2][1][1:],
+        tbs_response_bytes=basic_items[0][2],
+        single_responses=_single_responses(responses))
+
+
+def _single_responses(responses):
+    """Read the status of each certificate of an OCSP response.
+
+    :param bytes responses: Content of the ``responses`` field of the
+        ``ResponseData`` of an OCSP response
+
+    :returns: Maps ``(issuer_name_hash, issuer_key_hash, serial_number)``
+        of each certificate to its status, thisUpdate and nextUpdate.
+        Responses whose CertID isn't hashed with SHA-1, like the
+        requests, are left out.
+    :rtype: `dict`
+
+    :raises ValueError: if the responses can't be parsed
+
+    """
+    cert_statuses = {
+        0x80: ocsp.OCSPCertStatus.GOOD,
+        0xa1: ocsp.OCSPCertStatus.REVOKED,
+        0x82: ocsp.OCSPCertStatus.UNKNOWN,
+    }
+    single_responses = {}
+    try:
+        for _, single_response, _ in _der_items(responses):
+            items = _der_items(single_response)
+            cert_id = _der_items(items[0][1])
+            if _der_oid(_der_items(cert_id[0][1])[0][1]) != _SHA1_OID:
+                continue
+            next_update = None
+            if len(items) > 3 and items[3][0] == 0xa0:
+                next_update = _generalized_time(_der_items(items[3][1])[0][1])
+            key = (cert_id[1][1], cert_id[2][1], int(binascii.hexlify(cert_id[3][1]), 16))
+            single_responses[key] = (
+                cert_statuses[items[1][0]], _generalized_time(items[2][1]), next_update)
+    except (IndexError, KeyError):
+        raise ValueError("malformed OCSP response")
+    return single_responses
+
+
+def _der_oid(content):
+    """Parse the content of a DER OBJECT IDENTIFIER.
+
+    :rtype: `cryptography.x509.ObjectIdentifier`
+
+    """
+    arcs = []
+    value = 0
+    for octet in bytearray(content):
+        value = (value << 7) | (octet & 0x7f)
+        if not octet & 0x80:
+            arcs.append(value)
+            value = 0
+    if not arcs:
+        raise ValueError("empty object identifier")
+    first = min(arcs[0] // 40, 2)
+    arcs[0:1] = [first, arcs[0] - 40 * first]
+    return x509.ObjectIdentifier(".".join(str(arc) for arc in arcs))
+
+
+def _generalized_time(content):
+    """Parse the content of a DER GeneralizedTime, in UTC."""
+    return datetime.strptime(content[:14].decode("ascii"), "%Y%m%d%H%M%S")
+
+
+def _check_ocsp_cryptography(cert_path, chain_path, url, cache=None, post=None):
+    # type: (str, str, str, Optional[OCSPResponseCache], Optional[Callable]) -> bool
+    issuer, request = _ocsp_request(cert_path, chain_path)
+    if cache is not None:
+        cached = cache.get(request, issuer, cert_path)
+        if cached is not None:
+            return cached.certificate_status == ocsp.OCSPCertStatus.REVOKED
+    # Retrieve OCSP response
+    if post is None:
+        post = requests.post
     request_binary = request.public_bytes(serialization.Encoding.DER)
     try:
-        response = requests.post(url, data=request_binary,
-                                 headers={'Content-Type': 'application/ocsp-request'})
+        response = post(url, data=request_binary,
+                        headers={'Content-Type': 'application/ocsp-request'})
     except requests.exceptions.RequestException:
         logger.info("OCSP check failed for %s (are we offline?)", cert_path, exc_info=True)
         return False
@@ -168,6 +779,8 @@ def _check_ocsp_cryptography(cert_path, chain_path, url):
         # Check OCSP certificate status
         logger.debug("OCSP certificate status for %s is: %s",
                      cert_path, response_ocsp.certificate_status)
+        if cache is not None:
+            cache.store(request, response.content)
         return response_ocsp.certificate_status == ocsp.OCSPCertStatus.REVOKED
 
     return False
@@ -198,12 +811,17 @@ def _check_ocsp_response(response_ocsp, request_ocsp, issuer_cert, cert_path):
     #      for OpenSSL, so we do not do it here.
     # See OpenSSL implementation as a reference:
     # https://github.com/openssl/openssl/blob/ef45aa14c5af024fcb8bef1c9007f3d1c115bd85/crypto/ocsp/ocsp_cl.c#L338-L391
+    _check_validity_period(response_ocsp.this_update, response_ocsp.next_update)
+
+
+def _check_validity_period(this_update, next_update):
+    """Verify that the thisUpdate and nextUpdate of an OCSP response are valid now"""
     now = datetime.utcnow()  # thisUpdate/nextUpdate are expressed in UTC/GMT time zone
-    if not response_ocsp.this_update:
+    if not this_update:
         raise AssertionError('param thisUpdate is not set.')
-    if response_ocsp.this_update > now + timedelta(minutes=5):
+    if this_update > now + timedelta(minutes=5):
         raise AssertionError('param thisUpdate is in the future.')
-    if response_ocsp.next_update and response_ocsp.next_update < now - timedelta(minutes=5):
+    if next_update and next_update < now - timedelta(minutes=5):
         raise AssertionError('param nextUpdate is in the past.')
 
 
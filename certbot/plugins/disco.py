@@ -1,6 +1,8 @@
 """Utilities for plugins discovery and selection."""
 import collections
+import inspect
 import itertools
+import json
 import logging
 
 import pkg_resources
@@ -9,10 +11,14 @@ import six
 import zope.interface
 import zope.interface.verify
 
-from acme.magic_typing import Dict  # pylint: disable=unused-import, no-name-in-module
+from acme.magic_typing import Any, Dict, List, Optional  # pylint: disable=unused-import, no-name-in-module
+import certbot
 from certbot import constants
 from certbot import errors
 from certbot import interfaces
+from certbot.compat import filesystem
+from certbot.compat import os
+from certbot.plugins import common
 
 
 logger = logging.getLogger(__name__)
@@ -45,12 +51,47 @@ class PluginEntryPoint(object):
     # this object is mutable, don't allow it to be hashed!
     __hash__ = None  # type: ignore
 
-    def __init__(self, entry_point):
+    def __init__(self, entry_point, manifest_entry=None):
+        """Initialize.
+
+        :param pkg_resources.EntryPoint entry_point: Entry point of the
+            plugin.
+        :param dict manifest_entry: Description of the plugin found in a
+            `PluginManifest`. If provided, the plugin class is only
+            loaded when it is needed.
+
+        """
         self.name = self.entry_point_to_plugin_name(entry_point)
-        self.plugin_cls = entry_point.load()
         self.entry_point = entry_point
+        self._plugin_cls = None
+        self._manifest_entry = manifest_entry
         self._initialized = None
         self._prepared = None
+        if manifest_entry is None:
+            self._plugin_cls = entry_point.load()
+
+    @property
+    def plugin_cls(self):
+        """Plugin class, loaded on first use."""
+        if self._plugin_cls is None:
+            self._plugin_cls = self.entry_point.load()
+        return self._plugin_cls
+
+    @plugin_cls.setter
+    def plugin_cls(self, plugin_cls):
+        self._plugin_cls = plugin_cls
+        self._manifest_entry = None
+
+    @property
+    def manifest_entry(self):
+        """Description of the plugin to store in a `PluginManifest`.
+
+        :rtype: dict
+
+        """
+        if self._manifest_entry is None:
+            self._manifest_entry = _manifest_entry(self.entry_point, self.plugin_cls)
+        return self._manifest_entry
 
     @classmethod
     def entry_point_to_plugin_name(cls, entry_point):
@@ -62,6 +103,8 @@ class PluginEntryPoint(object):
     @property
     def description(self):
         """Description of the plugin."""
+        if self._manifest_entry is not None:
+            return self._manifest_entry["description"]
         return self.plugin_cls.description
 
     @property
@@ -72,6 +115,8 @@ class PluginEntryPoint(object):
     @property
     def long_description(self):
         """Long description of the plugin."""
+        if self._manifest_entry is not None:
+            return self._manifest_entry["long_description"]
         try:
             return self.plugin_cls.long_description
         except AttributeError:
@@ -80,15 +125,45 @@ class PluginEntryPoint(object):
     @property
     def hidden(self):
         """Should this plugin be hidden from UI?"""
+        if self._manifest_entry is not None:
+            return self._manifest_entry["hidden"]
         return getattr(self.plugin_cls, "hidden", False)
 
     def ifaces(self, *ifaces_groups):
         """Does plugin implements specified interface groups?"""
+        if self._manifest_entry is not None:
+            implemented = self._manifest_entry["interfaces"]
+            return not ifaces_groups or any(
+                all(iface.__identifier__ in implemented for iface in ifaces)
+                for ifaces in ifaces_groups)
         return not ifaces_groups or any(
             all(iface.implementedBy(self.plugin_cls)
                 for iface in ifaces)
             for ifaces in ifaces_groups)
 
+    def inject_parser_options(self, parser, name):
+        """Inject the command line arguments of the plugin.
+
+        The arguments are recorded in the manifest entry of the plugin,
+        so that they can be added without loading the plugin class on
+        the next run. They are only recorded for plugins using
+        `.common.Plugin.inject_parser_options`, which does nothing but
+        add the arguments of ``add_parser_arguments``. See
+        `~.IPlugin.inject_parser_options`.
+
+        """
+        if self._manifest_entry is not None and self._manifest_entry["arguments"] is not None:
+            for args, kwargs in self._manifest_entry["arguments"]:
+                if "type" in kwargs:
+                    kwargs = dict(kwargs, type=_ARGUMENT_TYPES[kwargs["type"]])
+                parser.add_argument(*args, **kwargs)
+            return
+        recorder = _ArgumentRecorder(parser)
+        self.plugin_cls.inject_parser_options(recorder, name)
+        definer = [cls for cls in inspect.getmro(self.plugin_cls)
+                   if "inject_parser_options" in vars(cls)][0]
+        self.manifest_entry["arguments"] = recorder.calls if definer is common.Plugin else None
+
     @property
     def initialized(self):
         """Has the plugin been initialized already?"""
@@ -195,8 +270,14 @@ class PluginsRegistry(collections.Mapping):
         self._plugins = collections.OrderedDict(sorted(six.iteritems(plugins)))
 
     @classmethod
-    def find_all(cls):
-        """Find plugins using setuptools entry points."""
+    def find_all(cls, manifest=None):
+        """Find plugins using setuptools entry points.
+
+        :param PluginManifest manifest: Manifest describing the plugins
+            found on a previous run. Plugins described in it are not
+            loaded until they are needed.
+
+        """
         plugins = {}  # type: Dict[str, PluginEntryPoint]
         # pylint: disable=not-callable
         entry_points = itertools.chain(
@@ -205,11 +286,13 @@ class PluginsRegistry(collections.Mapping):
             pkg_resources.iter_entry_points(
                 constants.OLD_SETUPTOOLS_PLUGINS_ENTRY_POINT),)
         for entry_point in entry_points:
-            plugin_ep = PluginEntryPoint(entry_point)
+            manifest_entry = manifest.get(entry_point) if manifest is not None else None
+            plugin_ep = PluginEntryPoint(entry_point, manifest_entry)
             assert plugin_ep.name not in plugins, (
                 "PREFIX_FREE_DISTRIBUTIONS messed up")
             # providedBy | pylint: disable=no-member
-            if interfaces.IPluginFactory.providedBy(plugin_ep.plugin_cls):
+            if manifest_entry is not None or interfaces.IPluginFactory.providedBy(
+                    plugin_ep.plugin_cls):
                 plugins[plugin_ep.name] = plugin_ep
             else:  # pragma: no cover
                 logger.warning(
@@ -287,3 +370,245 @@ class PluginsRegistry(collections.Mapping):
         if not self._plugins:
             return "No plugins"
         return "\n\n".join(str(p_ep) for p_ep in six.itervalues(self._plugins))
+
+
+class PluginManifest(object):
+    """Description of the installed plugins, cached between runs.
+
+    Loading a plugin imports its module and all its dependencies, which
+    is slow for plugins using large API client libraries. The manifest
+    stores what is needed to list the plugins and build the command
+    line parser: descriptions, implemented interfaces and the arguments
+    each plugin adds to the parser. An entry is only reused if the
+    plugin comes from the same entry point of the same version of the
+    same distribution, installed at the same path and not reinstalled
+    since, and if it is well formed. The manifest is discarded when
+    Certbot is upgraded, or if it is not owned by the current user or
+    is accessible to everyone.
+
+    """
+    def __init__(self, path):
+        """Initialize and load the manifest from disk.
+
+        :param str path: Path to the manifest file.
+
+        """
+        self.path = path
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as manifest_file:
+                data = json.load(manifest_file)
+        except (IOError, ValueError) as error:
+            if os.path.exists(self.path):
+                logger.debug("Ignoring unreadable plugin manifest %s: %s", self.path, error)
+            return {}
+        try:
+            trusted = (filesystem.check_owner(self.path) and
+                       not filesystem.has_world_permissions(self.path))
+        except OSError:
+            trusted = False
+        if not trusted:
+            logger.debug("Ignoring plugin manifest %s not owned by the current user or "
+                         "accessible to everyone.", self.path)
+            return {}
+        if not isinstance(data, dict) or data.get("certbot_version") != certbot.__version__:
+            logger.debug("Ignoring plugin manifest %s from another version of Certbot.",
+                         self.path)
+            return {}
+        entries = data.get("plugins")
+        if not isinstance(entries, dict):
+            logger.debug("Ignoring malformed plugin manifest %s.", self.path)
+            return {}
+        malformed = [name for name, entry in six.iteritems(entries)
+                     if not _valid_entry(name, entry)]
+        for name in malformed:
+            logger.debug("Ignoring malformed entry of %s in plugin manifest %s.",
+                         name, self.path)
+            del entries[name]
+        return entries
+
+    def get(self, entry_point):
+        """Find the manifest entry of a plugin.
+
+        :param pkg_resources.EntryPoint entry_point: Entry point of the
+            plugin.
+
+        :returns: Copy of the entry, or None if the plugin isn't
+            described by the manifest.
+        :rtype: dict or None
+
+        """
+        name = PluginEntryPoint.entry_point_to_plugin_name(entry_point)
+        entry = self._entries.get(name)
+        if entry is None or entry["origin"] != _origin(entry_point):
+            return None
+        return dict(entry)
+
+    def save(self, plugins):
+        """Write the manifest to disk if it changed.
+
+        Failing to write the manifest is not an error: plugins are
+        simply loaded again on the next run.
+
+        :param PluginsRegistry plugins: Plugins to describe.
+
+        """
+        entries = dict((name, plugin_ep.manifest_entry)
+                       for name, plugin_ep in six.iteritems(plugins))
+        if entries == self._entries:
+            return
+        serialized = json.dumps({"certbot_version": certbot.__version__, "plugins": entries},
+                                indent=1, sort_keys=True)
+        temp_path = self.path + ".new"
+        try:
+            with os.fdopen(filesystem.open(
+                    temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as fh:
+                fh.write(serialized)
+            filesystem.replace(temp_path, self.path)
+        except (IOError, OSError) as error:
+            logger.debug("Could not write plugin manifest %s: %s", self.path, error)
+        else:
+            self._entries = json.loads(serialized)["plugins"]
+
+
+_ARGUMENT_TYPES = {"int": int, "float": float, "str": str}
+"""Values of the ``type`` argument of ``add_argument`` that can be cached."""
+
+
+_ARGUMENT_KWARGS = frozenset(("action", "choices", "const", "default", "dest", "help",
+                              "metavar", "nargs", "required", "type"))
+"""Keyword arguments of ``add_argument`` accepted in a manifest."""
+
+_ARGUMENT_ACTIONS = frozenset(("store", "store_const", "store_true", "store_false",
+                               "append", "append_const", "count"))
+"""Values of the ``action`` argument of ``add_argument`` accepted in a manifest."""
+
+
+class _ArgumentRecorder(object):
+    """Parser proxy recording the arguments added by a plugin.
+
+    :ivar list calls: Positional and keyword arguments of each
+        ``add_argument`` call, or None if one of them can't be stored in
+        a `PluginManifest` or if the plugin used the parser otherwise.
+
+    """
+    def __init__(self, parser):
+        self._parser = parser
+        self.calls = []  # type: Optional[List[Any]]
+
+    def __getattr__(self, name):
+        # Anything but add_argument can't be replayed from the manifest
+        self.calls = None
+        return getattr(self._parser, name)
+
+    def add_argument(self, *args, **kwargs):
+        """Add an argument to the parser and record the call."""
+        result = self._parser.add_argument(*args, **kwargs)
+        if self.calls is not None:
+            self.calls = _record(self.calls, args, kwargs)
+        return result
+
+
+def _record(calls, args, kwargs):
+    """Append an ``add_argument`` call to ``calls`` if it can be stored.
+
+    :returns: extended list of calls, or None if the call can't be
+        serialized
+    :rtype: list or None
+
+    """
+    if "type" in kwargs:
+        names = [name for name, arg_type in six.iteritems(_ARGUMENT_TYPES)
+                 if kwargs["type"] is arg_type]
+        if not names:
+            return None
+        kwargs = dict(kwargs, type=names[0])
+    call = [list(args), kwargs]
+    try:
+        # Values such as tuples would not be restored as they were given
+        if json.loads(json.dumps(call)) != call:
+            return None
+    except (TypeError, ValueError):
+        return None
+    return calls + [call]
+
+
+def _origin(entry_point):
+    """What a plugin described by a manifest entry was loaded from.
+
+    This includes the modification time of the metadata directory of
+    the distribution, which changes when it is reinstalled.
+
+    :rtype: list
+
+    """
+    dist = entry_point.dist
+    metadata_mtime = None  # type: Optional[float]
+    try:
+        metadata_mtime = os.path.getmtime(dist.egg_info)
+    except (AttributeError, TypeError, OSError):
+        # Distributions without metadata directory have no egg_info, or None
+        pass
+    return [str(entry_point), dist.key, dist.version, dist.location, metadata_mtime]
+
+
+def _valid_entry(name, entry):
+    """Is a manifest entry well formed?
+
+    The arguments of a plugin must be in its namespace, see
+    `.common.option_namespace`, and only use the keyword arguments
+    of ``add_argument`` that plugins can record.
+
+    :param str name: Name of the plugin.
+    :param entry: Entry read from a manifest.
+
+    :rtype: bool
+
+    """
+    try:
+        if (not isinstance(entry["origin"], list) or
+                not isinstance(entry["description"], six.string_types) or
+                not isinstance(entry["long_description"], six.string_types) or
+                not isinstance(entry["hidden"], bool) or
+                not isinstance(entry["interfaces"], list) or
+                not all(isinstance(iface, six.string_types) for iface in entry["interfaces"])):
+            return False
+        if entry["arguments"] is None:
+            return True
+        prefix = "--" + common.option_namespace(name)
+        dest_prefix = common.dest_namespace(name)
+        for args, kwargs in entry["arguments"]:
+            if (not args or
+                    not all(isinstance(arg, six.string_types) and arg.startswith(prefix)
+                            for arg in args) or
+                    not set(kwargs).issubset(_ARGUMENT_KWARGS) or
+                    kwargs.get("type", "str") not in _ARGUMENT_TYPES or
+                    kwargs.get("action", "store") not in _ARGUMENT_ACTIONS or
+                    not str(kwargs.get("dest", dest_prefix)).startswith(dest_prefix)):
+                return False
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return False
+    return True
+
+
+def _manifest_entry(entry_point, plugin_cls):
+    """Describe a plugin for a `PluginManifest`.
+
+    :param pkg_resources.EntryPoint entry_point: Entry point of the
+        plugin.
+    :param plugin_cls: Class of the plugin.
+
+    :rtype: dict
+
+    """
+    return {
+        "origin": _origin(entry_point),
+        "description": plugin_cls.description,
+        "long_description": getattr(plugin_cls, "long_description", plugin_cls.description),
+        "hidden": getattr(plugin_cls, "hidden", False),
+        "interfaces": sorted(iface.__identifier__ for iface in
+                             zope.interface.implementedBy(plugin_cls).flattened()),
+        "arguments": None,
+    }
@@ -1,5 +1,7 @@
 """Tests for certbot.plugins.disco."""
+import argparse
 import functools
+import json
 import string
 import unittest
 
@@ -9,11 +11,16 @@ import six
 import zope.interface
 
 from acme.magic_typing import List  # pylint: disable=unused-import, no-name-in-module
+import certbot
 from certbot import errors
 from certbot import interfaces
-
+from certbot.compat import filesystem
+from certbot.compat import os
+from certbot.plugins import manual
+from certbot.plugins import null
 from certbot.plugins import standalone
 from certbot.plugins import webroot
+from certbot.tests import util as test_util
 
 EP_SA = pkg_resources.EntryPoint(
     "sa", "certbot.plugins.standalone",
@@ -181,6 +188,78 @@ class PluginEntryPointTest(unittest.TestCase):
     def test_repr(self):
         self.assertEqual("PluginEntryPoint#sa", repr(self.plugin_ep))
 
+    def test_lazy_plugin_cls(self):
+        from certbot.plugins.disco import PluginEntryPoint
+        entry_point = mock.MagicMock(dist=mock.MagicMock(key="certbot"))
+        entry_point.name = "sa"
+        plugin_ep = PluginEntryPoint(entry_point, self.plugin_ep.manifest_entry)
+        self.assertEqual(plugin_ep.description, self.plugin_ep.description)
+        self.assertEqual(plugin_ep.long_description, self.plugin_ep.long_description)
+        self.assertFalse(plugin_ep.hidden)
+        self.assertTrue(plugin_ep.ifaces((interfaces.IAuthenticator, interfaces.IPlugin)))
+        self.assertFalse(plugin_ep.ifaces((interfaces.IInstaller,)))
+        self.assertFalse(entry_point.load.called)
+
+        entry_point.load.return_value = standalone.Authenticator
+        self.assertTrue(plugin_ep.plugin_cls is standalone.Authenticator)
+
+    def test_inject_parser_options(self):
+        self.plugin_ep.plugin_cls = manual.Authenticator
+        parser = argparse.ArgumentParser()
+        self.plugin_ep.inject_parser_options(parser, "manual")
+        self.assertTrue(self.plugin_ep.manifest_entry["arguments"])
+
+        from certbot.plugins.disco import PluginEntryPoint
+        entry_point = mock.MagicMock(dist=mock.MagicMock(key="certbot"))
+        entry_point.name = "manual"
+        plugin_ep = PluginEntryPoint(entry_point, self.plugin_ep.manifest_entry)
+        replayed = argparse.ArgumentParser()
+        plugin_ep.inject_parser_options(replayed, "manual")
+        self.assertFalse(entry_point.load.called)
+        self.assertEqual(parser.format_help(), replayed.format_help())
+
+    def test_inject_parser_options_not_cached(self):
+        plugin_ep = self.plugin_ep
+        plugin_ep.plugin_cls = webroot.Authenticator
+        plugin_ep.inject_parser_options(argparse.ArgumentParser(), "webroot")
+        # Custom action classes can't be cached
+        self.assertEqual(plugin_ep.manifest_entry["arguments"], None)
+
+    def test_inject_parser_options_types(self):
+        from certbot.plugins.disco import _ArgumentRecorder
+        recorder = _ArgumentRecorder(argparse.ArgumentParser())
+        recorder.add_argument("--port", type=int, default=80)
+        self.assertEqual(recorder.calls,
+                         [[["--port"], {"type": "int", "default": 80}]])
+        recorder.add_argument("--names", default=("a", "b"))
+        self.assertEqual(recorder.calls, None)
+        recorder.add_argument("--other")
+        self.assertEqual(recorder.calls, None)
+
+    def test_inject_parser_options_other_parser_use(self):
+        from certbot.plugins.disco import _ArgumentRecorder
+        parser = argparse.ArgumentParser()
+        recorder = _ArgumentRecorder(parser)
+        recorder.add_argument("--port", type=int, default=80)
+        recorder.set_defaults(port=443)
+        self.assertEqual(recorder.calls, None)
+        self.assertEqual(parser.parse_args([]).port, 443)
+
+    def test_inject_parser_options_overridden(self):
+        class _Authenticator(standalone.Authenticator):
+            injected = []  # type: List[str]
+
+            @classmethod
+            def inject_parser_options(cls, parser, name):
+                cls.injected.append(name)
+                super(_Authenticator, cls).inject_parser_options(parser, name)
+
+        self.plugin_ep.plugin_cls = _Authenticator
+        self.plugin_ep.inject_parser_options(argparse.ArgumentParser(), "sa")
+        self.assertEqual(_Authenticator.injected, ["sa"])
+        # Its other side effects would be skipped when replaying the arguments
+        self.assertEqual(self.plugin_ep.manifest_entry["arguments"], None)
+
 
 class PluginsRegistryTest(unittest.TestCase):
     """Tests for certbot.plugins.disco.PluginsRegistry."""
@@ -288,5 +367,137 @@ class PluginsRegistryTest(unittest.TestCase):
         self.assertEqual("Bar\n\nMock", str(reg))
 
 
+class PluginManifestTest(test_util.TempDirTestCase):
+    """Tests for certbot.plugins.disco.PluginManifest."""
+
+    def setUp(self):
+        super(PluginManifestTest, self).setUp()
+        self.path = os.path.join(self.tempdir, "plugin-manifest.json")
+        egg_info = os.path.join(self.tempdir, "certbot.egg-info")
+        filesystem.mkdir(egg_info)
+        self.entry_point = pkg_resources.EntryPoint(
+            "null", "certbot.plugins.null", attrs=("Installer",),
+            dist=mock.MagicMock(key="certbot", version="1.0", location="/site",
+                                egg_info=egg_info))
+
+    def _find_all(self, manifest):
+        from certbot.plugins.disco import PluginsRegistry
+        with mock.patch("certbot.plugins.disco.pkg_resources") as mock_pkg:
+            mock_pkg.iter_entry_points.side_effect = [iter([self.entry_point]), iter([])]
+            return PluginsRegistry.find_all(manifest)
+
+    def _manifest(self):
+        from certbot.plugins.disco import PluginManifest
+        return PluginManifest(self.path)
+
+    def _save(self):
+        manifest = self._manifest()
+        plugins = self._find_all(manifest)
+        plugins["null"].inject_parser_options(argparse.ArgumentParser(), "null")
+        manifest.save(plugins)
+        return plugins
+
+    @mock.patch("certbot.plugins.disco.pkg_resources.EntryPoint.load")
+    def test_cached(self, mock_load):
+        mock_load.return_value = null.Installer
+        self._save()
+        self.assertEqual(mock_load.call_count, 1)
+
+        plugins = self._find_all(self._manifest())
+        plugins["null"].inject_parser_options(argparse.ArgumentParser(), "null")
+        self.assertEqual(plugins["null"].description, null.Installer.description)
+        self.assertTrue(plugins["null"].ifaces((interfaces.IInstaller,)))
+        self.assertEqual(mock_load.call_count, 1)
+
+    def test_save_only_when_changed(self):
+        self._save()
+        with mock.patch("certbot.plugins.disco.filesystem.replace") as mock_replace:
+            self._save()
+        self.assertFalse(mock_replace.called)
+
+    def test_other_origin(self):
+        self._save()
+        self.entry_point.dist.version = "2.0"
+        self.assertEqual(self._manifest().get(self.entry_point), None)
+
+    def test_other_location(self):
+        self._save()
+        self.entry_point.dist.location = "/other-site"
+        self.assertEqual(self._manifest().get(self.entry_point), None)
+
+    def test_reinstalled(self):
+        self._save()
+        mtime = os.path.getmtime(self.entry_point.dist.egg_info)
+        os.utime(self.entry_point.dist.egg_info, (mtime + 10, mtime + 10))
+        self.assertEqual(self._manifest().get(self.entry_point), None)
+
+    def test_no_metadata_directory(self):
+        self.entry_point.dist.egg_info = None
+        self._save()
+        self.assertNotEqual(self._manifest().get(self.entry_point), None)
+
+    @test_util.skip_on_windows("POSIX ownership and permissions")
+    def test_untrusted(self):
+        self._save()
+        self.assertNotEqual(self._manifest().get(self.entry_point), None)
+        with mock.patch("certbot.plugins.disco.filesystem.check_owner") as mock_owner:
+            mock_owner.return_value = False
+            self.assertEqual(self._manifest().get(self.entry_point), None)
+        filesystem.chmod(self.path, 0o606)
+        self.assertEqual(self._manifest().get(self.entry_point), None)
+
+    def _save_entry(self, **changes):
+        self._save()
+        with open(self.path) as manifest_file:
+            data = json.load(manifest_file)
+        data["plugins"]["null"].update(changes)
+        with open(self.path, "w") as manifest_file:
+            json.dump(data, manifest_file)
+
+    def test_malformed_entry(self):
+        self._save_entry(hidden="no")
+        self.assertEqual(self._manifest().get(self.entry_point), None)
+        self._save_entry(interfaces="IInstaller")
+        self.assertEqual(self._manifest().get(self.entry_point), None)
+        self._save_entry(arguments=[["--null-x"]])
+        self.assertEqual(self._manifest().get(self.entry_point), None)
+
+    def test_malformed_arguments(self):
+        valid = [[["--null-x", "--null-y"], {"type": "int", "help": "x"}]]
+        self._save_entry(arguments=valid)
+        self.assertEqual(self._manifest().get(self.entry_point)["arguments"], valid)
+        for arguments in ([[["--config-dir"], {}]],
+                          [[[], {}]],
+                          [[["--null-x"], {"action": "version"}]],
+                          [[["--null-x"], {"type": "bool"}]],
+                          [[["--null-x"], {"dest": "config_dir"}]],
+                          [[["--null-x"], {"callback": "x"}]],
+                          [[["--null-x"], ["help"]]]):
+            self._save_entry(arguments=arguments)
+            self.assertEqual(self._manifest().get(self.entry_point), None)
+
+    def test_other_certbot_version(self):
+        self._save()
+        with mock.patch("certbot.plugins.disco.certbot.__version__", "0.0.0"):
+            self.assertEqual(self._manifest().get(self.entry_point), None)
+
+    def test_unreadable(self):
+        with open(self.path, "w") as manifest_file:
+            manifest_file.write("not json")
+        self.assertEqual(self._manifest().get(self.entry_point), None)
+        self._save()
+        with open(self.path) as manifest_file:
+            data = json.load(manifest_file)
+        self.assertEqual(data["certbot_version"], certbot.__version__)
+        self.assertEqual(list(data["plugins"]), ["null"])
+
+    @mock.patch("certbot.plugins.disco.logger")
+    def test_save_failure(self, mock_logger):
+        self.path = os.path.join(self.tempdir, "missing", "plugin-manifest.json")
+        self._save()
+        self.assertTrue(mock_logger.debug.called)
+        self.assertFalse(os.path.exists(self.path))
+
+
 if __name__ == "__main__":
     unittest.main()  # pragma: no cover
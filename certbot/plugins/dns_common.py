@@ -1,14 +1,24 @@
 """Common code for DNS Authenticator Plugins."""
 
 import abc
+import collections
+import hashlib
+import json
 import logging
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 from time import sleep
 
 import configobj
 import zope.interface
 
 from acme import challenges
+# pylint: disable=unused-import, no-name-in-module
+from acme.magic_typing import Any, Dict, List, Optional, Tuple
+# pylint: enable=unused-import, no-name-in-module
 
+from certbot import constants
 from certbot import errors
 from certbot import interfaces
 from certbot.compat import filesystem
@@ -16,6 +26,7 @@ from certbot.compat import os
 from certbot.display import ops
 from certbot.display import util as display_util
 from certbot.plugins import common
+from certbot.plugins import dns_common_propagation
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +36,12 @@ logger = logging.getLogger(__name__)
 class DNSAuthenticator(common.Plugin):
     """Base class for DNS  Authenticators"""
 
+    # Whether `_perform` and `_cleanup` can be called from several threads at once. Plugins
+    # setting it to True create and delete the records of several domains concurrently.
+    thread_safe = False
+    # The maximum number of records created or deleted at the same time.
+    max_concurrent_records = 10
+
     def __init__(self, config, name):
         super(DNSAuthenticator, self).__init__(config, name)
 
@@ -37,6 +54,18 @@ class DNSAuthenticator(common.Plugin):
             type=int,
             help='The number of seconds to wait for DNS to propagate before asking the ACME server '
                  'to verify the DNS record.')
+        add('propagation-check',
+            action='store_true',
+            default=False,
+            help='Query the authoritative nameservers of the zone until the DNS records are '
+                 'visible, instead of always waiting for the propagation seconds, which become the '
+                 'maximum wait. Requires dnspython.')
+        add('zone-cache-ttl',
+            default=0,
+            type=int,
+            help='The number of seconds during which the zones found for DNS records are '
+                 'remembered across runs. Zones created in the meantime may then not be used '
+                 'until the saved ones expire. By default, they are only remembered for one run.')
 
     def get_chall_pref(self, unused_domain):  # pylint: disable=missing-docstring,no-self-use
         return [challenges.DNS01]
@@ -49,32 +78,120 @@ class DNSAuthenticator(common.Plugin):
 
         self._attempt_cleanup = True
 
-        responses = []
-        for achall in achalls:
-            domain = achall.domain
-            validation_domain_name = achall.validation_domain_name(domain)
-            validation = achall.validation(achall.account_key)
+        zone_cache_ttl = self.conf('zone-cache-ttl')
+        if zone_cache_ttl > 0:
+            zone_cache.persist(
+                os.path.join(self.config.work_dir, constants.DNS_ZONE_CACHE_FILENAME),
+                zone_cache_ttl)
 
-            self._perform(domain, validation_domain_name, validation)
-            responses.append(achall.response(achall.account_key))
+        records = self._records(achalls)
+        self._for_each_record(self._perform, records, 'create')
+        responses = [achall.response(achall.account_key) for achall in achalls]
 
-        # DNS updates take time to propagate and checking to see if the update has occurred is not
-        # reliable (the machine this code is running on might be able to see an update before
-        # the ACME server). So: we sleep for a short amount of time we believe to be long enough.
-        logger.info("Waiting %d seconds for DNS changes to propagate",
-                    self.conf('propagation-seconds'))
-        sleep(self.conf('propagation-seconds'))
+        if self.conf('propagation-check'):
+            self._wait_for_propagation([(validation_domain_name, validation)
+                                        for _, validation_domain_name, validation in records])
+        else:
+            # DNS updates take time to propagate and checking to see if the update has occurred
+            # is not reliable (the machine this code is running on might be able to see an update
+            # before the ACME server). So: we sleep for a short amount of time we believe to be
+            # long enough.
+            logger.info("Waiting %d seconds for DNS changes to propagate",
+                        self.conf('propagation-seconds'))
+            sleep(self.conf('propagation-seconds'))
 
         return responses
 
+    def _wait_for_propagation(self, records):
+        """
+        Wait until DNS records are visible on the authoritative nameservers of their zone.
+
+        The propagation seconds are the maximum wait. If the nameservers cannot be checked, the
+        whole propagation delay is waited for.
+
+        :param list records: `tuple` of the name and content of each TXT record.
+        """
+        propagation_seconds = self.conf('propagation-seconds')
+        deadline = time.time() + propagation_seconds
+        logger.info("Waiting up to %d seconds for DNS changes to propagate", propagation_seconds)
+        try:
+            checker = dns_common_propagation.PropagationChecker()
+            if checker.wait(records, propagation_seconds):
+                logger.info("DNS changes are visible on all authoritative nameservers")
+                return
+        except errors.PluginError as e:
+            logger.warning("Unable to check DNS propagation: %s", e)
+        remaining = deadline - time.time()
+        if remaining > 0:
+            sleep(remaining)
+
     def cleanup(self, achalls):  # pylint: disable=missing-docstring
         if self._attempt_cleanup:
-            for achall in achalls:
-                domain = achall.domain
-                validation_domain_name = achall.validation_domain_name(domain)
-                validation = achall.validation(achall.account_key)
+            self._for_each_record(self._cleanup, self._records(achalls), 'delete')
 
-                self._cleanup(domain, validation_domain_name, validation)
+    @staticmethod
+    def _records(achalls):
+        """
+        List the DNS records needed by challenges.
+
+        :param list achalls: The `.achallenges.KeyAuthorizationAnnotatedChallenge` to answer.
+        :returns: `tuple` of the domain, validation domain name and validation of each challenge.
+        :rtype: list
+        """
+        records = []
+        for achall in achalls:
+            domain = achall.domain
+            validation_domain_name = achall.validation_domain_name(domain)
+            validation = achall.validation(achall.account_key)
+            records.append((domain, validation_domain_name, validation))
+        return records
+
+    def _for_each_record(self, func, records, action):
+        """
+        Call `_perform` or `_cleanup` for DNS records.
+
+        Records are processed one at a time, unless the plugin is `thread_safe`: they are then
+        processed concurrently, and the errors of all the records are reported together.
+
+        :param callable func: `_perform` or `_cleanup`.
+        :param list records: `tuple` of the arguments of ``func`` for each record.
+        :param str action: What ``func`` does to the records, for error messages.
+        :raises errors.PluginError: If ``func`` failed for several records.
+        """
+        if not self.thread_safe or len(records) < 2:
+            for record in records:
+                func(*record)
+            return
+
+        def _call(record):
+            try:
+                func(*record)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.debug('Unable to %s the DNS record of %s', action, record[0], exc_info=True)
+                return e
+            return None
+
+        workers = min(self.max_concurrent_records, len(records))
+        logger.debug('Processing %d DNS records with %d threads', len(records), workers)
+        pool = ThreadPool(workers)
+        try:
+            failures = pool.map(_call, records)
+        finally:
+            pool.close()
+            pool.join()
+
+        failed = [(record[0], error) for record, error in zip(records, failures)
+                  if error is not None]
+        if len(failed) == 1:
+            raise failed[0][1]
+        if failed:
+            errors_by_domain = collections.OrderedDict()  # type: Dict[str, List[str]]
+            for domain, error in failed:
+                errors_by_domain.setdefault(domain, []).append(str(error))
+            raise errors.PluginError('Unable to {0} the DNS records of {1} domains:\n * {2}'.format(
+                action, len(errors_by_domain),
+                '\n * '.join('{0}: {1}'.format(domain, '; '.join(domain_errors))
+                              for domain, domain_errors in errors_by_domain.items())))
 
     @abc.abstractmethod
     def _setup_credentials(self):  # pragma: no cover
@@ -236,6 +353,226 @@ class DNSAuthenticator(common.Plugin):
             raise errors.PluginError('{0} required to proceed.'.format(label))
 
 
+class ZoneCache(object):
+    """
+    Remembers the zones managing domain names, for each DNS provider account.
+
+    Zones are remembered for the exact domain they were looked up for, by name for providers
+    which can confirm cheaply that a domain belongs to a zone, or as the list of all the zones of
+    an account for providers which list them, so that a zone delegated below another zone is
+    still found. They are remembered until the end of the run, and across runs if the cache is
+    persisted. This class is thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._account_locks = {}  # type: Dict[str, threading.Lock]
+        # Maps account keys to domains to the zone ID and expiry time of their zone.
+        self._domains = {}  # type: Dict[str, Dict[str, Tuple[Any, Optional[float]]]]
+        # Maps account keys to the names of the zones found to their ID and expiry time.
+        self._zones = {}  # type: Dict[str, Dict[str, Tuple[Any, Optional[float]]]]
+        # Maps account keys to the names and IDs of all their zones, and the expiry time.
+        self._listings = {}  # type: Dict[str, Tuple[List[Tuple[str, Any]], Optional[float]]]
+        self._path = None  # type: Optional[str]
+        self._ttl = 0
+
+    def persist(self, path, ttl):
+        """
+        Load the zones found by previous runs, and save the new ones.
+
+        Failing to read or write the file is not an error: zones are then looked up again.
+
+        :param str path: The path to the cache file.
+        :param int ttl: The number of seconds during which saved zones are used.
+        """
+        try:
+            with open(path) as cache_file:
+                saved = json.load(cache_file)
+            domains = saved['domains']
+            zones = saved.get('zones', {})
+            listings = saved['listings']
+            now = time.time()
+            loaded_domains = dict(
+                (account, dict((domain, (zone_id, expiry))
+                               for domain, (zone_id, expiry) in account_domains.items()
+                               if expiry > now))
+                for account, account_domains in domains.items())
+            loaded_zones = dict(
+                (account, dict((name, (zone_id, expiry))
+                               for name, (zone_id, expiry) in account_zones.items()
+                               if expiry > now))
+                for account, account_zones in zones.items())
+            loaded_listings = dict(
+                (account, ([(name, zone_id) for name, zone_id in zones], expiry))
+                for account, (zones, expiry) in listings.items() if expiry > now)
+        except (IOError, ValueError, TypeError, KeyError, AttributeError) as e:
+            if os.path.exists(path):
+                logger.debug('Ignoring unreadable DNS zone cache %s: %s', path, e)
+            loaded_domains, loaded_zones, loaded_listings = {}, {}, {}
+        with self._lock:
+            self._path = path
+            self._ttl = ttl
+            for account, account_domains in loaded_domains.items():
+                for domain, entry in account_domains.items():
+                    self._domains.setdefault(account, {}).setdefault(domain, entry)
+            for account, account_zones in loaded_zones.items():
+                for name, entry in account_zones.items():
+                    self._zones.setdefault(account, {}).setdefault(name, entry)
+            for account, listing in loaded_listings.items():
+                self._listings.setdefault(account, listing)
+
+    def find_zone_id(self, provider, credentials, domain, find_zone, confirm_zone=None):
+        """
+        Find the zone managing a domain name, using the zone cached for it when possible.
+
+        :param str provider: The name of the DNS provider.
+        :param credentials: What identifies the account at the provider, such as a list of
+            credentials. They are only stored as a hash. If None, the zones of the account are
+            only cached until the end of the run.
+        :param str domain: The domain for which to find the zone.
+        :param callable find_zone: Called with ``domain`` if no zone is cached for it, returns
+            the name and ID of its zone.
+        :param callable confirm_zone: Called with ``domain`` and the name of the zone found for
+            another domain whose name is the longest suffix of ``domain``, returns whether it is
+            also the zone of ``domain``. Zones found for other domains are not used if None.
+        :returns: The ID of the zone.
+        :raises certbot.errors.PluginError: as raised by ``find_zone`` or ``confirm_zone``.
+        """
+        account = _account_key(provider, credentials)
+        with self._account_lock(account):
+            now = time.time()
+            with self._lock:
+                entry = self._domains.get(account, {}).get(_normalize(domain))
+                zones = [(name, zone_id)
+                         for name, (zone_id, expiry) in self._zones.get(account, {}).items()
+                         if expiry is None or expiry > now]
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                logger.debug('Using cached zone %s for %s', entry[0], domain)
+                return entry[0]
+
+            zone = _longest_matching_zone(domain, zones) if confirm_zone else None
+            if zone is not None and confirm_zone(domain, zone[0]):
+                logger.debug('Using cached zone %s for %s', zone[1], domain)
+                zone_name, zone_id = zone
+            else:
+                zone_name, zone_id = find_zone(domain)
+            expiry = self._expiry(credentials)
+            with self._lock:
+                self._domains.setdefault(account, {})[_normalize(domain)] = (zone_id, expiry)
+                self._zones.setdefault(account, {})[_normalize(zone_name)] = (zone_id, expiry)
+            if expiry is not None:
+                self._save()
+            return zone_id
+
+    def find_zone_id_in_listing(self, provider, credentials, domain, list_zones):
+        """
+        Find the zone managing a domain name among all the zones of an account.
+
+        The zone is the one whose name is the longest suffix of the domain. The zones are only
+        listed if they are not cached, or if none of the cached zones matches the domain.
+
+        :param str provider: The name of the DNS provider.
+        :param credentials: What identifies the account at the provider, see `find_zone_id`.
+        :param str domain: The domain for which to find the zone.
+        :param callable list_zones: Called without arguments, returns the name and ID of each
+            zone of the account.
+        :returns: The ID of the zone, or None if no zone of the account matches the domain.
+        :raises certbot.errors.PluginError: as raised by ``list_zones``.
+        """
+        account = _account_key(provider, credentials)
+        with self._account_lock(account):
+            now = time.time()
+            with self._lock:
+                listing = self._listings.get(account)
+            if listing is not None and (listing[1] is None or listing[1] > now):
+                zone = _longest_matching_zone(domain, listing[0])
+                if zone is not None:
+                    logger.debug('Using cached zone %s for %s', zone[1], domain)
+                    return zone[1]
+
+            zones = [(name, zone_id) for name, zone_id in list_zones()]
+            expiry = self._expiry(credentials)
+            with self._lock:
+                self._listings[account] = (zones, expiry)
+            if expiry is not None:
+                self._save()
+            zone = _longest_matching_zone(domain, zones)
+            return zone[1] if zone is not None else None
+
+    def _account_lock(self, account):
+        """Concurrent lookups for the same account wait for the first one to fill the cache."""
+        with self._lock:
+            return self._account_locks.setdefault(account, threading.Lock())
+
+    def _expiry(self, credentials):
+        with self._lock:
+            if self._path is not None and credentials is not None:
+                return time.time() + self._ttl
+        return None
+
+    def _save(self):
+        """Write the zones found with persistent credentials to the cache file."""
+        with self._lock:
+            saved = {
+                'domains': {},
+                'zones': {},
+                'listings': {},
+            }  # type: Dict[str, Dict[str, Any]]
+            for account, domains in self._domains.items():
+                for domain, entry in domains.items():
+                    if entry[1] is not None:
+                        saved['domains'].setdefault(account, {})[domain] = entry
+            for account, zones in self._zones.items():
+                for name, entry in zones.items():
+                    if entry[1] is not None:
+                        saved['zones'].setdefault(account, {})[name] = entry
+            for account, listing in self._listings.items():
+                if listing[1] is not None:
+                    saved['listings'][account] = listing
+            temp_path = self._path + '.new'
+            try:
+                with os.fdopen(filesystem.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                                               0o600), 'w') as cache_file:
+                    json.dump(saved, cache_file, indent=1, sort_keys=True)
+                filesystem.replace(temp_path, self._path)
+            except (IOError, OSError) as e:
+                logger.debug('Could not write DNS zone cache %s: %s', self._path, e)
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+
+def _longest_matching_zone(domain, zones):
+    """
+    Find the zone whose name is the longest suffix of a domain.
+
+    :param str domain: The domain name.
+    :param list zones: The name and ID of each zone.
+    :returns: The name and ID of the zone, or None if no zone matches.
+    :rtype: tuple
+    """
+    zone_ids = dict((_normalize(name), zone_id) for name, zone_id in zones)
+    for guess in base_domain_name_guesses(_normalize(domain)):
+        if guess in zone_ids:
+            return guess, zone_ids[guess]
+    return None
+
+
+def _account_key(provider, credentials):
+    """Identify a DNS provider account without storing its credentials."""
+    if credentials is None:
+        return provider
+    digest = hashlib.sha256(json.dumps([provider, credentials]).encode('utf-8')).hexdigest()
+    return '{0}:{1}'.format(provider, digest)
+
+
+def _normalize(domain):
+    return domain.rstrip('.').lower()
+
+
+zone_cache = ZoneCache()
+"""The zone cache shared by all the DNS Authenticators of the process."""
+
+
 class CredentialsConfiguration(object):
     """Represents a user-supplied filed which stores API credentials."""
 
@@ -0,0 +1,181 @@
+"""Active checks of the propagation of DNS records for DNS Authenticator Plugins."""
+import logging
+import socket
+import time
+from multiprocessing.pool import ThreadPool
+
+from acme.magic_typing import Dict, List, Tuple  # pylint: disable=unused-import,no-name-in-module
+from certbot import errors
+
+# dnspython is not declared as a dependency in Certbot itself, but in
+# the Certbot plugins needing it. So we catch import error here to allow
+# this module to be always importable, active propagation checks are
+# then unavailable.
+try:
+    import dns.exception
+    import dns.message
+    import dns.query
+    import dns.rcode
+    import dns.rdatatype
+    import dns.resolver
+except ImportError:  # pragma: no cover
+    dns = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# The maximum number of CNAME records followed from the name of a TXT record.
+_MAX_CNAME_CHAIN = 8
+
+
+class PropagationChecker(object):
+    """
+    Waits for TXT records to be visible on the authoritative nameservers of their zone.
+
+    Each nameserver is queried directly, so that caching resolvers do not hide a record that
+    was just created. Queries for all the records and nameservers are sent concurrently, and
+    repeated with an exponential backoff until every record is visible everywhere.
+    """
+
+    def __init__(self, query_timeout=5.0, initial_delay=1.0, max_delay=16.0, workers=10):
+        """
+        :param float query_timeout: The timeout of each DNS query, in seconds.
+        :param float initial_delay: The delay before querying the nameservers again, in seconds.
+        :param float max_delay: The maximum delay between two rounds of queries, in seconds.
+        :param int workers: The maximum number of queries sent at the same time.
+        :raises errors.PluginError: If dnspython is not available.
+        """
+        if dns is None:
+            raise errors.PluginError('dnspython is required to check DNS propagation.')
+
+        self.query_timeout = query_timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.workers = workers
+        self._resolver = dns.resolver.Resolver()
+        self._resolver.lifetime = query_timeout
+        self._nameservers = {}  # type: Dict[str, List[str]]
+
+    def wait(self, records, max_wait):
+        """
+        Wait until TXT records are visible on the authoritative nameservers of their zone.
+
+        :param list records: `tuple` of the name and content of each TXT record.
+        :param float max_wait: The maximum time to wait, in seconds.
+        :returns: True if all the records are visible, False if the time ran out first.
+        :rtype: bool
+        :raises errors.PluginError: If the authoritative nameservers of a record cannot be found.
+        """
+        deadline = time.time() + max_wait
+        pending = []  # type: List[Tuple[str, str, str]]
+        for name, content in records:
+            name = self._canonical_name(name)
+            pending.extend((name, content, address)
+                           for address in self._authoritative_addresses(name))
+        delay = self.initial_delay
+
+        pool = ThreadPool(min(self.workers, len(pending)) or 1)
+        try:
+            while pending:
+                visible = pool.map(self._visible, pending)
+                pending = [query for query, ok in zip(pending, visible) if not ok]
+                if not pending:
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logger.debug('TXT records still missing on their nameservers: %s', pending)
+                    return False
+                logger.debug('Waiting for %d TXT records to propagate, checking again in %.1f '
+                             'seconds', len(pending), min(delay, remaining))
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, self.max_delay)
+        finally:
+            pool.close()
+            pool.join()
+        return True
+
+    def _canonical_name(self, name):
+        """
+        Follow the CNAME records of a name, e.g. of a validation name delegated to another zone.
+
+        The ACME server follows them too, so the TXT record must be visible on the nameservers
+        of the zone of the name they lead to.
+
+        :param str name: The name of a TXT record.
+        :returns: The name the CNAME records lead to, or the name itself if it has none.
+        :rtype: str
+        """
+        for _ in range(_MAX_CNAME_CHAIN):
+            try:
+                answer = self._resolver.query(name, dns.rdatatype.CNAME)
+            except dns.exception.DNSException:
+                return name
+            target = answer[0].target.to_text()
+            logger.info('%s is an alias of %s, checking the propagation of its TXT record there',
+                        name, target)
+            name = target
+        return name
+
+    def _authoritative_addresses(self, name):
+        """
+        Find the addresses of the authoritative nameservers of the zone of a name.
+
+        :param str name: The name of a TXT record.
+        :returns: The IP addresses of the nameservers.
+        :rtype: `list` of `str`
+        :raises errors.PluginError: If they cannot be found.
+        """
+        try:
+            zone = dns.resolver.zone_for_name(name, resolver=self._resolver).to_text()
+            if zone not in self._nameservers:
+                addresses = []  # type: List[str]
+                for nameserver in self._resolver.query(zone, dns.rdatatype.NS):
+                    addresses.extend(self._addresses(nameserver.target))
+                if not addresses:
+                    raise errors.PluginError('No address found for the nameservers of {0}.'
+                                             .format(zone))
+                self._nameservers[zone] = addresses
+        except dns.exception.DNSException as e:
+            raise errors.PluginError('Unable to find the nameservers of {0}: {1}'
+                                     .format(name, e))
+        return self._nameservers[zone]
+
+    def _addresses(self, host):
+        """
+        Resolve the IPv4 addresses of a host, or its IPv6 addresses if it has none.
+
+        :param dns.name.Name host: The name of the host.
+        :rtype: `list` of `str`
+        """
+        for rdtype in (dns.rdatatype.A, dns.rdatatype.AAAA):
+            try:
+                return [rdata.address for rdata in self._resolver.query(host, rdtype)]
+            except dns.exception.DNSException:
+                logger.debug('No %s record for nameserver %s', dns.rdatatype.to_text(rdtype),
+                             host, exc_info=True)
+        return []
+
+    def _visible(self, query):
+        """
+        Check whether a nameserver serves a TXT record.
+
+        :param tuple query: The name and content of the record, and the address of the
+            nameserver.
+        :rtype: bool
+        """
+        name, content, address = query
+        request = dns.message.make_query(name, dns.rdatatype.TXT)
+        try:
+            response = dns.query.udp(request, address, timeout=self.query_timeout)
+        except (dns.exception.DNSException, socket.error) as e:
+            logger.debug('Error querying %s for %s: %s', address, name, e)
+            return False
+
+        if response.rcode() != dns.rcode.NOERROR:
+            return False
+        for rrset in response.answer:
+            if rrset.rdtype != dns.rdatatype.TXT:
+                continue
+            for rdata in rrset:
+                if b''.join(rdata.strings).decode('utf-8', 'replace') == content:
+                    return True
+        return False
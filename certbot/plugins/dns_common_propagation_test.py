@@ -0,0 +1,141 @@
+"""Tests for certbot.plugins.dns_common_propagation."""
+
+import socket
+import unittest
+
+import dns.exception
+import dns.message
+import dns.name
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.rrset
+import mock
+
+from certbot import errors
+
+NAME = '_acme-challenge.example.com'
+OTHER_NAME = '_acme-challenge.www.example.com'
+
+
+def _response(name, *contents, **kwargs):
+    request = dns.message.make_query(name, dns.rdatatype.TXT)
+    response = dns.message.make_response(request)
+    response.set_rcode(kwargs.get('rcode', dns.rcode.NOERROR))
+    if contents:
+        response.answer.append(dns.rrset.from_text(
+            name, 300, 'IN', 'TXT', *['"{0}"'.format(content) for content in contents]))
+    return response
+
+
+class PropagationCheckerTest(unittest.TestCase):
+    # pylint: disable=protected-access
+
+    def setUp(self):
+        from certbot.plugins.dns_common_propagation import PropagationChecker
+
+        self.checker = PropagationChecker(initial_delay=1, max_delay=2)
+        self.checker._resolver = mock.MagicMock()
+        self.checker._resolver.query.side_effect = self._query
+
+        self.zone_for_name = mock.patch('dns.resolver.zone_for_name').start()
+        self.zone_for_name.return_value = dns.name.from_text('example.com')
+        self.udp = mock.patch('dns.query.udp').start()
+        self.time = mock.patch('certbot.plugins.dns_common_propagation.time').start()
+        self.time.time.return_value = 0
+        self.addCleanup(mock.patch.stopall)
+
+    @staticmethod
+    def _query(name, rdtype):
+        if rdtype == dns.rdatatype.NS:
+            return [mock.MagicMock(target=dns.name.from_text('ns1.example.com')),
+                    mock.MagicMock(target=dns.name.from_text('ns2.example.com'))]
+        if rdtype == dns.rdatatype.A and name == dns.name.from_text('ns1.example.com'):
+            return [mock.MagicMock(address='192.0.2.1')]
+        if rdtype == dns.rdatatype.AAAA and name == dns.name.from_text('ns2.example.com'):
+            return [mock.MagicMock(address='2001:db8::2')]
+        raise dns.resolver.NoAnswer()
+
+    def test_visible(self):
+        self.udp.side_effect = lambda request, address, timeout: _response(
+            request.question[0].name.to_text(), 'other', 'validation')
+
+        self.assertTrue(self.checker.wait([(NAME, 'validation'), (OTHER_NAME, 'validation')], 60))
+
+        queried = sorted((args[0].question[0].name.to_text(), args[1])
+                         for args, _ in self.udp.call_args_list)
+        self.assertEqual(queried, [(NAME + '.', '192.0.2.1'), (NAME + '.', '2001:db8::2'),
+                                   (OTHER_NAME + '.', '192.0.2.1'),
+                                   (OTHER_NAME + '.', '2001:db8::2')])
+        self.assertFalse(self.time.sleep.called)
+        # The nameservers of the zone are only looked up once, after the CNAME of each name
+        self.assertEqual(self.checker._resolver.query.call_count, 6)
+
+    def test_cname(self):
+        alias = '_acme-challenge.example.net.'
+
+        def _query(name, rdtype):
+            if rdtype == dns.rdatatype.CNAME and name == NAME:
+                return [mock.MagicMock(target=dns.name.from_text(alias))]
+            return self._query(name, rdtype)
+        self.checker._resolver.query.side_effect = _query
+        self.zone_for_name.return_value = dns.name.from_text('example.net')
+        self.udp.side_effect = lambda request, address, timeout: _response(
+            request.question[0].name.to_text(), 'validation')
+
+        with mock.patch('certbot.plugins.dns_common_propagation.logger') as mock_logger:
+            self.assertTrue(self.checker.wait([(NAME, 'validation')], 60))
+
+        self.zone_for_name.assert_called_once_with(alias, resolver=self.checker._resolver)
+        queried = sorted(args[0].question[0].name.to_text() for args, _ in self.udp.call_args_list)
+        self.assertEqual(queried, [alias, alias])
+        self.assertTrue(mock_logger.info.called)
+
+    def test_backoff(self):
+        responses = {
+            '192.0.2.1': [_response(NAME), _response(NAME, 'validation')],
+            '2001:db8::2': [socket.error(), dns.exception.Timeout(),
+                            _response(NAME, rcode=dns.rcode.NXDOMAIN),
+                            _response(NAME, 'validation')],
+        }
+
+        def _udp(unused_request, address, timeout):
+            response = responses[address].pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        self.udp.side_effect = _udp
+
+        self.assertTrue(self.checker.wait([(NAME, 'validation')], 60))
+
+        self.assertEqual([args[0] for args, _ in self.time.sleep.call_args_list], [1, 2, 2])
+
+    def test_timeout(self):
+        self.time.time.side_effect = [0, 5, 10, 15]
+        self.udp.return_value = _response(NAME, 'other')
+
+        self.assertFalse(self.checker.wait([(NAME, 'validation')], 12))
+
+        self.assertEqual([args[0] for args, _ in self.time.sleep.call_args_list], [1, 2])
+
+    def test_no_nameserver_address(self):
+        self.checker._resolver.query.side_effect = lambda name, rdtype: (
+            [mock.MagicMock(target=dns.name.from_text('ns3.example.com'))]
+            if rdtype == dns.rdatatype.NS else self._query(name, rdtype))
+
+        self.assertRaises(errors.PluginError, self.checker.wait, [(NAME, 'validation')], 60)
+
+    def test_no_zone(self):
+        self.zone_for_name.side_effect = dns.resolver.NoRootSOA()
+
+        self.assertRaises(errors.PluginError, self.checker.wait, [(NAME, 'validation')], 60)
+
+    @mock.patch('certbot.plugins.dns_common_propagation.dns', None)
+    def test_no_dnspython(self):
+        from certbot.plugins.dns_common_propagation import PropagationChecker
+
+        self.assertRaises(errors.PluginError, PropagationChecker)
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
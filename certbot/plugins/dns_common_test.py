@@ -1,17 +1,21 @@
 """Tests for certbot.plugins.dns_common."""
 
 import collections
+import json
 import logging
 import unittest
 
 import mock
 
+from certbot import achallenges
 from certbot import errors
 from certbot import util
+from certbot.compat import filesystem
 from certbot.compat import os
 from certbot.display import util as display_util
 from certbot.plugins import dns_common
 from certbot.plugins import dns_test_common
+from certbot.tests import acme_util
 from certbot.tests import util as test_util
 
 
@@ -28,6 +32,8 @@ class DNSAuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthen
 
     class _FakeConfig(object):
         fake_propagation_seconds = 0
+        fake_propagation_check = False
+        fake_zone_cache_ttl = 0
         fake_config_key = 1
         fake_other_key = None
         fake_file_path = None
@@ -44,6 +50,57 @@ class DNSAuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthen
 
         self.auth._perform.assert_called_once_with(dns_test_common.DOMAIN, mock.ANY, mock.ANY)
 
+    @mock.patch('certbot.plugins.dns_common.dns_common_propagation.PropagationChecker')
+    @mock.patch('certbot.plugins.dns_common.sleep')
+    def test_perform_propagation_check(self, mock_sleep, mock_checker):
+        self.config.fake_propagation_check = True
+        self.config.fake_propagation_seconds = 60
+        mock_checker.return_value.wait.return_value = True
+
+        self.auth.perform([self.achall])
+
+        mock_checker.return_value.wait.assert_called_once_with(
+            [(self.achall.validation_domain_name(dns_test_common.DOMAIN),
+              self.achall.validation(self.achall.account_key))], 60)
+        self.assertFalse(mock_sleep.called)
+
+    @mock.patch('certbot.plugins.dns_common.dns_common_propagation.PropagationChecker')
+    @mock.patch('certbot.plugins.dns_common.time')
+    @mock.patch('certbot.plugins.dns_common.sleep')
+    def test_perform_propagation_check_failure(self, mock_sleep, mock_time, mock_checker):
+        self.config.fake_propagation_check = True
+        self.config.fake_propagation_seconds = 60
+        mock_time.time.side_effect = [100, 110]
+        mock_checker.return_value.wait.side_effect = errors.PluginError('no nameservers')
+
+        self.auth.perform([self.achall])
+
+        # The rest of the propagation delay is waited for
+        mock_sleep.assert_called_once_with(50)
+
+    @mock.patch('certbot.plugins.dns_common.dns_common_propagation.PropagationChecker')
+    @mock.patch('certbot.plugins.dns_common.time')
+    @mock.patch('certbot.plugins.dns_common.sleep')
+    def test_perform_propagation_check_timeout(self, mock_sleep, mock_time, mock_checker):
+        self.config.fake_propagation_check = True
+        self.config.fake_propagation_seconds = 60
+        mock_time.time.side_effect = [100, 160]
+        mock_checker.return_value.wait.return_value = False
+
+        self.auth.perform([self.achall])
+
+        self.assertFalse(mock_sleep.called)
+
+    @mock.patch('certbot.plugins.dns_common.zone_cache')
+    def test_perform_zone_cache(self, mock_zone_cache):
+        self.config.fake_zone_cache_ttl = 3600
+        self.config.work_dir = self.tempdir
+
+        self.auth.perform([self.achall])
+
+        mock_zone_cache.persist.assert_called_once_with(
+            os.path.join(self.tempdir, 'dns-zone-cache.json'), 3600)
+
     def test_cleanup(self):
         self.auth._attempt_cleanup = True
 
@@ -51,6 +108,65 @@ class DNSAuthenticatorTest(test_util.TempDirTestCase, dns_test_common.BaseAuthen
 
         self.auth._cleanup.assert_called_once_with(dns_test_common.DOMAIN, mock.ANY, mock.ANY)
 
+    def _concurrent_achalls(self):
+        self.auth.thread_safe = True
+        self.auth._perform = mock.MagicMock()
+        self.auth._cleanup = mock.MagicMock()
+        return [achallenges.KeyAuthorizationAnnotatedChallenge(
+            challb=acme_util.DNS01, domain=domain, account_key=dns_test_common.KEY)
+                for domain in ('a.example.com', 'b.example.com', 'c.example.com')]
+
+    def test_perform_concurrent(self):
+        achalls = self._concurrent_achalls()
+        self.auth.max_concurrent_records = 2
+
+        responses = self.auth.perform(achalls)
+
+        self.assertEqual(responses, [achall.response(achall.account_key) for achall in achalls])
+        self.assertEqual(sorted(args[0] for args, _ in self.auth._perform.call_args_list),
+                         ['a.example.com', 'b.example.com', 'c.example.com'])
+
+    def test_perform_concurrent_error(self):
+        achalls = self._concurrent_achalls()
+        error = errors.PluginError('API error')
+        self.auth._perform.side_effect = lambda domain, *args: (
+            None if domain != 'b.example.com' else self._raise(error))
+
+        with self.assertRaises(errors.PluginError) as context:
+            self.auth.perform(achalls)
+
+        # A single error is raised as is, after all the records were processed
+        self.assertTrue(context.exception is error)
+        self.assertEqual(self.auth._perform.call_count, 3)
+
+    def test_cleanup_concurrent_errors(self):
+        achalls = self._concurrent_achalls()
+        self.auth._attempt_cleanup = True
+        self.auth._cleanup.side_effect = lambda domain, *args: (
+            None if domain == 'b.example.com' else self._raise(ValueError(domain + ' failed')))
+
+        with self.assertRaises(errors.PluginError) as context:
+            self.auth.cleanup(achalls)
+
+        self.assertEqual(str(context.exception),
+                         'Unable to delete the DNS records of 2 domains:\n'
+                         ' * a.example.com: a.example.com failed\n'
+                         ' * c.example.com: c.example.com failed')
+        self.assertEqual(self.auth._cleanup.call_count, 3)
+
+    def test_perform_sequential_error(self):
+        achalls = self._concurrent_achalls()
+        self.auth.thread_safe = False
+        self.auth._perform.side_effect = errors.PluginError('API error')
+
+        self.assertRaises(errors.PluginError, self.auth.perform, achalls)
+
+        self.assertEqual(self.auth._perform.call_count, 1)
+
+    @staticmethod
+    def _raise(error):
+        raise error
+
     @test_util.patch_get_utility()
     def test_prompt(self, mock_get_utility):
         mock_display = mock_get_utility()
@@ -226,5 +342,165 @@ class DomainNameGuessTest(unittest.TestCase):
         )
 
 
+class ZoneCacheTest(test_util.TempDirTestCase):
+    # pylint: disable=protected-access
+
+    def setUp(self):
+        super(ZoneCacheTest, self).setUp()
+
+        self.cache = dns_common.ZoneCache()
+        self.path = os.path.join(self.tempdir, 'dns-zone-cache.json')
+        self.find_zone = mock.MagicMock(return_value=('Example.com.', 'zone-id'))
+        self.list_zones = mock.MagicMock(return_value=[('example.com', 'zone-id'),
+                                                        ('sub.example.com.', 'sub-zone-id')])
+
+    def _find(self, domain, credentials=('user', 'secret'), provider='fake'):
+        return self.cache.find_zone_id(provider, list(credentials), domain, self.find_zone)
+
+    def _saved(self):
+        with open(self.path) as cache_file:
+            return json.load(cache_file)
+
+    def _find_in_listing(self, domain, credentials=('user', 'secret')):
+        return self.cache.find_zone_id_in_listing('listing', list(credentials), domain,
+                                                  self.list_zones)
+
+    def test_exact_hit(self):
+        self.assertEqual(self._find('_acme-challenge.www.example.com'), 'zone-id')
+        self.assertEqual(self._find('_acme-challenge.WWW.example.com.'), 'zone-id')
+
+        self.find_zone.assert_called_once_with('_acme-challenge.www.example.com')
+
+    def test_delegated_subzone(self):
+        self.assertEqual(self._find('_acme-challenge.example.com'), 'zone-id')
+        self.find_zone.return_value = ('sub.example.com', 'sub-zone-id')
+
+        self.assertEqual(self._find('_acme-challenge.sub.example.com'), 'sub-zone-id')
+        self.assertEqual(self.find_zone.call_count, 2)
+
+    def test_confirmed_zone(self):
+        confirm_zone = mock.MagicMock(side_effect=lambda domain, zone: 'sub.' not in domain)
+        find = lambda domain: self.cache.find_zone_id('fake', ['user', 'secret'], domain,
+                                                      self.find_zone, confirm_zone)
+        self.assertEqual(find('_acme-challenge.example.com'), 'zone-id')
+        self.assertFalse(confirm_zone.called)
+
+        # The zone found for another domain is used once confirmed
+        self.assertEqual(find('_acme-challenge.www.example.com'), 'zone-id')
+        confirm_zone.assert_called_once_with('_acme-challenge.www.example.com', 'example.com')
+        self.assertEqual(self.find_zone.call_count, 1)
+
+        self.find_zone.return_value = ('sub.example.com', 'sub-zone-id')
+        self.assertEqual(find('_acme-challenge.sub.example.com'), 'sub-zone-id')
+        self.assertEqual(find('_acme-challenge.a.sub.example.com'), 'sub-zone-id')
+        self.assertEqual(confirm_zone.call_args[0], ('_acme-challenge.a.sub.example.com',
+                                                     'sub.example.com'))
+        self.assertEqual(self.find_zone.call_count, 3)
+
+        # Without confirmation, only the exact domain is cached
+        self.assertEqual(self._find('_acme-challenge.mail.example.com'), 'sub-zone-id')
+        self.assertEqual(self.find_zone.call_count, 4)
+
+    def test_accounts_separated(self):
+        self._find('_acme-challenge.example.com')
+        self._find('_acme-challenge.example.com', credentials=('other', 'secret'))
+        self._find('_acme-challenge.example.com', provider='other')
+
+        self.assertEqual(self.find_zone.call_count, 3)
+
+    def test_errors_not_cached(self):
+        self.find_zone.side_effect = errors.PluginError
+        self.assertRaises(errors.PluginError, self._find, '_acme-challenge.example.com')
+        self.find_zone.side_effect = None
+
+        self.assertEqual(self._find('_acme-challenge.example.com'), 'zone-id')
+
+    def test_listing(self):
+        self.assertEqual(self._find_in_listing('_acme-challenge.www.example.com'), 'zone-id')
+        self.assertEqual(self._find_in_listing('_acme-challenge.sub.example.com'),
+                         'sub-zone-id')
+        self.assertEqual(self._find_in_listing('_acme-challenge.a.sub.EXAMPLE.com.'),
+                         'sub-zone-id')
+
+        self.assertEqual(self.list_zones.call_count, 1)
+
+    def test_listing_miss(self):
+        self.assertEqual(self._find_in_listing('_acme-challenge.example.com'), 'zone-id')
+        self.list_zones.return_value = [('example.org.', 'org-zone-id')]
+
+        # Zones created since the listing are found
+        self.assertEqual(self._find_in_listing('_acme-challenge.example.org'), 'org-zone-id')
+        self.assertEqual(self._find_in_listing('_acme-challenge.example.net'), None)
+        self.assertEqual(self.list_zones.call_count, 3)
+
+    def test_not_persisted_by_default(self):
+        self._find('_acme-challenge.example.com')
+        self._find_in_listing('_acme-challenge.example.com')
+
+        self.assertFalse(os.path.exists(self.path))
+
+    @mock.patch('certbot.plugins.dns_common.time')
+    def test_persist(self, mock_time):
+        mock_time.time.return_value = 1000
+        self.cache.persist(self.path, 60)
+        self._find('_acme-challenge.example.com')
+        self._find_in_listing('_acme-challenge.example.com')
+        self.cache.find_zone_id('memory', None, '_acme-challenge.example.org', self.find_zone)
+
+        saved = self._saved()
+        self.assertEqual(list(saved['domains'].values()),
+                         [{'_acme-challenge.example.com': ['zone-id', 1060]}])
+        self.assertEqual(list(saved['zones'].values()), [{'example.com': ['zone-id', 1060]}])
+        self.assertEqual(list(saved['listings'].values()),
+                         [[[['example.com', 'zone-id'], ['sub.example.com.', 'sub-zone-id']],
+                           1060]])
+        self.assertFalse('user' in json.dumps(saved))
+        self.assertTrue(filesystem.check_mode(self.path, 0o600))
+
+        cache = dns_common.ZoneCache()
+        cache.persist(self.path, 60)
+        self.assertEqual(cache.find_zone_id('fake', ['user', 'secret'],
+                                            '_acme-challenge.example.com', self.find_zone),
+                         'zone-id')
+        self.assertEqual(cache.find_zone_id_in_listing(
+            'listing', ['user', 'secret'], '_acme-challenge.sub.example.com', self.list_zones),
+                         'sub-zone-id')
+        self.assertEqual(cache.find_zone_id('fake', ['user', 'secret'],
+                                            '_acme-challenge.www.example.com', self.find_zone,
+                                            lambda domain, zone: True),
+                         'zone-id')
+        self.assertEqual(self.find_zone.call_count, 2)
+        self.assertEqual(self.list_zones.call_count, 1)
+
+        mock_time.time.return_value = 1060
+        cache = dns_common.ZoneCache()
+        cache.persist(self.path, 60)
+        cache.find_zone_id('fake', ['user', 'secret'], '_acme-challenge.example.com',
+                           self.find_zone)
+        cache.find_zone_id_in_listing('listing', ['user', 'secret'], '_acme-challenge.example.com',
+                                      self.list_zones)
+        self.assertEqual(self.find_zone.call_count, 3)
+        self.assertEqual(self.list_zones.call_count, 2)
+
+    def test_persist_unreadable(self):
+        for content in ('not json', '{"example.com": ["zone-id", 1060]}', '[]'):
+            with open(self.path, 'w') as cache_file:
+                cache_file.write(content)
+
+            self.cache.persist(self.path, 60)
+
+        self.assertEqual(self._find('_acme-challenge.example.com'), 'zone-id')
+        self.assertEqual(list(self._saved()['domains'].values()),
+                         [{'_acme-challenge.example.com': ['zone-id', mock.ANY]}])
+
+    @mock.patch('certbot.plugins.dns_common.filesystem.replace')
+    def test_persist_write_failure(self, mock_replace):
+        mock_replace.side_effect = OSError
+        self.cache.persist(self.path, 60)
+
+        self.assertEqual(self._find('_acme-challenge.example.com'), 'zone-id')
+        self.assertEqual(os.listdir(self.tempdir), [])
+
+
 if __name__ == "__main__":
     unittest.main()  # pragma: no cover
@@ -9,6 +9,7 @@ from acme import challenges
 
 from certbot import achallenges
 from certbot.compat import filesystem
+from certbot.plugins import dns_common
 from certbot.tests import acme_util
 from certbot.tests import util as test_util
 
@@ -45,6 +46,29 @@ class BaseAuthenticatorTest(object):
         m.assert_any_call('propagation-seconds', type=int, default=mock.ANY, help=mock.ANY)
 
 
+def default_options(name):
+    """Default values of the options added by DNSAuthenticator.
+
+    Mock configurations return a truthy mock for any option they are not given, so tests of
+    plugins using them must set these options explicitly.
+
+    :param str name: The name of the plugin.
+    :returns: The keyword arguments setting the options on a mock configuration.
+    :rtype: dict
+    """
+    return {name + '_propagation_check': False, name + '_zone_cache_ttl': 0}
+
+
+def patch_zone_cache(test_case):
+    """Give a test its own, empty, zone cache.
+
+    :param unittest.TestCase test_case: The test.
+    """
+    patcher = mock.patch('certbot.plugins.dns_common.zone_cache', dns_common.ZoneCache())
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
+
+
 def write(values, path):
     """Write the specified values to a config file.
 
@@ -2,24 +2,36 @@
 from __future__ import print_function
 
 import copy
+import datetime
 import itertools
 import logging
+import multiprocessing
 import random
+import signal
 import sys
+import threading
 import time
 import traceback
+from multiprocessing.pool import ThreadPool
 
 import OpenSSL
+import pytz
 import six
 import zope.component
+import zope.component.hooks
+import zope.interface.registry
 
-from acme.magic_typing import List  # pylint: disable=unused-import, no-name-in-module
+# pylint: disable=unused-import, no-name-in-module
+from acme.magic_typing import Any, Dict, List, Optional, Tuple
+# pylint: enable=unused-import, no-name-in-module
 
 from certbot import cli
 from certbot import crypto_util
 from certbot import errors
 from certbot import hooks
 from certbot import interfaces
+from certbot import key_pool
+from certbot import lineage_index
 from certbot import storage
 from certbot import updater
 from certbot import util
@@ -34,7 +46,8 @@ logger = logging.getLogger(__name__)
 # the renewal configuration process loses this information.
 STR_CONFIG_ITEMS = ["config_dir", "logs_dir", "work_dir", "user_agent",
                     "server", "account", "authenticator", "installer",
-                    "renew_hook", "pre_hook", "post_hook", "http01_address"]
+                    "renew_hook", "pre_hook", "post_hook", "http01_address",
+                    "key_type", "elliptic_curve"]
 INT_CONFIG_ITEMS = ["rsa_key_size", "http01_port"]
 BOOL_CONFIG_ITEMS = ["must_staple", "allow_subset_of_names", "reuse_key",
                      "autorenew"]
@@ -42,6 +55,9 @@ BOOL_CONFIG_ITEMS = ["must_staple", "allow_subset_of_names", "reuse_key",
 CONFIG_ITEMS = set(itertools.chain(
     BOOL_CONFIG_ITEMS, INT_CONFIG_ITEMS, STR_CONFIG_ITEMS, ('pref_challs',)))
 
+_OCSP_DEADLINE = 60
+"""Seconds the OCSP checks of the lineages that are not due may take."""
+
 
 def _reconstitute(config, full_path):
     """Try to instantiate a RenewableCert, updating config with relevant items.
@@ -294,17 +310,25 @@ def _avoid_invalidating_lineage(config, lineage, original_server):
                     "unless you use the --break-my-certs flag!".format(names))
 
 
-def renew_cert(config, domains, le_client, lineage):
-    "Renew a certificate lineage."
+def renew_cert(config, domains, le_client, lineage, prepared_key=None):
+    """Renew a certificate lineage.
+
+    ``prepared_key`` is a key and a CSR for the names of the lineage
+    generated in advance, see `.Client.obtain_certificate`.
+
+    """
     renewal_params = lineage.configuration["renewalparams"]
     original_server = renewal_params.get("server", cli.flag_default("server"))
     _avoid_invalidating_lineage(config, lineage, original_server)
     if not domains:
         domains = lineage.names()
+    elif domains != lineage.names():
+        prepared_key = None
     # The private key is the existing lineage private key if reuse_key is set.
     # Otherwise, generate a fresh private key by passing None.
     new_key = os.path.normpath(lineage.privkey) if config.reuse_key else None
-    new_cert, new_chain, new_key, _ = le_client.obtain_certificate(domains, new_key)
+    new_cert, new_chain, new_key, _ = le_client.obtain_certificate(
+        domains, new_key, prepared_key=prepared_key)
     if config.dry_run:
         logger.debug("Dry run: skipping updating lineage at %s",
                     os.path.dirname(lineage.cert))
@@ -372,7 +396,557 @@ def _renew_describe_results(config, renew_successes, renew_failures,
     disp.notification("\n".join(out), wrap=False)
 
 
-def handle_renewal_request(config):  # pylint: disable=too-many-locals,too-many-branches,too-many-statements
+class _RandomSleep(object):
+    """Sleeps a random amount of time once, before the first renewal.
+
+    Noninteractive renewals include a random delay in order to spread
+    out the load on the certificate authority servers, even if many
+    users all pick the same time for renewals. This delay precedes
+    running any hooks, so that side effects of the hooks (such as
+    shutting down a web service) aren't prolonged unnecessarily.
+
+    When lineages are renewed concurrently, every worker calls this
+    object before renewing; the first one sleeps while the others wait
+    on the lock, so no renewal starts before the delay has elapsed.
+
+    :param bool enabled: whether the delay should be applied at all
+
+    """
+    def __init__(self, enabled):
+        self._pending = enabled
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            if self._pending:
+                sleep_time = random.randint(1, 60 * 8)
+                logger.info("Non-interactive renewal: random delay of %s seconds",
+                            sleep_time)
+                time.sleep(sleep_time)
+                # We will sleep only once this day, folks.
+                self._pending = False
+
+
+class _RenewalBudget(object):
+    """Number of renewals left in this run, from --max-renewals-per-run.
+
+    :param int max_renewals: maximum number of renewals, or None if
+        there is no limit
+
+    """
+    def __init__(self, max_renewals):
+        self._left = max_renewals
+        self._lock = threading.Lock()
+
+    def consume(self):
+        """Use one renewal of the budget.
+
+        :returns: False if the budget is exhausted
+        :rtype: bool
+
+        """
+        with self._lock:
+            if self._left is None:
+                return True
+            if self._left <= 0:
+                return False
+            self._left -= 1
+            return True
+
+
+class _LineageSite(object):
+    """Minimal zope site holding the component registry of one lineage.
+
+    Used with :func:`zope.component.hooks.setSite` so that each renewal
+    worker thread sees its own lineage configuration as the
+    `.interfaces.IConfig` utility, while other utilities (such as
+    `.interfaces.IDisplay`) are still looked up in the global registry.
+
+    :param configuration.NamespaceConfig config: lineage configuration
+
+    """
+    def __init__(self, config):
+        self._sm = zope.interface.registry.Components(
+            bases=(zope.component.getGlobalSiteManager(),))
+        self._sm.registerUtility(config, interfaces.IConfig)
+
+    def getSiteManager(self):  # pylint: disable=invalid-name
+        """Return the component registry for this lineage."""
+        return self._sm
+
+
+class _PluginLocks(object):
+    """Serializes renewals of lineages that share a non-concurrent plugin.
+
+    Installers and authenticators manage resources that can be shared
+    between lineages (a web server configuration, a listening port), so
+    lineages using the same one are renewed one at a time, unless the
+    authenticator declares with its ``thread_safe`` attribute that it
+    can be run for several lineages at the same time.
+
+    :param PluginsRegistry plugins: available plugins
+
+    """
+    def __init__(self, plugins):
+        self._plugins = plugins
+        self._lock = threading.Lock()
+        self._locks = {}  # type: Dict[str, threading.Lock]
+        self._thread_safe = {}  # type: Dict[str, bool]
+
+    def _get(self, name):
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def _is_thread_safe(self, name):
+        with self._lock:
+            if name not in self._thread_safe:
+                self._thread_safe[name] = name in self._plugins and bool(
+                    getattr(self._plugins[name].plugin_cls, "thread_safe", False))
+            return self._thread_safe[name]
+
+    def locks_for(self, config):
+        """Locks that must be held while renewing a lineage.
+
+        :param configuration.NamespaceConfig config: lineage configuration
+
+        :returns: locks in a consistent order to avoid deadlocks
+        :rtype: `list` of `threading.Lock`
+
+        """
+        names = set()
+        if config.installer:
+            names.add(config.installer)
+        if config.authenticator and not self._is_thread_safe(config.authenticator):
+            names.add(config.authenticator)
+        return [self._get(name) for name in sorted(names)]
+
+
+class _KeyPipeline(object):
+    """Generates the keys and CSRs of due lineages in worker processes.
+
+    Keys are generated for all the lineages due for renewal as soon as
+    they are known, so that this CPU bound work overlaps with the
+    network bound ACME steps of the lineages renewed before. The renewal
+    of a lineage then takes its key and CSR, waiting for them if they
+    are not ready yet.
+
+    :param int workers: number of worker processes
+
+    """
+    def __init__(self, workers):
+        self._pool = multiprocessing.Pool(workers, initializer=_init_key_worker)
+        self._lock = threading.Lock()
+        self._results = {}  # type: Dict[str, Tuple[Tuple, List[str], Any]]
+
+    def submit(self, lineagename, parameters, names, key_pem=None):
+        """Start generating the key and CSR of a lineage.
+
+        :param str lineagename: name of the lineage
+        :param tuple parameters: key parameters, see `_key_parameters`
+        :param list names: names to include in the CSR
+        :param bytes key_pem: key to use, in PEM format, if one was
+            already generated
+
+        """
+        key_size, key_type, elliptic_curve, must_staple = parameters
+        result = self._pool.apply_async(
+            crypto_util.make_key_and_csr,
+            (key_size, key_type, elliptic_curve, names, must_staple, key_pem))
+        with self._lock:
+            self._results[lineagename] = (parameters, names, result)
+
+    def take(self, lineagename, config, names):
+        """Key and CSR generated for a lineage.
+
+        :param str lineagename: name of the lineage
+        :param configuration.NamespaceConfig config: configuration of
+            the lineage
+        :param list names: names the certificate is renewed for
+
+        :returns: key and CSR in PEM format, or None if they were not
+            generated for these parameters or their generation failed
+        :rtype: `tuple` of `bytes` or None
+
+        """
+        with self._lock:
+            entry = self._results.pop(lineagename, None)
+        if entry is None:
+            return None
+        parameters, expected_names, result = entry
+        if parameters != _key_parameters(config) or expected_names != list(names):
+            logger.debug("Key parameters of %s changed, not using the prepared key.",
+                         lineagename)
+            return None
+        try:
+            return result.get()
+        except Exception:  # pylint: disable=broad-except
+            logger.debug("Could not prepare the key of %s.", lineagename, exc_info=True)
+            return None
+
+    def close(self):
+        """Stop the worker processes, discarding the keys not taken."""
+        self._pool.terminate()
+        self._pool.join()
+
+
+def _init_key_worker():
+    """Let `_KeyPipeline.close` stop the worker processes.
+
+    Workers inherit the signal handlers of the main process, such as
+    those of `.error_handler.ErrorHandler`, which must not run in them.
+
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _key_parameters(config):
+    """Parameters of the keys and CSRs generated for a configuration.
+
+    :param configuration.NamespaceConfig config: lineage configuration
+
+    :returns: RSA key size, key type, elliptic curve and whether OCSP
+        Must Staple is requested
+    :rtype: tuple
+
+    """
+    return (config.rsa_key_size, config.key_type, config.elliptic_curve,
+            config.must_staple)
+
+
+_KEY_PARAMS_RESTORE = {
+    "rsa_key_size": _restore_int,
+    "key_type": _restore_str,
+    "elliptic_curve": _restore_str,
+    "must_staple": _restore_bool,
+    "reuse_key": _restore_bool,
+}
+
+
+def _lineage_key_parameters(config, metadata):
+    """Key parameters of a lineage, read from the lineage index.
+
+    The parameters saved in the renewal configuration file are restored
+    like `restore_required_config_elements` does, without copying the
+    configuration or parsing the file again.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run
+    :param lineage_index.LineageMetadata metadata: metadata of the
+        lineage
+
+    :returns: whether the lineage reuses its key, and its key
+        parameters, see `_key_parameters`
+    :rtype: tuple
+
+    :raises errors.Error: if a saved parameter is invalid
+
+    """
+    saved = metadata.key_params
+    values = {}
+    for name, restore_func in _KEY_PARAMS_RESTORE.items():
+        if name in saved and not cli.set_by_cli(name):
+            values[name] = restore_func(name, saved[name])
+        else:
+            values[name] = getattr(config, name)
+    return values["reuse_key"], (values["rsa_key_size"], values["key_type"],
+                                 values["elliptic_curve"], values["must_staple"])
+
+
+def _start_key_pipeline(config, due):
+    """Start generating the keys of the lineages due for renewal.
+
+    Lineages reusing their key or without automatic renewal, unless the
+    renewal is forced, and those beyond --max-renewals-per-run, are left
+    out. Nothing is started unless at least two keys are needed. With
+    --key-pool-size, the keys are taken from the key pool when it has
+    some, and only their CSRs are generated.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run
+    :param list due: positions in the renewal configuration files and
+        metadata of the lineages due for renewal, in processing order
+
+    :returns: the pipeline, or None
+    :rtype: `_KeyPipeline` or None
+
+    """
+    forced = config.renew_by_default or config.dry_run
+    if config.max_renewals_per_run is not None:
+        due = due[:config.max_renewals_per_run]
+    jobs = []
+    for _, metadata in due:
+        if not forced and not metadata.autorenew:
+            continue
+        try:
+            reuse_key, parameters = _lineage_key_parameters(config, metadata)
+        except errors.Error:
+            logger.debug("Could not read the key parameters of %s.", metadata.lineagename,
+                         exc_info=True)
+            continue
+        if not reuse_key:
+            jobs.append((metadata.lineagename, parameters, metadata.names()))
+    if len(jobs) < 2:
+        return None
+    workers = min(multiprocessing.cpu_count(), len(jobs))
+    logger.debug("Generating %d keys with %d processes.", len(jobs), workers)
+    pipeline = _KeyPipeline(workers)
+    pool = key_pool.get_pool(config)
+    for lineagename, parameters, names in jobs:
+        key_pem = None
+        if pool is not None:
+            key_size, key_type, elliptic_curve, _ = parameters
+            key_pem = pool.take(key_size, key_type, elliptic_curve)
+        pipeline.submit(lineagename, parameters, names, key_pem)
+    return pipeline
+
+
+def _renew_lineage(config, renewal_file, random_sleep, plugin_locks=None, budget=None,
+                   key_pipeline=None):
+    """Reconstitute one lineage and renew it if it is due.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run. It is copied before any lineage specific value is
+        restored into it.
+    :param str renewal_file: path to the renewal configuration file
+    :param callable random_sleep: called right before renewing
+    :param _PluginLocks plugin_locks: if provided, the lineage is being
+        renewed concurrently with others. Its configuration is then
+        registered in a thread local zope site instead of globally, and
+        renewals sharing a non-concurrent plugin are serialized.
+    :param _RenewalBudget budget: if provided, the lineage is only
+        renewed if the budget is not exhausted.
+    :param _KeyPipeline key_pipeline: if provided, where the key and
+        CSR of the lineage may have been generated in advance.
+
+    :returns: the outcome category (one of ``"success"``, ``"failure"``,
+        ``"skipped"`` or ``"parsefail"``) and the message to report
+    :rtype: `tuple` of `str`
+
+    """
+    disp = zope.component.getUtility(interfaces.IDisplay)
+    disp.notification("Processing " + renewal_file, pause=False)
+    lineage_config = copy.deepcopy(config)
+    lineagename = storage.lineagename_for_filename(renewal_file)
+
+    # Note that this modifies config (to add back the configuration
+    # elements from within the renewal configuration file).
+    try:
+        renewal_candidate = _reconstitute(lineage_config, renewal_file)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Renewal configuration file %s (cert: %s) "
+                       "produced an unexpected error: %s. Skipping.",
+                       renewal_file, lineagename, e)
+        logger.debug("Traceback was:\n%s", traceback.format_exc())
+        return "parsefail", renewal_file
+
+    if renewal_candidate is None:
+        return "parsefail", renewal_file
+
+    if plugin_locks is None:
+        # XXX: ensure that each call here replaces the previous one
+        zope.component.provideUtility(lineage_config)
+        return _renew_candidate(lineage_config, renewal_candidate,
+                                lineagename, renewal_file, random_sleep, budget,
+                                key_pipeline)
+
+    zope.component.hooks.setSite(_LineageSite(lineage_config))
+    locks = plugin_locks.locks_for(lineage_config)
+    for lock in locks:
+        lock.acquire()
+    try:
+        return _renew_candidate(lineage_config, renewal_candidate,
+                                lineagename, renewal_file, random_sleep, budget,
+                                key_pipeline)
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+        zope.component.hooks.setSite(None)
+
+
+def _renew_candidate(lineage_config, renewal_candidate, lineagename,
+                     renewal_file, random_sleep, budget=None, key_pipeline=None):
+    """Renew a reconstituted lineage if it is due.
+
+    See :func:`_renew_lineage` for the meaning of the parameters and
+    return value.
+
+    """
+    try:
+        renewal_candidate.ensure_deployed()
+        from certbot import main
+        plugins = plugins_disco.PluginsRegistry.find_all()
+        renew = should_renew(lineage_config, renewal_candidate)
+        if renew and budget is not None and not budget.consume():
+            logger.info("Not renewing %s, --max-renewals-per-run reached.", lineagename)
+            expiry = crypto_util.notAfter(renewal_candidate.version(
+                "cert", renewal_candidate.latest_common_version()))
+            outcome = "skipped", "%s expires on %s (deferred to a later run)" % (
+                renewal_candidate.fullchain, expiry.strftime("%Y-%m-%d"))
+        elif renew:
+            # Apply random sleep upon first renewal if needed
+            random_sleep()
+            # domains have been restored into lineage_config by reconstitute
+            # but they're unnecessary anyway because renew_cert here
+            # will just grab them from the certificate
+            # we already know it's time to renew based on should_renew
+            # and we have a lineage in renewal_candidate
+            prepared_key = None
+            if key_pipeline is not None and not lineage_config.reuse_key:
+                prepared_key = key_pipeline.take(lineagename, lineage_config,
+                                                 renewal_candidate.names())
+            main.renew_cert(lineage_config, plugins, renewal_candidate, prepared_key)
+            outcome = "success", renewal_candidate.fullchain
+        else:
+            expiry = crypto_util.notAfter(renewal_candidate.version(
+                "cert", renewal_candidate.latest_common_version()))
+            outcome = "skipped", "%s expires on %s" % (
+                renewal_candidate.fullchain, expiry.strftime("%Y-%m-%d"))
+        # Run updater interface methods
+        updater.run_generic_updaters(lineage_config, renewal_candidate,
+                                     plugins)
+        return outcome
+    except Exception as e:  # pylint: disable=broad-except
+        # obtain_cert (presumably) encountered an unanticipated problem.
+        logger.warning("Attempting to renew cert (%s) from %s produced an "
+                       "unexpected error: %s. Skipping.", lineagename,
+                           renewal_file, e)
+        logger.debug("Traceback was:\n%s", traceback.format_exc())
+        return "failure", renewal_candidate.fullchain
+
+
+def _renew_concurrently(config, conf_files, random_sleep, budget=None, key_pipeline=None):
+    """Process lineages in a bounded pool of worker threads.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run
+    :param list conf_files: paths to the renewal configuration files
+    :param callable random_sleep: called right before each renewal
+    :param _RenewalBudget budget: limits the number of renewals
+    :param _KeyPipeline key_pipeline: keys and CSRs generated in advance
+
+    :returns: outcomes of :func:`_renew_lineage`, in the order of
+        ``conf_files``
+    :rtype: `list` of `tuple`
+
+    """
+    plugin_locks = _PluginLocks(plugins_disco.PluginsRegistry.find_all())
+    workers = min(config.renew_concurrency, len(conf_files))
+    logger.debug("Renewing %d lineages with %d workers", len(conf_files), workers)
+
+    def _worker(renewal_file):
+        return _renew_lineage(config, renewal_file, random_sleep, plugin_locks, budget,
+                              key_pipeline)
+
+    zope.component.hooks.setHooks()
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(_worker, conf_files)
+    finally:
+        pool.close()
+        pool.join()
+        zope.component.hooks.resetHooks()
+
+
+def _schedule(config, conf_files):
+    """Order lineages by renewal urgency and skip those that are not due.
+
+    The renewal due time of each lineage is read from the lineage
+    index, so lineages that did not change since the last run are not
+    parsed. A lineage is skipped without being loaded if it is not due,
+    is not revoked according to its saved OCSP status, has no pending
+    deployment and no updater needs to run for it. Nothing is sent over
+    the network and no process is started. All the other lineages are
+    returned, the most urgent first, so that --max-renewals-per-run
+    keeps the renewals of the lineages closest to their expiry. Lineages
+    that could not be read from the index come first and are reported by
+    `_renew_lineage`.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run
+    :param list conf_files: paths to the renewal configuration files
+
+    :returns: positions in ``conf_files`` of the lineages to process, in
+        processing order, a list of the same length as ``conf_files``
+        holding the outcomes of the skipped lineages and None for the
+        others, the positions and metadata of the lineages due for
+        renewal, in processing order, and the ``(cert_path,
+        chain_path)`` tuples of the lineages not due whose OCSP status
+        must be refreshed, see `_refresh_ocsp_status`
+    :rtype: `tuple`
+
+    """
+    index = lineage_index.LineageIndex(config)
+    now = pytz.UTC.fromutc(datetime.datetime.utcnow())
+    forced = config.renew_by_default or config.dry_run
+    outcomes = [None] * len(conf_files)  # type: List[Optional[Tuple[str, str]]]
+    urgency = {}
+    due_metadata = {}
+    not_due = []
+    for position, renewal_file in enumerate(conf_files):
+        try:
+            metadata = index.metadata(renewal_file)
+        except Exception:  # pylint: disable=broad-except
+            logger.debug("Could not index %s.", renewal_file, exc_info=True)
+            urgency[position] = (0, now, position)
+            continue
+        due = metadata.renewal_due
+        if forced or metadata.version != metadata.latest_version:
+            urgency[position] = (0, now, position)
+            due_metadata[position] = metadata
+        elif due is not None and due <= now:
+            urgency[position] = (1, due, position)
+            due_metadata[position] = metadata
+        else:
+            not_due.append((position, renewal_file, metadata))
+
+    # Only the saved OCSP status is used here, see _refresh_ocsp_status
+    unchecked = []
+    for position, renewal_file, metadata in not_due:
+        due = metadata.renewal_due
+        revoked = None
+        if due is not None:
+            revoked = storage.saved_ocsp_revoked(config, metadata.cert)
+            if revoked is None:
+                unchecked.append((metadata.cert, metadata.chain))
+        if revoked:
+            # Revoked certificates are renewed by should_autorenew
+            urgency[position] = (1, now, position)
+            due_metadata[position] = metadata
+        elif metadata.installer and not config.disable_renew_updates:
+            # Updaters of the installer run even if the lineage is not due
+            urgency[position] = (2, due or now, position)
+        else:
+            logger.debug("Skipping %s, not due for renewal before %s.", renewal_file, due)
+            outcomes[position] = "skipped", "%s expires on %s" % (
+                metadata.fullchain, metadata.target_expiry.strftime("%Y-%m-%d"))
+    index.save()
+    scheduled = sorted(urgency, key=urgency.get)
+    return scheduled, outcomes, [(position, due_metadata[position])
+                                 for position in scheduled if position in due_metadata], unchecked
+
+
+def _refresh_ocsp_status(config, certs):
+    """Check the OCSP status of lineages that are not due for renewal.
+
+    This is done after the renewals, so that runs with nothing to do
+    don't wait for OCSP responders. The status is saved, and revoked
+    certificates are renewed by the next run.
+
+    :param configuration.NamespaceConfig config: configuration for the
+        current run
+    :param list certs: ``(cert_path, chain_path)`` tuples of the
+        lineages whose saved OCSP status is missing or stale
+
+    """
+    revoked = storage.cached_ocsp_revoked_bulk(config, certs,
+                                               deadline=time.time() + _OCSP_DEADLINE)
+    for cert_path, _ in certs:
+        if revoked[cert_path]:
+            logger.warning("The certificate %s is revoked, it will be renewed by the "
+                           "next run of certbot renew.", cert_path)
+
+
+def handle_renewal_request(config):
     """Examine each lineage; renew if due and report results"""
 
     # This is trivially False if config.domains is empty
@@ -392,78 +966,39 @@ def handle_renewal_request(config):  # pylint: disable=too-many-locals,too-many-
     else:
         conf_files = storage.renewal_conf_files(config)
 
-    renew_successes = []
-    renew_failures = []
-    renew_skipped = []
-    parse_failures = []
-
-    # Noninteractive renewals include a random delay in order to spread
-    # out the load on the certificate authority servers, even if many
-    # users all pick the same time for renewals.  This delay precedes
-    # running any hooks, so that side effects of the hooks (such as
-    # shutting down a web service) aren't prolonged unnecessarily.
-    apply_random_sleep = not sys.stdin.isatty() and config.random_sleep_on_renew
-
-    for renewal_file in conf_files:
-        disp = zope.component.getUtility(interfaces.IDisplay)
-        disp.notification("Processing " + renewal_file, pause=False)
-        lineage_config = copy.deepcopy(config)
-        lineagename = storage.lineagename_for_filename(renewal_file)
-
-        # Note that this modifies config (to add back the configuration
-        # elements from within the renewal configuration file).
-        try:
-            renewal_candidate = _reconstitute(lineage_config, renewal_file)
-        except Exception as e:  # pylint: disable=broad-except
-            logger.warning("Renewal configuration file %s (cert: %s) "
-                           "produced an unexpected error: %s. Skipping.",
-                           renewal_file, lineagename, e)
-            logger.debug("Traceback was:\n%s", traceback.format_exc())
-            parse_failures.append(renewal_file)
-            continue
+    scheduled, outcomes, due, unchecked = _schedule(config, conf_files)
 
-        try:
-            if renewal_candidate is None:
-                parse_failures.append(renewal_file)
-            else:
-                # XXX: ensure that each call here replaces the previous one
-                zope.component.provideUtility(lineage_config)
-                renewal_candidate.ensure_deployed()
-                from certbot import main
-                plugins = plugins_disco.PluginsRegistry.find_all()
-                if should_renew(lineage_config, renewal_candidate):
-                    # Apply random sleep upon first renewal if needed
-                    if apply_random_sleep:
-                        sleep_time = random.randint(1, 60 * 8)
-                        logger.info("Non-interactive renewal: random delay of %s seconds",
-                                    sleep_time)
-                        time.sleep(sleep_time)
-                        # We will sleep only once this day, folks.
-                        apply_random_sleep = False
-
-                    # domains have been restored into lineage_config by reconstitute
-                    # but they're unnecessary anyway because renew_cert here
-                    # will just grab them from the certificate
-                    # we already know it's time to renew based on should_renew
-                    # and we have a lineage in renewal_candidate
-                    main.renew_cert(lineage_config, plugins, renewal_candidate)
-                    renew_successes.append(renewal_candidate.fullchain)
-                else:
-                    expiry = crypto_util.notAfter(renewal_candidate.version(
-                        "cert", renewal_candidate.latest_common_version()))
-                    renew_skipped.append("%s expires on %s" % (renewal_candidate.fullchain,
-                                         expiry.strftime("%Y-%m-%d")))
-                # Run updater interface methods
-                updater.run_generic_updaters(lineage_config, renewal_candidate,
-                                             plugins)
-
-        except Exception as e:  # pylint: disable=broad-except
-            # obtain_cert (presumably) encountered an unanticipated problem.
-            logger.warning("Attempting to renew cert (%s) from %s produced an "
-                           "unexpected error: %s. Skipping.", lineagename,
-                               renewal_file, e)
-            logger.debug("Traceback was:\n%s", traceback.format_exc())
-            renew_failures.append(renewal_candidate.fullchain)
+    random_sleep = _RandomSleep(
+        not sys.stdin.isatty() and config.random_sleep_on_renew)
+    budget = _RenewalBudget(config.max_renewals_per_run)
+
+    scheduled_files = [conf_files[position] for position in scheduled]
+    key_pipeline = _start_key_pipeline(config, due)
+    try:
+        if config.renew_concurrency > 1 and len(scheduled_files) > 1:
+            scheduled_outcomes = _renew_concurrently(
+                config, scheduled_files, random_sleep, budget, key_pipeline)
+        else:
+            scheduled_outcomes = [
+                _renew_lineage(config, renewal_file, random_sleep, None, budget, key_pipeline)
+                for renewal_file in scheduled_files]
+    finally:
+        if key_pipeline is not None:
+            key_pipeline.close()
+    for position, outcome in zip(scheduled, scheduled_outcomes):
+        outcomes[position] = outcome
+    if unchecked:
+        _refresh_ocsp_status(config, unchecked)
+
+    results = {
+        "success": [], "failure": [], "skipped": [], "parsefail": [],
+    }  # type: Dict[str, List[str]]
+    for category, msg in outcomes:
+        results[category].append(msg)
+    renew_successes = results["success"]
+    renew_failures = results["failure"]
+    renew_skipped = results["skipped"]
+    parse_failures = results["parsefail"]
 
     # Describe all the results
     _renew_describe_results(config, renew_successes, renew_failures,
@@ -1,13 +1,17 @@
 """Renewable certificates storage."""
 import datetime
 import glob
+import hashlib
+import json
 import logging
 import re
 import shutil
 import stat
+import tempfile
 
 import configobj
 import parsedatetime
+import pyrfc3339
 import pytz
 import six
 
@@ -17,6 +21,7 @@ from certbot import constants
 from certbot import crypto_util
 from certbot import error_handler
 from certbot import errors
+from certbot import ocsp
 from certbot import util
 from certbot.compat import os
 from certbot.compat import filesystem
@@ -31,6 +36,141 @@ CURRENT_VERSION = util.get_strict_version(certbot.__version__)
 BASE_PRIVKEY_MODE = 0o600
 
 
+def cached_ocsp_revoked(cli_config, cert_path, chain_path):
+    """Is a certificate of a lineage revoked according to OCSP?
+
+    The status is saved next to the cached OCSP responses and reused
+    until the nextUpdate of the response it was read from, so that OCSP
+    responders are only queried when the status may have changed. A
+    revoked status from a response without nextUpdate is reused for
+    `constants.OCSP_STATUS_RETRY_DELAY`. Statuses that are not known,
+    because the check failed, are not saved.
+
+    :param .NamespaceConfig cli_config: parsed command line arguments
+    :param str cert_path: path to the certificate in the archive
+        directory, or to a symlink to it
+    :param str chain_path: path to its chain
+
+    :returns: whether the certificate is revoked; False if the check
+        failed
+    :rtype: bool
+
+    """
+    cert_path = filesystem.realpath(cert_path)
+    now = pytz.UTC.fromutc(datetime.datetime.utcnow())
+    revoked = _read_ocsp_status(cli_config, cert_path, now)
+    if revoked is not None:
+        return revoked
+
+    checker = ocsp.RevocationChecker(cache_dir=cli_config.ocsp_cache_dir)
+    revoked = checker.ocsp_revoked(cert_path, chain_path)
+    _save_ocsp_status(cli_config, checker, cert_path, chain_path, revoked, now)
+    return revoked
+
+
+def cached_ocsp_revoked_bulk(cli_config, certs, deadline=None):
+    """Are certificates of several lineages revoked according to OCSP?
+
+    Like `cached_ocsp_revoked`, but the certificates whose status is
+    not saved are checked together, with a single
+    `ocsp.RevocationChecker`, see
+    `ocsp.RevocationChecker.ocsp_revoked_bulk`.
+
+    :param .NamespaceConfig cli_config: parsed command line arguments
+    :param list certs: ``(cert_path, chain_path)`` tuples, see
+        `cached_ocsp_revoked`
+    :param float deadline: Time, as returned by `time.time`, after
+        which the checks that are not done are considered failed. No
+        deadline if None.
+
+    :returns: whether each certificate path of ``certs`` is revoked;
+        False if the check failed
+    :rtype: dict
+
+    """
+    now = pytz.UTC.fromutc(datetime.datetime.utcnow())
+    statuses = {}
+    misses = []
+    for cert_path, chain_path in certs:
+        real_path = filesystem.realpath(cert_path)
+        revoked = _read_ocsp_status(cli_config, real_path, now)
+        if revoked is None:
+            misses.append((cert_path, real_path, chain_path))
+        else:
+            statuses[cert_path] = revoked
+    if not misses:
+        return statuses
+
+    checker = ocsp.RevocationChecker(cache_dir=cli_config.ocsp_cache_dir)
+    checked = checker.ocsp_revoked_bulk([(real_path, chain_path)
+                                         for _, real_path, chain_path in misses],
+                                        deadline=deadline)
+    for cert_path, real_path, chain_path in misses:
+        statuses[cert_path] = checked[real_path]
+        _save_ocsp_status(cli_config, checker, real_path, chain_path, checked[real_path], now)
+    return statuses
+
+
+def saved_ocsp_revoked(cli_config, cert_path):
+    """Is a certificate of a lineage revoked according to its saved OCSP status?
+
+    Unlike `cached_ocsp_revoked`, OCSP responders are never queried.
+
+    :param .NamespaceConfig cli_config: parsed command line arguments
+    :param str cert_path: path to the certificate in the archive
+        directory, or to a symlink to it
+
+    :returns: whether the certificate is revoked, or None if its status
+        is not saved or is stale
+    :rtype: bool or None
+
+    """
+    return _read_ocsp_status(cli_config, filesystem.realpath(cert_path),
+                             pytz.UTC.fromutc(datetime.datetime.utcnow()))
+
+
+def _ocsp_status_path(cli_config, cert_path):
+    name = hashlib.sha256(cert_path.encode("utf-8")).hexdigest() + ".json"
+    return os.path.join(cli_config.ocsp_cache_dir, constants.OCSP_STATUS_DIR, name)
+
+
+def _read_ocsp_status(cli_config, cert_path, now):
+    """Read the saved OCSP status of a certificate, None if it is stale or missing."""
+    try:
+        with open(_ocsp_status_path(cli_config, cert_path)) as status_file:
+            status = json.load(status_file)
+        if status["cert"] == cert_path and now < pyrfc3339.parse(status["next_update"]):
+            return status["revoked"]
+    except (IOError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _save_ocsp_status(cli_config, checker, cert_path, chain_path, revoked, now):
+    """Save the OCSP status of a certificate until it may change."""
+    next_update = checker.next_update(cert_path, chain_path)
+    if next_update is not None:
+        next_update = pytz.UTC.localize(next_update)
+    elif revoked:
+        next_update = now + datetime.timedelta(seconds=constants.OCSP_STATUS_RETRY_DELAY)
+    else:
+        # The check failed, or the response can't tell how long it holds
+        return
+    status_path = _ocsp_status_path(cli_config, cert_path)
+    temp_path = None
+    try:
+        util.make_or_verify_dir(os.path.dirname(status_path), 0o755)
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(status_path))
+        with os.fdopen(handle, "w") as status_file:
+            json.dump({"cert": cert_path, "revoked": revoked,
+                       "next_update": pyrfc3339.generate(next_update)}, status_file)
+        filesystem.replace(temp_path, status_path)
+    except (IOError, OSError, errors.Error) as error:
+        logger.debug("Could not save OCSP status in %s: %s", status_path, error)
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
 def renewal_conf_files(config):
     """Build a list of all renewal configuration files.
 
@@ -876,30 +1016,30 @@ class RenewableCert(object):
             target = self.version("cert", version)
         if target is None:
             raise errors.CertStorageError("could not find cert file")
-        with open(target) as f:
-            return crypto_util.get_names_from_cert(f.read())
+        return crypto_util.load_parsed_cert(target).names
 
     def ocsp_revoked(self, version=None):
-        # pylint: disable=no-self-use,unused-argument
         """Is the specified cert version revoked according to OCSP?
 
-        Also returns True if the cert version is declared as intended
-        to be revoked according to Let's Encrypt OCSP extensions.
-        (If no version is specified, uses the current version.)
-
-        This method is not yet implemented and currently always returns
-        False.
+        (If no version is specified, uses the current version.) The
+        status is cached, see `cached_ocsp_revoked`.
 
         :param int version: the desired version number
 
-        :returns: whether the certificate is or will be revoked
+        :returns: whether the certificate is revoked; False if the
+            check failed
         :rtype: bool
 
         """
-        # XXX: This query and its associated network service aren't
-        # implemented yet, so we currently return False (indicating that the
-        # certificate is not revoked).
-        return False
+        if version is None:
+            cert_path = self.current_target("cert")
+            chain_path = self.current_target("chain")
+        else:
+            cert_path = self.version("cert", version)
+            chain_path = self.version("chain", version)
+        if cert_path is None or chain_path is None:
+            return False
+        return cached_ocsp_revoked(self.cli_config, cert_path, chain_path)
 
     def autorenewal_is_enabled(self):
         """Is automatic renewal enabled for this cert?
@@ -130,6 +130,16 @@ class AccountFileStorageTest(test_util.ConfigTestCase):
         loaded = self.storage.load(self.acc.id)
         self.assertEqual(self.acc, loaded)
 
+    def test_save_and_restore_ecdsa(self):
+        from acme import jws
+        from certbot.account import Account
+        key = jws.JWKEC.load(test_util.load_vector("nistp256_key.pem"))
+        acc = Account(regr=self.acc.regr, key=key)
+        self.storage.save(acc, self.mock_client)
+        loaded = self.storage.load(acc.id)
+        self.assertTrue(isinstance(loaded.key, jws.JWKEC))
+        self.assertEqual(acc, loaded)
+
     def test_save_and_restore_old_version(self):
         """Saved regr should include a new_authzr_uri for older Certbots"""
         self.storage.save(self.acc, self.mock_client)
@@ -343,6 +343,32 @@ class HandleAuthorizationsTest(unittest.TestCase):  # pylint: disable=too-many-p
         # Despite best_effort=True, process will fail because no authzr is valid.
         self.assertTrue('All challenges have failed.' in str(error.exception))
 
+    def test_independent_polling(self):
+        slow_mock = _gen_mock_on_poll(retry=2, wait_value=30)
+        fast_mock = _gen_mock_on_poll()
+
+        def _conditional_mock_on_poll(authzr):
+            """The first authzr is validated after three polls, the others immediately"""
+            if authzr.body.identifier.value == 'slow':
+                return slow_mock(authzr)
+            return fast_mock(authzr)
+
+        authzrs = [gen_dom_authzr(domain="slow", challs=acme_util.CHALLENGES),
+                   gen_dom_authzr(domain="fast1", challs=acme_util.CHALLENGES),
+                   gen_dom_authzr(domain="fast2", challs=acme_util.CHALLENGES)]
+        self.mock_net.poll.side_effect = _conditional_mock_on_poll
+        mock_order = mock.MagicMock(authorizations=authzrs)
+
+        with mock.patch('certbot.auth_handler.time') as mock_time:
+            valid_authzr = self.handler.handle_authorizations(mock_order)
+
+        self.assertEqual(len(valid_authzr), 3)
+        polled = [call[0][0].body.identifier.value
+                  for call in self.mock_net.poll.call_args_list]
+        # Validated authzrs are not polled again while the slow one is pending.
+        self.assertEqual(sorted(polled), ['fast1', 'fast2', 'slow', 'slow', 'slow'])
+        self.assertEqual(mock_time.sleep.call_count, 3)
+
     def test_validated_challenge_not_rerun(self):
         # With pending challenge, we expect the challenge to be tried, and fail.
         authzr = acme_util.gen_authzr(
@@ -169,20 +169,19 @@ class CertificatesTest(BaseCertManagerTest):
         self.assertFalse(mock_utility.notification.called)
         self.assertTrue(mock_logger.warning.called) #pylint: disable=no-member
 
-    @mock.patch('certbot.crypto_util.verify_renewable_cert')
     @mock.patch('certbot.cert_manager.logger')
     @test_util.patch_get_utility()
-    @mock.patch("certbot.storage.RenewableCert")
+    @mock.patch("certbot.lineage_index.LineageIndex.metadata")
     @mock.patch('certbot.cert_manager._report_human_readable')
-    def test_certificates_parse_success(self, mock_report, mock_renewable_cert,
-        mock_utility, mock_logger, mock_verifier):
-        mock_verifier.return_value = None
+    def test_certificates_parse_success(self, mock_report, mock_metadata,
+        mock_utility, mock_logger):
         mock_report.return_value = ""
         self._certificates(self.config)
         self.assertFalse(mock_logger.warning.called) #pylint: disable=no-member
         self.assertTrue(mock_report.called)
         self.assertTrue(mock_utility.called)
-        self.assertTrue(mock_renewable_cert.called)
+        mock_metadata.assert_called_with(mock.ANY, verify=True)
+        self.assertTrue(mock_metadata.return_value.verify.called)
 
     @mock.patch('certbot.cert_manager.logger')
     @test_util.patch_get_utility()
@@ -201,9 +200,11 @@ class CertificatesTest(BaseCertManagerTest):
         self.assertTrue(mock_utility.called)
         shutil.rmtree(empty_tempdir)
 
-    @mock.patch('certbot.cert_manager.ocsp.RevocationChecker.ocsp_revoked')
+    @mock.patch('certbot.cert_manager.ocsp.RevocationChecker.ocsp_revoked_bulk')
     def test_report_human_readable(self, mock_revoked): #pylint: disable=too-many-statements
-        mock_revoked.return_value = None
+        revoked = [False]
+        mock_revoked.side_effect = lambda certs, **unused_kwargs: dict(
+            (cert_path, revoked[0]) for cert_path, _ in certs)
         from certbot import cert_manager
         import datetime
         import pytz
@@ -244,7 +245,7 @@ class CertificatesTest(BaseCertManagerTest):
         self.assertTrue('VALID' in out and 'INVALID'  not in out)
 
         cert.is_test_cert = True
-        mock_revoked.return_value = True
+        revoked[0] = True
         out = get_report()
         self.assertTrue('INVALID: TEST_CERT, REVOKED' in out)
 
@@ -270,6 +271,33 @@ class CertificatesTest(BaseCertManagerTest):
         self.assertEqual(len(re.findall("INVALID:", out)), 0)
 
 
+    @mock.patch('certbot.cert_manager.ocsp.RevocationChecker')
+    def test_report_human_readable_shared_checker(self, mock_checker):
+        from certbot import cert_manager
+        import datetime
+        import pytz
+        expiry = pytz.UTC.fromutc(datetime.datetime.utcnow()) + datetime.timedelta(days=10)
+        certs = []
+        for name in ("one", "two", "three"):
+            cert = mock.MagicMock(lineagename=name, target_expiry=expiry, is_test_cert=False)
+            cert.names.return_value = [name + ".com"] + (["shared.com"] if name != "two" else [])
+            certs.append(cert)
+        mock_checker.return_value.ocsp_revoked_bulk.return_value = {
+            certs[0].cert: True, certs[2].cert: False}
+        mock_config = mock.MagicMock(certname=None, domains=["shared.com"])
+
+        out = cert_manager._report_human_readable(  # pylint: disable=protected-access
+            mock_config, certs)
+        self.assertEqual(mock_checker.call_count, 1)
+        mock_checker.return_value.ocsp_revoked_bulk.assert_called_once_with(
+            [(certs[0].cert, certs[0].chain), (certs[2].cert, certs[2].chain)],
+            deadline=mock.ANY)
+        self.assertFalse(mock_checker.return_value.ocsp_revoked.called)
+        self.assertEqual(len(re.findall("INVALID: REVOKED", out)), 1)
+        self.assertTrue(out.index("INVALID: REVOKED") < out.index("three.com"))
+        self.assertFalse("two.com" in out)
+
+
 class SearchLineagesTest(BaseCertManagerTest):
     """Tests for certbot.cert_manager._search_lineages."""
 
@@ -419,6 +419,16 @@ class ParseTest(unittest.TestCase):  # pylint: disable=too-many-public-methods
             self.assertRaises(
                 SystemExit, self.parse, "--max-log-backups -42".split())
 
+    def test_renew_concurrency_error(self):
+        with mock.patch('certbot.cli.sys.stderr'):
+            for value in ('foo', '0', '-2'):
+                self.assertRaises(
+                    SystemExit, self.parse, ['--renew-concurrency', value])
+
+    def test_renew_concurrency_success(self):
+        namespace = self.parse(['--renew-concurrency', '4'])
+        self.assertEqual(namespace.renew_concurrency, 4)
+
     def test_max_log_backups_success(self):
         value = "42"
         namespace = self.parse(["--max-log-backups", value])
@@ -6,6 +6,7 @@ import unittest
 
 import mock
 
+import josepy as jose
 from josepy import interfaces
 
 import certbot.tests.util as test_util
@@ -103,7 +104,22 @@ class RegisterTest(test_util.ConfigTestCase):
             mock_client().external_account_required.side_effect = self._false_mock
             with mock.patch("certbot.account.report_new_account"):
                 with mock.patch("certbot.eff.handle_subscription"):
-                    self._call()
+                    acc, _ = self._call()
+        self.assertTrue(isinstance(acc.key, jose.JWKRSA))
+
+    @mock.patch("certbot.client.acme_client.ClientNetwork")
+    def test_ecdsa(self, mock_net):
+        from acme import jws
+        self.config.key_type = "ecdsa"
+        self.config.elliptic_curve = "secp384r1"
+        with mock.patch("certbot.client.acme_client.BackwardsCompatibleClientV2") as mock_client:
+            mock_client().external_account_required.side_effect = self._false_mock
+            with mock.patch("certbot.account.report_new_account"):
+                with mock.patch("certbot.eff.handle_subscription"):
+                    acc, _ = self._call()
+        self.assertTrue(isinstance(acc.key, jws.JWKEC))
+        self.assertEqual(acc.key.crv, "P-384")
+        self.assertEqual(mock_net.call_args[1]["alg"], jws.ES384)
 
     @mock.patch("certbot.account.report_new_account")
     @mock.patch("certbot.client.display_ops.get_email")
@@ -317,7 +333,8 @@ class ClientTest(ClientTestCommon):
         self._test_obtain_certificate_common(mock.sentinel.key, csr)
 
         mock_crypto_util.init_save_key.assert_called_once_with(
-            self.config.rsa_key_size, self.config.key_dir)
+            self.config.rsa_key_size, self.config.key_dir, key_pool=None,
+            key_type=self.config.key_type, elliptic_curve=self.config.elliptic_curve)
         mock_crypto_util.init_save_csr.assert_called_once_with(
             mock.sentinel.key, self.eg_domains, self.config.csr_dir)
         mock_crypto_util.cert_and_chain_from_fullchain.assert_called_once_with(
@@ -353,13 +370,66 @@ class ClientTest(ClientTestCommon):
         self.client.config.dry_run = True
         self._test_obtain_certificate_common(key, csr)
 
-        mock_crypto.make_key.assert_called_once_with(self.config.rsa_key_size)
+        mock_crypto.make_key.assert_called_once_with(
+            self.config.rsa_key_size, self.config.key_type, self.config.elliptic_curve)
         mock_acme_crypto.make_csr.assert_called_once_with(
             mock.sentinel.key_pem, self.eg_domains, self.config.must_staple)
         mock_crypto.init_save_key.assert_not_called()
         mock_crypto.init_save_csr.assert_not_called()
         self.assertEqual(mock_crypto.cert_and_chain_from_fullchain.call_count, 1)
 
+    @mock.patch("certbot.client.crypto_util")
+    def test_obtain_certificate_prepared_key(self, mock_crypto_util):
+        csr = util.CSR(form="pem", file=None, data=CSR_SAN)
+        mock_crypto_util.save_csr.return_value = csr
+        mock_crypto_util.save_key.return_value = mock.sentinel.key
+        self._set_mock_from_fullchain(mock_crypto_util.cert_and_chain_from_fullchain)
+        self._mock_obtain_certificate()
+        authzr = self._authzr_from_domains(self.eg_domains)
+        self.eg_order.authorizations = authzr
+        self.client.auth_handler.handle_authorizations.return_value = authzr
+
+        with test_util.patch_get_utility():
+            result = self.client.obtain_certificate(
+                self.eg_domains, prepared_key=(mock.sentinel.key_pem, CSR_SAN))
+
+        self.assertEqual(result, (mock.sentinel.cert, mock.sentinel.chain,
+                                  mock.sentinel.key, csr))
+        mock_crypto_util.save_key.assert_called_once_with(
+            mock.sentinel.key_pem, self.config.key_dir)
+        mock_crypto_util.save_csr.assert_called_once_with(CSR_SAN, self.config.csr_dir)
+        self.assertFalse(mock_crypto_util.init_save_key.called)
+        self.assertFalse(mock_crypto_util.make_key.called)
+
+        # The prepared key is not used if a key is reused
+        mock_crypto_util.init_save_csr.return_value = csr
+        with mock.patch("certbot.client.open", mock.mock_open(read_data=b"old_key"),
+                        create=True):
+            with test_util.patch_get_utility():
+                _, _, key, _ = self.client.obtain_certificate(
+                    self.eg_domains, "privkey.pem", (mock.sentinel.key_pem, CSR_SAN))
+        self.assertEqual(key.pem, b"old_key")
+        self.assertEqual(mock_crypto_util.save_key.call_count, 1)
+
+    @mock.patch("certbot.client.crypto_util")
+    def test_obtain_certificate_prepared_key_dry_run(self, mock_crypto_util):
+        csr = util.CSR(form="pem", file=None, data=CSR_SAN)
+        key = util.Key(file=None, pem=mock.sentinel.key_pem)
+        self._set_mock_from_fullchain(mock_crypto_util.cert_and_chain_from_fullchain)
+        self._mock_obtain_certificate()
+        authzr = self._authzr_from_domains(self.eg_domains)
+        self.eg_order.authorizations = authzr
+        self.client.auth_handler.handle_authorizations.return_value = authzr
+
+        self.client.config.dry_run = True
+        with test_util.patch_get_utility():
+            result = self.client.obtain_certificate(
+                self.eg_domains, prepared_key=(mock.sentinel.key_pem, CSR_SAN))
+
+        self.assertEqual(result, (mock.sentinel.cert, mock.sentinel.chain, key, csr))
+        self.assertFalse(mock_crypto_util.save_key.called)
+        self.assertFalse(mock_crypto_util.make_key.called)
+
     def _set_mock_from_fullchain(self, mock_from_fullchain):
         mock_cert = mock.Mock()
         mock_cert.encode.return_value = mock.sentinel.cert
@@ -46,6 +46,8 @@ class NamespaceConfigTest(test_util.ConfigTestCase):
 
         mock_constants.IN_PROGRESS_DIR = '../p'
         mock_constants.KEY_DIR = 'keys'
+        mock_constants.KEY_POOL_DIR = 'kp'
+        mock_constants.OCSP_CACHE_DIR = 'ocsp'
         mock_constants.TEMP_CHECKPOINT_DIR = 't'
 
         ref_path = misc.underscores_for_unsupported_characters_in_path(
@@ -65,6 +67,12 @@ class NamespaceConfigTest(test_util.ConfigTestCase):
         self.assertEqual(
             os.path.normpath(self.config.key_dir),
             os.path.normpath(os.path.join(self.config.config_dir, 'keys')))
+        self.assertEqual(
+            os.path.normpath(self.config.key_pool_dir),
+            os.path.normpath(os.path.join(self.config.config_dir, 'kp')))
+        self.assertEqual(
+            os.path.normpath(self.config.ocsp_cache_dir),
+            os.path.normpath(os.path.join(self.config.work_dir, 'ocsp')))
         self.assertEqual(
             os.path.normpath(self.config.temp_checkpoint_dir),
             os.path.normpath(os.path.join(self.config.work_dir, 't')))
@@ -101,6 +109,8 @@ class NamespaceConfigTest(test_util.ConfigTestCase):
         self.assertTrue(os.path.isabs(config.csr_dir))
         self.assertTrue(os.path.isabs(config.in_progress_dir))
         self.assertTrue(os.path.isabs(config.key_dir))
+        self.assertTrue(os.path.isabs(config.key_pool_dir))
+        self.assertTrue(os.path.isabs(config.ocsp_cache_dir))
         self.assertTrue(os.path.isabs(config.temp_checkpoint_dir))
 
     @mock.patch('certbot.configuration.constants')
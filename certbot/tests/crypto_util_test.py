@@ -5,6 +5,7 @@ import unittest
 import OpenSSL
 import mock
 import zope.component
+from cryptography.hazmat.backends import default_backend
 
 import certbot.tests.util as test_util
 from certbot import errors
@@ -60,6 +61,27 @@ class InitSaveKeyTest(test_util.TempDirTestCase):
         mock_make.side_effect = ValueError
         self.assertRaises(ValueError, self._call, 431, self.workdir)
 
+    @mock.patch('certbot.crypto_util.make_key')
+    def test_key_pool(self, mock_make):
+        from certbot.crypto_util import init_save_key
+        key_pool = mock.MagicMock()
+        key_pool.take.return_value = b'pooled_key_pem'
+        key = init_save_key(1024, self.workdir, key_pool=key_pool)
+        self.assertEqual(key.pem, b'pooled_key_pem')
+        key_pool.take.assert_called_once_with(1024, 'rsa', None)
+        self.assertFalse(mock_make.called)
+
+        key_pool.take.return_value = None
+        mock_make.return_value = b'key_pem'
+        self.assertEqual(init_save_key(1024, self.workdir, key_pool=key_pool).pem, b'key_pem')
+
+    def test_ecdsa(self):
+        from certbot.crypto_util import init_save_key
+        key = init_save_key(2048, self.workdir, key_type='ecdsa', elliptic_curve='secp384r1')
+        with open(key.file, 'rb') as key_file:
+            self.assertEqual(key_file.read(), key.pem)
+        self.assertTrue(b'EC PRIVATE KEY' in key.pem)
+
 
 class InitSaveCSRTest(test_util.TempDirTestCase):
     """Tests for certbot.crypto_util.init_save_csr."""
@@ -84,6 +106,22 @@ class InitSaveCSRTest(test_util.TempDirTestCase):
         self.assertTrue('csr-certbot.pem' in csr.file)
 
 
+class MakeKeyAndCSRTest(unittest.TestCase):
+    """Tests for certbot.crypto_util.make_key_and_csr."""
+
+    def test_it(self):
+        from acme.crypto_util import _pyopenssl_cert_or_req_san
+        from certbot.crypto_util import make_key_and_csr
+        from certbot.crypto_util import valid_privkey
+        key_pem, csr_pem = make_key_and_csr(
+            1024, 'ecdsa', 'secp256r1', ['example.com', 'www.example.com'], True)
+        self.assertTrue(valid_privkey(key_pem))
+        csr = OpenSSL.crypto.load_certificate_request(OpenSSL.crypto.FILETYPE_PEM, csr_pem)
+        self.assertEqual(_pyopenssl_cert_or_req_san(csr), ['example.com', 'www.example.com'])
+        self.assertTrue(csr.verify(OpenSSL.crypto.load_privatekey(
+            OpenSSL.crypto.FILETYPE_PEM, key_pem)))
+
+
 class ValidCSRTest(unittest.TestCase):
     """Tests for certbot.crypto_util.valid_csr."""
 
@@ -164,7 +202,7 @@ class ImportCSRFileTest(unittest.TestCase):
                           test_util.load_vector('cert_512.pem'))
 
 
-class MakeKeyTest(unittest.TestCase):  # pylint: disable=too-few-public-methods
+class MakeKeyTest(unittest.TestCase):
     """Tests for certbot.crypto_util.make_key."""
 
     def test_it(self):  # pylint: disable=no-self-use
@@ -173,6 +211,19 @@ class MakeKeyTest(unittest.TestCase):  # pylint: disable=too-few-public-methods
         OpenSSL.crypto.load_privatekey(
             OpenSSL.crypto.FILETYPE_PEM, make_key(1024))
 
+    def test_ecdsa(self):
+        from cryptography.hazmat.primitives import serialization
+        from certbot.crypto_util import make_key
+        for curve, size in (('secp256r1', 256), ('secp384r1', 384), (None, 256)):
+            key = serialization.load_pem_private_key(
+                make_key(1024, 'ecdsa', curve), None, default_backend())
+            self.assertEqual(key.curve.key_size, size)
+
+    def test_unsupported(self):
+        from certbot.crypto_util import make_key
+        self.assertRaises(ValueError, make_key, 1024, 'dsa')
+        self.assertRaises(ValueError, make_key, 1024, 'ecdsa', 'secp521r1')
+
 
 class VerifyCertSetup(unittest.TestCase):
     """Refactoring for verification tests."""
@@ -277,6 +328,17 @@ class ValidPrivkeyTest(unittest.TestCase):
     def test_valid_true(self):
         self.assertTrue(self._call(RSA512_KEY))
 
+    def test_valid_ecdsa(self):
+        self.assertTrue(self._call(P256_KEY))
+
+    def test_dsa_false(self):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import dsa
+        key = dsa.generate_private_key(1024, default_backend())  # type: ignore
+        self.assertFalse(self._call(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption())))
+
     def test_empty_false(self):
         self.assertFalse(self._call(''))
 
@@ -365,6 +427,105 @@ class NotAfterTest(unittest.TestCase):
                          '2014-12-18T22:34:45+00:00')
 
 
+class ParsedCertificateTest(unittest.TestCase):
+    """Tests for certbot.crypto_util.ParsedCertificate."""
+
+    @classmethod
+    def _parse(cls, name):
+        from certbot.crypto_util import ParsedCertificate
+        return ParsedCertificate(test_util.load_vector(name))
+
+    def test_names(self):
+        cert = self._parse('cert-5sans_512.pem')
+        self.assertEqual(cert.names,
+                         ['example.com'] + ['{0}.example.com'.format(c) for c in 'abcd'])
+        self.assertEqual(cert.sans, ['{0}.example.com'.format(c) for c in 'abcd'] +
+                         ['example.com'])
+
+    def test_validity(self):
+        cert = self._parse('cert_512.pem')
+        self.assertEqual(cert.not_before.isoformat(), '2014-12-11T22:34:45+00:00')
+        self.assertEqual(cert.not_after.isoformat(), '2014-12-18T22:34:45+00:00')
+
+    def test_ocsp_url_and_issuer(self):
+        cert = self._parse('ocsp_certificate.pem')
+        self.assertEqual(cert.ocsp_url, 'http://ocsp.test4.buypass.com')
+        self.assertEqual(cert.issuer, self._parse('ocsp_issuer_certificate.pem').cert.subject)
+        self.assertEqual(self._parse('cert_512.pem').ocsp_url, None)
+
+    def test_key_type(self):
+        self.assertEqual(self._parse('cert_512.pem').key_type, 'RSA')
+        self.assertEqual(self._parse('cert-nosans_nistp256.pem').key_type, 'ECDSA')
+        cert = self._parse('cert_512.pem')
+        with mock.patch('certbot.crypto_util.x509.load_pem_x509_certificate'):
+            self.assertEqual(cert.key_type, None)
+
+    def test_fingerprint(self):
+        digest = OpenSSL.crypto.load_certificate(
+            OpenSSL.crypto.FILETYPE_PEM, CERT).digest('sha256').decode()
+        self.assertEqual(self._parse('cert_512.pem').fingerprint,
+                         digest.replace(':', '').lower())
+
+    def test_parsed_once(self):
+        cert = self._parse('cert_512.pem')
+        from cryptography import x509
+        with mock.patch('certbot.crypto_util.x509.load_pem_x509_certificate',
+                        wraps=x509.load_pem_x509_certificate) as mock_load:
+            cert.not_before  # pylint: disable=pointless-statement
+            cert.not_after  # pylint: disable=pointless-statement
+            cert.key_type  # pylint: disable=pointless-statement
+        self.assertEqual(mock_load.call_count, 1)
+
+    def test_invalid(self):
+        from certbot.crypto_util import ParsedCertificate
+        self.assertRaises(ValueError, lambda: ParsedCertificate(b'hello there').not_after)
+
+
+class LoadParsedCertTest(test_util.TempDirTestCase):
+    """Tests for certbot.crypto_util.load_parsed_cert."""
+
+    def setUp(self):
+        super(LoadParsedCertTest, self).setUp()
+        self.cert_path = os.path.join(self.tempdir, 'cert.pem')
+        with open(self.cert_path, 'wb') as cert_file:
+            cert_file.write(CERT)
+
+    @classmethod
+    def _call(cls, cert_path):
+        from certbot.crypto_util import load_parsed_cert
+        return load_parsed_cert(cert_path)
+
+    def test_cached(self):
+        cert = self._call(self.cert_path)
+        self.assertEqual(cert.names, ['example.com'])
+        self.assertTrue(self._call(self.cert_path) is cert)
+
+    def test_symlink(self):
+        link_path = os.path.join(self.tempdir, 'link.pem')
+        os.symlink(self.cert_path, link_path)
+        self.assertTrue(self._call(link_path) is self._call(self.cert_path))
+
+    def test_file_changed(self):
+        cert = self._call(self.cert_path)
+        with open(self.cert_path, 'wb') as cert_file:
+            cert_file.write(test_util.load_vector('cert-san_512.pem'))
+        new_cert = self._call(self.cert_path)
+        self.assertFalse(new_cert is cert)
+        self.assertEqual(new_cert.names, ['example.com', 'www.example.com'])
+
+    def test_eviction(self):
+        other_path = os.path.join(self.tempdir, 'other.pem')
+        with open(other_path, 'wb') as cert_file:
+            cert_file.write(CERT)
+        with mock.patch('certbot.crypto_util._PARSED_CERTS_CACHE_SIZE', 1):
+            cert = self._call(self.cert_path)
+            self._call(other_path)
+            self.assertFalse(self._call(self.cert_path) is cert)
+
+    def test_missing(self):
+        self.assertRaises(IOError, self._call, os.path.join(self.tempdir, 'missing.pem'))
+
+
 class Sha256sumTest(unittest.TestCase):
     """Tests for certbot.crypto_util.notAfter"""
     def test_sha256sum(self):
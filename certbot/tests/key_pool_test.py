@@ -0,0 +1,243 @@
+"""Tests for certbot.key_pool."""
+import sys
+import threading
+import unittest
+
+import mock
+
+from certbot import util
+from certbot.compat import filesystem
+from certbot.compat import os
+from certbot.tests import util as test_util
+
+KEY = test_util.load_vector("rsa512_key.pem")
+EC_KEY = test_util.load_vector("nistp256_key.pem")
+
+
+class KeyPoolTest(test_util.TempDirTestCase):
+    """Tests for certbot.key_pool.KeyPool."""
+
+    def setUp(self):
+        super(KeyPoolTest, self).setUp()
+        from certbot.key_pool import KeyPool
+        self.directory = os.path.join(self.tempdir, "key-pool")
+        self.pool = KeyPool(self.directory, 2, workers=1)
+        self.key_dir = os.path.join(self.directory, "rsa-1024")
+
+    def tearDown(self):
+        self.pool.wait()
+        super(KeyPoolTest, self).tearDown()
+
+    def _add_key(self, name, key_pem=KEY):
+        util.make_or_verify_dir(self.directory, 0o700)
+        util.make_or_verify_dir(self.key_dir, 0o700)
+        with open(os.path.join(self.key_dir, name), "wb") as key_file:
+            key_file.write(key_pem)
+
+    @mock.patch("certbot.key_pool.KeyPool.refill")
+    def test_take(self, mock_refill):
+        self._add_key("a.pem")
+        self._add_key("b.pem")
+        self.assertEqual(self.pool.take(1024), KEY)
+        self.assertEqual(os.listdir(self.key_dir), ["b.pem"])
+        mock_refill.assert_called_once_with(1024, "rsa", None)
+
+    @mock.patch("certbot.key_pool.KeyPool.refill")
+    def test_take_empty(self, unused_mock_refill):
+        self.assertEqual(self.pool.take(1024), None)
+        self.assertTrue(filesystem.check_mode(self.directory, 0o700))
+        self.assertTrue(filesystem.check_mode(self.key_dir, 0o700))
+
+    @mock.patch("certbot.key_pool.KeyPool.refill")
+    def test_take_invalid_key(self, unused_mock_refill):
+        self._add_key("a.pem", b"not a key")
+        self._add_key("b.pem")
+        self.assertEqual(self.pool.take(1024), KEY)
+        self.assertEqual(os.listdir(self.key_dir), [])
+
+    @mock.patch("certbot.key_pool.KeyPool.refill")
+    def test_take_claimed_by_other_process(self, unused_mock_refill):
+        self._add_key("a.pem")
+        self._add_key("b.pem")
+        original_replace = filesystem.replace
+
+        def _replace(src, dst):
+            if src.endswith("a.pem"):
+                raise OSError("already claimed")
+            original_replace(src, dst)
+
+        with mock.patch("certbot.key_pool.filesystem.replace", side_effect=_replace):
+            self.assertEqual(self.pool.take(1024), KEY)
+        self.assertEqual(os.listdir(self.key_dir), ["a.pem"])
+
+    def test_refill(self):
+        self._add_key("a.pem")
+        self.pool.start()
+        self.pool.refill(1024)
+        # A key is already being generated
+        self.pool.refill(1024)
+        self.pool.wait()
+        names = os.listdir(self.key_dir)
+        self.assertEqual(len(names), 2)
+        self.assertTrue(all(name.endswith(".pem") for name in names))
+        self.assertTrue(self.pool.take(1024) is not None)
+
+    @mock.patch("certbot.key_pool.multiprocessing.Pool")
+    def test_refill_full(self, mock_pool):
+        self._add_key("a.pem")
+        self._add_key("b.pem")
+        self.pool.start()
+        self.pool.refill(1024)
+        self.assertFalse(mock_pool.return_value.apply_async.called)
+
+    @mock.patch("certbot.key_pool.multiprocessing.Pool")
+    def test_refill_not_started(self, mock_pool):
+        self.pool.refill(1024)
+        self.assertFalse(mock_pool.called)
+        self.assertEqual(self.pool._pending, {})  # pylint: disable=protected-access
+
+    @unittest.skipIf(sys.version_info[0] < 3, "error_callback requires Python 3")
+    @mock.patch("certbot.key_pool.multiprocessing.Pool")
+    def test_refill_failure(self, mock_pool):
+        self.pool.start()
+        self.pool.refill(1024)
+        self.assertEqual(self.pool._pending, {self.key_dir: 2})  # pylint: disable=protected-access
+        for call in mock_pool.return_value.apply_async.call_args_list:
+            call[1]["error_callback"](OSError("worker died"))
+        self.assertEqual(self.pool._pending, {self.key_dir: 0})  # pylint: disable=protected-access
+        self.assertEqual(os.listdir(self.key_dir), [])
+
+    @mock.patch("certbot.key_pool.multiprocessing.Pool")
+    def test_close(self, mock_pool):
+        self.pool.start()
+        self.pool.start()
+        self.assertEqual(mock_pool.call_count, 1)
+        self.pool.close()
+        mock_pool.return_value.terminate.assert_called_once_with()
+        mock_pool.return_value.join.assert_called_once_with()
+        self.pool.close()
+        self.assertEqual(mock_pool.return_value.terminate.call_count, 1)
+
+    @mock.patch("certbot.key_pool.multiprocessing.Pool")
+    def test_close_waits_for_pending_keys(self, mock_pool):
+        self.pool.start()
+        self.pool.refill(1024)
+        calls = mock_pool.return_value.apply_async.call_args_list
+
+        def _generated():
+            for call in calls:
+                call[1]["callback"](KEY)
+
+        timer = threading.Timer(0.1, _generated)
+        timer.start()
+        self.pool.close()
+        timer.join()
+        self.assertEqual(len(os.listdir(self.key_dir)), 2)
+        mock_pool.return_value.terminate.assert_called_once_with()
+
+    @mock.patch("certbot.key_pool.multiprocessing.Pool")
+    def test_close_timeout(self, mock_pool):
+        self.pool.start()
+        self.pool.refill(1024)
+        self.pool.close(timeout=0.01)
+        self.assertEqual(self.pool._pending, {self.key_dir: 2})  # pylint: disable=protected-access
+        mock_pool.return_value.terminate.assert_called_once_with()
+
+    @mock.patch("certbot.key_pool.KeyPool.refill")
+    def test_take_sweeps_stale_claimed_keys(self, unused_mock_refill):
+        self._add_key("a.pem.claimed")
+        old = os.path.getmtime(os.path.join(self.key_dir, "a.pem.claimed")) - 3600
+        os.utime(os.path.join(self.key_dir, "a.pem.claimed"), (old, old))
+        self._add_key("b.pem.claimed")
+        self._add_key("c.pem")
+        self.assertEqual(self.pool.take(1024), KEY)
+        self.assertEqual(os.listdir(self.key_dir), ["b.pem.claimed"])
+
+    @mock.patch("certbot.key_pool.KeyPool.refill")
+    def test_take_claimed_key_swept(self, unused_mock_refill):
+        self._add_key("a.pem")
+        self._add_key("b.pem")
+        original_open = open
+
+        def _open(path, mode):
+            if path.endswith("a.pem.claimed"):
+                raise IOError("swept")
+            return original_open(path, mode)
+
+        with mock.patch("certbot.key_pool.open", side_effect=_open, create=True):
+            self.assertEqual(self.pool.take(1024), KEY)
+        self.assertEqual(os.listdir(self.key_dir), [])
+
+    def test_store_failure(self):
+        self._add_key("a.pem")
+        self.pool._pending[self.key_dir] = 2  # pylint: disable=protected-access
+        with mock.patch("certbot.key_pool.filesystem.replace") as mock_replace:
+            mock_replace.side_effect = OSError
+            self.pool._store(self.key_dir, KEY)  # pylint: disable=protected-access
+        self.assertEqual(os.listdir(self.key_dir), ["a.pem"])
+        with mock.patch("certbot.key_pool.tempfile.mkstemp") as mock_mkstemp:
+            mock_mkstemp.side_effect = OSError
+            self.pool._store(self.key_dir, KEY)  # pylint: disable=protected-access
+        self.assertEqual(os.listdir(self.key_dir), ["a.pem"])
+
+    @mock.patch("certbot.key_pool.KeyPool.refill")
+    def test_take_ecdsa(self, mock_refill):
+        self.key_dir = os.path.join(self.directory, "ecdsa-secp256r1")
+        self._add_key("a.pem", EC_KEY)
+        self._add_key("b.pem", EC_KEY)
+        self.assertEqual(self.pool.take(1024, "ecdsa", "secp256r1"), EC_KEY)
+        mock_refill.assert_called_with(1024, "ecdsa", "secp256r1")
+        # The first curve is the default one
+        self.assertEqual(self.pool.take(1024, "ecdsa"), EC_KEY)
+        self.assertEqual(self.pool.take(1024, "ecdsa", "secp384r1"), None)
+        self.assertTrue(os.path.isdir(os.path.join(self.directory, "ecdsa-secp384r1")))
+
+    def test_generate_key(self):
+        from certbot.key_pool import _generate_key
+        self.assertEqual(_generate_key(1024, "dsa", None), None)
+        with mock.patch("certbot.key_pool.crypto_util.make_key") as mock_make_key:
+            mock_make_key.side_effect = ValueError
+            self.assertEqual(_generate_key(1024, "rsa", None), None)
+            mock_make_key.side_effect = None
+            mock_make_key.return_value = KEY
+            self.assertEqual(_generate_key(1024, "rsa", None), KEY)
+
+
+class GetPoolTest(test_util.ConfigTestCase):
+    """Tests for certbot.key_pool.get_pool."""
+
+    @classmethod
+    def _call(cls, config):
+        from certbot.key_pool import get_pool
+        return get_pool(config)
+
+    def test_disabled(self):
+        self.assertEqual(self._call(self.config), None)
+
+    @mock.patch("certbot.key_pool.KeyPool.start")
+    @mock.patch("certbot.key_pool.util.atexit_register")
+    def test_shared(self, mock_register, mock_start):
+        self.config.key_pool_size = 3
+        pool = self._call(self.config)
+        self.assertEqual(pool.directory, self.config.key_pool_dir)
+        self.assertEqual(pool.size, 3)
+        self.assertTrue(self._call(self.config) is pool)
+        self.assertTrue(mock_start.called)
+        mock_register.assert_called_once_with(pool.close)
+
+    @mock.patch("certbot.key_pool.KeyPool.start")
+    @mock.patch("certbot.key_pool.util.atexit_register")
+    def test_started_from_main_thread(self, unused_mock_register, mock_start):
+        self.config.key_pool_size = 3
+        pools = []
+        thread = threading.Thread(target=lambda: pools.append(self._call(self.config)))
+        thread.start()
+        thread.join()
+        # The processes are not forked from other threads
+        self.assertFalse(mock_start.called)
+        self.assertTrue(self._call(self.config) is pools[0])
+        mock_start.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
@@ -0,0 +1,241 @@
+"""Tests for certbot.lineage_index."""
+import datetime
+import json
+import shutil
+import unittest
+
+import mock
+import pytz
+
+from certbot import crypto_util
+from certbot import errors
+from certbot import storage
+from certbot.compat import filesystem
+from certbot.compat import os
+from certbot.storage import ALL_FOUR
+from certbot.tests import storage_test
+from certbot.tests import util as test_util
+
+
+class LineageIndexTest(storage_test.BaseRenewableCertTest):
+    """Tests for certbot.lineage_index.LineageIndex."""
+
+    def setUp(self):
+        super(LineageIndexTest, self).setUp()
+        self.config_file["renewalparams"] = {"server": "https://acme-staging-v02.api."
+                                                       "letsencrypt.org/directory"}
+        self.config_file.write()
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+        self._write_out_kind("cert", 1, test_util.load_vector("cert-san_512.pem"))
+        self.renewal_file = self.config_file.filename
+
+    def _index(self):
+        from certbot.lineage_index import LineageIndex
+        return LineageIndex(self.config)
+
+    def test_metadata(self):
+        metadata = self._index().metadata(self.renewal_file)
+        self.assertEqual(metadata.lineagename, "example.org")
+        self.assertEqual(metadata.cert, self.test_rc.cert)
+        self.assertEqual(metadata.fullchain, self.test_rc.fullchain)
+        self.assertEqual(metadata.names(), ["example.com", "www.example.com"])
+        cert_path = self.test_rc.current_target("cert")
+        self.assertEqual(metadata.not_before, crypto_util.notBefore(cert_path))
+        self.assertEqual(metadata.target_expiry, crypto_util.notAfter(cert_path))
+        self.assertEqual(metadata.key_type, "RSA")
+        self.assertEqual(metadata.version, 1)
+        self.assertEqual(metadata.latest_version, 1)
+        self.assertTrue(metadata.is_test_cert)
+        self.assertTrue(metadata.autorenew)
+        self.assertEqual(metadata.renew_before_expiry, "30 days")
+        self.assertEqual(metadata.renewal_due,
+                         metadata.target_expiry - datetime.timedelta(days=30))
+        self.assertEqual(metadata.installer, None)
+        # Not verified unless requested
+        metadata.verify()
+
+    def test_metadata_ecdsa(self):
+        self._write_out_kind("cert", 1, test_util.load_vector("cert-nosans_nistp256.pem"))
+        self.assertEqual(self._index().metadata(self.renewal_file).key_type, "ECDSA")
+
+    def test_metadata_other_key_type(self):
+        with mock.patch("certbot.crypto_util.ParsedCertificate.key_type",
+                        new_callable=mock.PropertyMock) as mock_key_type:
+            mock_key_type.return_value = None
+            self.assertEqual(self._index().metadata(self.renewal_file).key_type, None)
+
+    def test_metadata_not_test_cert(self):
+        del self.config_file["renewalparams"]
+        self.config_file["renew_before_expiry"] = "10 days"
+        self.config_file.write()
+        metadata = self._index().metadata(self.renewal_file)
+        self.assertFalse(metadata.is_test_cert)
+        self.assertTrue(metadata.autorenew)
+        self.assertEqual(metadata.renew_before_expiry, "10 days")
+        self.assertEqual(metadata.key_params, {})
+
+    def test_metadata_key_params(self):
+        self.config_file["renewalparams"]["rsa_key_size"] = "4096"
+        self.config_file["renewalparams"]["reuse_key"] = "True"
+        self.config_file.write()
+        self.assertEqual(self._index().metadata(self.renewal_file).key_params,
+                         {"rsa_key_size": "4096", "reuse_key": "True"})
+
+    def test_metadata_autorenew_disabled(self):
+        self.config_file["renewalparams"]["autorenew"] = "False"
+        self.config_file["renewalparams"]["installer"] = "nginx"
+        self.config_file.write()
+        metadata = self._index().metadata(self.renewal_file)
+        self.assertFalse(metadata.autorenew)
+        self.assertEqual(metadata.renewal_due, None)
+        self.assertEqual(metadata.installer, "nginx")
+
+    def test_renewal_due_months(self):
+        from certbot.lineage_index import _renewal_due
+        from certbot.storage import add_time_interval
+        expiry = pytz.UTC.localize(datetime.datetime(2019, 3, 30))
+        due = _renewal_due(expiry, "1 month")
+        self.assertTrue(add_time_interval(due, "1 month") <= expiry)
+        self.assertTrue(add_time_interval(due + datetime.timedelta(days=3), "1 month") > expiry)
+        # The first estimate, 28 days before expiry, is too late
+        expiry = pytz.UTC.localize(datetime.datetime(2019, 1, 31))
+        due = _renewal_due(expiry, "1 month")
+        self.assertEqual(due, pytz.UTC.localize(datetime.datetime(2018, 12, 31)))
+
+    def test_metadata_broken_lineage(self):
+        os.unlink(self.test_rc.cert)
+        self.assertRaises(errors.CertStorageError, self._index().metadata, self.renewal_file)
+
+    def test_metadata_no_complete_version(self):
+        with mock.patch("certbot.storage.RenewableCert.latest_common_version") as mock_latest:
+            mock_latest.side_effect = ValueError
+            self.assertRaises(errors.CertStorageError,
+                              self._index().metadata, self.renewal_file)
+
+    def test_metadata_missing_cert(self):
+        with mock.patch("certbot.storage.RenewableCert.current_target") as mock_target:
+            mock_target.return_value = None
+            self.assertRaises(errors.CertStorageError,
+                              self._index().metadata, self.renewal_file)
+
+    def test_cached(self):
+        index = self._index()
+        expected = index.metadata(self.renewal_file).names()
+        index.save()
+        with mock.patch("certbot.storage.RenewableCert") as mock_renewable_cert:
+            self.assertEqual(self._index().metadata(self.renewal_file).names(), expected)
+        self.assertFalse(mock_renewable_cert.called)
+
+    def test_invalidated_by_new_cert(self):
+        index = self._index()
+        index.metadata(self.renewal_file)
+        index.save()
+        self._write_out_kind("cert", 1, test_util.load_vector("cert-5sans_512.pem"))
+        self.assertEqual(len(self._index().metadata(self.renewal_file).names()), 5)
+
+    def test_invalidated_by_new_version(self):
+        index = self._index()
+        index.metadata(self.renewal_file)
+        index.save()
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 2)
+        self._write_out_kind("cert", 2, test_util.load_vector("cert-san_512.pem"))
+        self.assertEqual(self._index().metadata(self.renewal_file).version, 2)
+
+    def test_invalidated_by_replaced_file(self):
+        index = self._index()
+        index.metadata(self.renewal_file)
+        target = storage.get_link_target(self.test_rc.cert)
+        archive_dir = os.path.dirname(target)
+        mtime, dir_mtime = os.path.getmtime(target), os.path.getmtime(archive_dir)
+        shutil.copy(target, target + ".new")
+        os.utime(target + ".new", (mtime, mtime))
+        filesystem.replace(target + ".new", target)
+        os.utime(archive_dir, (dir_mtime, dir_mtime))
+        with mock.patch("certbot.storage.RenewableCert",
+                        wraps=storage.RenewableCert) as mock_renewable_cert:
+            index.metadata(self.renewal_file)
+        self.assertTrue(mock_renewable_cert.called)
+
+    def test_other_renewal_file(self):
+        index = self._index()
+        index.metadata(self.renewal_file)
+        other_dir = os.path.join(self.tempdir, "other")
+        filesystem.makedirs(other_dir)
+        other_file = os.path.join(other_dir, os.path.basename(self.renewal_file))
+        shutil.copy(self.renewal_file, other_file)
+        with mock.patch("certbot.storage.RenewableCert",
+                        wraps=storage.RenewableCert) as mock_renewable_cert:
+            index.metadata(other_file)
+        mock_renewable_cert.assert_called_once_with(other_file, self.config)
+
+    def test_invalidated_by_broken_link(self):
+        index = self._index()
+        index.metadata(self.renewal_file)
+        os.unlink(self.test_rc.chain)
+        self.assertRaises(errors.CertStorageError, index.metadata, self.renewal_file)
+
+    @mock.patch("certbot.crypto_util.verify_renewable_cert")
+    def test_verify(self, mock_verify):
+        mock_verify.side_effect = errors.Error("corrupted")
+        index = self._index()
+        metadata = index.metadata(self.renewal_file, verify=True)
+        self.assertRaises(errors.Error, metadata.verify)
+        index.save()
+
+        # The verification result is cached as well
+        metadata = self._index().metadata(self.renewal_file, verify=True)
+        self.assertRaises(errors.Error, metadata.verify)
+        self.assertEqual(mock_verify.call_count, 1)
+
+    @mock.patch("certbot.crypto_util.verify_renewable_cert")
+    def test_verify_after_metadata(self, mock_verify):
+        index = self._index()
+        index.metadata(self.renewal_file)
+        self.assertFalse(mock_verify.called)
+        index.metadata(self.renewal_file, verify=True).verify()
+        self.assertEqual(mock_verify.call_count, 1)
+
+    def test_save_only_when_changed(self):
+        index = self._index()
+        index.save()
+        self.assertFalse(os.path.exists(index.path))
+        index.metadata(self.renewal_file)
+        index.save()
+        self.assertTrue(os.path.exists(index.path))
+
+    def test_save_prunes_removed_lineages(self):
+        index = self._index()
+        index.metadata(self.renewal_file)
+        index.save()
+        os.unlink(self.renewal_file)
+        index = self._index()
+        index.save()
+        with open(index.path) as index_file:
+            self.assertEqual(json.load(index_file)["lineages"], {})
+
+    @mock.patch("certbot.lineage_index.logger")
+    def test_save_failure(self, mock_logger):
+        index = self._index()
+        index.metadata(self.renewal_file)
+        with mock.patch("certbot.lineage_index.filesystem.replace") as mock_replace:
+            mock_replace.side_effect = OSError
+            index.save()
+        self.assertTrue(mock_logger.debug.called)
+
+    def test_unreadable_index(self):
+        index = self._index()
+        with open(index.path, "w") as index_file:
+            index_file.write("not json")
+        self.assertEqual(self._index().metadata(self.renewal_file).version, 1)
+
+    def test_unknown_index_version(self):
+        index = self._index()
+        with open(index.path, "w") as index_file:
+            json.dump({"version": 0, "lineages": {"example.org": {}}}, index_file)
+        self.assertEqual(self._index().metadata(self.renewal_file).version, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()  # pragma: no cover
@@ -567,6 +567,12 @@ class MainTest(test_util.ConfigTestCase):  # pylint: disable=too-many-public-met
             self._call([])
             self.assertEqual(1, mock_run.call_count)
 
+    def test_plugin_manifest_saved(self):
+        with mock.patch('certbot.main.plugins_cmd'):
+            self._call(['plugins'])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.config.work_dir, constants.PLUGIN_MANIFEST_FILENAME)))
+
     def test_version_string_program_name(self):
         toy_out = six.StringIO()
         toy_err = six.StringIO()
@@ -626,8 +632,8 @@ class MainTest(test_util.ConfigTestCase):  # pylint: disable=too-many-public-met
             ua = "bandersnatch"
             args += ["--user-agent", ua]
             self._call_no_clientmock(args)
-            acme_net.assert_called_once_with(mock.ANY, account=mock.ANY, verify_ssl=True,
-                user_agent=ua)
+            acme_net.assert_called_once_with(mock.ANY, alg=mock.ANY, account=mock.ANY,
+                verify_ssl=True, user_agent=ua)
 
     @mock.patch('certbot.main.plug_sel.record_chosen_plugins')
     @mock.patch('certbot.main.plug_sel.pick_installer')
@@ -1036,9 +1042,11 @@ class MainTest(test_util.ConfigTestCase):  # pylint: disable=too-many-public-met
                     # to obtain_certificate
                     mock_client.obtain_certificate.assert_called_once_with(['isnot.org'],
                         os.path.normpath(os.path.join(
-                            self.config.config_dir, "live/sample-renewal/privkey.pem")))
+                            self.config.config_dir, "live/sample-renewal/privkey.pem")),
+                        prepared_key=None)
                 else:
-                    mock_client.obtain_certificate.assert_called_once_with(['isnot.org'], None)
+                    mock_client.obtain_certificate.assert_called_once_with(
+                        ['isnot.org'], None, prepared_key=None)
             else:
                 self.assertEqual(mock_client.obtain_certificate.call_count, 0)
         except:
@@ -1583,6 +1591,22 @@ class UnregisterTest(unittest.TestCase):
         self.assertFalse(cb_client.acme.deactivate_registration.called)
 
 
+class PluginManifestTest(test_util.TempDirTestCase):
+    """Tests for certbot.main._plugin_manifest."""
+
+    def _path(self, args):
+        return main._plugin_manifest(args).path  # pylint: disable=protected-access
+
+    def test_default_work_dir(self):
+        self.assertEqual(self._path(["certificates"]), os.path.join(
+            cli.flag_default("work_dir"), constants.PLUGIN_MANIFEST_FILENAME))
+
+    def test_work_dir(self):
+        expected = os.path.join(self.tempdir, constants.PLUGIN_MANIFEST_FILENAME)
+        self.assertEqual(self._path(["--work-dir", self.tempdir]), expected)
+        self.assertEqual(self._path(["--work-dir=" + self.tempdir]), expected)
+
+
 class MakeOrVerifyNeededDirs(test_util.ConfigTestCase):
     """Tests for certbot.main.make_or_verify_needed_dirs."""
 
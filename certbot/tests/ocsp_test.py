@@ -1,11 +1,14 @@
 """Tests for ocsp.py"""
 # pylint: disable=protected-access
 import contextlib
+import threading
+import time
 import unittest
 from datetime import datetime, timedelta
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes  # type: ignore
+from cryptography.hazmat.primitives import serialization
 from cryptography.exceptions import UnsupportedAlgorithm, InvalidSignature
 from cryptography import x509
 try:
@@ -18,6 +21,7 @@ except (ImportError, AttributeError):  # pragma: no cover
 import mock
 
 from certbot import errors
+from certbot.compat import os
 from certbot.tests import util as test_util
 
 out = """Missing = in header key=value
@@ -87,6 +91,27 @@ class OCSPTestOpenSSL(unittest.TestCase):
         self.assertEqual(self.checker.ocsp_revoked("x", "y"), False)
         self.assertEqual(mock_run.call_count, 2)
 
+    def test_ocsp_revoked_many(self):
+        revoked = {"a.pem": True, "b.pem": False}
+        with mock.patch.object(self.checker, 'ocsp_revoked') as mock_revoked:
+            mock_revoked.side_effect = lambda cert, chain: revoked[cert]
+            certs = [("a.pem", "chain.pem"), ("b.pem", "chain.pem"), ("a.pem", "chain.pem")]
+            self.assertEqual(self.checker.ocsp_revoked_many(certs, workers=2),
+                             [True, False, True])
+            # Duplicate checks are sent once
+            self.assertEqual(mock_revoked.call_count, 2)
+            self.assertEqual(self.checker.ocsp_revoked_many([]), [])
+
+    @mock.patch('certbot.ocsp.logger')
+    def test_ocsp_revoked_many_deadline(self, mock_logger):
+        release = threading.Event()
+        with mock.patch.object(self.checker, 'ocsp_revoked') as mock_revoked:
+            mock_revoked.side_effect = lambda cert, chain: release.wait(10)
+            self.assertEqual(self.checker.ocsp_revoked_many([("a.pem", "chain.pem")],
+                                                            deadline=time.time()), [False])
+            release.set()
+        self.assertTrue(mock_logger.info.called)
+
     def test_determine_ocsp_server(self):
         cert_path = test_util.vector_path('ocsp_certificate.pem')
 
@@ -138,7 +163,8 @@ class OSCPTestCryptography(unittest.TestCase):
         mock_determine.return_value = ('http://example.com', 'example.com')
         self.checker.ocsp_revoked(self.cert_path, self.chain_path)
 
-        mock_revoke.assert_called_once_with(self.cert_path, self.chain_path, 'http://example.com')
+        mock_revoke.assert_called_once_with(self.cert_path, self.chain_path,
+                                            'http://example.com', None, mock.ANY)
 
     def test_revoke(self):
         with _ocsp_mock(ocsp_lib.OCSPCertStatus.REVOKED, ocsp_lib.OCSPResponseStatus.SUCCESSFUL):
@@ -249,13 +275,398 @@ class OSCPTestCryptography(unittest.TestCase):
         self.assertFalse(revoked)
 
 
+@unittest.skipIf(not ocsp_lib,
+                 reason='This class tests functionalities available only on cryptography>=2.5.0')
+class OCSPResponseCacheTest(test_util.TempDirTestCase):
+    """Tests for certbot.ocsp.OCSPResponseCache."""
+
+    def setUp(self):
+        super(OCSPResponseCacheTest, self).setUp()
+        from certbot import ocsp
+        self.cache_dir = os.path.join(self.tempdir, 'ocsp')
+        self.cache = ocsp.OCSPResponseCache(self.cache_dir)
+        self.cert_path = test_util.vector_path('ocsp_certificate.pem')
+        self.chain_path = test_util.vector_path('ocsp_issuer_certificate.pem')
+        self.issuer, self.request = ocsp._ocsp_request(self.cert_path, self.chain_path)
+        # The issuer key is not available, signatures are not checked
+        self.mock_check = mock.patch('certbot.ocsp.crypto_util.verify_signed_payload').start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+        super(OCSPResponseCacheTest, self).tearDown()
+
+    def _get(self):
+        return self.cache.get(self.request, self.issuer, self.cert_path)
+
+    def test_store_and_get(self):
+        self.assertEqual(self._get(), None)
+        self.cache.store(self.request, _construct_ocsp_response_der(
+            ocsp_lib.OCSPCertStatus.REVOKED))
+        self.assertEqual(self._get().certificate_status, ocsp_lib.OCSPCertStatus.REVOKED)
+
+    def test_stale(self):
+        self.cache.store(self.request, _construct_ocsp_response_der(
+            ocsp_lib.OCSPCertStatus.GOOD, next_update=timedelta(seconds=1)))
+        with mock.patch('certbot.ocsp.datetime', wraps=datetime) as mock_datetime:
+            mock_datetime.utcnow.return_value = datetime.utcnow() + timedelta(minutes=1)
+            self.assertEqual(self._get(), None)
+
+    def test_no_next_update(self):
+        self.cache.store(self.request, _construct_ocsp_response_der(
+            ocsp_lib.OCSPCertStatus.GOOD, next_update=None))
+        self.assertFalse(os.path.exists(self.cache_dir))
+        self.cache.store(self.request, b'not a response')
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_invalid_signature(self):
+        self.cache.store(self.request, _construct_ocsp_response_der(
+            ocsp_lib.OCSPCertStatus.GOOD))
+        self.mock_check.side_effect = InvalidSignature('foo')
+        self.assertEqual(self._get(), None)
+
+    def test_corrupted(self):
+        self.cache.store(self.request, _construct_ocsp_response_der(
+            ocsp_lib.OCSPCertStatus.GOOD))
+        for name in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, name), 'wb') as file_handler:
+                file_handler.write(b'garbage')
+        self.assertEqual(self._get(), None)
+
+    @mock.patch('certbot.ocsp.logger')
+    def test_store_failure(self, mock_logger):
+        with mock.patch('certbot.ocsp.filesystem.replace') as mock_replace:
+            mock_replace.side_effect = OSError
+            self.cache.store(self.request, _construct_ocsp_response_der(
+                ocsp_lib.OCSPCertStatus.GOOD))
+        self.assertTrue(mock_logger.debug.called)
+        self.assertEqual(self._get(), None)
+
+    @mock.patch('certbot.ocsp.requests.Session.post')
+    def test_checker(self, mock_post):
+        from certbot import ocsp
+        mock_post.return_value = mock.Mock(status_code=200, content=_construct_ocsp_response_der(
+            ocsp_lib.OCSPCertStatus.REVOKED))
+        checker = ocsp.RevocationChecker(cache_dir=self.cache_dir)
+        self.assertTrue(checker.ocsp_revoked(self.cert_path, self.chain_path))
+        self.assertTrue(checker.ocsp_revoked(self.cert_path, self.chain_path))
+        self.assertEqual(mock_post.call_count, 1)
+
+    @mock.patch('certbot.ocsp.requests.Session.post')
+    def test_next_update(self, mock_post):
+        from certbot import ocsp
+        mock_post.return_value = mock.Mock(status_code=200, content=_construct_ocsp_response_der(
+            ocsp_lib.OCSPCertStatus.GOOD))
+        checker = ocsp.RevocationChecker(cache_dir=self.cache_dir)
+        self.assertEqual(checker.next_update(self.cert_path, self.chain_path), None)
+        checker.ocsp_revoked(self.cert_path, self.chain_path)
+        next_update = checker.next_update(self.cert_path, self.chain_path)
+        assert next_update is not None
+        self.assertTrue(datetime.utcnow() < next_update < datetime.utcnow() + timedelta(days=2))
+        self.assertEqual(checker.next_update(self.cert_path, 'missing.pem'), None)
+        self.assertEqual(ocsp.RevocationChecker().next_update(self.cert_path, self.chain_path),
+                         None)
+
+    @mock.patch('certbot.util.run_script')
+    def test_checker_openssl_bin(self, mock_run):
+        from certbot import ocsp
+        with mock.patch('certbot.ocsp.Popen') as mock_popen:
+            with mock.patch('certbot.util.exe_exists') as mock_exists:
+                mock_popen.return_value.communicate.return_value = (None, out)
+                mock_exists.return_value = True
+                checker = ocsp.RevocationChecker(enforce_openssl_binary_usage=True,
+                                                 cache_dir=self.cache_dir)
+
+        def _run_script(cmd, **unused_kwargs):
+            with open(cmd[cmd.index('-respout') + 1], 'wb') as file_handler:
+                file_handler.write(_construct_ocsp_response_der(ocsp_lib.OCSPCertStatus.GOOD))
+            return tuple(_openssl_output(self.cert_path, 'good')[1:])
+        mock_run.side_effect = _run_script
+
+        self.assertFalse(checker.ocsp_revoked(self.cert_path, self.chain_path))
+        self.assertFalse(checker.ocsp_revoked(self.cert_path, self.chain_path))
+        self.assertEqual(mock_run.call_count, 1)
+        # Only the cached response is left in the cache directory
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+
+@unittest.skipIf(not ocsp_lib,
+                 reason='This class tests functionalities available only on cryptography>=2.5.0')
+class OCSPRevokedBulkTest(test_util.TempDirTestCase):
+    """Tests for certbot.ocsp.RevocationChecker.ocsp_revoked_bulk."""
+
+    def setUp(self):
+        super(OCSPRevokedBulkTest, self).setUp()
+        from certbot import ocsp
+        self.checker = ocsp.RevocationChecker()
+        self.chain_path = test_util.vector_path('ocsp_issuer_certificate.pem')
+        self.cert_path = test_util.vector_path('ocsp_certificate.pem')
+        self.cert = x509.load_pem_x509_certificate(
+            test_util.load_vector('ocsp_certificate.pem'), default_backend())
+        # Another certificate from the same issuer and OCSP responder
+        key = serialization.load_pem_private_key(
+            test_util.load_vector('rsa2048_key.pem'), None, default_backend())
+        now = datetime.utcnow()
+        self.other_cert = x509.CertificateBuilder().subject_name(
+            x509.Name([x509.NameAttribute(x509.oid.NameOID.COMMON_NAME, u'example.org')])
+        ).issuer_name(self.cert.issuer).public_key(key.public_key()).serial_number(
+            42).not_valid_before(now - timedelta(days=1)).not_valid_after(
+                now + timedelta(days=1)).add_extension(
+                    self.cert.extensions.get_extension_for_class(
+                        x509.AuthorityInformationAccess).value,
+                    critical=False).sign(key, hashes.SHA256(), default_backend())
+        self.other_cert_path = os.path.join(self.tempdir, 'cert.pem')
+        with open(self.other_cert_path, 'wb') as file_handler:
+            file_handler.write(self.other_cert.public_bytes(serialization.Encoding.PEM))
+        self.certs = [(self.cert_path, self.chain_path), (self.other_cert_path, self.chain_path)]
+        # The issuer key is not available, signatures are not checked
+        mock.patch('certbot.ocsp.crypto_util.verify_signed_payload').start()
+        self.mock_post = mock.patch('certbot.ocsp.requests.Session.post').start()
+        self.mock_post.side_effect = self._post
+        self.responses = {
+            self.cert.serial_number: _construct_ocsp_response_der(
+                ocsp_lib.OCSPCertStatus.REVOKED),
+            self.other_cert.serial_number: _construct_ocsp_response_der(
+                ocsp_lib.OCSPCertStatus.GOOD, cert=self.other_cert),
+        }
+        self.batch_response = mock.Mock(status_code=200, content=_combine_ocsp_responses_der(
+            list(self.responses.values())))
+
+    def tearDown(self):
+        mock.patch.stopall()
+        super(OCSPRevokedBulkTest, self).tearDown()
+
+    def _post(self, unused_url, data, **unused_kwargs):
+        try:
+            request = ocsp_lib.load_der_ocsp_request(data)
+        except NotImplementedError:
+            # Requests about several certificates
+            return self.batch_response
+        return mock.Mock(status_code=200, content=self.responses[request.serial_number])
+
+    def test_one_request_per_issuer(self):
+        from certbot.ocsp import _der_items
+        self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: True, self.other_cert_path: False})
+        self.assertEqual(self.mock_post.call_count, 1)
+        request = self.mock_post.call_args[1]['data']
+        request_list = _der_items(_der_items(_der_items(request)[0][1])[0][1])[0][1]
+        self.assertEqual(len(_der_items(request_list)), 2)
+
+    def test_partial_answer(self):
+        self.batch_response.content = self.responses[self.cert.serial_number]
+        self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: True, self.other_cert_path: False})
+        self.assertEqual(self.mock_post.call_count, 2)
+        # The responder is only sent single requests from now on
+        self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: True, self.other_cert_path: False})
+        self.assertEqual(self.mock_post.call_count, 4)
+
+    def test_batch_request_failure(self):
+        self.batch_response.status_code = 400
+        self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: True, self.other_cert_path: False})
+        self.assertEqual(self.mock_post.call_count, 3)
+
+    def test_offline(self):
+        import requests
+        self.mock_post.side_effect = requests.exceptions.ConnectionError
+        self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: False, self.other_cert_path: False})
+
+    def test_stale_single_response(self):
+        self.responses[self.other_cert.serial_number] = _construct_ocsp_response_der(
+            ocsp_lib.OCSPCertStatus.REVOKED, next_update=-timedelta(hours=1),
+            cert=self.other_cert)
+        self.batch_response.content = _combine_ocsp_responses_der(
+            list(self.responses.values()))
+        self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: True, self.other_cert_path: False})
+        self.assertEqual(self.mock_post.call_count, 2)
+
+    @mock.patch('certbot.ocsp._determine_ocsp_server')
+    def test_no_responder(self, mock_determine):
+        mock_determine.return_value = (None, None)
+        self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: False, self.other_cert_path: False})
+        self.assertFalse(self.mock_post.called)
+
+    def test_unreadable_certificate(self):
+        missing_path = os.path.join(self.tempdir, 'missing.pem')
+        self.assertEqual(self.checker.ocsp_revoked_bulk(
+            self.certs + [(missing_path, self.chain_path)]),
+                         {self.cert_path: True, self.other_cert_path: False,
+                          missing_path: False})
+        self.assertEqual(self.mock_post.call_count, 1)
+
+    def test_deadline(self):
+        import time
+        self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs, deadline=time.time() - 1),
+                         {self.cert_path: False, self.other_cert_path: False})
+        self.assertFalse(self.mock_post.called)
+
+        self.checker.ocsp_revoked_bulk(self.certs, deadline=time.time() + 5)
+        self.assertTrue(0 < self.mock_post.call_args[1]['timeout'] <= 5)
+
+    def test_other_cert_id_hash_algorithm(self):
+        # The CertID hashes are kept, its hash algorithm becomes 1.3.14.3.2.27
+        other_response = _construct_ocsp_response_der(
+            ocsp_lib.OCSPCertStatus.REVOKED, cert=self.other_cert)
+        self.assertEqual(other_response.count(b'\x06\x05\x2b\x0e\x03\x02\x1a'), 1)
+        self.batch_response.content = _combine_ocsp_responses_der([
+            self.responses[self.cert.serial_number],
+            other_response.replace(b'\x06\x05\x2b\x0e\x03\x02\x1a',
+                                   b'\x06\x05\x2b\x0e\x03\x02\x1b')])
+        self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: True, self.other_cert_path: False})
+        self.assertEqual(self.mock_post.call_count, 2)
+
+    def test_cached(self):
+        from certbot import ocsp
+        checker = ocsp.RevocationChecker(cache_dir=os.path.join(self.tempdir, 'ocsp'))
+        checker.ocsp_revoked(self.cert_path, self.chain_path)
+        self.assertEqual(checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: True, self.other_cert_path: False})
+        self.assertEqual(self.mock_post.call_count, 2)
+
+    def test_cache_batch_response(self):
+        from certbot import ocsp
+        checker = ocsp.RevocationChecker(cache_dir=os.path.join(self.tempdir, 'ocsp'))
+        self.assertEqual(checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: True, self.other_cert_path: False})
+        self.assertEqual(self.mock_post.call_count, 1)
+        # The batch response is cached for each certificate
+        for cert_path, chain_path in self.certs:
+            self.assertTrue(checker.next_update(cert_path, chain_path) is not None)
+        self.assertEqual(checker.ocsp_revoked_bulk(self.certs),
+                         {self.cert_path: True, self.other_cert_path: False})
+        self.assertFalse(checker.ocsp_revoked(self.other_cert_path, self.chain_path))
+        self.assertEqual(self.mock_post.call_count, 1)
+
+    def test_cache_batch_response_failure(self):
+        from certbot import ocsp
+        cache_dir = os.path.join(self.tempdir, 'ocsp')
+        checker = ocsp.RevocationChecker(cache_dir=cache_dir)
+        with mock.patch('certbot.ocsp.filesystem.replace') as mock_replace:
+            mock_replace.side_effect = OSError
+            self.assertEqual(checker.ocsp_revoked_bulk(self.certs),
+                             {self.cert_path: True, self.other_cert_path: False})
+        # The temporary file is removed
+        self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_openssl_bin(self):
+        self.checker.use_openssl_binary = True
+        with mock.patch.object(self.checker, 'ocsp_revoked_many') as mock_many:
+            mock_many.return_value = [True, False]
+            self.assertEqual(self.checker.ocsp_revoked_bulk(self.certs),
+                             {self.cert_path: True, self.other_cert_path: False})
+
+    def test_malformed_der(self):
+        from certbot.ocsp import _der_items, _der_oid, _load_ocsp_response
+        self.assertRaises(ValueError, _der_items, b'\x30')
+        self.assertRaises(ValueError, _der_items, b'\x30\x82\x01\x00')
+        self.assertRaises(ValueError, _der_items, b'\x30\x84\x00')
+        self.assertRaises(ValueError, _der_items, b'\x30\x80\x00\x00')
+        self.assertRaises(ValueError, _der_oid, b'')
+        self.assertRaises(ValueError, _load_ocsp_response, b'\x30\x00', self.cert)
+        self.assertRaises(ValueError, _load_ocsp_response, _combine_ocsp_responses_der(
+            [_construct_ocsp_response_der(ocsp_lib.OCSPCertStatus.GOOD)]).replace(
+                b'\x80\x00\x18', b'\x83\x00\x18'), self.cert)
+
+    def test_unsuccessful_response(self):
+        from certbot.ocsp import _load_ocsp_response
+        self.assertRaises(errors.Error, _load_ocsp_response, b'\x30\x03\x0a\x01\x01', self.cert)
+
+    def test_unsupported_signature_algorithm(self):
+        from certbot.ocsp import _load_ocsp_response
+        response = _combine_ocsp_responses_der(
+            [_construct_ocsp_response_der(ocsp_lib.OCSPCertStatus.GOOD)])
+        # sha256WithRSAEncryption becomes sha224WithRSAEncryption
+        response = response.replace(b'\x2a\x86\x48\x86\xf7\x0d\x01\x01\x0b',
+                                    b'\x2a\x86\x48\x86\xf7\x0d\x01\x01\x0e')
+        self.assertRaises(UnsupportedAlgorithm, _load_ocsp_response, response, self.cert)
+
+    def test_responder_by_key(self):
+        from certbot.ocsp import _load_ocsp_response
+        response = _load_ocsp_response(_combine_ocsp_responses_der([
+            _construct_ocsp_response_der(ocsp_lib.OCSPCertStatus.GOOD,
+                                         responder_encoding=ocsp_lib.OCSPResponderEncoding.HASH)
+        ]), self.cert)
+        self.assertEqual(response.responder_name, response.certificates[0].subject)
+
+    def test_der_long_length(self):
+        from certbot.ocsp import _der_encode, _der_items
+        content = b'x' * 300
+        self.assertEqual(_der_items(_der_encode(0x04, content))[0][1], content)
+
+
+def _construct_ocsp_response_der(certificate_status, next_update=timedelta(days=1), cert=None,
+                                 responder_encoding=None):
+    if cert is None:
+        cert = x509.load_pem_x509_certificate(
+            test_util.load_vector('ocsp_certificate.pem'), default_backend())
+    issuer = x509.load_pem_x509_certificate(
+        test_util.load_vector('ocsp_issuer_certificate.pem'), default_backend())
+    key = serialization.load_pem_private_key(
+        test_util.load_vector('rsa2048_key.pem'), None, default_backend())
+    now = datetime.utcnow()
+    # Delegated responder with a key we have, its signature isn't checked
+    responder = x509.CertificateBuilder().subject_name(
+        x509.Name([x509.NameAttribute(x509.oid.NameOID.COMMON_NAME, u'Test OCSP responder')])
+    ).issuer_name(issuer.subject).public_key(key.public_key()).serial_number(
+        1).not_valid_before(now - timedelta(days=1)).not_valid_after(
+            now + timedelta(days=1)).add_extension(
+                x509.ExtendedKeyUsage([x509.oid.ExtendedKeyUsageOID.OCSP_SIGNING]),
+                critical=False).sign(key, hashes.SHA256(), default_backend())
+    revoked = certificate_status == ocsp_lib.OCSPCertStatus.REVOKED
+    builder = ocsp_lib.OCSPResponseBuilder().add_response(
+        cert=cert, issuer=issuer, algorithm=hashes.SHA1(),
+        cert_status=certificate_status, this_update=now - timedelta(days=1),
+        next_update=now + next_update if next_update is not None else None,
+        revocation_time=now - timedelta(days=1) if revoked else None,
+        revocation_reason=None,
+    ).responder_id(responder_encoding or ocsp_lib.OCSPResponderEncoding.NAME,
+                   responder).certificates([responder])
+    response = builder.sign(key, hashes.SHA256())
+    return response.public_bytes(serialization.Encoding.DER)
+
+
+def _combine_ocsp_responses_der(responses_der):
+    """Build a response about the certificates of all the responses.
+
+    Its signature is invalid.
+
+    """
+    from certbot.ocsp import _der_encode, _der_items
+
+    def _parts(response_der):
+        status, response_bytes = _der_items(_der_items(response_der)[0][1])
+        oid, basic = _der_items(_der_items(response_bytes[1])[0][1])
+        basic_items = _der_items(_der_items(basic[1])[0][1])
+        return status, oid, basic_items, _der_items(basic_items[0][1])
+
+    status, oid, basic_items, data_items = _parts(responses_der[0])
+    responses = b''.join(content for der in responses_der
+                         for tag, content, _ in _parts(der)[3] if tag == 0x30)
+    response_data = b''.join(_der_encode(0x30, responses) if tag == 0x30 else encoding
+                             for tag, _, encoding in data_items)
+    basic = _der_encode(0x30, _der_encode(0x30, response_data) +
+                        b''.join(encoding for _, _, encoding in basic_items[1:]))
+    return _der_encode(0x30, status[2] + _der_encode(0xa0, _der_encode(
+        0x30, oid[2] + _der_encode(0x04, basic))))
+
+
+def _openssl_output(cert_path, status):
+    return (cert_path, "{0}: {1}\n".format(cert_path, status), "Response verify OK")
+
+
 @contextlib.contextmanager
 def _ocsp_mock(certificate_status, response_status,
                http_status_code=200, check_signature_side_effect=None):
     with mock.patch('certbot.ocsp.ocsp.load_der_ocsp_response') as mock_response:
         mock_response.return_value = _construct_mock_ocsp_response(
             certificate_status, response_status)
-        with mock.patch('certbot.ocsp.requests.post') as mock_post:
+        with mock.patch('certbot.ocsp.requests.Session.post') as mock_post:
             mock_post.return_value = mock.Mock(status_code=http_status_code)
             with mock.patch('certbot.ocsp.crypto_util.verify_signed_payload') as mock_check:
                 if check_signature_side_effect:
@@ -1,12 +1,18 @@
 """Tests for certbot.renewal"""
+import datetime
 import unittest
+
 import mock
+import pytz
 
 from acme import challenges
+from acme.magic_typing import Dict, List, Tuple  # pylint: disable=unused-import, no-name-in-module
 
 from certbot import configuration
+from certbot import crypto_util
 from certbot import errors
 from certbot import storage
+from certbot.compat import os
 
 import certbot.tests.util as test_util
 
@@ -113,5 +119,407 @@ class RestoreRequiredConfigElementsTest(test_util.ConfigTestCase):
             errors.Error, self._call, self.config, renewalparams)
 
 
+class ConcurrentRenewalTest(test_util.ConfigTestCase):
+    """Tests for renewing lineages with --renew-concurrency."""
+    def setUp(self):
+        super(ConcurrentRenewalTest, self).setUp()
+        self.config.renew_concurrency = 3
+        self.config.webroot_map = {}
+        self.config.domains = []
+        self.config.certname = None
+        self.config.random_sleep_on_renew = False
+
+    @mock.patch('certbot.renewal._renew_describe_results')
+    @mock.patch('certbot.renewal._renew_lineage')
+    @mock.patch('certbot.renewal.storage.renewal_conf_files')
+    def test_results_in_order(self, mock_conf_files, mock_renew_lineage, mock_describe):
+        from certbot import renewal
+        mock_conf_files.return_value = ['a.conf', 'b.conf', 'c.conf', 'd.conf']
+        outcomes = {
+            'a.conf': ('success', 'a'), 'b.conf': ('skipped', 'b'),
+            'c.conf': ('success', 'c'), 'd.conf': ('parsefail', 'd.conf'),
+        }
+        mock_renew_lineage.side_effect = lambda _, path, *args: outcomes[path]
+
+        self.assertRaises(errors.Error, renewal.handle_renewal_request, self.config)
+
+        for call in mock_renew_lineage.call_args_list:
+            self.assertTrue(isinstance(call[0][3], renewal._PluginLocks))  # pylint: disable=protected-access
+        mock_describe.assert_called_once_with(
+            self.config, ['a', 'c'], [], ['b'], ['d.conf'])
+
+    @mock.patch('certbot.renewal._renew_candidate')
+    @mock.patch('certbot.renewal._reconstitute')
+    def test_lineage_config_isolation(self, mock_reconstitute, mock_renew_candidate):
+        import zope.component
+        from certbot import interfaces
+        from certbot import renewal
+
+        def _reconstitute(config, path):
+            config.certname = path
+            return mock.MagicMock()
+        mock_reconstitute.side_effect = _reconstitute
+        # getUtility itself is mocked out by patch_get_utility
+        mock_renew_candidate.side_effect = lambda *args: (
+            'success',
+            zope.component.getSiteManager().getUtility(interfaces.IConfig).certname)
+        zope.component.provideUtility(self.config)
+
+        with test_util.patch_get_utility():
+            outcomes = renewal._renew_concurrently(  # pylint: disable=protected-access
+                self.config, ['a.conf', 'b.conf', 'c.conf'], mock.MagicMock())
+
+        self.assertEqual(outcomes, [('success', 'a.conf'), ('success', 'b.conf'),
+                                    ('success', 'c.conf')])
+        self.assertTrue(
+            zope.component.getSiteManager().getUtility(interfaces.IConfig) is self.config)
+        self.assertTrue(self.config.certname is None)
+
+    def test_plugin_locks(self):
+        from certbot import renewal
+        plugins = {
+            'dns-cloudflare': mock.MagicMock(plugin_cls=mock.MagicMock(thread_safe=True)),
+            'dns-google': mock.MagicMock(plugin_cls=mock.MagicMock(thread_safe=False)),
+            'webroot': mock.MagicMock(plugin_cls=object),
+        }
+        plugin_locks = renewal._PluginLocks(plugins)  # pylint: disable=protected-access
+        self.config.authenticator = 'dns-cloudflare'
+        self.config.installer = None
+        self.assertEqual(plugin_locks.locks_for(self.config), [])
+
+        self.config.authenticator = 'dns-google'
+        self.assertEqual(len(plugin_locks.locks_for(self.config)), 1)
+
+        self.config.authenticator = 'standalone'
+        standalone_locks = plugin_locks.locks_for(self.config)
+        self.assertEqual(len(standalone_locks), 1)
+
+        self.config.authenticator = 'webroot'
+        self.config.installer = 'nginx'
+        self.assertEqual(len(plugin_locks.locks_for(self.config)), 2)
+
+        self.config.authenticator = 'nginx'
+        nginx_locks = plugin_locks.locks_for(self.config)
+        self.assertEqual(len(nginx_locks), 1)
+        self.assertFalse(nginx_locks[0] is standalone_locks[0])
+
+    @mock.patch('certbot.renewal.time.sleep')
+    def test_random_sleep_once(self, mock_sleep):
+        from certbot import renewal
+        random_sleep = renewal._RandomSleep(True)  # pylint: disable=protected-access
+        random_sleep()
+        random_sleep()
+        self.assertEqual(mock_sleep.call_count, 1)
+
+        random_sleep = renewal._RandomSleep(False)  # pylint: disable=protected-access
+        random_sleep()
+        self.assertEqual(mock_sleep.call_count, 1)
+
+
+class ScheduleTest(test_util.ConfigTestCase):
+    """Tests for certbot.renewal._schedule and --max-renewals-per-run."""
+    def setUp(self):
+        super(ScheduleTest, self).setUp()
+        self.config.renew_by_default = False
+        self.config.dry_run = False
+        self.config.disable_renew_updates = False
+        self.now = pytz.UTC.fromutc(datetime.datetime.utcnow())
+        self.metadata = {}  # type: Dict[str, mock.MagicMock]
+        self.checked = []  # type: List[str]
+
+    def _add(self, renewal_file, due, **kwargs):
+        metadata = mock.MagicMock(version=1, latest_version=1, renewal_due=due,
+                                  installer=None, fullchain=renewal_file + '.pem',
+                                  cert=renewal_file + '.cert', revoked=False,
+                                  target_expiry=self.now + datetime.timedelta(days=60))
+        for name, value in kwargs.items():
+            setattr(metadata, name, value)
+        self.metadata[renewal_file] = metadata
+
+    def _schedule(self, conf_files):
+        from certbot import renewal
+
+        def _metadata(renewal_file):
+            if renewal_file not in self.metadata:
+                raise errors.CertStorageError('broken')
+            return self.metadata[renewal_file]
+
+        def _saved_revoked(unused_config, cert_path):
+            self.checked.append(cert_path)
+            return self.metadata[cert_path[:-len('.cert')]].revoked
+        with mock.patch('certbot.renewal.lineage_index.LineageIndex.metadata') as mock_metadata:
+            mock_metadata.side_effect = _metadata
+            with mock.patch('certbot.renewal.storage.saved_ocsp_revoked') as mock_revoked:
+                mock_revoked.side_effect = _saved_revoked
+                # pylint: disable=protected-access
+                return renewal._schedule(self.config, conf_files)
+
+    def test_not_due_skipped(self):
+        self._add('a.conf', self.now + datetime.timedelta(days=30))
+        self._add('b.conf', None)
+        scheduled, outcomes, due, unchecked = self._schedule(['a.conf', 'b.conf'])
+        self.assertEqual(scheduled, [])
+        self.assertEqual(due, [])
+        self.assertEqual(unchecked, [])
+        expiry = (self.now + datetime.timedelta(days=60)).strftime('%Y-%m-%d')
+        self.assertEqual(outcomes, [('skipped', 'a.conf.pem expires on ' + expiry),
+                                    ('skipped', 'b.conf.pem expires on ' + expiry)])
+
+    def test_most_urgent_first(self):
+        self._add('late.conf', self.now - datetime.timedelta(days=1))
+        self._add('early.conf', self.now - datetime.timedelta(days=5))
+        self._add('pending.conf', self.now + datetime.timedelta(days=30), latest_version=2)
+        self._add('updater.conf', self.now + datetime.timedelta(days=30), installer='nginx')
+        self._add('later.conf', self.now + datetime.timedelta(days=30))
+        conf_files = ['late.conf', 'early.conf', 'updater.conf', 'later.conf',
+                      'pending.conf', 'broken.conf']
+        scheduled, outcomes, due, _ = self._schedule(conf_files)
+        self.assertEqual([conf_files[position] for position in scheduled],
+                         ['pending.conf', 'broken.conf', 'early.conf', 'late.conf',
+                          'updater.conf'])
+        self.assertEqual([outcome is None for outcome in outcomes],
+                         [True, True, True, False, True, True])
+        # Broken lineages and those only due for an update don't need a key
+        self.assertEqual(due, [(4, self.metadata['pending.conf']),
+                               (1, self.metadata['early.conf']),
+                               (0, self.metadata['late.conf'])])
+
+    def test_revoked(self):
+        self._add('a.conf', self.now + datetime.timedelta(days=30))
+        self._add('b.conf', self.now + datetime.timedelta(days=30), revoked=True)
+        self._add('c.conf', None, revoked=True)
+        self._add('d.conf', self.now - datetime.timedelta(days=1), revoked=True)
+        self.assertEqual(self._schedule(['a.conf', 'b.conf', 'c.conf', 'd.conf'])[0], [3, 1])
+        # Only the saved status of the lineages that are not due is read
+        self.assertEqual(self.checked, ['a.conf.cert', 'b.conf.cert'])
+
+    def test_ocsp_status_not_saved(self):
+        self._add('a.conf', self.now + datetime.timedelta(days=30), revoked=None,
+                  chain='a.conf.chain')
+        scheduled, _, _, unchecked = self._schedule(['a.conf'])
+        self.assertEqual(scheduled, [])
+        self.assertEqual(unchecked, [('a.conf.cert', 'a.conf.chain')])
+
+    def test_disable_renew_updates(self):
+        self._add('a.conf', self.now + datetime.timedelta(days=30), installer='nginx')
+        self.config.disable_renew_updates = True
+        self.assertEqual(self._schedule(['a.conf'])[0], [])
+
+    def test_forced(self):
+        self._add('a.conf', self.now + datetime.timedelta(days=30))
+        self.config.dry_run = True
+        self.assertEqual(self._schedule(['a.conf'])[0], [0])
+
+    @mock.patch('certbot.renewal._renew_describe_results')
+    @mock.patch('certbot.renewal._renew_lineage')
+    @mock.patch('certbot.renewal.storage.renewal_conf_files')
+    @mock.patch('certbot.renewal.key_pool.get_pool')
+    @mock.patch('certbot.renewal.storage.cached_ocsp_revoked_bulk')
+    def test_nothing_due(self, mock_revoked_bulk, mock_get_pool, mock_conf_files,
+                         mock_renew_lineage, mock_describe):
+        from certbot import renewal
+        self.config.webroot_map = {}
+        self.config.domains = []
+        self.config.certname = None
+        self.config.random_sleep_on_renew = False
+        mock_conf_files.return_value = ['a.conf']
+        self._add('a.conf', self.now + datetime.timedelta(days=30), chain='a.conf.chain')
+        with mock.patch('certbot.renewal.lineage_index.LineageIndex.metadata') as mock_metadata:
+            mock_metadata.return_value = self.metadata['a.conf']
+            with mock.patch('certbot.renewal.storage.saved_ocsp_revoked') as mock_revoked:
+                mock_revoked.return_value = False
+                renewal.handle_renewal_request(self.config)
+                self.assertFalse(mock_revoked_bulk.called)
+
+                # A stale OCSP status is refreshed after the renewals
+                mock_revoked.return_value = None
+                mock_revoked_bulk.return_value = {'a.conf.cert': True}
+                with mock.patch('certbot.renewal.logger') as mock_logger:
+                    renewal.handle_renewal_request(self.config)
+        self.assertFalse(mock_renew_lineage.called)
+        self.assertFalse(mock_get_pool.called)
+        self.assertEqual(len(mock_describe.call_args[0][3]), 1)
+        self.assertEqual(mock_revoked_bulk.call_args[0][1], [('a.conf.cert', 'a.conf.chain')])
+        self.assertTrue(mock_logger.warning.called)
+
+    def test_budget(self):
+        from certbot import renewal
+        budget = renewal._RenewalBudget(1)  # pylint: disable=protected-access
+        self.assertTrue(budget.consume())
+        self.assertFalse(budget.consume())
+        budget = renewal._RenewalBudget(None)  # pylint: disable=protected-access
+        self.assertTrue(all(budget.consume() for _ in range(10)))
+
+    @mock.patch('certbot.renewal.updater.run_generic_updaters')
+    @mock.patch('certbot.renewal.plugins_disco.PluginsRegistry.find_all')
+    @mock.patch('certbot.renewal.crypto_util.notAfter')
+    @mock.patch('certbot.renewal.should_renew')
+    def test_budget_exhausted(self, mock_should_renew, mock_not_after, unused_find_all,
+                              mock_updaters):
+        from certbot import renewal
+        mock_should_renew.return_value = True
+        mock_not_after.return_value = self.now
+        budget = renewal._RenewalBudget(0)  # pylint: disable=protected-access
+        candidate = mock.MagicMock(fullchain='fullchain.pem')
+        random_sleep = mock.MagicMock()
+        with mock.patch('certbot.main.renew_cert') as mock_renew_cert:
+            outcome = renewal._renew_candidate(  # pylint: disable=protected-access
+                self.config, candidate, 'a', 'a.conf', random_sleep, budget)
+        self.assertEqual(outcome, ('skipped', 'fullchain.pem expires on {0} '
+                                   '(deferred to a later run)'.format(
+                                       self.now.strftime('%Y-%m-%d'))))
+        self.assertFalse(mock_renew_cert.called)
+        self.assertFalse(random_sleep.called)
+        self.assertTrue(mock_updaters.called)
+
+
+class KeyPipelineTest(test_util.ConfigTestCase):
+    """Tests for certbot.renewal._KeyPipeline."""
+    def setUp(self):
+        super(KeyPipelineTest, self).setUp()
+        from certbot import renewal
+        self.config.key_type = 'ecdsa'
+        self.config.elliptic_curve = 'secp256r1'
+        self.config.must_staple = False
+        self.parameters = renewal._key_parameters(self.config)  # pylint: disable=protected-access
+        self.pipeline = renewal._KeyPipeline(1)  # pylint: disable=protected-access
+
+    def tearDown(self):
+        self.pipeline.close()
+        super(KeyPipelineTest, self).tearDown()
+
+    def test_take(self):
+        self.pipeline.submit('a', self.parameters, ['a.example.com'])
+        key_pem, csr_pem = self.pipeline.take('a', self.config, ['a.example.com'])
+        self.assertTrue(crypto_util.valid_privkey(key_pem))
+        self.assertTrue(crypto_util.valid_csr(csr_pem))
+        self.assertTrue(crypto_util.csr_matches_pubkey(csr_pem, key_pem))
+        # A key is only taken once
+        self.assertEqual(self.pipeline.take('a', self.config, ['a.example.com']), None)
+
+    def test_take_pooled_key(self):
+        key_pem = test_util.load_vector('nistp256_key.pem')
+        self.pipeline.submit('a', self.parameters, ['a.example.com'], key_pem)
+        taken_key_pem, csr_pem = self.pipeline.take('a', self.config, ['a.example.com'])
+        self.assertEqual(taken_key_pem, key_pem)
+        self.assertTrue(crypto_util.csr_matches_pubkey(csr_pem, key_pem))
+
+    def test_take_not_submitted(self):
+        self.assertEqual(self.pipeline.take('a', self.config, ['a.example.com']), None)
+
+    def test_take_changed(self):
+        self.pipeline.submit('a', self.parameters, ['a.example.com'])
+        self.pipeline.submit('b', self.parameters, ['b.example.com'])
+        self.assertEqual(self.pipeline.take('a', self.config, ['c.example.com']), None)
+        self.config.elliptic_curve = 'secp384r1'
+        self.assertEqual(self.pipeline.take('b', self.config, ['b.example.com']), None)
+
+    def test_take_failure(self):
+        self.config.key_type = 'dsa'
+        from certbot import renewal
+        parameters = renewal._key_parameters(self.config)  # pylint: disable=protected-access
+        self.pipeline.submit('a', parameters, ['a.example.com'])
+        self.assertEqual(self.pipeline.take('a', self.config, ['a.example.com']), None)
+
+
+class StartKeyPipelineTest(test_util.ConfigTestCase):
+    """Tests for certbot.renewal._start_key_pipeline."""
+    def setUp(self):
+        super(StartKeyPipelineTest, self).setUp()
+        self.config.max_renewals_per_run = None
+        self.config.renew_by_default = False
+        self.config.dry_run = False
+        self.due = []  # type: List[Tuple[int, mock.MagicMock]]
+
+    def _add(self, name, autorenew=True, **key_params):
+        metadata = mock.MagicMock(lineagename=name, autorenew=autorenew, key_params=key_params)
+        metadata.names.return_value = [name + '.example.com']
+        self.due.append((len(self.due), metadata))
+
+    @mock.patch('certbot.renewal._KeyPipeline')
+    def _call(self, mock_pipeline):
+        from certbot import renewal
+        # pylint: disable=protected-access
+        if renewal._start_key_pipeline(self.config, self.due) is None:
+            return None
+        mock_pipeline.assert_called_once_with(mock.ANY)
+        return [call[0] for call in mock_pipeline.return_value.submit.call_args_list]
+
+    @mock.patch('certbot.renewal.cli.set_by_cli')
+    def test_submitted(self, mock_set_by_cli):
+        mock_set_by_cli.return_value = False
+        self._add('a', key_type='ecdsa', elliptic_curve='secp384r1')
+        self._add('b', reuse_key='True')
+        self._add('c', rsa_key_size='4096', must_staple='True')
+        self.assertEqual(self._call(), [
+            ('a', (self.config.rsa_key_size, 'ecdsa', 'secp384r1', self.config.must_staple),
+             ['a.example.com'], None),
+            ('c', (4096, self.config.key_type, self.config.elliptic_curve, True),
+             ['c.example.com'], None)])
+
+    @mock.patch('certbot.renewal.cli.set_by_cli')
+    def test_set_by_cli(self, mock_set_by_cli):
+        mock_set_by_cli.side_effect = lambda name: name == 'rsa_key_size'
+        self.config.rsa_key_size = 3072
+        self._add('a', rsa_key_size='4096')
+        self._add('b')
+        self.assertEqual([job[1][0] for job in self._call()], [3072, 3072])
+
+    @mock.patch('certbot.renewal.cli.set_by_cli')
+    def test_single_key(self, mock_set_by_cli):
+        mock_set_by_cli.return_value = False
+        self._add('a')
+        self._add('b', rsa_key_size='not a size')
+        self.assertEqual(self._call(), None)
+        self._add('c')
+        self.config.max_renewals_per_run = 2
+        self.assertEqual(self._call(), None)
+
+    @mock.patch('certbot.renewal.cli.set_by_cli')
+    def test_autorenew_disabled(self, mock_set_by_cli):
+        mock_set_by_cli.return_value = False
+        self._add('a')
+        self._add('b', autorenew=False)
+        self.assertEqual(self._call(), None)
+        self.config.renew_by_default = True
+        self.assertEqual([job[0] for job in self._call()], ['a', 'b'])
+
+    @mock.patch('certbot.renewal.key_pool.get_pool')
+    @mock.patch('certbot.renewal.cli.set_by_cli')
+    def test_key_pool(self, mock_set_by_cli, mock_get_pool):
+        mock_set_by_cli.return_value = False
+        mock_get_pool.return_value.take.side_effect = [b'pooled key', None]
+        self._add('a')
+        self._add('b', key_type='ecdsa', elliptic_curve='secp384r1')
+        self.assertEqual([job[3] for job in self._call()], [b'pooled key', None])
+        mock_get_pool.assert_called_once_with(self.config)
+        self.assertEqual(mock_get_pool.return_value.take.call_args_list, [
+            mock.call(self.config.rsa_key_size, self.config.key_type,
+                      self.config.elliptic_curve),
+            mock.call(self.config.rsa_key_size, 'ecdsa', 'secp384r1')])
+
+    @mock.patch('certbot.renewal._renew_lineage')
+    @mock.patch('certbot.renewal._renew_describe_results')
+    @mock.patch('certbot.renewal.storage.renewal_conf_files')
+    @mock.patch('certbot.renewal._schedule')
+    @mock.patch('certbot.renewal._start_key_pipeline')
+    @mock.patch('certbot.renewal.key_pool.get_pool')
+    def test_closed(self, mock_get_pool, mock_start, mock_schedule, mock_conf_files,
+                    unused_describe, mock_renew_lineage):
+        from certbot import renewal
+        self.config.certname = None
+        self.config.random_sleep_on_renew = False
+        self.config.renew_concurrency = 1
+        mock_conf_files.return_value = ['a.conf']
+
+        mock_schedule.return_value = [0], [None], [], []
+        mock_renew_lineage.side_effect = KeyboardInterrupt
+        self.assertRaises(KeyboardInterrupt, renewal.handle_renewal_request, self.config)
+        self.assertTrue(mock_start.return_value.close.called)
+        self.assertTrue(mock_renew_lineage.call_args[0][5] is mock_start.return_value)
+        # The key pool is only started when keys are needed, by _start_key_pipeline
+        self.assertFalse(mock_get_pool.called)
+
+
 if __name__ == "__main__":
     unittest.main()  # pragma: no cover
@@ -690,11 +690,135 @@ class RenewableCertTests(BaseRenewableCertTest):
             errors.CertStorageError,
             self.test_rc._update_link_to, "elephant", 17)
 
-    def test_ocsp_revoked(self):
-        # XXX: This is currently hardcoded to False due to a lack of an
-        #      OCSP server to test against.
+    @mock.patch("certbot.storage.cached_ocsp_revoked")
+    def test_ocsp_revoked(self, mock_revoked):
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+            self._write_out_kind(kind, 2)
+        mock_revoked.return_value = True
+        self.assertTrue(self.test_rc.ocsp_revoked())
+        mock_revoked.assert_called_with(self.config, self.test_rc.current_target("cert"),
+                                        self.test_rc.current_target("chain"))
+        self.assertTrue(self.test_rc.ocsp_revoked(1))
+        mock_revoked.assert_called_with(self.config, self.test_rc.version("cert", 1),
+                                        self.test_rc.version("chain", 1))
+        os.unlink(self.test_rc.chain)
         self.assertFalse(self.test_rc.ocsp_revoked())
 
+    @mock.patch("certbot.storage.ocsp.RevocationChecker")
+    def test_cached_ocsp_revoked(self, mock_checker):
+        from certbot.storage import cached_ocsp_revoked
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+        checker = mock_checker.return_value
+        checker.ocsp_revoked.return_value = True
+        checker.next_update.return_value = (
+            datetime.datetime.utcnow() + datetime.timedelta(days=1))
+        self.assertTrue(cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain))
+        mock_checker.assert_called_once_with(cache_dir=self.config.ocsp_cache_dir)
+        # The status is saved next to the OCSP responses until nextUpdate, not in the archive
+        self.assertEqual(len(os.listdir(os.path.join(self.config.ocsp_cache_dir, "status"))), 1)
+        self.assertEqual(sorted(os.listdir(self.test_rc.archive_dir)),
+                         sorted(kind + "1.pem" for kind in ALL_FOUR))
+        checker.ocsp_revoked.return_value = False
+        self.assertTrue(cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain))
+        self.assertEqual(checker.ocsp_revoked.call_count, 1)
+        # A new version is checked again
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 2)
+        self.assertFalse(cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain))
+        self.assertEqual(checker.ocsp_revoked.call_count, 2)
+
+    @mock.patch("certbot.storage.ocsp.RevocationChecker")
+    def test_cached_ocsp_revoked_refresh(self, mock_checker):
+        from certbot.storage import cached_ocsp_revoked
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+        checker = mock_checker.return_value
+        checker.ocsp_revoked.return_value = True
+        # Without nextUpdate, a revoked status is checked again after a day
+        checker.next_update.return_value = None
+        self.assertTrue(cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain))
+        self.assertTrue(cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain))
+        self.assertEqual(checker.ocsp_revoked.call_count, 1)
+        later = datetime.datetime.utcnow() + datetime.timedelta(days=2)
+        with mock.patch("certbot.storage.datetime") as mock_datetime:
+            mock_datetime.datetime.utcnow.return_value = later
+            mock_datetime.timedelta = datetime.timedelta
+            cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain)
+        self.assertEqual(checker.ocsp_revoked.call_count, 2)
+
+    @mock.patch("certbot.storage.ocsp.RevocationChecker")
+    def test_saved_ocsp_revoked(self, mock_checker):
+        from certbot.storage import cached_ocsp_revoked, saved_ocsp_revoked
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+        self.assertEqual(saved_ocsp_revoked(self.config, self.test_rc.cert), None)
+        checker = mock_checker.return_value
+        checker.ocsp_revoked.return_value = True
+        checker.next_update.return_value = None
+        cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain)
+        self.assertTrue(saved_ocsp_revoked(self.config, self.test_rc.cert))
+        self.assertEqual(checker.ocsp_revoked.call_count, 1)
+
+    @mock.patch("certbot.storage.ocsp.RevocationChecker")
+    def test_cached_ocsp_revoked_failure(self, mock_checker):
+        from certbot.storage import cached_ocsp_revoked
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+        checker = mock_checker.return_value
+        # A failed check is not saved as a good status
+        checker.ocsp_revoked.return_value = False
+        checker.next_update.return_value = None
+        self.assertFalse(cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain))
+        self.assertFalse(cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain))
+        self.assertEqual(checker.ocsp_revoked.call_count, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.config.ocsp_cache_dir, "status")))
+
+    @mock.patch("certbot.storage.logger")
+    @mock.patch("certbot.storage.ocsp.RevocationChecker")
+    def test_cached_ocsp_revoked_save_failure(self, mock_checker, mock_logger):
+        from certbot.storage import cached_ocsp_revoked
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+        mock_checker.return_value.ocsp_revoked.return_value = True
+        mock_checker.return_value.next_update.return_value = None
+        with mock.patch("certbot.storage.filesystem.replace") as mock_replace:
+            mock_replace.side_effect = OSError
+            self.assertTrue(cached_ocsp_revoked(
+                self.config, self.test_rc.cert, self.test_rc.chain))
+        self.assertTrue(mock_logger.debug.called)
+        # The temporary file is removed
+        self.assertEqual(os.listdir(os.path.join(self.config.ocsp_cache_dir, "status")), [])
+
+    @mock.patch("certbot.storage.ocsp.RevocationChecker")
+    def test_cached_ocsp_revoked_bulk(self, mock_checker):
+        from certbot.storage import cached_ocsp_revoked, cached_ocsp_revoked_bulk
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+        other_dir = os.path.join(self.config.config_dir, "archive", "other.example.org")
+        filesystem.makedirs(other_dir)
+        other_cert = os.path.join(other_dir, "cert1.pem")
+        other_chain = os.path.join(other_dir, "chain1.pem")
+        checker = mock_checker.return_value
+        checker.ocsp_revoked.return_value = True
+        checker.next_update.return_value = None
+        self.assertTrue(cached_ocsp_revoked(self.config, self.test_rc.cert, self.test_rc.chain))
+
+        checker.ocsp_revoked_bulk.return_value = {other_cert: False}
+        checker.next_update.return_value = (
+            datetime.datetime.utcnow() + datetime.timedelta(days=1))
+        self.assertEqual(cached_ocsp_revoked_bulk(
+            self.config, [(self.test_rc.cert, self.test_rc.chain), (other_cert, other_chain)],
+            deadline=42), {self.test_rc.cert: True, other_cert: False})
+        # Only the certificate without a saved status is checked, by a single checker
+        self.assertEqual(mock_checker.call_count, 2)
+        checker.ocsp_revoked_bulk.assert_called_once_with(
+            [(other_cert, other_chain)], deadline=42)
+        self.assertEqual(cached_ocsp_revoked_bulk(
+            self.config, [(other_cert, other_chain)]), {other_cert: False})
+        self.assertEqual(mock_checker.call_count, 2)
+
     def test_add_time_interval(self):
         from certbot import storage
 
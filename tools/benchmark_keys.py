@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""Compares the cost of RSA and ECDSA keys in Certbot.
+
+For each kind of key, measures how long it takes to generate a key with
+`certbot.crypto_util.make_key`, to create a CSR with
+`acme.crypto_util.make_csr` and to sign an ACME request with
+`acme.client.ClientNetwork._wrap_in_jws`, using the signature algorithm
+Certbot uses for account keys of this kind.
+
+Usage: python benchmark_keys.py [RUNS]
+"""
+from __future__ import print_function
+
+import sys
+import timeit
+
+import josepy as jose
+
+from acme import client
+from acme import crypto_util as acme_crypto_util
+from acme import jws
+from acme import messages
+from certbot import crypto_util
+
+KINDS = [
+    ('RSA 2048', 2048, 'rsa', None),
+    ('RSA 4096', 4096, 'rsa', None),
+    ('ECDSA P-256', None, 'ecdsa', 'secp256r1'),
+    ('ECDSA P-384', None, 'ecdsa', 'secp384r1'),
+]
+
+DOMAINS = ['example.com', 'www.example.com']
+
+
+def measure(func, runs):
+    """Returns the median time of a call to func, in milliseconds."""
+    times = sorted(timeit.repeat(func, number=1, repeat=runs))
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    # pylint: disable=cell-var-from-loop
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print('{0:<12} {1:>12} {2:>12} {3:>12}'.format('key', 'keygen (ms)', 'CSR (ms)', 'JWS (ms)'))
+    for name, bits, key_type, curve in KINDS:
+        keygen = measure(lambda: crypto_util.make_key(bits, key_type, curve), runs)
+        key_pem = crypto_util.make_key(bits, key_type, curve)
+        csr = measure(lambda: acme_crypto_util.make_csr(key_pem, DOMAINS), runs)
+        key = jws.JWKEC.load(key_pem) if key_type == 'ecdsa' else jose.JWKRSA.load(key_pem)
+        net = client.ClientNetwork(key, alg=jws.signature_algorithm(key))
+        order = messages.NewOrder(identifiers=[
+            messages.Identifier(typ=messages.IDENTIFIER_FQDN, value=domain)
+            for domain in DOMAINS])
+        # pylint: disable=protected-access
+        signing = measure(lambda: net._wrap_in_jws(
+            order, b'nonce', 'https://example.com/acme/new-order', 2, None), runs)
+        print('{0:<12} {1:>12.2f} {2:>12.2f} {3:>12.2f}'.format(name, keygen, csr, signing))
+
+
+if __name__ == '__main__':
+    main()
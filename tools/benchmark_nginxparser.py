@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Measures the throughput of the nginx configuration parsers.
+
+Every file under DIRECTORY, which defaults to the roundtrip test data of
+certbot-compatibility-test, is parsed by the pyparsing grammar
+`certbot_nginx.nginxparser.RawNginxParser` and by
+`certbot_nginx.nginxparser.StreamingNginxParser`, used by
+`certbot_nginx.nginxparser.loads`. Files that the parsers reject are
+skipped.
+
+Usage: python benchmark_nginxparser.py [DIRECTORY] [RUNS]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+from pyparsing import ParseException
+
+from certbot_nginx import nginxparser
+
+DEFAULT_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir,
+    'certbot-compatibility-test', 'nginx', 'nginx-roundtrip-testdata')
+
+PARSERS = [
+    ('pyparsing', nginxparser.RawNginxParser),
+    ('streaming', nginxparser.StreamingNginxParser),
+]
+
+
+def read_sources(directory):
+    """Returns the content of the files the parsers accept."""
+    sources = []
+    for where, _, files in os.walk(directory):
+        for name in files:
+            with open(os.path.join(where, name)) as handle:
+                source = handle.read()
+            try:
+                nginxparser.StreamingNginxParser(source).as_list()
+            except ParseException:
+                continue
+            sources.append(source)
+    return sources
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIRECTORY
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    sources = read_sources(directory)
+    megabytes = sum(len(source) for source in sources) / 1e6
+    print('{0} files, {1:.2f} MB'.format(len(sources), megabytes))
+    print('{0:<10} {1:>10} {2:>10}'.format('parser', 'time (s)', 'MB/s'))
+    for name, parser in PARSERS:
+        def parse_all(parser=parser):
+            for source in sources:
+                parser(source).as_list()
+        seconds = min(timeit.repeat(parse_all, number=1, repeat=runs))
+        print('{0:<10} {1:>10.3f} {2:>10.2f}'.format(name, seconds, megabytes / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""Measures how long Certbot takes to run commands doing little work.
+
+The commands are run with empty configuration, working and logs
+directories in a temporary directory, so that `certbot certificates`
+finds no certificate and `certbot renew` has nothing to renew. Their
+run time is then dominated by imports, plugin discovery and command
+line parsing.
+
+The first run of each command is reported separately: it fills caches,
+such as the plugin manifest, used by the following runs.
+
+Usage: python benchmark_startup.py [RUNS]
+"""
+from __future__ import print_function
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+COMMANDS = [
+    ['certificates'],
+    ['renew'],
+]
+
+
+def run(command, directory):
+    """Runs Certbot and returns how long it took."""
+    args = [sys.executable, '-m', 'certbot.main'] + command + [
+        '--config-dir', directory + '/config',
+        '--work-dir', directory + '/work',
+        '--logs-dir', directory + '/logs',
+        '--non-interactive', '--quiet']
+    start = time.time()
+    subprocess.check_call(args)
+    return time.time() - start
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for command in COMMANDS:
+        directory = tempfile.mkdtemp()
+        try:
+            first = run(command, directory)
+            times = sorted(run(command, directory) for _ in range(runs))
+        finally:
+            shutil.rmtree(directory)
+        print('certbot {0}: first run {1:.3f}s, then min {2:.3f}s, median {3:.3f}s'.format(
+            ' '.join(command), first, times[0], times[len(times) // 2]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# Runs mypy on the given source paths in the Python 2.7 mode of mypy.ini,
+# except for the modules using Python 3.5+ syntax, which are checked in the
+# Python 3 mode of the running interpreter. mypy has no option to exclude
+# files from the directories it is given.
+
+from __future__ import absolute_import
+
+import os
+import subprocess
+import sys
+
+PY35_MODULES = [
+    os.path.join('acme', 'acme', 'aio.py'),
+    os.path.join('acme', 'acme', 'aio_test.py'),
+]
+
+
+def python_files(paths):
+    """Lists the Python files mypy finds in the given paths, except PY35_MODULES.
+
+    As in mypy, directories which are not packages are skipped.
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(os.path.normpath(path))
+            continue
+        for where, dirs, names in os.walk(path):
+            dirs[:] = sorted(name for name in dirs
+                             if os.path.exists(os.path.join(where, name, '__init__.py')))
+            for name in sorted(names):
+                filename = os.path.normpath(os.path.join(where, name))
+                if name.endswith('.py') and filename not in PY35_MODULES:
+                    files.append(filename)
+    return files
+
+
+def main(paths):
+    status = subprocess.call(['mypy'] + python_files(paths))
+    py35_modules = [module for module in PY35_MODULES
+                    if any(module.startswith(os.path.normpath(path)) for path in paths)]
+    if py35_modules:
+        version = '{0}.{1}'.format(*sys.version_info[:2])
+        # Errors in the modules they import are reported by the first run
+        status = subprocess.call(['mypy', '--python-version', version,
+                                  '--follow-imports', 'silent'] + py35_modules) or status
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))